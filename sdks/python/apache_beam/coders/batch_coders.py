@@ -0,0 +1,154 @@
+#
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""Coders that encode a whole batch of a Batched DoFn as a single value.
+
+A batch coder is provided by a
+:class:`~apache_beam.typehints.batch.BatchConverter` through
+``get_batch_coder()``. When a PCollection is produced and consumed only by
+Batched DoFns with the same batch type, batches are encoded with it across the
+data plane instead of being exploded into elements and encoded one at a time.
+"""
+
+# pytype: skip-file
+
+from typing import Optional
+
+from apache_beam.coders.coders import Coder
+from apache_beam.coders.coders import LengthPrefixCoder
+from apache_beam.coders.coders import WindowedValueCoder
+
+try:
+  import pyarrow as pa
+except ImportError:
+  pa = None
+
+__all__ = ['BatchCoder']
+
+
+class BatchCoder(Coder):
+  """Base class for coders of the batches of a BatchConverter.
+
+  Each encoded value is a whole batch, so the elements of a PCollection encoded
+  with a BatchCoder are batches rather than the elements of the batches.
+  """
+  def __init__(self, batch_converter):
+    self._batch_converter = batch_converter
+
+  @property
+  def batch_converter(self):
+    return self._batch_converter
+
+  def is_deterministic(self):
+    return False
+
+  def estimate_size(self, value):
+    return self._batch_converter.estimate_byte_size(value)
+
+  def to_type_hint(self):
+    # The PCollection still logically contains elements.
+    return self._batch_converter.element_type
+
+  def __eq__(self, other):
+    return (
+        type(self) == type(other) and
+        self._batch_converter == other._batch_converter)
+
+  def __hash__(self):
+    return hash((type(self), self._batch_converter))
+
+  def __repr__(self):
+    return '%s[%s]' % (type(self).__name__, self._batch_converter.element_type)
+
+  @staticmethod
+  def from_coder(coder: Coder) -> Optional['BatchCoder']:
+    """Returns the BatchCoder wrapped by a (windowed) PCollection coder."""
+    if isinstance(coder, WindowedValueCoder):
+      coder = coder.wrapped_value_coder
+    if isinstance(coder, LengthPrefixCoder):
+      coder = coder.value_coder()
+    return coder if isinstance(coder, BatchCoder) else None
+
+
+def _write_ipc_stream(table):
+  sink = pa.BufferOutputStream()
+  with pa.ipc.new_stream(sink, table.schema) as writer:
+    writer.write_table(table)
+  return sink.getvalue().to_pybytes()
+
+
+def _read_ipc_stream(encoded):
+  # The decoded table references the buffers of encoded, rather than copying
+  # them.
+  with pa.ipc.open_stream(pa.py_buffer(encoded)) as reader:
+    return reader.read_all()
+
+
+class ArrowIpcBatchCoder(BatchCoder):
+  """Encodes a pa.Table batch as a single Arrow IPC stream."""
+  def __init__(self, batch_converter, arrow_schema):
+    super().__init__(batch_converter)
+    self._arrow_schema = arrow_schema
+
+  def encode(self, batch):
+    return _write_ipc_stream(batch)
+
+  def decode(self, encoded):
+    return _read_ipc_stream(encoded)
+
+
+class ArrowIpcArrayBatchCoder(ArrowIpcBatchCoder):
+  """Encodes a pa.Array batch as a single column Arrow IPC stream."""
+  def __init__(self, batch_converter, arrow_type):
+    super().__init__(
+        batch_converter, pa.schema([pa.field('value', arrow_type)]))
+
+  def encode(self, batch):
+    return _write_ipc_stream(
+        pa.Table.from_arrays([batch], schema=self._arrow_schema))
+
+  def decode(self, encoded):
+    return _read_ipc_stream(encoded).column(0).combine_chunks()
+
+
+class DataFrameArrowBatchCoder(BatchCoder):
+  """Encodes a pd.DataFrame batch as a single Arrow IPC stream."""
+  def __init__(self, batch_converter, preserve_index):
+    super().__init__(batch_converter)
+    self._preserve_index = preserve_index
+
+  def encode(self, batch):
+    return _write_ipc_stream(
+        pa.Table.from_pandas(batch, preserve_index=self._preserve_index))
+
+  def decode(self, encoded):
+    return _read_ipc_stream(encoded).to_pandas()
+
+
+class SeriesArrowBatchCoder(BatchCoder):
+  """Encodes a pd.Series batch as a single column Arrow IPC stream."""
+  def __init__(self, batch_converter, dtype):
+    super().__init__(batch_converter)
+    self._dtype = dtype
+
+  def encode(self, batch):
+    return _write_ipc_stream(
+        pa.Table.from_pandas(
+            batch.rename('value').to_frame(), preserve_index=False))
+
+  def decode(self, encoded):
+    return _read_ipc_stream(encoded).column(0).to_pandas().astype(self._dtype)
@@ -0,0 +1,157 @@
+#
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""Tests for the batch coders of Batched DoFns."""
+
+# pytype: skip-file
+
+import typing
+import unittest
+from collections.abc import Iterator
+
+import numpy as np
+import pyarrow as pa
+
+import apache_beam as beam
+from apache_beam import coders
+from apache_beam.coders.batch_coders import BatchCoder
+from apache_beam.coders.coders import GlobalWindowCoder
+from apache_beam.coders.coders import LengthPrefixCoder
+from apache_beam.options.pipeline_options import PipelineOptions
+from apache_beam.testing.test_pipeline import TestPipeline
+from apache_beam.testing.util import assert_that
+from apache_beam.testing.util import equal_to
+from apache_beam.typehints.batch import BatchConverter
+
+try:
+  import pandas as pd
+except ImportError:
+  pd = None
+
+Purchase = typing.NamedTuple(
+    'Purchase', [('item', str), ('quantity', np.int64), ('price', np.float64)])
+
+PURCHASES = [
+    Purchase('apple', 3, 0.5),
+    Purchase('banana', 12, 0.25),
+    Purchase('cherry', 100, 0.05),
+]
+
+
+class MultiplyDoFn(beam.DoFn):
+  def process_batch(self, batch: pa.Array) -> Iterator[pa.Array]:
+    yield pa.compute.multiply(batch, 2)
+
+  def infer_output_type(self, input_type):
+    return input_type
+
+
+class AddSideInputLengthDoFn(beam.DoFn):
+  def process_batch(self, batch: pa.Array,
+                    side: list[np.int64]) -> Iterator[pa.Array]:
+    yield pa.compute.add(batch, len(side))
+
+  def infer_output_type(self, input_type):
+    return input_type
+
+
+class ArrowIpcBatchCoderTest(unittest.TestCase):
+  def assert_round_trip(self, batch_converter, batch):
+    coder = batch_converter.get_batch_coder()
+    self.assertIsInstance(coder, BatchCoder)
+    self.assertEqual(
+        list(batch_converter.explode_batch(coder.decode(coder.encode(batch)))),
+        list(batch_converter.explode_batch(batch)))
+
+  def test_table(self):
+    batch_converter = BatchConverter.from_typehints(
+        element_type=Purchase, batch_type=pa.Table)
+    self.assert_round_trip(
+        batch_converter, batch_converter.produce_batch(PURCHASES))
+
+  def test_empty_table(self):
+    batch_converter = BatchConverter.from_typehints(
+        element_type=Purchase, batch_type=pa.Table)
+    self.assert_round_trip(batch_converter, batch_converter.produce_batch([]))
+
+  def test_array(self):
+    batch_converter = BatchConverter.from_typehints(
+        element_type=np.int64, batch_type=pa.Array)
+    self.assert_round_trip(
+        batch_converter, batch_converter.produce_batch([1, 2, 3]))
+
+  @unittest.skipIf(pd is None, 'pandas is not installed')
+  def test_dataframe(self):
+    batch_converter = BatchConverter.from_typehints(
+        element_type=Purchase, batch_type=pd.DataFrame)
+    self.assert_round_trip(
+        batch_converter, batch_converter.produce_batch(PURCHASES))
+
+  @unittest.skipIf(pd is None, 'pandas is not installed')
+  def test_series(self):
+    batch_converter = BatchConverter.from_typehints(
+        element_type=np.float64, batch_type=pd.Series)
+    self.assert_round_trip(
+        batch_converter, batch_converter.produce_batch([1.5, 2.5, -3.0]))
+
+  def test_from_coder(self):
+    coder = BatchConverter.from_typehints(
+        element_type=np.int64, batch_type=pa.Array).get_batch_coder()
+    windowed_coder = coders.WindowedValueCoder(
+        LengthPrefixCoder(coder), GlobalWindowCoder())
+    self.assertEqual(BatchCoder.from_coder(windowed_coder), coder)
+    self.assertIsNone(
+        BatchCoder.from_coder(coders.WindowedValueCoder(coders.VarIntCoder())))
+
+  def test_pipeline_uses_batch_coder(self):
+    options = PipelineOptions(experiments=['use_batch_coders'])
+    with TestPipeline('FnApiRunner', options=options) as p:
+      elements = (
+          p | beam.Create([np.int64(i)
+                           for i in range(10)]).with_output_types(np.int64))
+      multiplied = elements | beam.ParDo(MultiplyDoFn()).with_output_types(
+          np.int64)
+      # The side input is produced alongside MultiplyDoFn, which keeps
+      # AddSideInputLengthDoFn in another stage.
+      side = elements | beam.Map(lambda x: x)
+      result = multiplied | beam.ParDo(
+          AddSideInputLengthDoFn(), beam.pvalue.AsList(side)).with_output_types(
+              np.int64)
+      assert_that(result, equal_to([2 * i + 10 for i in range(10)]))
+
+      proto, context = p.to_runner_api(return_context=True)
+      pcoll_id = context.pcollections.get_id(multiplied)
+      self.assertIsInstance(
+          context.coders.get_by_id(
+              proto.components.pcollections[pcoll_id].coder_id),
+          BatchCoder)
+
+  def test_pipeline_without_batch_consumers(self):
+    options = PipelineOptions(experiments=['use_batch_coders'])
+    p = beam.Pipeline(options=options)
+    multiplied = (
+        p | beam.Create([np.int64(1)]).with_output_types(np.int64)
+        | beam.ParDo(MultiplyDoFn()).with_output_types(np.int64))
+    _ = multiplied | beam.Map(lambda x: x)
+    _ = multiplied | 'Again' >> beam.ParDo(MultiplyDoFn()).with_output_types(
+        np.int64)
+    p.to_runner_api()
+    self.assertIsNone(multiplied.batch_coder)
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -51,6 +51,13 @@ cdef class CoderImpl(object):
   @cython.overflowcheck(False)
   cpdef int _get_nested_size(self, int inner_size, bint nested)
   cpdef get_estimated_size_and_observables(self, value, bint nested=?)
+  cpdef encode_all_to_stream(self, values, OutputStream stream)
+  @cython.locals(values=list)
+  cpdef list decode_all_from_stream(self, InputStream stream)
+  @cython.locals(values=list)
+  cpdef list decode_some_from_stream(self, InputStream stream, size_t limit)
+  cpdef bytes encode_all(self, values)
+  cpdef list decode_all(self, encoded)
 
 
 cdef class SimpleCoderImpl(CoderImpl):
@@ -71,7 +78,7 @@ cdef object NoneType
 cdef unsigned char UNKNOWN_TYPE, NONE_TYPE, INT_TYPE, FLOAT_TYPE, BOOL_TYPE
 cdef unsigned char BYTES_TYPE, UNICODE_TYPE, LIST_TYPE, TUPLE_TYPE, DICT_TYPE
 cdef unsigned char SET_TYPE, ITERABLE_LIKE_TYPE
-cdef unsigned char PROTO_TYPE, DATACLASS_TYPE, NAMED_TUPLE_TYPE
+cdef unsigned char PROTO_TYPE, DATACLASS_TYPE, NAMED_TUPLE_TYPE, KNOWN_TYPE
 
 
 cdef set _ITERABLE_LIKE_TYPES
@@ -83,6 +90,9 @@ cdef class FastPrimitivesCoderImpl(StreamCoderImpl):
   cdef bint warn_deterministic_fallback
   cdef bint force_use_dill
   cdef bint use_relative_filepaths
+  cdef tuple known_types
+  cdef dict known_type_ids
+  cdef tuple known_type_fields
 
   @cython.locals(dict_value=dict, int_value=libc.stdint.int64_t,
                  unicode_value=unicode)
@@ -90,6 +100,9 @@ cdef class FastPrimitivesCoderImpl(StreamCoderImpl):
   @cython.locals(t=int)
   cpdef decode_from_stream(self, InputStream stream, bint nested)
   cdef encode_special_deterministic(self, value, OutputStream stream)
+  cdef bint has_only_fields(self, value, libc.stdint.int64_t type_id) except -1
+  cdef encode_known_type(self, value, libc.stdint.int64_t type_id, OutputStream stream)
+  cdef decode_known_type(self, InputStream stream)
   cdef encode_type_2_67_0(self, t, OutputStream stream)
   cdef encode_type(self, t, OutputStream stream)
   cdef decode_type(self, InputStream stream)
@@ -106,7 +119,15 @@ cdef class MapCoderImpl(StreamCoderImpl):
 
 
 cdef class BytesCoderImpl(CoderImpl):
-  pass
+  cdef bint _zero_copy
+
+  @cython.locals(values=list)
+  cpdef list decode_all_from_stream(self, InputStream stream)
+
+
+cdef class StrUtf8CoderImpl(StreamCoderImpl):
+  @cython.locals(values=list)
+  cpdef list decode_all_from_stream(self, InputStream stream)
 
 
 cdef class BooleanCoderImpl(CoderImpl):
@@ -137,6 +158,8 @@ cdef list small_ints
 cdef class VarIntCoderImpl(StreamCoderImpl):
   @cython.locals(ivalue=libc.stdint.int64_t)
   cpdef bytes encode(self, value)
+  @cython.locals(values=list)
+  cpdef list decode_all_from_stream(self, InputStream stream)
 
 
 cdef class VarInt32CoderImpl(StreamCoderImpl):
@@ -164,7 +187,10 @@ cdef class AbstractComponentCoderImpl(StreamCoderImpl):
 
 
 cdef class TupleCoderImpl(AbstractComponentCoderImpl):
-  pass
+  @cython.locals(key_coder=CoderImpl, value_coder=CoderImpl)
+  cpdef encode_all_to_stream(self, values, OutputStream stream)
+  @cython.locals(key_coder=CoderImpl, value_coder=CoderImpl, values=list)
+  cpdef list decode_all_from_stream(self, InputStream stream)
 
 
 cdef class SequenceCoderImpl(StreamCoderImpl):
@@ -251,9 +277,17 @@ cdef class WindowedValueCoderImpl(StreamCoderImpl):
   cdef CoderImpl _timestamp_coder
   cdef CoderImpl _windows_coder
   cdef CoderImpl _pane_info_coder
+  cdef tuple _global_windows
+  cdef bytes _global_windows_suffix
+  cdef bytes _min_timestamp_global_header
 
   cdef libc.stdint.uint64_t _to_normal_time(self, libc.stdint.int64_t value)
   cdef libc.stdint.int64_t _from_normal_time(self, libc.stdint.uint64_t value)
+  @cython.locals(restore_sign=int)
+  cdef _write_timestamp(self, libc.stdint.int64_t timestamp_micros, OutputStream out)
+  cdef bint _is_global_windows(self, windows) except -1
+  @cython.locals(size=libc.stdint.int64_t, count=libc.stdint.int64_t)
+  cdef tuple _decode_global_windows(self, InputStream in_stream)
 
   @cython.locals(c=CoderImpl)
   cpdef get_estimated_size_and_observables(self, value, bint nested=?)
@@ -261,7 +295,7 @@ cdef class WindowedValueCoderImpl(StreamCoderImpl):
   @cython.locals(timestamp=libc.stdint.int64_t)
   cpdef decode_from_stream(self, InputStream stream, bint nested)
 
-  @cython.locals(wv=windowed_value.WindowedValue, restore_sign=int)
+  @cython.locals(wv=windowed_value.WindowedValue)
   cpdef encode_to_stream(self, value, OutputStream stream, bint nested)
 
 
@@ -274,6 +308,7 @@ cdef class ParamWindowedValueCoderImpl(WindowedValueCoderImpl):
 
 cdef class LengthPrefixCoderImpl(StreamCoderImpl):
   cdef CoderImpl _value_coder
+  cdef bint _zero_copy
 
 
 cdef class RowColumnEncoder:
@@ -298,23 +333,49 @@ cdef class RowCoderImpl(StreamCoderImpl):
   cdef list components
   cdef bint has_nullable_fields
 
-  @cython.locals(i=int, nvals=libc.stdint.int64_t, running=int, component_coder=CoderImpl,
-                 null_mask=bytes, null_mask_c=char_ptr)
+  @cython.locals(nvals=libc.stdint.int64_t)
   cpdef decode_from_stream(self, InputStream stream, bint nested)
 
-  @cython.locals(i=int, nvals=libc.stdint.int64_t, k=size_t, n=size_t,
+  @cython.locals(i=int, component_coder=CoderImpl,
                  null_mask=bytes, null_mask_c=char_ptr)
+  cpdef _decode_fields_from_stream(
+      self, InputStream stream, long long nvals)
+
+  @cython.locals(k=size_t, n=size_t)
   cpdef decode_batch_from_stream(self, dict dest, InputStream stream)
 
+  @cython.locals(i=int, nvals=libc.stdint.int64_t,
+                 null_mask=bytes, null_mask_c=char_ptr)
+  cdef bint _decode_batch_row(
+      self, list attrs, size_t k, InputStream stream) except -1
+
   @cython.locals(i=int, running=int, component_coder=CoderImpl)
   cpdef encode_to_stream(self, value, OutputStream stream, bint nested)
 
-  @cython.locals(i=int, k=size_t, n=size_t,
+  @cython.locals(k=size_t, n=size_t,
                  null_flags=libc.stdint.uint8_t[:,::1],
                  null_bits=libc.stdint.uint8_t[:,::1],
                  has_null_bits=libc.stdint.uint8_t[::1])
   cpdef encode_batch_to_stream(self, dict values, OutputStream stream)
 
+  @cython.locals(i=int, null_bits_len=int)
+  cdef bint _encode_batch_row(
+      self,
+      list attrs,
+      size_t k,
+      libc.stdint.uint8_t[::1] has_null_bits,
+      libc.stdint.uint8_t[:,::1] null_bits,
+      libc.stdint.uint8_t[:,::1] null_flags,
+      OutputStream stream) except -1
+
+
+cdef class SchemaSpecializedRowCoderImpl(RowCoderImpl):
+  cdef object _encode_fn
+  cdef object _decode_fn
+
+  cpdef encode_to_stream(self, value, OutputStream stream, bint nested)
+  cpdef decode_from_stream(self, InputStream stream, bint nested)
+
 
 cdef class LogicalTypeCoderImpl(StreamCoderImpl):
   cdef object logical_type
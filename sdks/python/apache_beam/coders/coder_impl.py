@@ -31,13 +31,17 @@ For internal use only; no backwards-compatibility guarantees.
 # pytype: skip-file
 
 # ruff: noqa: UP006
+import collections
 import dataclasses
 import decimal
 import enum
+import functools
 import itertools
 import json
 import logging
+import operator
 import pickle
+import threading
 from io import BytesIO
 from typing import TYPE_CHECKING
 from typing import Any
@@ -51,6 +55,7 @@ from typing import Sequence
 from typing import Set
 from typing import Tuple
 from typing import Type
+from typing import Union
 
 import numpy as np
 from fastavro import parse_schema
@@ -154,18 +159,40 @@ class CoderImpl(object):
     """Decodes an object to an unnested string."""
     raise NotImplementedError
 
+  def encode_all_to_stream(self, values, stream):
+    # type: (Iterable[Any], create_OutputStream) -> None
+
+    """Writes the nested encoding of each of values to stream."""
+    for value in values:
+      self.encode_to_stream(value, stream, True)
+
+  def decode_all_from_stream(self, stream):
+    # type: (create_InputStream) -> List[Any]
+
+    """Reads nested encoded objects until stream is exhausted."""
+    values = []
+    while stream.size() > 0:
+      values.append(self.decode_from_stream(stream, True))
+    return values
+
+  def decode_some_from_stream(self, stream, limit):
+    # type: (create_InputStream, int) -> List[Any]
+
+    """Reads at most limit nested encoded objects from stream."""
+    values = []
+    while len(values) < limit and stream.size() > 0:
+      values.append(self.decode_from_stream(stream, True))
+    return values
+
   def encode_all(self, values):
     # type: (Iterable[Any]) -> bytes
     out = create_OutputStream()
-    for value in values:
-      self.encode_to_stream(value, out, True)
+    self.encode_all_to_stream(values, out)
     return out.get()
 
   def decode_all(self, encoded):
-    # type: (bytes) -> Iterator[Any]
-    input_stream = create_InputStream(encoded)
-    while input_stream.size() > 0:
-      yield self.decode_from_stream(input_stream, True)
+    # type: (Union[bytes, memoryview]) -> List[Any]
+    return self.decode_all_from_stream(create_InputStream(encoded))
 
   def encode_nested(self, value):
     # type: (Any) -> bytes
@@ -352,6 +379,7 @@ NAMED_TUPLE_TYPE = 102
 ENUM_TYPE = 103
 NESTED_STATE_TYPE = 104
 DATACLASS_KW_ONLY_TYPE = 105
+KNOWN_TYPE = 106
 
 # Types that can be encoded as iterables, but are not literally
 # lists, etc. due to being lazy.  The actual type is not preserved
@@ -379,13 +407,21 @@ class FastPrimitivesCoderImpl(StreamCoderImpl):
       fallback_coder_impl,
       requires_deterministic_step_label=None,
       force_use_dill=False,
-      use_relative_filepaths=True):
+      use_relative_filepaths=True,
+      known_types=()):
     self.fallback_coder_impl = fallback_coder_impl
     self.iterable_coder_impl = IterableCoderImpl(self)
     self.requires_deterministic_step_label = requires_deterministic_step_label
     self.warn_deterministic_fallback = True
     self.force_use_dill = force_use_dill
     self.use_relative_filepaths = use_relative_filepaths
+    # Dataclasses and NamedTuples that are encoded as their index in
+    # known_types followed by their fields, instead of by the fallback coder.
+    self.known_types = tuple(known_types)
+    self.known_type_ids = {t: i for i, t in enumerate(self.known_types)}
+    self.known_type_fields = tuple(
+        tuple(field.name for field in dataclasses.fields(t)) if dataclasses.
+        is_dataclass(t) else None for t in self.known_types)
 
   @staticmethod
   def register_iterable_like_type(t):
@@ -479,10 +515,47 @@ class FastPrimitivesCoderImpl(StreamCoderImpl):
     # all non-deterministic ones below.
     elif self.requires_deterministic_step_label is not None:
       self.encode_special_deterministic(value, stream)
+    elif t in self.known_type_ids and self.has_only_fields(
+        value, self.known_type_ids[t]):
+      self.encode_known_type(value, self.known_type_ids[t], stream)
     else:
       stream.write_byte(UNKNOWN_TYPE)
       self.fallback_coder_impl.encode_to_stream(value, stream, nested)
 
+  def has_only_fields(self, value, type_id):
+    field_names = self.known_type_fields[type_id]
+    # Dataclass instances with attributes other than their fields, or with
+    # unset fields, are encoded by the fallback coder.
+    return field_names is None or len(value.__dict__) == len(field_names)
+
+  def encode_known_type(self, value, type_id, stream):
+    stream.write_byte(KNOWN_TYPE)
+    stream.write_var_int64(type_id)
+    field_names = self.known_type_fields[type_id]
+    if field_names is None:
+      for e in value:
+        self.encode_to_stream(e, stream, True)
+    else:
+      for field_name in field_names:
+        self.encode_to_stream(getattr(value, field_name), stream, True)
+
+  def decode_known_type(self, stream):
+    type_id = stream.read_var_int64()
+    cls = self.known_types[type_id]
+    field_names = self.known_type_fields[type_id]
+    if field_names is None:
+      return cls(
+          *[
+              self.decode_from_stream(stream, True)
+              for _ in range(len(cls._fields))
+          ])
+    # Like unpickling, restore the fields without calling __init__.
+    value = cls.__new__(cls)
+    for field_name in field_names:
+      object.__setattr__(
+          value, field_name, self.decode_from_stream(stream, True))
+    return value
+
   def encode_special_deterministic(self, value, stream):
     if self.warn_deterministic_fallback:
       _LOGGER.warning(
@@ -641,6 +714,8 @@ class FastPrimitivesCoderImpl(StreamCoderImpl):
       value = cls.__new__(cls)
       value.__setstate__(state)
       return value
+    elif t == KNOWN_TYPE:
+      return self.decode_known_type(stream)
     elif t == UNKNOWN_TYPE:
       return self.fallback_coder_impl.decode_from_stream(stream, nested)
     else:
@@ -687,7 +762,15 @@ def _unpickle_named_tuple(bs, items):
 class BytesCoderImpl(CoderImpl):
   """For internal use only; no backwards-compatibility guarantees.
 
-  A coder for bytes/str objects."""
+  A coder for bytes/str objects.
+
+  With zero_copy, values are decoded as memoryviews of the buffer they are
+  read from rather than as bytes copied out of it, and any bytes-like object
+  can be encoded."""
+  def __init__(self, zero_copy=False):
+    # type: (bool) -> None
+    self._zero_copy = zero_copy
+
   def encode_to_stream(self, value, out, nested):
     # type: (bytes, create_OutputStream, bool) -> None
 
@@ -695,21 +778,75 @@ class BytesCoderImpl(CoderImpl):
     # does not recognize it as bytes.
     if is_compiled and isinstance(value, np.bytes_):
       value = bytes(value)
+    elif self._zero_copy and not isinstance(value, bytes):
+      value = bytes(value)
 
     out.write(value, nested)
 
   def decode_from_stream(self, in_stream, nested):
     # type: (create_InputStream, bool) -> bytes
+    if self._zero_copy:
+      return in_stream.read_all_view(nested)
     return in_stream.read_all(nested)
 
+  def decode_all_from_stream(self, in_stream):
+    # type: (create_InputStream) -> List[bytes]
+    values = []
+    if self._zero_copy:
+      while in_stream.size() > 0:
+        values.append(in_stream.read_all_view(True))
+      return values
+    while in_stream.size() > 0:
+      values.append(in_stream.read_all(True))
+    return values
+
   def encode(self, value):
+    if self._zero_copy and not isinstance(value, bytes):
+      return bytes(value)
     assert isinstance(value, bytes), (value, type(value))
     return value
 
   def decode(self, encoded):
+    if self._zero_copy:
+      return memoryview(encoded)
     return encoded
 
 
+class StrUtf8CoderImpl(StreamCoderImpl):
+  """For internal use only; no backwards-compatibility guarantees.
+
+  A coder for str objects, encoded as UTF-8."""
+  def encode_to_stream(self, value, out, nested):
+    # type: (str, create_OutputStream, bool) -> None
+    out.write(value.encode('utf-8'), nested)
+
+  def decode_from_stream(self, in_stream, nested):
+    # type: (create_InputStream, bool) -> str
+    return in_stream.read_all(nested).decode('utf-8')
+
+  def encode_all_to_stream(self, values, out):
+    # type: (Iterable[str], create_OutputStream) -> None
+    for value in values:
+      out.write(value.encode('utf-8'), True)
+
+  def decode_all_from_stream(self, in_stream):
+    # type: (create_InputStream) -> List[str]
+    values = []
+    while in_stream.size() > 0:
+      values.append(in_stream.read_all(True).decode('utf-8'))
+    return values
+
+  def encode(self, value):
+    return value.encode('utf-8')
+
+  def decode(self, encoded):
+    return encoded.decode('utf-8')
+
+  def estimate_size(self, value, nested=False):
+    # type: (Any, bool) -> int
+    return self._get_nested_size(len(value.encode('utf-8')), nested)
+
+
 class BooleanCoderImpl(CoderImpl):
   """For internal use only; no backwards-compatibility guarantees.
 
@@ -1056,6 +1193,13 @@ class VarIntCoderImpl(StreamCoderImpl):
     # type: (create_InputStream, bool) -> int
     return in_stream.read_var_int64()
 
+  def decode_all_from_stream(self, in_stream):
+    # type: (create_InputStream) -> List[int]
+    values = []
+    while in_stream.size() > 0:
+      values.append(in_stream.read_var_int64())
+    return values
+
   def encode(self, value):
     ivalue = value  # type cast
     if 0 <= ivalue < len(small_ints):
@@ -1221,6 +1365,30 @@ class TupleCoderImpl(AbstractComponentCoderImpl):
   def _construct_from_components(self, components):
     return tuple(components)
 
+  def encode_all_to_stream(self, values, out):
+    # type: (Iterable[Any], create_OutputStream) -> None
+    if len(self._coder_impls) != 2:
+      StreamCoderImpl.encode_all_to_stream(self, values, out)
+      return
+    # Key-value pairs, the most common tuples, skip the component lists.
+    key_coder = self._coder_impls[0]
+    value_coder = self._coder_impls[1]
+    for key, value in values:
+      key_coder.encode_to_stream(key, out, True)
+      value_coder.encode_to_stream(value, out, True)
+
+  def decode_all_from_stream(self, in_stream):
+    # type: (create_InputStream) -> List[Any]
+    if len(self._coder_impls) != 2:
+      return StreamCoderImpl.decode_all_from_stream(self, in_stream)
+    key_coder = self._coder_impls[0]
+    value_coder = self._coder_impls[1]
+    values = []
+    while in_stream.size() > 0:
+      key = key_coder.decode_from_stream(in_stream, True)
+      values.append((key, value_coder.decode_from_stream(in_stream, True)))
+    return values
+
 
 class _ConcatSequence(object):
   def __init__(self, head, tail):
@@ -1614,11 +1782,27 @@ class WindowedValueCoderImpl(StreamCoderImpl):
     self._windows_coder = TupleSequenceCoderImpl(window_coder)
     self._pane_info_coder = PaneInfoCoderImpl()
 
-  def encode_to_stream(self, value, out, nested):
-    # type: (windowed_value.WindowedValue, create_OutputStream, bool) -> None
-    wv = value  # type cast
+    # Nearly all elements of batch pipelines are in the global window with the
+    # default pane, and most of them at MIN_TIMESTAMP. Their encoded windows
+    # and pane, and their whole encoded header, are computed once.
+    from apache_beam.transforms.window import GlobalWindow
+    self._global_windows = None
+    if (isinstance(window_coder, SingletonCoderImpl) and
+        isinstance(window_coder.decode(b''), GlobalWindow)):
+      self._global_windows = (window_coder.decode(b''), )
+      out = create_OutputStream()
+      self._windows_coder.encode_to_stream(self._global_windows, out, True)
+      self._pane_info_coder.encode_to_stream(
+          windowed_value.PANE_INFO_UNKNOWN, out, True)
+      self._global_windows_suffix = out.get()
+      out = create_OutputStream()
+      self._write_timestamp(MIN_TIMESTAMP_micros, out)
+      self._min_timestamp_global_header = (
+          out.get() + self._global_windows_suffix)
+
+  def _write_timestamp(self, timestamp_micros, out):
     # Avoid creation of Timestamp object.
-    restore_sign = -1 if wv.timestamp_micros < 0 else 1
+    restore_sign = -1 if timestamp_micros < 0 else 1
     out.write_bigendian_uint64(
         # Convert to postive number and divide, since python rounds off to the
         # lower negative number. For ex: -3 / 2 = -2, but we expect it to be -1,
@@ -1628,11 +1812,49 @@ class WindowedValueCoderImpl(StreamCoderImpl):
         self._from_normal_time(
             restore_sign * (
                 abs(
-                    MIN_TIMESTAMP_micros if wv.timestamp_micros <
-                    MIN_TIMESTAMP_micros else wv.timestamp_micros) // 1000)))
-    self._windows_coder.encode_to_stream(wv.windows, out, True)
-    # Default PaneInfo encoded byte representing NO_FIRING.
-    self._pane_info_coder.encode_to_stream(wv.pane_info, out, True)
+                    MIN_TIMESTAMP_micros if timestamp_micros <
+                    MIN_TIMESTAMP_micros else timestamp_micros) // 1000)))
+
+  def _is_global_windows(self, windows):
+    if windows is self._global_windows:
+      return True
+    return (
+        isinstance(windows, (tuple, list)) and len(windows) == 1 and
+        windows[0] is self._global_windows[0])
+
+  def _decode_global_windows(self, in_stream):
+    # Global windows are encoded as no bytes, so only their count is read.
+    size = in_stream.read_bigendian_int32()
+    if size == 1:
+      return self._global_windows
+    if size < 0:
+      # An unknown length is followed by counts of elements, ending in 0.
+      size = 0
+      count = in_stream.read_var_int64()
+      while count > 0:
+        size += count
+        count = in_stream.read_var_int64()
+      if count < 0:
+        raise ValueError(
+            'Cannot read state-written iterable without state reader.')
+    return self._global_windows * size
+
+  def encode_to_stream(self, value, out, nested):
+    # type: (windowed_value.WindowedValue, create_OutputStream, bool) -> None
+    wv = value  # type cast
+    if (self._global_windows is not None and
+        wv.pane_info is windowed_value.PANE_INFO_UNKNOWN and
+        self._is_global_windows(wv.windows)):
+      if wv.timestamp_micros == MIN_TIMESTAMP_micros:
+        out.write(self._min_timestamp_global_header)
+      else:
+        self._write_timestamp(wv.timestamp_micros, out)
+        out.write(self._global_windows_suffix)
+    else:
+      self._write_timestamp(wv.timestamp_micros, out)
+      self._windows_coder.encode_to_stream(wv.windows, out, True)
+      # Default PaneInfo encoded byte representing NO_FIRING.
+      self._pane_info_coder.encode_to_stream(wv.pane_info, out, True)
     self._value_coder.encode_to_stream(wv.value, out, nested)
 
   def decode_from_stream(self, in_stream, nested):
@@ -1651,7 +1873,10 @@ class WindowedValueCoderImpl(StreamCoderImpl):
     else:
       timestamp *= 1000
 
-    windows = self._windows_coder.decode_from_stream(in_stream, True)
+    if self._global_windows is not None:
+      windows = self._decode_global_windows(in_stream)
+    else:
+      windows = self._windows_coder.decode_from_stream(in_stream, True)
     # Read PaneInfo encoded byte.
     pane_info = self._pane_info_coder.decode_from_stream(in_stream, True)
     value = self._value_coder.decode_from_stream(in_stream, nested)
@@ -1732,10 +1957,14 @@ class ParamWindowedValueCoderImpl(WindowedValueCoderImpl):
 class LengthPrefixCoderImpl(StreamCoderImpl):
   """For internal use only; no backwards-compatibility guarantees.
 
-  Coder which prefixes the length of the encoded object in the stream."""
-  def __init__(self, value_coder):
-    # type: (CoderImpl) -> None
+  Coder which prefixes the length of the encoded object in the stream.
+
+  With zero_copy, the value is decoded from a view of the input stream rather
+  than from a copy of its encoded bytes."""
+  def __init__(self, value_coder, zero_copy=False):
+    # type: (CoderImpl, bool) -> None
     self._value_coder = value_coder
+    self._zero_copy = zero_copy
 
   def encode_to_stream(self, value, out, nested):
     # type: (Any, create_OutputStream, bool) -> None
@@ -1746,6 +1975,9 @@ class LengthPrefixCoderImpl(StreamCoderImpl):
   def decode_from_stream(self, in_stream, nested):
     # type: (create_InputStream, bool) -> Any
     value_length = in_stream.read_var_int64()
+    if self._zero_copy:
+      return self._value_coder.decode_from_stream(
+          create_InputStream(in_stream.read_view(value_length)), False)
     return self._value_coder.decode(in_stream.read(value_length))
 
   def estimate_size(self, value, nested=False):
@@ -1891,8 +2123,24 @@ class RowColumnEncoder:
       except ImportError:
         pass
       row_coders_registered = True
-    return cls.ROW_ENCODERS.get((field_type, column.dtype),
-                                GenericRowColumnEncoder)(coder_impl, column)
+    dtype = getattr(column, 'dtype', None)
+    if dtype is None:
+      # A pyarrow.Array, for which encoders are registered by array type.
+      encoder_cls = cls.ROW_ENCODERS.get((field_type, type(column)))
+      if encoder_cls is not None:
+        return encoder_cls(coder_impl, column)
+      if column.null_count:
+        column = np.array(column.to_pylist(), dtype=object)
+      else:
+        column = column.to_numpy(zero_copy_only=False, writable=True)
+      dtype = column.dtype
+    # Encoders may be registered for a dtype, or for a dtype kind such as
+    # 'O' (object) or 'M' (datetime64).
+    encoder_cls = cls.ROW_ENCODERS.get((field_type, dtype))
+    if encoder_cls is None:
+      encoder_cls = cls.ROW_ENCODERS.get((field_type, dtype.kind),
+                                         GenericRowColumnEncoder)
+    return encoder_cls(coder_impl, column)
 
   def null_flags(self):
     raise NotImplementedError(type(self))
@@ -1926,6 +2174,21 @@ class GenericRowColumnEncoder(RowColumnEncoder):
     pass
 
 
+def _row_column_field_type(field_type):
+  """Returns the key of the RowColumnEncoders of a schema field type.
+
+  This is the atomic type of atomic fields, the urn of logical types, and
+  the name of the type_info (e.g. 'row_type') otherwise.
+  """
+  type_info = field_type.WhichOneof('type_info')
+  if type_info == 'atomic_type':
+    return field_type.atomic_type
+  elif type_info == 'logical_type':
+    return field_type.logical_type.urn
+  else:
+    return type_info
+
+
 class RowCoderImpl(StreamCoderImpl):
   """For internal use only; no backwards-compatibility guarantees."""
   def __init__(self, schema, components):
@@ -1997,50 +2260,61 @@ class RowCoderImpl(StreamCoderImpl):
   def _row_column_encoders(self, columns):
     return [
         RowColumnEncoder.create(
-            self.schema.fields[i].type.atomic_type,
+            _row_column_field_type(self.schema.fields[i].type),
             self.components[i],
             columns[name]) for i, name in enumerate(self.field_names)
     ]
 
-  def encode_batch_to_stream(self, columns: Dict[str, np.ndarray], out):
-    attrs = self._row_column_encoders(columns)
-    n = len(next(iter(columns.values())))
+  def _batch_null_bits(self, attrs, n):
+    """Returns the has_null_bits, null_bits and null_flags of n rows."""
     if self.has_nullable_fields:
-      null_flags_py = np.zeros((n, self.num_fields), dtype=np.uint8)
+      null_flags = np.zeros((n, self.num_fields), dtype=np.uint8)
       null_bits_len = (self.num_fields + 7) // 8
-      null_bits_py = np.zeros((n, null_bits_len), dtype=np.uint8)
+      null_bits = np.zeros((n, null_bits_len), dtype=np.uint8)
       for i, attr in enumerate(attrs):
         attr_null_flags = attr.null_flags()
         if attr_null_flags is not None and attr_null_flags.any():
-          null_flags_py[:, i] = attr_null_flags
-          null_bits_py[:, i // 8] |= attr_null_flags << np.uint8(i % 8)
-      has_null_bits = (null_bits_py.sum(axis=1) != 0).astype(np.uint8)
-      null_bits = null_bits_py
-      null_flags = null_flags_py
+          null_flags[:, i] = attr_null_flags
+          null_bits[:, i // 8] |= attr_null_flags << np.uint8(i % 8)
+      has_null_bits = (null_bits.sum(axis=1) != 0).astype(np.uint8)
+      return has_null_bits, null_bits, null_flags
     else:
-      has_null_bits = np.zeros((n, ), dtype=np.uint8)
+      return np.zeros((n, ), dtype=np.uint8), None, None
 
+  def encode_batch_to_stream(self, columns: Dict[str, np.ndarray], out):
+    attrs = self._row_column_encoders(columns)
+    n = len(next(iter(columns.values())))
+    has_null_bits, null_bits, null_flags = self._batch_null_bits(attrs, n)
     for k in range(n):
-      out.write_var_int64(self.num_fields)
-      if has_null_bits[k]:
-        out.write_byte(null_bits_len)
-        for i in range(null_bits_len):
-          out.write_byte(null_bits[k, i])
+      self._encode_batch_row(
+          attrs, k, has_null_bits, null_bits, null_flags, out)
+
+  def _encode_batch_row(
+      self, attrs, k, has_null_bits, null_bits, null_flags, out):
+    out.write_var_int64(self.num_fields)
+    if has_null_bits[k]:
+      null_bits_len = (self.num_fields + 7) // 8
+      out.write_byte(null_bits_len)
+      for i in range(null_bits_len):
+        out.write_byte(null_bits[k, i])
+    else:
+      out.write_byte(0)
+    for i in range(self.num_fields):
+      if not self.encoding_positions_are_trivial:
+        i = self.encoding_positions_argsort[i]
+      if has_null_bits[k] and null_flags[k, i]:
+        if not self.field_nullable[i]:
+          raise ValueError(
+              "Attempted to encode null for non-nullable field \"{}\".".format(
+                  self.schema.fields[i].name))
       else:
-        out.write_byte(0)
-      for i in range(self.num_fields):
-        if not self.encoding_positions_are_trivial:
-          i = self.encoding_positions_argsort[i]
-        if has_null_bits[k] and null_flags[k, i]:
-          if not self.field_nullable[i]:
-            raise ValueError(
-                "Attempted to encode null for non-nullable field \"{}\".".
-                format(self.schema.fields[i].name))
-        else:
-          cython.cast(RowColumnEncoder, attrs[i]).encode_to_stream(k, out)
+        cython.cast(RowColumnEncoder, attrs[i]).encode_to_stream(k, out)
 
   def decode_from_stream(self, in_stream, nested):
     nvals = in_stream.read_var_int64()
+    return self._decode_fields_from_stream(in_stream, nvals)
+
+  def _decode_fields_from_stream(self, in_stream, nvals):
     null_mask_len = in_stream.read_var_int64()
     if null_mask_len:
       # pylint: disable=unused-variable
@@ -2078,21 +2352,7 @@ class RowCoderImpl(StreamCoderImpl):
     for k in range(n):
       if in_stream.size() == 0:
         break
-      nvals = in_stream.read_var_int64()
-      null_mask_len = in_stream.read_var_int64()
-      if null_mask_len:
-        # pylint: disable=unused-variable
-        null_mask_c = null_mask = in_stream.read(null_mask_len)
-
-      for i in range(min(self.num_fields, nvals)):
-        if not self.encoding_positions_are_trivial:
-          i = self.encoding_positions_argsort[i]
-        if (null_mask_len and i >> 3 < null_mask_len and
-            null_mask_c[i >> 3] & (0x01 << (i & 0x07))):
-          continue
-        else:
-          cython.cast(RowColumnEncoder,
-                      attrs[i]).decode_from_stream(k, in_stream)
+      self._decode_batch_row(attrs, k, in_stream)
     else:
       # Loop variable will be n-1 on normal exit.
       k = n
@@ -2101,6 +2361,185 @@ class RowCoderImpl(StreamCoderImpl):
       attr.finalize_write()
     return k
 
+  def _decode_batch_row(self, attrs, k, in_stream):
+    nvals = in_stream.read_var_int64()
+    null_mask_len = in_stream.read_var_int64()
+    if null_mask_len:
+      # pylint: disable=unused-variable
+      null_mask_c = null_mask = in_stream.read(null_mask_len)
+
+    for i in range(min(self.num_fields, nvals)):
+      if not self.encoding_positions_are_trivial:
+        i = self.encoding_positions_argsort[i]
+      if (null_mask_len and i >> 3 < null_mask_len and
+          null_mask_c[i >> 3] & (0x01 << (i & 0x07))):
+        continue
+      else:
+        cython.cast(RowColumnEncoder, attrs[i]).decode_from_stream(k, in_stream)
+
+
+# Stream method calls of the CoderImpls that SchemaSpecializedRowCoderImpl
+# inlines, as (encode format, decode expression).
+_INLINED_ROW_COMPONENTS = {
+    VarIntCoderImpl: ('out.write_var_int64({})', 'in_stream.read_var_int64()'),
+    VarInt32CoderImpl: (
+        'out.write_var_int32({})', 'in_stream.read_var_int32()'),
+    BigEndianShortCoderImpl: (
+        'out.write_bigendian_int16({})', 'in_stream.read_bigendian_int16()'),
+    ByteCoderImpl: ('out.write_byte({})', 'in_stream.read_byte()'),
+    SinglePrecisionFloatCoderImpl: (
+        'out.write_bigendian_float({})', 'in_stream.read_bigendian_float()'),
+    FloatCoderImpl: (
+        'out.write_bigendian_double({})', 'in_stream.read_bigendian_double()'),
+    BytesCoderImpl: ('out.write({}, True)', 'in_stream.read_all(True)'),
+    StrUtf8CoderImpl: (
+        "out.write({}.encode('utf-8'), True)",
+        "in_stream.read_all(True).decode('utf-8')"),
+}  # type: Dict[type, Tuple[str, str]]
+
+# The compiled code of the functions generated by SchemaSpecializedRowCoderImpl,
+# keyed by their source, from the least to the most recently used. The code
+# does not depend on the coder instance; its components and constructor are
+# bound by each instance.
+_SPECIALIZED_ROW_CODER_CODE = collections.OrderedDict(
+)  # type: collections.OrderedDict[str, Any]
+# The maximum number of entries of _SPECIALIZED_ROW_CODER_CODE.
+_SPECIALIZED_ROW_CODER_CODE_MAX_SIZE = 1000
+_SPECIALIZED_ROW_CODER_CODE_LOCK = threading.Lock()
+
+
+class SchemaSpecializedRowCoderImpl(RowCoderImpl):
+  """For internal use only; no backwards-compatibility guarantees.
+
+  A RowCoderImpl whose encode and decode are straight-line Python functions
+  generated for its schema, rather than loops over the fields.
+
+  Fixed-width and string components are written and read inline, the null
+  bitmap layout is computed up front, and rows without nulls take a single
+  branch. The compiled code of the functions is cached in a bounded LRU cache,
+  and bound to the components of each instance.
+  """
+  def __init__(self, schema, components):
+    super().__init__(schema, components)
+    self._encode_fn, self._decode_fn = self._generate_fns()
+
+  def encode_to_stream(self, value, out, nested):
+    self._encode_fn(value, out)
+
+  def decode_from_stream(self, in_stream, nested):
+    return self._decode_fn(in_stream)
+
+  def _field_code(self, i):
+    """Returns the encode statement and decode expression of field i."""
+    component = self.components[i]
+    inlined = _INLINED_ROW_COMPONENTS.get(type(component))
+    if inlined is not None:
+      encode_format, decode_expr = inlined
+      return encode_format.format('a%d' % i), decode_expr
+    return (
+        'encode%d(a%d, out, True)' % (i, i), 'decode%d(in_stream, True)' % i)
+
+  def _generate_fns(self):
+    n = self.num_fields
+    names = ['a%d' % i for i in range(n)]
+    order = (
+        list(range(n)) if self.encoding_positions_are_trivial else
+        [int(i) for i in self.encoding_positions_argsort])
+    nullable = [i for i in range(n) if self.field_nullable[i]]
+    null_mask_len = (n + 7) // 8
+    field_code = [self._field_code(i) for i in range(n)]
+
+    header = create_OutputStream()
+    header.write_var_int64(n)
+    header.write_byte(0)
+    namespace = {
+        'get_attrs': operator.attrgetter(*self.field_names) if n else None,
+        'header': header.get(),
+        'field_names': self.field_names,
+        'constructor': self.constructor,
+        # Calls the cpdef method through its Python wrapper, which converts
+        # the arguments to the C types it declares.
+        'decode_fields': functools.partial(
+            RowCoderImpl._decode_fields_from_stream, self),
+    }
+    for i in range(n):
+      namespace['encode%d' % i] = self.components[i].encode_to_stream
+      namespace['decode%d' % i] = self.components[i].decode_from_stream
+
+    lines = ['def encode(value, out):']
+    if n == 1:
+      lines.append('  a0 = get_attrs(value)')
+    elif n > 1:
+      lines.append('  %s = get_attrs(value)' % ', '.join(names))
+    no_nulls = ' and '.join('%s is not None' % name for name in names)
+    lines.append('  if %s:' % (no_nulls or 'True'))
+    lines.append('    out.write(header)')
+    lines.extend('    ' + field_code[i][0] for i in order)
+    lines.append('    return')
+    for i in range(n):
+      if not self.field_nullable[i]:
+        lines.append('  if a%d is None:' % i)
+        lines.append(
+            '    raise ValueError("Attempted to encode null for non-nullable '
+            'field \\"{}\\".".format(field_names[%d]))' % i)
+    lines.append('  out.write_var_int64(%d)' % n)
+    lines.append('  out.write_byte(%d)' % null_mask_len)
+    for b in range(null_mask_len):
+      bits = [
+          '((a%d is None) << %d)' % (i, i & 7) for i in nullable if i >> 3 == b
+      ]
+      lines.append('  out.write_byte(%s)' % (' | '.join(bits) or '0'))
+    for i in order:
+      if self.field_nullable[i]:
+        lines.append('  if a%d is not None:' % i)
+        lines.append('    ' + field_code[i][0])
+      else:
+        lines.append('  ' + field_code[i][0])
+
+    lines.append('def decode(in_stream):')
+    lines.append('  nvals = in_stream.read_var_int64()')
+    lines.append('  if nvals != %d:' % n)
+    lines.append('    return decode_fields(in_stream, nvals)')
+    lines.append('  null_mask_len = in_stream.read_var_int64()')
+    lines.append('  if not null_mask_len:')
+    lines.extend('    a%d = %s' % (i, field_code[i][1]) for i in order)
+    if not n:
+      lines.append('    pass')
+    lines.append('  else:')
+    lines.append('    null_mask = in_stream.read(null_mask_len)')
+    for i in order:
+      lines.append(
+          '    a%d = None if null_mask_len > %d and null_mask[%d] & %d else %s'
+          % (i, i >> 3, i >> 3, 1 << (i & 7), field_code[i][1]))
+    lines.append('  return constructor(%s)' % ', '.join(names))
+
+    source = '\n'.join(lines)
+    with _SPECIALIZED_ROW_CODER_CODE_LOCK:
+      code = _SPECIALIZED_ROW_CODER_CODE.get(source)
+      if code is not None:
+        _SPECIALIZED_ROW_CODER_CODE.move_to_end(source)
+    if code is None:
+      code = compile(source, '<SchemaSpecializedRowCoderImpl>', 'exec')
+      with _SPECIALIZED_ROW_CODER_CODE_LOCK:
+        _SPECIALIZED_ROW_CODER_CODE[source] = code
+        while len(
+            _SPECIALIZED_ROW_CODER_CODE) > _SPECIALIZED_ROW_CODER_CODE_MAX_SIZE:
+          _SPECIALIZED_ROW_CODER_CODE.popitem(last=False)
+    # pylint: disable=exec-used
+    exec(code, namespace)
+    return namespace['encode'], namespace['decode']
+
+
+def create_row_coder_impl(schema, components):
+  # type: (Any, Sequence[Any]) -> RowCoderImpl
+
+  """Returns the fastest RowCoderImpl for schema in this environment."""
+  if is_compiled:
+    # The generated functions are interpreted Python, which is slower than the
+    # compiled loops of RowCoderImpl.
+    return RowCoderImpl(schema, components)
+  return SchemaSpecializedRowCoderImpl(schema, components)
+
 
 class LogicalTypeCoderImpl(StreamCoderImpl):
   def __init__(self, logical_type, representation_coder):
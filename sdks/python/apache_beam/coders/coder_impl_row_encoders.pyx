@@ -19,13 +19,23 @@
 
 # pytype: skip-file
 
+cimport libc.stdint
+from cpython.unicode cimport PyUnicode_AsUTF8AndSize
+from cpython.unicode cimport PyUnicode_DecodeUTF8
+
 import numpy as np
 cimport numpy as np
 
 from apache_beam.coders import coder_impl
-from apache_beam.coders.coder_impl cimport RowColumnEncoder, OutputStream, InputStream
+from apache_beam.coders.coder_impl cimport CoderImpl, RowCoderImpl, RowColumnEncoder, OutputStream, InputStream
+from apache_beam.portability import common_urns
 from apache_beam.portability.api import schema_pb2
 
+try:
+  import pyarrow as pa
+except ImportError:
+  pa = None
+
 
 cdef class AtomicTypeRowColumnEncoder(RowColumnEncoder):
   cdef original
@@ -166,3 +176,255 @@ BoolRowColumnEncoder.register(schema_pb2.BOOLEAN, np.uint8().dtype)
 BoolRowColumnEncoder.register(schema_pb2.BOOLEAN, np.bool_().dtype)
 
 
+
+
+cdef class ObjectRowColumnEncoder(RowColumnEncoder):
+  cdef CoderImpl coder_impl
+  cdef object[:] data
+
+  def __init__(self, coder_impl, column):
+    self.coder_impl = coder_impl
+    self.data = column
+
+  def null_flags(self):
+    cdef size_t i
+    flags = np.zeros((self.data.shape[0], ), dtype=np.uint8)
+    cdef libc.stdint.uint8_t[::1] flags_view = flags
+    for i in range(self.data.shape[0]):
+      flags_view[i] = self.data[i] is None
+    return flags
+
+  def finalize_write(self):
+    pass
+
+
+cdef class StrObjectRowColumnEncoder(ObjectRowColumnEncoder):
+  cdef bint encode_to_stream(self, size_t index, OutputStream stream) except -1:
+    cdef Py_ssize_t length
+    cdef const char* utf8
+    value = self.data[index]
+    if isinstance(value, str):
+      # Uses the UTF-8 representation cached by the str object.
+      utf8 = PyUnicode_AsUTF8AndSize(value, &length)
+      stream.write_var_int64(length)
+      stream.write_c(utf8, length)
+    else:
+      self.coder_impl.encode_to_stream(value, stream, True)
+
+  cdef bint decode_from_stream(self, size_t index, InputStream stream) except -1:
+    cdef Py_ssize_t length = stream.read_var_int64()
+    self.data[index] = PyUnicode_DecodeUTF8(
+        stream.allc + stream.pos, length, NULL)
+    stream.pos += length
+
+StrObjectRowColumnEncoder.register(schema_pb2.STRING, 'O')
+
+
+cdef class BytesObjectRowColumnEncoder(ObjectRowColumnEncoder):
+  cdef bint encode_to_stream(self, size_t index, OutputStream stream) except -1:
+    value = self.data[index]
+    if isinstance(value, bytes):
+      stream.write(value, True)
+    else:
+      self.coder_impl.encode_to_stream(value, stream, True)
+
+  cdef bint decode_from_stream(self, size_t index, InputStream stream) except -1:
+    self.data[index] = stream.read_all(True)
+
+BytesObjectRowColumnEncoder.register(schema_pb2.BYTES, 'O')
+
+
+cdef class Datetime64RowColumnEncoder(RowColumnEncoder):
+  """Encodes datetime64 columns, or pyarrow.TimestampArrays, as instants.
+
+  Values are held as int64 counts of the given unit, NaT being null.
+  """
+  cdef original
+  cdef contiguous
+  cdef object unit
+  cdef libc.stdint.int64_t* data
+
+  def __init__(self, column, unit):
+    if isinstance(column, np.ndarray):
+      self.original = column
+    else:
+      # pyarrow.TimestampArray, which is immutable.
+      self.original = None
+      column = column.to_numpy(zero_copy_only=False)
+    self.unit = 'datetime64[%s]' % unit
+    self.contiguous = np.ascontiguousarray(
+        column.astype(self.unit, copy=False)).view(np.int64)
+    cdef libc.stdint.int64_t[::1] view = self.contiguous
+    self.data = &view[0] if len(view) else NULL
+
+  def null_flags(self):
+    nulls = self.contiguous == np.iinfo(np.int64).min
+    return nulls if nulls.any() else None
+
+  def finalize_write(self):
+    if self.original is not None:
+      self.original[:] = self.contiguous.view(self.unit)
+
+  cdef bint check_writable(self) except -1:
+    if self.original is None:
+      raise ValueError('Cannot decode into a pyarrow array.')
+
+
+# Instants are shifted as in TimestampCoderImpl.
+cdef libc.stdint.uint64_t _INSTANT_SHIFT = (<libc.stdint.uint64_t>1) << 63
+
+
+cdef class MillisInstantRowColumnEncoder(Datetime64RowColumnEncoder):
+  def __init__(self, unused_coder, column):
+    super(MillisInstantRowColumnEncoder, self).__init__(column, 'ms')
+
+  cdef bint encode_to_stream(self, size_t index, OutputStream stream) except -1:
+    stream.write_bigendian_uint64(
+        (<libc.stdint.uint64_t>self.data[index]) ^ _INSTANT_SHIFT)
+
+  cdef bint decode_from_stream(self, size_t index, InputStream stream) except -1:
+    self.check_writable()
+    self.data[index] = <libc.stdint.int64_t>(
+        stream.read_bigendian_uint64() ^ _INSTANT_SHIFT)
+
+MillisInstantRowColumnEncoder.register(common_urns.millis_instant.urn, 'M')
+
+
+cdef class MicrosInstantRowColumnEncoder(Datetime64RowColumnEncoder):
+  def __init__(self, unused_coder, column):
+    super(MicrosInstantRowColumnEncoder, self).__init__(column, 'us')
+
+  cdef bint encode_to_stream(self, size_t index, OutputStream stream) except -1:
+    cdef libc.stdint.int64_t micros = self.data[index]
+    # A MicrosInstantRepresentation row with two non-null fields.
+    stream.write_var_int64(2)
+    stream.write_byte(0)
+    stream.write_var_int64(micros // 1000000)
+    stream.write_var_int64(micros % 1000000)
+
+  cdef bint decode_from_stream(self, size_t index, InputStream stream) except -1:
+    self.check_writable()
+    stream.read_var_int64()
+    null_mask_len = stream.read_var_int64()
+    if null_mask_len:
+      stream.read(null_mask_len)
+    seconds = stream.read_var_int64()
+    self.data[index] = seconds * 1000000 + stream.read_var_int64()
+
+MicrosInstantRowColumnEncoder.register(common_urns.micros_instant.urn, 'M')
+
+
+cdef class RowRowColumnEncoder(RowColumnEncoder):
+  """Encodes the rows of numpy structured arrays or pyarrow.StructArrays.
+
+  The fields of the nested rows are encoded by their own column encoders.
+  """
+  cdef RowCoderImpl coder_impl
+  cdef list attrs
+  cdef object nulls
+  cdef bint writable
+  cdef libc.stdint.uint8_t[::1] has_null_bits
+  cdef libc.stdint.uint8_t[:, ::1] null_bits
+  cdef libc.stdint.uint8_t[:, ::1] field_null_flags
+
+  def __init__(self, coder_impl, column):
+    self.coder_impl = coder_impl
+    if isinstance(column, np.ndarray):
+      children = {name: column[name] for name in column.dtype.names}
+      self.nulls = None
+      self.writable = True
+    else:
+      # pyarrow.StructArray, whose flattened children are also null where
+      # the struct is.
+      children = {
+          column.type.field(i).name: child
+          for i, child in enumerate(column.flatten())
+      }
+      self.nulls = (
+          column.is_null().to_numpy(zero_copy_only=False)
+          if column.null_count else None)
+      self.writable = False
+    self.attrs = coder_impl._row_column_encoders(children)
+    self.has_null_bits, self.null_bits, self.field_null_flags = (
+        coder_impl._batch_null_bits(self.attrs, len(column)))
+
+  def null_flags(self):
+    return self.nulls
+
+  def finalize_write(self):
+    for attr in self.attrs:
+      attr.finalize_write()
+
+  cdef bint encode_to_stream(self, size_t index, OutputStream stream) except -1:
+    self.coder_impl._encode_batch_row(
+        self.attrs,
+        index,
+        self.has_null_bits,
+        self.null_bits,
+        self.field_null_flags,
+        stream)
+
+  cdef bint decode_from_stream(self, size_t index, InputStream stream) except -1:
+    if not self.writable:
+      raise ValueError('Cannot decode into a pyarrow array.')
+    self.coder_impl._decode_batch_row(self.attrs, index, stream)
+
+RowRowColumnEncoder.register('row_type', 'V')
+
+
+cdef class ArrowBinaryRowColumnEncoder(RowColumnEncoder):
+  """Encodes pyarrow string and binary arrays straight from their buffers."""
+  cdef object column
+  cdef object offsets_array
+  cdef object values_array
+  cdef libc.stdint.int64_t* offsets
+  cdef const char* values
+
+  def __init__(self, unused_coder, column):
+    self.column = column
+    _, offsets_buffer, values_buffer = column.buffers()
+    if (pa.types.is_large_string(column.type) or
+        pa.types.is_large_binary(column.type)):
+      offsets_dtype = np.int64
+    else:
+      offsets_dtype = np.int32
+    self.offsets_array = np.frombuffer(
+        offsets_buffer, dtype=offsets_dtype)[
+            column.offset:column.offset + len(column) + 1].astype(np.int64)
+    cdef libc.stdint.int64_t[::1] offsets_view = self.offsets_array
+    self.offsets = &offsets_view[0]
+    if values_buffer is None or values_buffer.size == 0:
+      self.values_array = np.zeros((1, ), dtype=np.uint8)
+    else:
+      self.values_array = np.frombuffer(values_buffer, dtype=np.uint8)
+    cdef const libc.stdint.uint8_t[::1] values_view = self.values_array
+    self.values = <const char*>&values_view[0]
+
+  def null_flags(self):
+    if self.column.null_count:
+      return self.column.is_null().to_numpy(zero_copy_only=False)
+    return None
+
+  def finalize_write(self):
+    pass
+
+  cdef bint encode_to_stream(self, size_t index, OutputStream stream) except -1:
+    cdef libc.stdint.int64_t start = self.offsets[index]
+    cdef libc.stdint.int64_t length = self.offsets[index + 1] - start
+    stream.write_var_int64(length)
+    stream.write_c(self.values + start, length)
+
+  cdef bint decode_from_stream(self, size_t index, InputStream stream) except -1:
+    raise ValueError('Cannot decode into a pyarrow array.')
+
+
+if pa is not None:
+  ArrowBinaryRowColumnEncoder.register(schema_pb2.STRING, pa.StringArray)
+  ArrowBinaryRowColumnEncoder.register(schema_pb2.STRING, pa.LargeStringArray)
+  ArrowBinaryRowColumnEncoder.register(schema_pb2.BYTES, pa.BinaryArray)
+  ArrowBinaryRowColumnEncoder.register(schema_pb2.BYTES, pa.LargeBinaryArray)
+  MillisInstantRowColumnEncoder.register(
+      common_urns.millis_instant.urn, pa.TimestampArray)
+  MicrosInstantRowColumnEncoder.register(
+      common_urns.micros_instant.urn, pa.TimestampArray)
+  RowRowColumnEncoder.register('row_type', pa.StructArray)
@@ -37,8 +37,10 @@ encoded.
 # pytype: skip-file
 
 import base64
+import dataclasses
 import decimal
 import pickle
+import typing
 from functools import lru_cache
 from typing import TYPE_CHECKING
 from typing import Any
@@ -95,6 +97,7 @@ __all__ = [
     'IterableCoder',
     'ListCoder',
     'MapCoder',
+    'MemoryviewCoder',
     'NullableCoder',
     'PickleCoder',
     'ProtoCoder',
@@ -415,6 +418,12 @@ class StrUtf8Coder(Coder):
   def decode(self, value):
     return value.decode('utf-8')
 
+  def _create_impl(self):
+    if type(self) is not StrUtf8Coder:
+      # Subclasses may override encode and decode.
+      return super()._create_impl()
+    return coder_impl.StrUtf8CoderImpl()
+
   def is_deterministic(self):
     # type: () -> bool
     return True
@@ -487,6 +496,30 @@ class BytesCoder(FastCoder):
 Coder.register_structured_urn(common_urns.coders.BYTES.urn, BytesCoder)
 
 
+class MemoryviewCoder(FastCoder):
+  """Byte string coder that decodes values as memoryviews.
+
+  Values are encoded as with BytesCoder, but decoded as read-only memoryviews
+  of the encoded input rather than as copies of it, so that large payloads are
+  not duplicated when they are decoded. Any bytes-like object can be encoded.
+  """
+  def _create_impl(self):
+    return coder_impl.BytesCoderImpl(zero_copy=True)
+
+  def is_deterministic(self):
+    # type: () -> bool
+    return True
+
+  def to_type_hint(self):
+    return memoryview
+
+  def __eq__(self, other):
+    return type(self) == type(other)
+
+  def __hash__(self):
+    return hash(type(self))
+
+
 class BooleanCoder(FastCoder):
   def _create_impl(self):
     return coder_impl.BooleanCoderImpl()
@@ -1054,17 +1087,71 @@ def _update_compatible_deterministic_fast_primitives_coder(coder, step_label):
   return DeterministicFastPrimitivesCoderV2(coder, step_label)
 
 
+def _is_field_encodable_type(t):
+  if not isinstance(t, type):
+    return False
+  if dataclasses.is_dataclass(t):
+    # Restoring the fields of dataclasses that customize their initialization
+    # or pickling, or that have no __dict__, may not restore the instance.
+    return not (
+        hasattr(t, '__post_init__') or hasattr(t, '__slots__') or any(
+            getattr(t, name, None) is not getattr(object, name, None)
+            for name in
+            ('__getstate__', '__setstate__', '__reduce__', '__reduce_ex__')))
+  return issubclass(t, tuple) and hasattr(t, '_fields')
+
+
+def _field_encodable_types(typehint):
+  """Returns the dataclasses and NamedTuples that typehint refers to.
+
+  FastPrimitivesCoder encodes these types field by field, referring to them by
+  their index in the returned tuple, rather than pickling them.
+  """
+  from apache_beam.options.pipeline_options_context import get_pipeline_options
+  opts = get_pipeline_options()
+  if opts and opts.is_compat_version_prior_to("2.77.0"):
+    return ()
+
+  found = []
+
+  def visit(t):
+    if _is_field_encodable_type(t):
+      if t in found:
+        return
+      found.append(t)
+      try:
+        field_types = typing.get_type_hints(t).values()
+      except Exception:  # pylint: disable=broad-except
+        return
+      for field_type in field_types:
+        visit(field_type)
+    else:
+      for arg in getattr(t, '__args__', None) or ():
+        visit(arg)
+
+  visit(typehint)
+  return tuple(found)
+
+
 class FastPrimitivesCoder(FastCoder):
   """Encodes simple primitives (e.g. str, int) efficiently.
 
-  For unknown types, falls back to another coder (e.g. PickleCoder).
+  Dataclasses and NamedTuples named by the type hint the coder was created from
+  are encoded field by field. For other unknown types, falls back to another
+  coder (e.g. PickleCoder).
   """
-  def __init__(self, fallback_coder=PickleCoder()):
-    # type: (Coder) -> None
+  def __init__(self, fallback_coder=PickleCoder(), known_types=()):
+    # type: (Coder, Sequence[type]) -> None
     self._fallback_coder = fallback_coder
+    self._known_types = tuple(known_types)
 
   def _create_impl(self):
-    return coder_impl.FastPrimitivesCoderImpl(self._fallback_coder.get_impl())
+    return coder_impl.FastPrimitivesCoderImpl(
+        self._fallback_coder.get_impl(), known_types=self._known_types)
+
+  @classmethod
+  def from_type_hint(cls, typehint, unused_registry):
+    return cls(known_types=_field_encodable_types(typehint))
 
   def is_deterministic(self):
     # type: () -> bool
@@ -1094,10 +1181,11 @@ class FastPrimitivesCoder(FastCoder):
     return self
 
   def __eq__(self, other):
-    return type(self) == type(other)
+    return (
+        type(self) == type(other) and self._known_types == other._known_types)
 
   def __hash__(self):
-    return hash(type(self))
+    return hash((type(self), self._known_types))
 
 
 class FakeDeterministicFastPrimitivesCoder(FastPrimitivesCoder):
@@ -1656,7 +1744,9 @@ class LengthPrefixCoder(FastCoder):
     self._value_coder = value_coder
 
   def _create_impl(self):
-    return coder_impl.LengthPrefixCoderImpl(self._value_coder.get_impl())
+    return coder_impl.LengthPrefixCoderImpl(
+        self._value_coder.get_impl(),
+        zero_copy=isinstance(self._value_coder, MemoryviewCoder))
 
   def is_deterministic(self):
     # type: () -> bool
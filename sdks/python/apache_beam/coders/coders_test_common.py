@@ -37,6 +37,7 @@ import pytest
 from parameterized import param
 from parameterized import parameterized
 
+from apache_beam.coders import coder_impl
 from apache_beam.coders import coders
 from apache_beam.coders import proto2_coder_test_messages_pb2 as test_message
 from apache_beam.coders import typecoders
@@ -231,6 +232,14 @@ class CodersTest(unittest.TestCase):
             coder.get_impl().get_estimated_size_and_observables(v),
             (coder.get_impl().estimate_size(v), []))
       copy1 = pickler.loads(pickler.dumps(coder))
+    impl = coder.get_impl()
+    encoded_values = impl.encode_all(values)
+    if coder.is_deterministic():
+      self.assertEqual(
+          encoded_values, b''.join(impl.encode_nested(v) for v in values))
+    # Values with empty encodings cannot be told apart in a stream.
+    if all(impl.encode_nested(v) for v in values):
+      self.assertEqual(list(values), impl.decode_all(encoded_values))
     copy2 = coders.Coder.from_runner_api(coder.to_runner_api(context), context)
     for v in values:
       self.assertEqual(v, copy1.decode(copy2.encode(v)))
@@ -407,6 +416,47 @@ class CodersTest(unittest.TestCase):
     for v in self.test_values:
       self.check_coder(coders.TupleCoder((coder, )), (v, ))
 
+  def test_fast_primitives_coder_known_types(self):
+    coder = coders.FastPrimitivesCoder.from_type_hint(
+        tuple[MyTypedNamedTuple, UnFrozenDataClass,
+              FrozenUnInitKwOnlyDataClass],
+        typecoders.registry)
+    # Dataclasses with a __post_init__ are pickled.
+    self.assertEqual(
+        coders.FastPrimitivesCoder(
+            known_types=(MyTypedNamedTuple, UnFrozenDataClass)),
+        coder)
+    self.check_coder(
+        coder,
+        MyTypedNamedTuple(1, 'a'),
+        UnFrozenDataClass(1, 2),
+        FrozenUnInitKwOnlyDataClass(side=3), [UnFrozenDataClass(3, None)],
+        AnotherNamedTuple(1, 2))
+    # Known types are referred to by index rather than pickled.
+    self.assertEqual(
+        b'\x6a\x01\x01\x01\x01\x02', coder.encode(UnFrozenDataClass(1, 2)))
+    self.assertLess(
+        len(coder.encode(UnFrozenDataClass(1, 2))),
+        len(coders.FastPrimitivesCoder().encode(UnFrozenDataClass(1, 2))))
+
+    with scoped_pipeline_options(
+        PipelineOptions(update_compatibility_version='2.76.0')):
+      self.assertEqual(
+          coders.FastPrimitivesCoder(),
+          coders.FastPrimitivesCoder.from_type_hint(
+              UnFrozenDataClass, typecoders.registry))
+
+  def test_fast_primitives_coder_known_type_with_extra_attributes(self):
+    coder = coders.FastPrimitivesCoder.from_type_hint(
+        UnFrozenDataClass, typecoders.registry)
+    value = UnFrozenDataClass(1, 2)
+    value.z = 3
+    decoded = coder.decode(coder.encode(value))
+    self.assertEqual(decoded, value)
+    self.assertEqual(decoded.z, 3)
+    self.assertEqual(
+        coder.encode(value), coders.FastPrimitivesCoder().encode(value))
+
   def test_fast_primitives_coder_large_int(self):
     coder = coders.FastPrimitivesCoder()
     self.check_coder(coder, 10**100)
@@ -420,6 +470,24 @@ class CodersTest(unittest.TestCase):
   def test_bytes_coder(self):
     self.check_coder(coders.BytesCoder(), b'a', b'\0', b'z' * 1000)
 
+  def test_memoryview_coder(self):
+    coder = coders.MemoryviewCoder()
+    self.check_coder(coder, b'a', b'\0', b'z' * 1000)
+    self.assertEqual(
+        coders.BytesCoder().encode(b'abc'), coder.encode(bytearray(b'abc')))
+    self.assertIsInstance(coder.decode(b'abc'), memoryview)
+    # Decoded values are views of the buffer they are read from.
+    for zero_copy_coder in (coders.TupleCoder((coders.VarIntCoder(), coder)),
+                            coders.TupleCoder(
+                                (coders.VarIntCoder(),
+                                 coders.LengthPrefixCoder(coder)))):
+      buffer = bytearray(zero_copy_coder.encode((1, b'payload')))
+      key, value = zero_copy_coder.get_impl().decode_from_stream(
+          coder_impl.create_InputStream(buffer), False)
+      self.assertEqual((1, b'payload'), (key, value))
+      buffer[-7:] = b'PAYLOAD'
+      self.assertEqual(b'PAYLOAD', value)
+
   def test_bool_coder(self):
     self.check_coder(coders.BooleanCoder(), True, False)
 
@@ -555,9 +623,42 @@ class CodersTest(unittest.TestCase):
   def test_base64_pickle_coder(self):
     self.check_coder(coders.Base64PickleCoder(), 'a', 1, 1.5, (1, 2, 3))
 
+  def test_encode_all_decode_all(self):
+    for coder, values in [
+        (coders.VarIntCoder(), [0, -1, 1 << 40]),
+        (coders.BytesCoder(), [b'', b'abc', b'\x00' * 200]),
+        (coders.StrUtf8Coder(), ['', 'abc', u'\u0101' * 200]),
+        (coders.TupleCoder((coders.StrUtf8Coder(), coders.VarIntCoder())),
+         [('a', 1), ('', -5)]),
+        (coders.TupleCoder((coders.VarIntCoder(), ) * 3), [(1, 2, 3)]),
+        (coders.WindowedValueCoder(coders.VarIntCoder()),
+         [windowed_value.WindowedValue(5, 0, (GlobalWindow(), ))]),
+    ]:
+      impl = coder.get_impl()
+      out = coder_impl.create_OutputStream()
+      impl.encode_all_to_stream(iter(values), out)
+      encoded = out.get()
+      self.assertEqual(encoded, b''.join(impl.encode_nested(v) for v in values))
+      self.assertEqual(
+          values,
+          impl.decode_all_from_stream(coder_impl.create_InputStream(encoded)))
+      self.assertEqual([], impl.decode_all(b''))
+      self.assertEqual(values, impl.decode_all(memoryview(encoded)))
+      stream = coder_impl.create_InputStream(encoded)
+      self.assertEqual(values[:1], impl.decode_some_from_stream(stream, 1))
+      self.assertEqual(values[1:], impl.decode_some_from_stream(stream, 100))
+
   def test_utf8_coder(self):
     self.check_coder(coders.StrUtf8Coder(), 'a', 'ab\u00FF', '\u0101\0')
 
+  def test_utf8_coder_subclass(self):
+    class UpperCaseCoder(coders.StrUtf8Coder):
+      def encode(self, value):
+        return value.upper().encode('utf-8')
+
+    coder = UpperCaseCoder()
+    self.assertEqual(coder.decode(coder.get_impl().encode('abc')), 'ABC')
+
   def test_iterable_coder(self):
     iterable_coder = coders.IterableCoder(coders.VarIntCoder())
     # Test unnested
@@ -667,6 +768,46 @@ class CodersTest(unittest.TestCase):
             windowed_value.WindowedValue(1.5, 0, ()),
             windowed_value.WindowedValue("abc", 10, ('window', ))))
 
+  def test_global_windowed_value_coder_header(self):
+    coder = coders.WindowedValueCoder(
+        coders.VarIntCoder(), coders.GlobalWindowCoder())
+    # Encodes windows as no bytes too, but without the global window fast path.
+    generic_coder = coders.WindowedValueCoder(
+        coders.VarIntCoder(), coders.SingletonCoder('window'))
+    on_time = windowed_value.PaneInfo(
+        True, True, windowed_value.PaneInfoTiming.ON_TIME, 0, 0)
+    for wv, num_windows in [
+        (window.GlobalWindows.windowed_value(1), 1),
+        (windowed_value.WindowedValue(2, 1234, [GlobalWindow()]), 1),
+        (windowed_value.WindowedValue(3, 0, (GlobalWindow(), ), on_time), 1),
+        (windowed_value.WindowedValue(4, 0, (GlobalWindow(), ) * 2), 2),
+        (windowed_value.WindowedValue(5, 0, ()), 0),
+    ]:
+      self.assertEqual(
+          generic_coder.encode(
+              windowed_value.WindowedValue(
+                  wv.value,
+                  wv.timestamp, ('window', ) * num_windows,
+                  wv.pane_info)),
+          coder.encode(wv))
+      self.assertEqual(
+          windowed_value.WindowedValue(
+              wv.value,
+              wv.timestamp, (GlobalWindow(), ) * num_windows,
+              wv.pane_info),
+          coder.decode(coder.encode(wv)))
+
+    # Windows of unknown length.
+    encoded = generic_coder.encode(
+        windowed_value.WindowedValue(7, 0, iter(['window'] * 2)))
+    self.assertEqual((GlobalWindow(), ) * 2, coder.decode(encoded).windows)
+
+    # Decoding reuses the windows and pane of the default header.
+    first = coder.decode(coder.encode(window.GlobalWindows.windowed_value(1)))
+    second = coder.decode(coder.encode(window.GlobalWindows.windowed_value(2)))
+    self.assertIs(first.windows, second.windows)
+    self.assertIs(first.pane_info, second.pane_info)
+
   def test_param_windowed_value_coder(self):
     from apache_beam.transforms.window import IntervalWindow
     from apache_beam.utils.windowed_value import PaneInfo
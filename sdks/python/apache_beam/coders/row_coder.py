@@ -19,7 +19,7 @@
 
 from apache_beam.coders import typecoders
 from apache_beam.coders.coder_impl import LogicalTypeCoderImpl
-from apache_beam.coders.coder_impl import RowCoderImpl
+from apache_beam.coders.coder_impl import create_row_coder_impl
 from apache_beam.coders.coders import BigEndianShortCoder
 from apache_beam.coders.coders import BooleanCoder
 from apache_beam.coders.coders import ByteCoder
@@ -77,7 +77,7 @@ class RowCoder(FastCoder):
     self.forced_deterministic = bool(force_deterministic)
 
   def _create_impl(self):
-    return RowCoderImpl(self.schema, self.components)
+    return create_row_coder_impl(self.schema, self.components)
 
   def is_deterministic(self):
     return all(c.is_deterministic() for c in self.components)
@@ -16,10 +16,12 @@
 #
 # pytype: skip-file
 
+import collections
 import logging
 import typing
 import unittest
 from itertools import chain
+from unittest import mock
 
 import numpy as np
 from numpy.testing import assert_array_equal
@@ -29,14 +31,21 @@ from apache_beam.coders import RowCoder
 from apache_beam.coders import coder_impl
 from apache_beam.coders.typecoders import registry as coders_registry
 from apache_beam.internal import pickler
+from apache_beam.portability import common_urns
 from apache_beam.portability.api import schema_pb2
 from apache_beam.testing.test_pipeline import TestPipeline
 from apache_beam.testing.util import assert_that
 from apache_beam.testing.util import equal_to
+from apache_beam.tools import utils
 from apache_beam.typehints.schemas import named_tuple_from_schema
 from apache_beam.typehints.schemas import typing_to_runner_api
 from apache_beam.utils.timestamp import Timestamp
 
+try:
+  import pyarrow as pa
+except ImportError:
+  pa = None
+
 Person = typing.NamedTuple(
     "Person",
     [
@@ -462,6 +471,129 @@ class RowCoderTest(unittest.TestCase):
     self.assertEqual(
         New(f_new_str=None, f_int32=42, f_str="Hello World!"), roundtripped)
 
+  def test_schema_specialized_impl_matches_generic(self):
+    Reordered = named_tuple_from_schema(
+        schema_pb2.Schema(
+            id="specialized_reorder_test",
+            encoding_positions_set=True,
+            fields=[
+                schema_pb2.Field(
+                    name="f_str",
+                    type=schema_pb2.FieldType(
+                        atomic_type=schema_pb2.STRING, nullable=True),
+                    encoding_position=2,
+                ),
+                schema_pb2.Field(
+                    name="f_double",
+                    type=schema_pb2.FieldType(atomic_type=schema_pb2.DOUBLE),
+                    encoding_position=0,
+                ),
+                schema_pb2.Field(
+                    name="f_int64",
+                    type=schema_pb2.FieldType(
+                        atomic_type=schema_pb2.INT64, nullable=True),
+                    encoding_position=1,
+                ),
+            ]))
+    Empty = named_tuple_from_schema(
+        schema_pb2.Schema(id="specialized_empty_test"))
+    nullable_person = NullablePerson(
+        None,
+        np.int32(25),
+        "Westeros", ["Mother of Dragons"],
+        False,
+        None, {"dragons": 3},
+        None,
+        "NotNull")
+    cases = [(Person, self.PEOPLE), (NullablePerson, [nullable_person]),
+             (People, [People(self.JON_SNOW, None), People(*self.PEOPLE[1:])]),
+             (Reordered, [Reordered("a", 1.5, None),
+                          Reordered(None, -2., 3)]), (Empty, [Empty()])]
+
+    for row_type, rows in cases:
+      coder = RowCoder.from_type_hint(row_type, None)
+      generic = coder_impl.RowCoderImpl(coder.schema, coder.components)
+      specialized = coder_impl.SchemaSpecializedRowCoderImpl(
+          coder.schema, coder.components)
+      for row in rows:
+        encoded = generic.encode(row)
+        self.assertEqual(specialized.encode(row), encoded)
+        self.assertEqual(specialized.decode(encoded), row)
+
+  def test_schema_specialized_impl_schema_evolution(self):
+    Old = typing.NamedTuple('Old', [('f1', typing.Optional[str])])
+    New = typing.NamedTuple(
+        'New', [('f1', typing.Optional[str]), ('f2', typing.Optional[str])])
+    old_coder = RowCoder.from_type_hint(Old, None)
+    new_coder = RowCoder.from_type_hint(New, None)
+    old_impl = coder_impl.SchemaSpecializedRowCoderImpl(
+        old_coder.schema, old_coder.components)
+    new_impl = coder_impl.SchemaSpecializedRowCoderImpl(
+        new_coder.schema, new_coder.components)
+
+    self.assertEqual(
+        New('foo', None), new_impl.decode(old_impl.encode(Old('foo'))))
+    self.assertEqual(
+        Old(None), old_impl.decode(new_impl.encode(New(None, 'x'))))
+
+  def test_schema_specialized_impl_none_in_non_nullable_field_throws(self):
+    Test = typing.NamedTuple(
+        'Test', [('foo', str), ('bar', typing.Optional[str])])
+    c = RowCoder.from_type_hint(Test, None)
+    impl = coder_impl.SchemaSpecializedRowCoderImpl(c.schema, c.components)
+    self.assertRaisesRegex(
+        ValueError, 'foo', lambda: impl.encode(Test(foo=None, bar=None)))
+
+  def test_schema_specialized_impl_compiles_once_per_schema(self):
+    Flat = typing.NamedTuple('Flat', [('f1', str), ('f2', np.int64)])
+    c = RowCoder.from_type_hint(Flat, None)
+    code = collections.OrderedDict()
+    with mock.patch.object(coder_impl, '_SPECIALIZED_ROW_CODER_CODE', code):
+      coder_impl.SchemaSpecializedRowCoderImpl(c.schema, c.components)
+      (compiled, ) = code.values()
+      impl = coder_impl.SchemaSpecializedRowCoderImpl(c.schema, c.components)
+
+    self.assertIs(next(iter(code.values())), compiled)
+    self.assertEqual(impl.decode(impl.encode(Flat('a', 1))), Flat('a', 1))
+
+  def test_schema_specialized_impl_cache_is_lru(self):
+    code = collections.OrderedDict()
+
+    def create_impl(num_fields):
+      row_type = typing.NamedTuple(
+          'Row', [('f%d' % i, str) for i in range(num_fields)])
+      c = RowCoder.from_type_hint(row_type, None)
+      coder_impl.SchemaSpecializedRowCoderImpl(c.schema, c.components)
+
+    with mock.patch.object(coder_impl, '_SPECIALIZED_ROW_CODER_CODE', code), \
+        mock.patch.object(
+            coder_impl, '_SPECIALIZED_ROW_CODER_CODE_MAX_SIZE', 2):
+      create_impl(1)
+      create_impl(2)
+      sources = list(code)
+      create_impl(1)
+      create_impl(3)
+    self.assertEqual(len(code), 2)
+    self.assertIn(sources[0], code)
+    self.assertNotIn(sources[1], code)
+
+  def test_schema_specialized_impl_deterministic_and_not_on_same_schema(self):
+    WithMap = typing.NamedTuple(
+        'WithMap', [('f1', typing.Mapping[str, np.int64])])
+    schema = RowCoder.from_type_hint(WithMap, None).schema
+    row = WithMap({'b': 2, 'a': 1, 'c': 3})
+    sorted_row = WithMap({'a': 1, 'b': 2, 'c': 3})
+
+    non_deterministic = coder_impl.SchemaSpecializedRowCoderImpl(
+        schema, RowCoder(schema).components)
+    deterministic = coder_impl.SchemaSpecializedRowCoderImpl(
+        schema, RowCoder(schema, force_deterministic=True).components)
+
+    self.assertEqual(
+        deterministic.encode(row), non_deterministic.encode(sorted_row))
+    self.assertNotEqual(
+        non_deterministic.encode(row), non_deterministic.encode(sorted_row))
+
   def test_row_coder_fail_early_bad_schema(self):
     schema_proto = schema_pb2.Schema(
         fields=[
@@ -510,6 +642,182 @@ class RowCoderTest(unittest.TestCase):
       for field, a in columnar.items():
         assert_array_equal(a[:n], dest[field][:n])
 
+  def assert_batch_encodes_as_rows(self, schema, columns, rows):
+    coder = RowCoder(schema).get_impl()
+    seq_out = coder_impl.create_OutputStream()
+    for row in rows:
+      coder.encode_to_stream(row, seq_out, False)
+    batch_out = coder_impl.create_OutputStream()
+    coder.encode_batch_to_stream(columns, batch_out)
+    self.assertEqual(seq_out.get(), batch_out.get())
+    return seq_out.get()
+
+  def test_batch_encode_decode_strings_and_bytes(self):
+    schema = schema_pb2.Schema(
+        fields=[
+            schema_pb2.Field(
+                name='s',
+                type=schema_pb2.FieldType(
+                    atomic_type=schema_pb2.STRING, nullable=True)),
+            schema_pb2.Field(
+                name='b',
+                type=schema_pb2.FieldType(
+                    atomic_type=schema_pb2.BYTES, nullable=True)),
+        ])
+    Row = named_tuple_from_schema(schema)
+    rows = [
+        Row('a', b'x'),
+        Row(None, b''),
+        Row('\u00e9\u00e8' * 100, None),
+        Row('', b'\0' * 200)
+    ]
+    columns = {
+        's': np.array([row.s for row in rows], dtype=object),
+        'b': np.array([row.b for row in rows], dtype=object),
+    }
+    encoded = self.assert_batch_encodes_as_rows(schema, columns, rows)
+
+    dest = {
+        name: np.empty((len(rows), ), dtype=object)
+        for name in columns
+    }
+    self.assertEqual(
+        len(rows),
+        RowCoder(schema).get_impl().decode_batch_from_stream(
+            dest, coder_impl.create_InputStream(encoded)))
+    for name in columns:
+      assert_array_equal(columns[name], dest[name])
+
+  @unittest.skipIf(pa is None, 'pyarrow is not installed')
+  def test_batch_encode_arrow_strings_and_bytes(self):
+    schema = schema_pb2.Schema(
+        fields=[
+            schema_pb2.Field(
+                name='s',
+                type=schema_pb2.FieldType(
+                    atomic_type=schema_pb2.STRING, nullable=True)),
+            schema_pb2.Field(
+                name='b',
+                type=schema_pb2.FieldType(
+                    atomic_type=schema_pb2.BYTES, nullable=True)),
+        ])
+    Row = named_tuple_from_schema(schema)
+    rows = [Row('a', b'x'), Row(None, b''), Row('\u00e9' * 100, None)] * 3
+    for string_type, binary_type in [(pa.string(), pa.binary()),
+                                     (pa.large_string(), pa.large_binary())]:
+      s = pa.array(['unused'] + [row.s for row in rows], type=string_type)
+      b = pa.array([b'unused'] + [row.b for row in rows], type=binary_type)
+      # Slicing exercises the offset of the arrays into their buffers.
+      self.assert_batch_encodes_as_rows(schema, {'s': s[1:], 'b': b[1:]}, rows)
+
+  def test_batch_encode_decode_timestamps(self):
+    try:
+      utils.check_compiled('apache_beam.coders.coder_impl')
+    except RuntimeError:
+      self.skipTest('Cython is not installed')
+    schema = schema_pb2.Schema(
+        fields=[
+            schema_pb2.Field(
+                name='millis',
+                type=schema_pb2.FieldType(
+                    logical_type=schema_pb2.LogicalType(
+                        urn=common_urns.millis_instant.urn,
+                        representation=schema_pb2.FieldType(
+                            atomic_type=schema_pb2.INT64)),
+                    nullable=True)),
+            schema_pb2.Field(
+                name='micros',
+                type=typing_to_runner_api(typing.Optional[Timestamp])),
+        ])
+    Row = named_tuple_from_schema(schema)
+    times = np.array([
+        '1970-01-01T00:00:00.000001',
+        '2024-02-29T12:34:56.789012',
+        '1969-12-31T23:59:59.999999',
+        'NaT',
+    ],
+                     dtype='datetime64[us]')
+
+    def to_timestamp(t, unit):
+      if np.isnat(t):
+        return None
+      micros = t.astype('datetime64[%s]' %
+                        unit).astype('datetime64[us]').astype(np.int64)
+      return Timestamp(micros=int(micros))
+
+    rows = [Row(to_timestamp(t, 'ms'), to_timestamp(t, 'us')) for t in times]
+    for unit in ['ns', 'us']:
+      columns = {
+          'millis': times.astype('datetime64[%s]' % unit),
+          'micros': times.astype('datetime64[%s]' % unit),
+      }
+      encoded = self.assert_batch_encodes_as_rows(schema, columns, rows)
+
+      dest = {
+          name: np.full((len(rows), ), 'NaT', dtype='datetime64[%s]' % unit)
+          for name in columns
+      }
+      RowCoder(schema).get_impl().decode_batch_from_stream(
+          dest, coder_impl.create_InputStream(encoded))
+      assert_array_equal(times.astype('datetime64[ms]'), dest['millis'])
+      assert_array_equal(times, dest['micros'])
+
+    if pa is not None:
+      self.assert_batch_encodes_as_rows(
+          schema, {
+              'millis': pa.array(times), 'micros': pa.array(times)
+          }, rows)
+
+  def test_batch_encode_decode_nested_rows(self):
+    try:
+      utils.check_compiled('apache_beam.coders.coder_impl')
+    except RuntimeError:
+      self.skipTest('Cython is not installed')
+    inner_schema = schema_pb2.Schema(
+        id='inner',
+        fields=[
+            schema_pb2.Field(
+                name='x',
+                type=schema_pb2.FieldType(atomic_type=schema_pb2.INT64)),
+            schema_pb2.Field(
+                name='y',
+                type=schema_pb2.FieldType(atomic_type=schema_pb2.DOUBLE)),
+        ])
+    schema = schema_pb2.Schema(
+        id='outer',
+        fields=[
+            schema_pb2.Field(
+                name='inner',
+                type=schema_pb2.FieldType(
+                    row_type=schema_pb2.RowType(schema=inner_schema),
+                    nullable=True)),
+        ])
+    Inner = named_tuple_from_schema(inner_schema)
+    Outer = named_tuple_from_schema(schema)
+    rows = [Outer(Inner(1, 0.5)), Outer(Inner(-2, 1e10)), Outer(Inner(3, 0))]
+    structured = np.array([(r.inner.x, r.inner.y) for r in rows],
+                          dtype=[('x', np.int64), ('y', np.float64)])
+    encoded = self.assert_batch_encodes_as_rows(
+        schema, {'inner': structured}, rows)
+
+    dest = {
+        'inner': np.zeros((len(rows), ), dtype=structured.dtype)
+    }
+    RowCoder(schema).get_impl().decode_batch_from_stream(
+        dest, coder_impl.create_InputStream(encoded))
+    assert_array_equal(structured, dest['inner'])
+
+    if pa is not None:
+      rows.append(Outer(None))
+      self.assert_batch_encodes_as_rows(
+          schema,
+          {
+              'inner': pa.array(
+                  [r.inner._asdict() if r.inner else None for r in rows],
+                  type=pa.struct([('x', pa.int64()), ('y', pa.float64())]))
+          },
+          rows)
+
 
 if __name__ == "__main__":
   logging.getLogger().setLevel(logging.INFO)
@@ -16,6 +16,7 @@
 #
 
 cimport libc.stdint
+from cpython.buffer cimport Py_buffer
 
 
 cdef class OutputStream(object):
@@ -24,6 +25,7 @@ cdef class OutputStream(object):
   cdef size_t pos
 
   cpdef write(self, bytes b, bint nested=*)
+  cdef write_c(self, const char* data, size_t length)
   cpdef write_byte(self, unsigned char val)
   cpdef write_var_int64(self, libc.stdint.int64_t v)
   cpdef write_var_int32(self, libc.stdint.int64_t v)
@@ -44,6 +46,7 @@ cdef class ByteCountingOutputStream(OutputStream):
   cdef size_t count
 
   cpdef write(self, bytes b, bint nested=*)
+  cdef write_c(self, const char* data, size_t length)
   cpdef write_var_int64(self, libc.stdint.int64_t val)
   cpdef write_var_int32(self, libc.stdint.int64_t val)
   cpdef write_byte(self, unsigned char val)
@@ -57,11 +60,16 @@ cdef class ByteCountingOutputStream(OutputStream):
 
 cdef class InputStream(object):
   cdef size_t pos
-  cdef bytes all
+  cdef size_t length
+  cdef object all
   cdef char* allc
+  cdef Py_buffer buffer
+  cdef bint has_buffer
+  cdef object view
 
   cpdef ssize_t size(self) except? -1
   cpdef bytes read(self, size_t len)
+  cpdef read_view(self, size_t len)
   cpdef long read_byte(self) except? -1
   cpdef libc.stdint.int64_t read_var_int64(self) except? -1
   cpdef libc.stdint.int32_t read_var_int32(self) except? -1
@@ -72,5 +80,6 @@ cdef class InputStream(object):
   cpdef double read_bigendian_double(self) except? -1
   cpdef float read_bigendian_float(self) except? -1
   cpdef bytes read_all(self, bint nested=*)
+  cpdef read_all_view(self, bint nested=*)
 
 cpdef libc.stdint.int64_t get_varint_size(libc.stdint.int64_t value)
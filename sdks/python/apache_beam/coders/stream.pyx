@@ -22,6 +22,9 @@ For internal use only; no backwards-compatibility guarantees.
 
 cimport libc.stdlib
 cimport libc.string
+from cpython.buffer cimport PyBUF_SIMPLE
+from cpython.buffer cimport PyBuffer_Release
+from cpython.buffer cimport PyObject_GetBuffer
 
 
 cdef class OutputStream(object):
@@ -48,6 +51,13 @@ cdef class OutputStream(object):
     libc.string.memcpy(self.data + self.pos, <char*>b, blen)
     self.pos += blen
 
+  cdef write_c(self, const char* data, size_t length):
+    """Writes length bytes from data, without a length prefix."""
+    if self.buffer_size < self.pos + length:
+      self.extend(length)
+    libc.string.memcpy(self.data + self.pos, data, length)
+    self.pos += length
+
   cpdef write_byte(self, unsigned char val):
     if  self.buffer_size < self.pos + 1:
       self.extend(1)
@@ -154,6 +164,9 @@ cdef class ByteCountingOutputStream(OutputStream):
       self.write_var_int64(blen)
     self.count += blen
 
+  cdef write_c(self, const char* data, size_t length):
+    self.count += length
+
   cpdef write_var_int64(self, libc.stdint.int64_t signed_v):
     self.count += get_varint_size(signed_v)
 
@@ -189,15 +202,41 @@ cdef class ByteCountingOutputStream(OutputStream):
 
 
 cdef class InputStream(object):
-  """An input string stream implementation supporting read() and size()."""
+  """An input string stream implementation supporting read() and size().
+
+  The stream reads from bytes or any other contiguous buffer, such as a
+  memoryview, mmap or bytearray, without copying it. read_view() and
+  read_all_view() return memoryview slices of that buffer rather than bytes.
+  """
 
   def __init__(self, all):
-    self.allc = self.all = all
+    if type(all) is bytes:
+      self.allc = all
+      self.length = len(<bytes>all)
+    else:
+      PyObject_GetBuffer(all, &self.buffer, PyBUF_SIMPLE)
+      self.has_buffer = True
+      self.allc = <char*>self.buffer.buf
+      self.length = self.buffer.len
+    self.all = all
+
+  def __dealloc__(self):
+    if self.has_buffer:
+      PyBuffer_Release(&self.buffer)
 
   cpdef bytes read(self, size_t size):
     self.pos += size
     return self.allc[self.pos - size : self.pos]
 
+  cpdef read_view(self, size_t size):
+    """Returns a memoryview of the next size bytes, without copying them."""
+    if self.view is None:
+      self.view = memoryview(self.all)
+      if self.view.format != 'B' or self.view.ndim != 1:
+        self.view = self.view.cast('B')
+    self.pos += size
+    return self.view[self.pos - size : self.pos]
+
   cpdef long read_byte(self) except? -1:
     self.pos += 1
     # Note: Some C++ compilers treats the char array below as a signed char.
@@ -206,11 +245,15 @@ cdef class InputStream(object):
     return <long>(<unsigned char> self.allc[self.pos - 1])
 
   cpdef ssize_t size(self) except? -1:
-    return len(self.all) - self.pos
+    return <ssize_t>self.length - <ssize_t>self.pos
 
   cpdef bytes read_all(self, bint nested=False):
     return self.read(<ssize_t>self.read_var_int64() if nested else self.size())
 
+  cpdef read_all_view(self, bint nested=False):
+    return self.read_view(
+        <ssize_t>self.read_var_int64() if nested else self.size())
+
   cpdef libc.stdint.int64_t read_var_int64(self) except? -1:
     """Decode a variable-length encoded long from a stream."""
     # Inline common case.
@@ -20,6 +20,8 @@
 
 import logging
 import math
+import mmap
+import tempfile
 import unittest
 
 import numpy as np
@@ -52,6 +54,42 @@ class StreamTest(unittest.TestCase):
     in_s = self.InputStream(out_s.get())
     self.assertEqual(b'abc', in_s.read_all(False))
 
+  def test_read_buffer(self):
+    out_s = self.OutputStream()
+    out_s.write(b'abc')
+    out_s.write_var_int64(300)
+    out_s.write(b'xyz', True)
+    encoded = out_s.get()
+    with tempfile.TemporaryFile() as f:
+      f.write(encoded)
+      f.flush()
+      with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        for buffer in (memoryview(encoded), bytearray(encoded), mapped):
+          in_s = self.InputStream(buffer)
+          self.assertEqual(len(encoded), in_s.size())
+          self.assertEqual(b'abc', in_s.read(3))
+          self.assertEqual(300, in_s.read_var_int64())
+          self.assertEqual(b'xyz', in_s.read_all(True))
+          self.assertEqual(0, in_s.size())
+          del in_s
+
+  def test_read_view(self):
+    out_s = self.OutputStream()
+    out_s.write(b'abc')
+    out_s.write(b'xyz', True)
+    buffer = bytearray(out_s.get())
+    in_s = self.InputStream(buffer)
+    abc = in_s.read_view(3)
+    xyz = in_s.read_all_view(True)
+    self.assertIsInstance(abc, memoryview)
+    self.assertEqual(b'abc', abc)
+    self.assertEqual(b'xyz', xyz)
+    # The views share the memory of the buffer they were read from.
+    buffer[4] = ord('X')
+    self.assertEqual(b'Xyz', xyz)
+    in_s = self.InputStream(np.frombuffer(b'\x01\xff', dtype=np.int8))
+    self.assertEqual(b'\x01\xff', in_s.read_all_view(False))
+
   def test_read_write_byte(self):
     out_s = self.OutputStream()
     out_s.write_byte(1)
@@ -88,6 +88,7 @@ class CoderRegistry(object):
     self._register_coder_internal(int, coders.VarIntCoder)
     self._register_coder_internal(float, coders.FloatCoder)
     self._register_coder_internal(bytes, coders.BytesCoder)
+    self._register_coder_internal(memoryview, coders.MemoryviewCoder)
     self._register_coder_internal(bool, coders.BooleanCoder)
     self._register_coder_internal(str, coders.StrUtf8Coder)
     self._register_coder_internal(windowed_value.PaneInfo, coders.PaneInfoCoder)
@@ -19,25 +19,40 @@
 
 # pytype: skip-file
 
+import io
 import logging
+import mmap
 import os
 from functools import partial
 from typing import TYPE_CHECKING
 from typing import Any
+from typing import NamedTuple
 from typing import Optional
 from typing import Union
 
+import numpy as np
+
 from apache_beam import typehints
 from apache_beam.coders import coders
 from apache_beam.io import filebasedsink
 from apache_beam.io import filebasedsource
 from apache_beam.io import iobase
 from apache_beam.io.filebasedsource import ReadAllFiles
+from apache_beam.io.filebasedsource import _ExpandIntoRanges
 from apache_beam.io.filesystem import CompressionTypes
 from apache_beam.io.iobase import Read
 from apache_beam.io.iobase import Write
 from apache_beam.transforms import PTransform
+from apache_beam.transforms.core import Create
+from apache_beam.transforms.core import DoFn
+from apache_beam.transforms.core import ParDo
 from apache_beam.transforms.display import DisplayDataItem
+from apache_beam.transforms.util import Reshuffle
+
+try:
+  import pyarrow as pa
+except ImportError:
+  pa = None
 
 if TYPE_CHECKING:
   from apache_beam.io import fileio
@@ -69,6 +84,9 @@ class _TextSource(filebasedsource.FileBasedSource):
   """
 
   DEFAULT_READ_BUFFER_SIZE = 8192
+  # Number of bytes of a memory-mapped file, or of a file read as record
+  # batches, that are split into records at once.
+  READ_BLOCK_SIZE = 1 << 20
 
   class ReadBuffer(object):
     # A buffer that gives the buffered data and next position in the
@@ -197,40 +215,22 @@ class _TextSource(filebasedsource.FileBasedSource):
       position_after_processing_header_lines = (
           self._process_header(file_to_read, read_buffer))
       start_offset = max(start_offset, position_after_processing_header_lines)
-      if start_offset > position_after_processing_header_lines:
-        # Seeking to one delimiter length before the start index and ignoring
-        # the current line. If start_position is at beginning of the line, that
-        # line belongs to the current bundle, hence ignoring that is incorrect.
-        # Seeking to one delimiter before prevents that.
-
-        if self._delimiter is not None and start_offset >= len(self._delimiter):
-          required_position = start_offset - len(self._delimiter)
-        else:
-          required_position = start_offset - 1
-
-        if self._escapechar is not None:
-          # Need more bytes to check if the delimiter is escaped.
-          # Seek until the first escapechar if any.
-          while required_position > 0:
-            file_to_read.seek(required_position - 1)
-            if file_to_read.read(1) == self._escapechar:
-              required_position -= 1
-            else:
-              break
-
-        file_to_read.seek(required_position)
-        read_buffer.reset()
-        sep_bounds = self._find_separator_bounds(file_to_read, read_buffer)
-        if not sep_bounds:
-          # Could not find a delimiter after required_position. This means that
-          # none of the records within the file belongs to the current source.
-          return
-
-        _, sep_end = sep_bounds
-        read_buffer.data = read_buffer.data[sep_end:]
-        next_record_start_position = required_position + sep_end
-      else:
-        next_record_start_position = position_after_processing_header_lines
+      mapped_file = self._try_to_map_file(file_to_read)
+      if mapped_file is not None:
+        with mapped_file:
+          yield from self._read_mapped_records(
+              mapped_file,
+              start_offset,
+              position_after_processing_header_lines,
+              range_tracker)
+        return
+      next_record_start_position = self._find_first_record(
+          file_to_read,
+          read_buffer,
+          start_offset,
+          position_after_processing_header_lines)
+      if next_record_start_position is None:
+        return
 
       while range_tracker.try_claim(next_record_start_position):
         record, num_bytes_to_next_record = self._read_record(file_to_read,
@@ -253,6 +253,233 @@ class _TextSource(filebasedsource.FileBasedSource):
         if num_bytes_to_next_record < 0:
           break
 
+  def output_batch_type_hints(self):
+    # The element and batch types produced by read_record_batches.
+    return str, pa.Array
+
+  def read_record_batches(self, file_name, range_tracker):
+    """Reads the records of file_name within range_tracker's range as
+    ``pyarrow.StringArray`` batches.
+
+    Delimiters are located and records are assembled with numpy a block at a
+    time, without creating a Python object per record. Only sources without an
+    escapechar that use a ``StrUtf8Coder`` support this.
+    """
+    read_buffer = _TextSource.ReadBuffer(b'', 0)
+    next_record_start_position = -1
+
+    def split_points_unclaimed(stop_position):
+      return (
+          0 if stop_position <= next_record_start_position else
+          iobase.RangeTracker.SPLIT_POINTS_UNKNOWN)
+
+    range_tracker.set_split_points_unclaimed_callback(split_points_unclaimed)
+
+    with self.open_file(file_name) as file_to_read:
+      position_after_processing_header_lines = (
+          self._process_header(file_to_read, read_buffer))
+      next_record_start_position = self._find_first_record(
+          file_to_read,
+          read_buffer,
+          max(
+              range_tracker.start_position(),
+              position_after_processing_header_lines),
+          position_after_processing_header_lines)
+      if next_record_start_position is None:
+        return
+
+      data = read_buffer.data[read_buffer.position:]
+      block_size = max(self._buffer_size, self.READ_BLOCK_SIZE)
+      reached_eof = False
+      while True:
+        if not reached_eof:
+          read_data = file_to_read.read(block_size)
+          reached_eof = not read_data
+          data += read_data
+        buffer = np.frombuffer(data, dtype=np.uint8)
+        sep_starts, sep_ends = self._find_all_separators(buffer)
+        if reached_eof and len(buffer) > (sep_ends[-1] if len(sep_ends) else 0):
+          # The last record of the file is not followed by a delimiter.
+          sep_starts = np.append(sep_starts, len(buffer))
+          sep_ends = np.append(sep_ends, len(buffer))
+        if not len(sep_ends):
+          if reached_eof:
+            return
+          # No complete record has been read yet.
+          continue
+
+        record_starts = next_record_start_position + np.concatenate(
+            ([0], sep_ends[:-1]))
+        num_claimed = self._claim_record_batch(range_tracker, record_starts)
+        if num_claimed:
+          yield self._to_string_array(
+              buffer, sep_starts[:num_claimed], sep_ends[:num_claimed])
+        if num_claimed < len(record_starts):
+          return
+        next_record_start_position += int(sep_ends[-1])
+        data = data[sep_ends[-1]:]
+
+  def _find_all_separators(self, buffer):
+    # Returns the start and end positions of all delimiters in buffer, a
+    # numpy array of bytes which starts with a record.
+    delimiter = self._delimiter or b'\n'
+    matches = np.flatnonzero(
+        buffer[:max(len(buffer) - len(delimiter) + 1, 0)] == delimiter[0])
+    for i in range(1, len(delimiter)):
+      matches = matches[buffer[matches + i] == delimiter[i]]
+    sep_starts = matches
+    if self._delimiter is None:
+      # Accept both '\r\n' and '\n' as a default delimiter.
+      sep_starts = matches - ((matches > 0) &
+                              (buffer[matches - 1] == ord(b'\r')))
+    return sep_starts, matches + len(delimiter)
+
+  @staticmethod
+  def _claim_record_batch(range_tracker, record_starts):
+    # Claims the records starting at record_starts, which belong to the range
+    # if they start before its (possibly concurrently reduced) stop position.
+    # Returns the number of claimed records.
+    while True:
+      num_records = int(
+          np.searchsorted(
+              record_starts, range_tracker.stop_position(), side='left'))
+      if num_records == 0:
+        return 0
+      if range_tracker.try_claim(int(record_starts[num_records - 1])):
+        return num_records
+
+  def _to_string_array(self, buffer, sep_starts, sep_ends):
+    # Builds an array of the records that end with the given delimiters.
+    buffer = buffer[:sep_ends[-1]]
+    if self._strip_trailing_newlines:
+      record_starts = np.concatenate(([0], sep_ends[:-1]))
+      in_delimiter = np.zeros(len(buffer) + 1, dtype=np.int8)
+      in_delimiter[sep_starts] += 1
+      in_delimiter[sep_ends] -= 1
+      values = buffer[np.cumsum(in_delimiter[:-1]) == 0]
+      offsets = np.concatenate(([0], np.cumsum(sep_starts - record_starts)))
+    else:
+      values = buffer
+      offsets = np.concatenate(([0], sep_ends))
+    array = pa.StringArray.from_buffers(
+        len(sep_ends),
+        pa.py_buffer(offsets.astype(np.int32)),
+        pa.py_buffer(values))
+    array.validate(full=True)
+    return array
+
+  def _find_first_record(
+      self, file_to_read, read_buffer, start_offset, records_start_offset):
+    # Returns the position of the first record that starts at or after
+    # start_offset, leaving read_buffer.data at that position, or None if
+    # there is no such record. records_start_offset is the position of the
+    # first record after the header.
+    if start_offset > records_start_offset:
+      # Seeking to one delimiter length before the start index and ignoring
+      # the current line. If start_position is at beginning of the line, that
+      # line belongs to the current bundle, hence ignoring that is incorrect.
+      # Seeking to one delimiter before prevents that.
+
+      if self._delimiter is not None and start_offset >= len(self._delimiter):
+        required_position = start_offset - len(self._delimiter)
+      else:
+        required_position = start_offset - 1
+
+      if self._escapechar is not None:
+        # Need more bytes to check if the delimiter is escaped.
+        # Seek until the first escapechar if any.
+        while required_position > 0:
+          file_to_read.seek(required_position - 1)
+          if file_to_read.read(1) == self._escapechar:
+            required_position -= 1
+          else:
+            break
+
+      file_to_read.seek(required_position)
+      read_buffer.reset()
+      sep_bounds = self._find_separator_bounds(file_to_read, read_buffer)
+      if not sep_bounds:
+        # Could not find a delimiter after required_position. This means that
+        # none of the records within the file belongs to the current source.
+        return None
+
+      _, sep_end = sep_bounds
+      read_buffer.data = read_buffer.data[sep_end:]
+      return required_position + sep_end
+    else:
+      return records_start_offset
+
+  def _try_to_map_file(self, file_to_read):
+    # Returns a read-only memory map of file_to_read if it is an uncompressed
+    # local file and records can be found without looking for escape
+    # characters, or None otherwise.
+    if self._escapechar is not None or not isinstance(file_to_read,
+                                                      io.BufferedReader):
+      return None
+    try:
+      return mmap.mmap(file_to_read.fileno(), 0, access=mmap.ACCESS_READ)
+    except (io.UnsupportedOperation, OSError, ValueError):
+      # Not backed by a file descriptor, or the file is empty.
+      return None
+
+  def _read_mapped_records(
+      self, mapped_file, start_offset, records_start_offset, range_tracker):
+    # Same as the loop in read_records, but splits a whole block of the mapped
+    # file into records at once instead of searching for one delimiter at a
+    # time.
+    delimiter = self._delimiter or b'\n'
+    delimiter_len = len(delimiter)
+    file_size = len(mapped_file)
+    if start_offset > records_start_offset:
+      # Skip the record that started before start_offset, see read_records.
+      if self._delimiter is not None and start_offset >= delimiter_len:
+        required_position = start_offset - delimiter_len
+      else:
+        required_position = start_offset - 1
+      next_delim = mapped_file.find(delimiter, required_position)
+      if next_delim < 0:
+        return
+      next_record_start_position = next_delim + delimiter_len
+    else:
+      next_record_start_position = records_start_offset
+
+    def split_points_unclaimed(stop_position):
+      return (
+          0 if stop_position <= next_record_start_position else
+          iobase.RangeTracker.SPLIT_POINTS_UNKNOWN)
+
+    range_tracker.set_split_points_unclaimed_callback(split_points_unclaimed)
+
+    strip_carriage_return = (
+        self._delimiter is None and self._strip_trailing_newlines)
+    block_size = max(self._buffer_size, self.READ_BLOCK_SIZE)
+    while True:
+      block_end = min(next_record_start_position + block_size, file_size)
+      records = mapped_file[next_record_start_position:block_end].split(
+          delimiter)
+      # The last element is not followed by a delimiter, so it is either
+      # incomplete or the last record of the file.
+      last_record = records.pop()
+      if not records and block_end < file_size:
+        # A record that is longer than the block.
+        block_size *= 2
+        continue
+      for record in records:
+        if not range_tracker.try_claim(next_record_start_position):
+          return
+        next_record_start_position += len(record) + delimiter_len
+        if not self._strip_trailing_newlines:
+          record += delimiter
+        elif strip_carriage_return and record[-1:] == b'\r':
+          record = record[:-1]
+        yield self._coder.decode(record)
+      if block_end == file_size:
+        # See read_records for why an empty record at the end of the file is
+        # not returned.
+        if range_tracker.try_claim(next_record_start_position) and last_record:
+          yield self._coder.decode(last_record)
+        return
+
   def _process_header(self, file_to_read, read_buffer):
     # Returns a tuple containing the position in file after processing header
     # records and a list of decoded header lines that match
@@ -424,6 +651,11 @@ class _TextSource(filebasedsource.FileBasedSource):
       return Any
 
 
+class _FileNameAndLine(NamedTuple):
+  file_name: str
+  line: str
+
+
 class _TextSourceWithFilename(_TextSource):
   def read_records(self, file_name, range_tracker):
     records = super().read_records(file_name, range_tracker)
@@ -433,6 +665,34 @@ class _TextSourceWithFilename(_TextSource):
   def output_type_hint(self):
     return typehints.KV[str, super().output_type_hint()]
 
+  def output_batch_type_hints(self):
+    return _FileNameAndLine, pa.Table
+
+  def read_record_batches(self, file_name, range_tracker):
+    for batch in super().read_record_batches(file_name, range_tracker):
+      yield pa.Table.from_arrays(
+          [pa.nulls(len(batch), pa.string()).fill_null(file_name), batch],
+          names=list(_FileNameAndLine._fields))
+
+
+class _ReadRangeBatches(DoFn):
+  """Reads (FileMetadata, OffsetRange) pairs as batches of text records."""
+  def __init__(self, source):
+    self._source = source
+    self._element_type, self._batch_type = source.output_batch_type_hints()
+
+  @DoFn.yields_batches
+  def process(self, element):
+    metadata, range = element
+    yield from self._source.read_record_batches(
+        metadata.path, range.new_tracker())
+
+  def infer_output_type(self, input_type):
+    return self._element_type
+
+  def get_output_batch_type(self, input_element_type):
+    return self._batch_type
+
 
 class _TextSink(filebasedsink.FileBasedSink):
   """A sink to a GCS or local text file or files."""
@@ -766,6 +1026,7 @@ class ReadFromText(PTransform):
       skip_header_lines=0,
       delimiter=None,
       escapechar=None,
+      output_batches=False,
       **kwargs):
     """Initialize the :class:`ReadFromText` transform.
 
@@ -794,6 +1055,12 @@ class ReadFromText(PTransform):
         ambiguous parsing.
       escapechar (bytes) Optional: a single byte to escape the records
         delimiter, can also escape itself.
+      output_batches (bool): If True, lines are produced in batches of
+        ``pyarrow.StringArray`` (``pyarrow.Table`` with ``file_name`` and
+        ``line`` columns for :class:`ReadFromTextWithFilename`) that are passed
+        on to batched DoFns without creating a Python object per line.
+        Requires pyarrow, a string **file_pattern**, the default
+        ``StrUtf8Coder`` and no **escapechar**.
     """
 
     super().__init__(**kwargs)
@@ -803,6 +1070,17 @@ class ReadFromText(PTransform):
           file_pattern = os.path.join('.', file_pattern)
       except TypeError:
         pass
+    if output_batches:
+      if pa is None:
+        raise ImportError('output_batches=True requires pyarrow.')
+      if not isinstance(file_pattern, str):
+        raise ValueError('output_batches=True requires a str file_pattern.')
+      if type(coder) is not coders.StrUtf8Coder or escapechar is not None:
+        raise ValueError(
+            'output_batches=True is only supported with a StrUtf8Coder and '
+            'without escapechar.')
+    self._file_pattern = file_pattern
+    self._output_batches = output_batches
 
     self._source = self._source_class(
         file_pattern,
@@ -816,6 +1094,18 @@ class ReadFromText(PTransform):
         escapechar=escapechar)
 
   def expand(self, pvalue):
+    if self._output_batches:
+      return (
+          pvalue.pipeline
+          | 'Create' >> Create([self._file_pattern])
+          | 'ExpandIntoRanges' >> ParDo(
+              _ExpandIntoRanges(
+                  True,
+                  self._source._compression_type,
+                  ReadAllFromText.DEFAULT_DESIRED_BUNDLE_SIZE,
+                  self._source._min_bundle_size))
+          | 'Reshard' >> Reshuffle()
+          | 'ReadRangeBatches' >> ParDo(_ReadRangeBatches(self._source)))
     return pvalue.pipeline | Read(self._source).with_output_types(
         self._source.output_type_hint())
 
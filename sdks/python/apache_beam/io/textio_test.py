@@ -28,17 +28,27 @@ import re
 import shutil
 import tempfile
 import unittest
+import typing
 import zlib
 from datetime import datetime
+from unittest import mock
 
 import pytz
 
+try:
+  import pyarrow as pa
+  import pyarrow.compute as pc
+except ImportError:
+  pa = None
+  pc = None
+
 import apache_beam as beam
 from apache_beam import coders
 from apache_beam.io import iobase
 from apache_beam.io import source_test_utils
 from apache_beam.io.filesystem import CompressionTypes
 from apache_beam.io.filesystems import FileSystems
+from apache_beam.io.range_trackers import OffsetRangeTracker
 # Importing following private classes for testing.
 from apache_beam.io.textio import ReadAllFromText
 from apache_beam.io.textio import ReadAllFromTextContinuously
@@ -538,6 +548,142 @@ class TextSourceTest(unittest.TestCase):
         splits[0].stop_position,
         perform_multi_threaded_test=False)
 
+  def _check_mapped_read_matches_buffered_read(self, file_name, **kwargs):
+    source = TextSource(
+        file_name,
+        0,
+        CompressionTypes.UNCOMPRESSED,
+        coder=coders.BytesCoder(),
+        **kwargs)
+    source = list(source.split(desired_bundle_size=100000))[0].source
+    file_size = os.path.getsize(file_name)
+    ranges = [(None, None)] + [(start, stop) for start in range(0, 12, 3)
+                               for stop in (start + 5, file_size)]
+    for start, stop in ranges:
+      mapped = source_test_utils.read_from_source(source, start, stop)
+      with mock.patch.object(TextSource, '_try_to_map_file', return_value=None):
+        buffered = source_test_utils.read_from_source(source, start, stop)
+      self.assertEqual(mapped, buffered, (kwargs, start, stop))
+
+  def test_mapped_read_matches_buffered_read(self):
+    for eol in (EOL.LF,
+                EOL.CRLF,
+                EOL.MIXED,
+                EOL.LF_WITH_NOTHING_AT_LAST_LINE,
+                EOL.CUSTOM_DELIMITER):
+      delimiter = b'@#' if eol == EOL.CUSTOM_DELIMITER else None
+      file_name, _ = write_data(20, eol=eol, custom_delimiter=delimiter)
+      for strip_trailing_newlines in (True, False):
+        self._check_mapped_read_matches_buffered_read(
+            file_name,
+            strip_trailing_newlines=strip_trailing_newlines,
+            delimiter=delimiter)
+
+  def test_mapped_read_records_longer_than_block(self):
+    file_name, expected_data = write_data(
+        10, eol=EOL.CUSTOM_DELIMITER, custom_delimiter=b'@#',
+        line_value=b'long_line')
+    with mock.patch.object(TextSource, 'READ_BLOCK_SIZE', 3):
+      self._check_mapped_read_matches_buffered_read(
+          file_name,
+          strip_trailing_newlines=True,
+          buffer_size=1,
+          delimiter=b'@#')
+      source = TextSource(
+          file_name,
+          0,
+          CompressionTypes.UNCOMPRESSED,
+          True,
+          coders.StrUtf8Coder(),
+          buffer_size=1,
+          delimiter=b'@#')
+      self.assertCountEqual(
+          source_test_utils.read_from_source(source), expected_data)
+
+  def _check_record_batches_match_records(self, file_name, **kwargs):
+    source = TextSource(
+        file_name,
+        0,
+        CompressionTypes.UNCOMPRESSED,
+        coder=coders.StrUtf8Coder(),
+        **kwargs)
+    file_size = os.path.getsize(file_name)
+    for start in range(0, 12, 3):
+      for stop in (start + 5, file_size):
+        records = list(
+            source.read_records(file_name, OffsetRangeTracker(start, stop)))
+        batches = list(
+            source.read_record_batches(
+                file_name, OffsetRangeTracker(start, stop)))
+        self.assertTrue(all(isinstance(b, pa.StringArray) for b in batches))
+        self.assertEqual(
+            sum((batch.to_pylist() for batch in batches), []),
+            records, (kwargs, start, stop))
+
+  @unittest.skipIf(pa is None, 'pyarrow not installed.')
+  def test_read_record_batches(self):
+    for eol in (EOL.LF,
+                EOL.CRLF,
+                EOL.MIXED,
+                EOL.LF_WITH_NOTHING_AT_LAST_LINE,
+                EOL.CUSTOM_DELIMITER):
+      delimiter = b'@#' if eol == EOL.CUSTOM_DELIMITER else None
+      file_name, _ = write_data(20, eol=eol, custom_delimiter=delimiter)
+      for strip_trailing_newlines in (True, False):
+        self._check_record_batches_match_records(
+            file_name,
+            strip_trailing_newlines=strip_trailing_newlines,
+            delimiter=delimiter)
+
+  @unittest.skipIf(pa is None, 'pyarrow not installed.')
+  def test_read_record_batches_small_blocks(self):
+    file_name, _ = write_data(
+        10, eol=EOL.CUSTOM_DELIMITER, custom_delimiter=b'@#',
+        line_value=b'long_line')
+    with mock.patch.object(TextSource, 'READ_BLOCK_SIZE', 3):
+      self._check_record_batches_match_records(
+          file_name,
+          strip_trailing_newlines=True,
+          buffer_size=1,
+          delimiter=b'@#',
+          skip_header_lines=1)
+
+  @unittest.skipIf(pa is None, 'pyarrow not installed.')
+  def test_read_from_text_output_batches(self):
+    file_name, expected_data = write_data(100, eol=EOL.MIXED)
+
+    class UpperCase(beam.DoFn):
+      def process_batch(self, batch: pa.Array) -> typing.Iterator[pa.Array]:
+        assert isinstance(batch, pa.StringArray)
+        yield pc.utf8_upper(batch)
+
+      def infer_output_type(self, input_type):
+        return input_type
+
+    with TestPipeline() as pipeline:
+      lines = pipeline | 'Read' >> ReadFromText(file_name, output_batches=True)
+      assert_that(lines, equal_to(expected_data), label='CheckLines')
+      assert_that(
+          lines | beam.ParDo(UpperCase()),
+          equal_to([line.upper() for line in expected_data]),
+          label='CheckUpperCase')
+
+  @unittest.skipIf(pa is None, 'pyarrow not installed.')
+  def test_read_from_text_with_file_name_output_batches(self):
+    pattern, expected_data = write_pattern(
+        lines_per_file=[5, 5], return_filenames=True)
+    with TestPipeline() as pipeline:
+      pcoll = pipeline | 'Read' >> ReadFromTextWithFilename(
+          pattern, output_batches=True)
+      assert_that(pcoll | beam.Map(tuple), equal_to(expected_data))
+
+  def test_read_from_text_output_batches_unsupported(self):
+    file_name, _ = write_data(5)
+    with self.assertRaises((ValueError, ImportError)):
+      ReadFromText(file_name, output_batches=True, escapechar=b'\\')
+    with self.assertRaises((ValueError, ImportError)):
+      ReadFromText(file_name, output_batches=True, coder=coders.BytesCoder())
+
   def test_read_from_text_single_file(self):
     file_name, expected_data = write_data(5)
     assert len(expected_data) == 5
@@ -972,9 +972,9 @@ class DirectOptions(PipelineOptions):
         '--no_direct_runner_use_stacked_bundle',
         action='store_false',
         dest='direct_runner_use_stacked_bundle',
-        help='DirectRunner uses stacked WindowedValues within a Bundle for '
-        'memory optimization. Set --no_direct_runner_use_stacked_bundle to '
-        'avoid it.')
+        help='DirectRunner stores the elements of a Bundle in columns, '
+        'sharing their windows and panes, for memory optimization. Set '
+        '--no_direct_runner_use_stacked_bundle to avoid it.')
     parser.add_argument(
         '--direct_runner_bundle_repeat',
         type=int,
@@ -1009,6 +1009,21 @@ class DirectOptions(PipelineOptions):
         '(in seconds) at which the split requests will be sent, and '
         'fractions is a corresponding list of floating points to use in the '
         'split requests themselves.')
+    parser.add_argument(
+        '--direct_runner_grouping_buffer_memory_mb',
+        type=int,
+        default=None,
+        help='Maximum encoded size, in megabytes, of the data buffered in '
+        'memory for a single GroupByKey before the FnApiRunner spills it to '
+        'local temporary files. By default GroupByKey data is never spilled.')
+    parser.add_argument(
+        '--direct_runner_shared_memory_data_plane',
+        default=False,
+        action='store_true',
+        help='When running in multi_processing mode, exchange elements with '
+        'the worker processes through shared memory instead of the gRPC data '
+        'plane. The control and state planes still use gRPC. Only supported '
+        'on x86 POSIX hosts, other hosts use the gRPC data plane.')
 
 
 class GoogleCloudOptions(PipelineOptions):
@@ -1576,6 +1591,19 @@ class WorkerOptions(PipelineOptions):
             'responsible for executing the user code and communicating with '
             'the runner. Depending on the runner, there may be more than one '
             'SDK Harness process running on the same worker node.'))
+    parser.add_argument(
+        '--state_cache_num_shards',
+        dest='state_cache_num_shards',
+        type=int,
+        default=0,
+        help=(
+            'Number of lock-striped shards to split the SDK Harness cache '
+            'configured by --max_cache_memory_usage_mb into. Each shard only '
+            'admits new elements that are accessed more frequently than the '
+            'elements they would evict (TinyLFU), which reduces lock '
+            'contention with many worker threads and keeps large one-off '
+            'reads from evicting frequently used elements. By default a '
+            'single least recently used cache is used.'))
     parser.add_argument(
         '--element_processing_timeout_minutes',
         type=int,
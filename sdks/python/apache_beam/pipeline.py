@@ -1130,6 +1130,10 @@ class Pipeline(HasDisplayData):
 
     self.visit(ForceKvInputTypes())
 
+    if self._options.view_as(DebugOptions).lookup_experiment(
+        'use_batch_coders'):
+      self._set_batch_coders()
+
     # Mutates context; placing inline would force dependence on
     # argument evaluation order.
     root_transform_id = context.transforms.get_id(self._root_transform())
@@ -1146,6 +1150,58 @@ class Pipeline(HasDisplayData):
     else:
       return proto
 
+  def _set_batch_coders(self) -> None:
+    """Encodes PCollections between Batched DoFns a batch at a time.
+
+    A PCollection gets the batch coder of its producer's output batch type if
+    the producer only yields batches, every consumer is a Batched DoFn with the
+    same input batch type, and it is not used as a side input. The batches
+    then cross the data plane as single values, rather than being exploded into
+    elements and encoded one at a time.
+    """
+    consumers: defaultdict[pvalue.PValue,
+                           list[AppliedPTransform]] = defaultdict(list)
+    producers: list[AppliedPTransform] = []
+    side_inputs: set[pvalue.PValue] = set()
+
+    class CollectBatchedEdges(PipelineVisitor):
+      def visit_transform(self, transform_node: AppliedPTransform) -> None:
+        for pcoll in transform_node.main_inputs.values():
+          consumers[pcoll].append(transform_node)
+        for side_input in transform_node.side_inputs:
+          side_inputs.add(side_input.pvalue)
+        if (isinstance(transform_node.transform, ParDo) and
+            len(transform_node.outputs) == 1):
+          producers.append(transform_node)
+
+    self.visit(CollectBatchedEdges())
+
+    def yields_only_batches(fn: Any) -> bool:
+      return (
+          fn._can_yield_batches and
+          (not fn._process_defined or fn._process_yields_batches) and (
+              not fn._process_batch_defined or
+              not fn._process_batch_yields_elements))
+
+    def consumes_batches(
+        transform_node: AppliedPTransform, batch_converter: Any) -> bool:
+      return (
+          isinstance(transform_node.transform, ParDo) and
+          transform_node.transform.fn._process_batch_defined and
+          getattr(transform_node.transform.fn, 'input_batch_converter',
+                  None) == batch_converter)
+
+    for producer in producers:
+      pcoll, = producer.outputs.values()
+      fn = producer.transform.fn
+      batch_converter = getattr(fn, 'output_batch_converter', None)
+      if (batch_converter is None or not yields_only_batches(fn) or
+          not consumers[pcoll] or pcoll in side_inputs or
+          not all(consumes_batches(consumer, batch_converter)
+                  for consumer in consumers[pcoll])):
+        continue
+      pcoll.batch_coder = batch_converter.get_batch_coder()
+
   @staticmethod
   def merge_compatible_environments(proto):
     """Tries to minimize the number of distinct environments by merging
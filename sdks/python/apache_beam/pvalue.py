@@ -106,6 +106,9 @@ class PValue(object):
     if windowing:
       self._windowing = windowing
     self.requires_deterministic_key_coder = None
+    # Set when this PCollection is encoded a batch at a time rather than an
+    # element at a time, see Pipeline.to_runner_api.
+    self.batch_coder = None
 
   def __str__(self):
     return self._str_internal()
@@ -177,10 +180,14 @@ class PCollection(PValue, Generic[T]):
 
   def to_runner_api(
       self, context: 'PipelineContext') -> beam_runner_api_pb2.PCollection:
+    if self.batch_coder is not None and not context.use_fake_coders:
+      coder_id = context.coders.get_id(self.batch_coder)
+    else:
+      coder_id = context.coder_id_from_element_type(
+          self.element_type, self.requires_deterministic_key_coder)
     return beam_runner_api_pb2.PCollection(
         unique_name=self._unique_name(),
-        coder_id=context.coder_id_from_element_type(
-            self.element_type, self.requires_deterministic_key_coder),
+        coder_id=coder_id,
         is_bounded=beam_runner_api_pb2.IsBounded.BOUNDED
         if self.is_bounded else beam_runner_api_pb2.IsBounded.UNBOUNDED,
         windowing_strategy_id=context.windowing_strategies.get_id(
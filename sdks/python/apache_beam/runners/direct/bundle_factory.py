@@ -19,13 +19,18 @@
 
 # pytype: skip-file
 
+import array
+from typing import Any
 from typing import Iterable
 from typing import Iterator
+from typing import Optional
 from typing import Union
-from typing import cast
 
 from apache_beam import pvalue
 from apache_beam.runners import common
+from apache_beam.utils import windowed_value
+from apache_beam.utils.timestamp import Timestamp
+from apache_beam.utils.windowed_value import PaneInfo
 from apache_beam.utils.windowed_value import WindowedValue
 
 
@@ -35,8 +40,8 @@ class BundleFactory(object):
   BundleFactory creates output bundles to be used by transform evaluators.
 
   Args:
-    stacked: whether or not to stack the WindowedValues within the bundle
-      in case consecutive ones share the same timestamp and windows.
+    stacked: whether or not to store the WindowedValues within the bundle
+      in columns, sharing the windows and panes of the elements.
       DirectRunnerOptions.direct_runner_use_stacked_bundle controls this option.
   """
   def __init__(self, stacked: bool) -> None:
@@ -68,66 +73,39 @@ class _Bundle(common.Receiver):
   The stored elements are WindowedValues, which contains timestamp and windows
   information.
 
-  Bundle internally optimizes storage by stacking elements with the same
-  timestamp and windows into StackedWindowedValues, and then returns an iterable
-  to restore WindowedValues upon get_elements() call.
+  Bundle internally optimizes storage by keeping its elements in columns: the
+  values in a list, the timestamps in an array of microseconds, and an index
+  per element into a small table of the distinct (windows, pane_info) pairs of
+  the bundle. WindowedValues are only restored upon get_elements_iterable()
+  call, and transform evaluators may read the values alone through
+  get_values_iterable().
 
   When this optimization is not desired, it can be avoided by an option when
   creating bundles, like:::
 
     b = Bundle(stacked=False)
   """
-  class _StackedWindowedValues(object):
-    """A stack of WindowedValues with the same timestamp and windows.
-
-    It must be initialized from a single WindowedValue.
-
-    Example:::
-
-      s = StackedWindowedValues(windowed_value)
-      if (another_windowed_value.timestamp == s.timestamp and
-          another_windowed_value.windows == s.windows):
-        s.add_value(another_windowed_value.value)
-      windowed_values = [wv for wv in s.windowed_values()]
-      # now windowed_values equals to [windowed_value, another_windowed_value]
-    """
-    def __init__(self, initial_windowed_value):
-      self._initial_windowed_value = initial_windowed_value
-      self._appended_values = []
-
-    @property
-    def timestamp(self):
-      return self._initial_windowed_value.timestamp
-
-    @property
-    def windows(self):
-      return self._initial_windowed_value.windows
-
-    @property
-    def pane_info(self):
-      return self._initial_windowed_value.pane_info
-
-    def add_value(self, value):
-      self._appended_values.append(value)
-
-    def windowed_values(self) -> Iterator[WindowedValue]:
-      # yield first windowed_value as is, then iterate through
-      # _appended_values to yield WindowedValue on the fly.
-      yield self._initial_windowed_value
-      for v in self._appended_values:
-        yield self._initial_windowed_value.with_value(v)
-
   def __init__(
       self,
       pcollection: Union[pvalue.PBegin, pvalue.PCollection],
       stacked: bool = True) -> None:
     assert isinstance(pcollection, (pvalue.PBegin, pvalue.PCollection))
     self._pcollection = pcollection
-    self._elements: list[Union[WindowedValue,
-                               _Bundle._StackedWindowedValues]] = []
     self._stacked = stacked
+    if stacked:
+      self._values: list[Any] = []
+      self._timestamps = array.array('q')
+      self._metadata_indices = array.array('I')
+      # The distinct (windows, pane_info) pairs of the elements, referenced by
+      # position from _metadata_indices.
+      self._metadata: list[tuple[Any, PaneInfo]] = []
+      self._metadata_to_index: dict[tuple[Any, ...], int] = {}
+      self._last_metadata: Optional[tuple[Any, PaneInfo, int]] = None
+    else:
+      self._elements: list[WindowedValue] = []
     self._committed = False
     self._tag = None  # optional tag information for this bundle
+    self._min_timestamp = None
 
   def get_elements_iterable(self,
                             make_copy: bool = False) -> Iterable[WindowedValue]:
@@ -142,27 +120,59 @@ class _Bundle(common.Receiver):
       or as a list of copied WindowedValues.
     """
     if not self._stacked:
-      # we can safely assume self._elements contains only WindowedValues
-      elements = cast('list[WindowedValue]', self._elements)
       if self._committed and not make_copy:
-        return elements
-      return list(elements)
-
-    def iterable_stacked_or_elements(elements):
-      for e in elements:
-        if isinstance(e, _Bundle._StackedWindowedValues):
-          for w in e.windowed_values():
-            yield w
-        else:
-          yield e
+        return self._elements
+      return list(self._elements)
 
     if self._committed and not make_copy:
-      return iterable_stacked_or_elements(self._elements)
+      return self._iter_windowed_values()
     # returns a copy.
-    return [e for e in iterable_stacked_or_elements(self._elements)]
+    return list(self._iter_windowed_values())
+
+  def _iter_windowed_values(self) -> Iterator[WindowedValue]:
+    metadata = self._metadata
+    create = windowed_value.create
+    for value, timestamp_micros, index in zip(
+        self._values, self._timestamps, self._metadata_indices):
+      windows, pane_info = metadata[index]
+      yield create(value, timestamp_micros, windows, pane_info)
+
+  def get_values_iterable(self) -> Iterable[Any]:
+    """Returns the values of the elements, without their windowing metadata."""
+    if not self._stacked:
+      return [e.value for e in self._elements]
+    if self._committed:
+      return self._values
+    return list(self._values)
+
+  def get_windows_iterable(self) -> Iterable[Any]:
+    """Returns the windows of the elements, each set at most once."""
+    if not self._stacked:
+      return [e.windows for e in self._elements]
+    return [windows for windows, _ in self._metadata]
 
   def has_elements(self):
-    return len(self._elements) > 0
+    if not self._stacked:
+      return len(self._elements) > 0
+    return len(self._values) > 0
+
+  @property
+  def min_timestamp(self) -> Optional[Timestamp]:
+    """The minimum timestamp of the elements, or None if there are none.
+
+    It is computed only once for a committed bundle.
+    """
+    if self._min_timestamp is not None:
+      return self._min_timestamp
+    if not self._stacked:
+      min_timestamp = min((e.timestamp for e in self._elements), default=None)
+    elif self._timestamps:
+      min_timestamp = Timestamp(micros=min(self._timestamps))
+    else:
+      min_timestamp = None
+    if self._committed:
+      self._min_timestamp = min_timestamp
+    return min_timestamp
 
   @property
   def tag(self):
@@ -188,17 +198,49 @@ class _Bundle(common.Receiver):
     if not self._stacked:
       self._elements.append(element)
       return
-    if (self._elements and
-        (isinstance(self._elements[-1],
-                    (WindowedValue, _Bundle._StackedWindowedValues))) and
-        self._elements[-1].timestamp == element.timestamp and
-        self._elements[-1].windows == element.windows and
-        self._elements[-1].pane_info == element.pane_info):
-      if isinstance(self._elements[-1], WindowedValue):
-        self._elements[-1] = _Bundle._StackedWindowedValues(self._elements[-1])
-      self._elements[-1].add_value(element.value)
+    windows = element.windows
+    pane_info = element.pane_info
+    last = self._last_metadata
+    # Consecutive elements usually share their windows and pane.
+    if (last is not None and (last[0] is windows or last[0] == windows) and
+        (last[1] is pane_info or last[1] == pane_info)):
+      index = last[2]
     else:
-      self._elements.append(element)
+      index = self._metadata_index(windows, pane_info)
+      self._last_metadata = (windows, pane_info, index)
+    self._values.append(element.value)
+    self._timestamps.append(element.timestamp_micros)
+    self._metadata_indices.append(index)
+
+  def _metadata_index(self, windows, pane_info) -> int:
+    # Windows may be given as a list, which is not hashable.
+    key = (type(windows), tuple(windows), pane_info)
+    index = self._metadata_to_index.get(key)
+    if index is None:
+      index = len(self._metadata)
+      self._metadata.append((windows, pane_info))
+      self._metadata_to_index[key] = index
+    return index
+
+  def add_all(self, bundle: '_Bundle') -> None:
+    """Outputs all the elements of another bundle to this bundle."""
+    assert not self._committed
+    if not (self._stacked and bundle._stacked):
+      for element in bundle.get_elements_iterable():
+        self.add(element)
+      return
+    mapping = [
+        self._metadata_index(windows, pane_info)
+        for windows, pane_info in bundle._metadata
+    ]
+    self._values.extend(bundle._values)
+    self._timestamps.extend(bundle._timestamps)
+    if mapping == list(range(len(mapping))):
+      self._metadata_indices.extend(bundle._metadata_indices)
+    else:
+      self._metadata_indices.extend(
+          mapping[index] for index in bundle._metadata_indices)
+    self._last_metadata = None
 
   def output(self, element):
     self.add(element)
@@ -217,5 +259,6 @@ class _Bundle(common.Receiver):
     """
     assert not self._committed
     self._committed = True
-    self._elements = tuple(self._elements)
+    if not self._stacked:
+      self._elements = tuple(self._elements)
     self._synchronized_processing_time = synchronized_processing_time
@@ -0,0 +1,96 @@
+#
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""Unit tests for the bundles of the DirectRunner."""
+
+# pytype: skip-file
+
+import unittest
+
+import apache_beam as beam
+from apache_beam.runners.direct.bundle_factory import BundleFactory
+from apache_beam.transforms.window import GlobalWindow
+from apache_beam.transforms.window import IntervalWindow
+from apache_beam.utils.timestamp import Timestamp
+from apache_beam.utils.windowed_value import PANE_INFO_UNKNOWN
+from apache_beam.utils.windowed_value import PaneInfo
+from apache_beam.utils.windowed_value import PaneInfoTiming
+from apache_beam.utils.windowed_value import WindowedValue
+
+
+class BundleTest(unittest.TestCase):
+  def setUp(self):
+    self.pcoll = beam.Pipeline() | beam.Create([])
+    early = PaneInfo(True, False, PaneInfoTiming.EARLY, 0, 0)
+    self.elements = [
+        WindowedValue('a', 1, (GlobalWindow(), )),
+        WindowedValue('b', 2, (GlobalWindow(), )),
+        WindowedValue('c', 3, (IntervalWindow(0, 10), ), early),
+        WindowedValue('d', Timestamp(micros=-1), [GlobalWindow()]),
+        WindowedValue('e', 4, (GlobalWindow(), )),
+    ]
+
+  def _bundle(self, stacked, elements):
+    bundle = BundleFactory(stacked).create_bundle(self.pcoll)
+    for element in elements:
+      bundle.add(element)
+    return bundle
+
+  def test_elements(self):
+    for stacked in (True, False):
+      bundle = self._bundle(stacked, self.elements)
+      self.assertEqual(bundle.get_elements_iterable(), self.elements)
+      bundle.commit(None)
+      self.assertEqual(list(bundle.get_elements_iterable()), self.elements)
+      self.assertEqual(
+          list(bundle.get_values_iterable()), ['a', 'b', 'c', 'd', 'e'])
+      self.assertEqual(bundle.min_timestamp, Timestamp(micros=-1))
+      self.assertEqual(
+          list(bundle.get_elements_iterable())[3].timestamp,
+          Timestamp(micros=-1))
+
+  def test_windows_and_panes_are_shared(self):
+    bundle = self._bundle(True, self.elements)
+    self.assertEqual(
+        bundle.get_windows_iterable(),
+        [(GlobalWindow(), ), (IntervalWindow(0, 10), ), [GlobalWindow()]])
+    self.assertEqual(list(bundle._metadata_indices), [0, 0, 1, 2, 0])
+    self.assertEqual([e.pane_info for e in bundle.get_elements_iterable()],
+                     [PANE_INFO_UNKNOWN] * 2 + [self.elements[2].pane_info] +
+                     [PANE_INFO_UNKNOWN] * 2)
+
+  def test_add_all(self):
+    for stacked in (True, False):
+      bundle = self._bundle(stacked, self.elements[2:])
+      bundle.add_all(self._committed(self.elements[:3]))
+      self.assertEqual(
+          bundle.get_elements_iterable(), self.elements[2:] + self.elements[:3])
+
+  def _committed(self, elements):
+    bundle = self._bundle(True, elements)
+    bundle.commit(None)
+    return bundle
+
+  def test_empty_bundle(self):
+    bundle = BundleFactory(True).create_empty_committed_bundle(self.pcoll)
+    self.assertFalse(bundle.has_elements())
+    self.assertIsNone(bundle.min_timestamp)
+    self.assertEqual(list(bundle.get_elements_iterable()), [])
+
+
+if __name__ == '__main__':
+  unittest.main()
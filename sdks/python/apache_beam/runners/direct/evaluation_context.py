@@ -333,6 +333,8 @@ class EvaluationContext(object):
       existing_keyed_state = self._transform_keyed_states[result.transform]
       for k, v in result.partial_keyed_state.items():
         existing_keyed_state[k] = v
+      self._watermark_manager.update_keyed_timers(
+          result.transform, result.partial_keyed_state)
       return committed_bundles
 
   def _update_side_inputs_container(
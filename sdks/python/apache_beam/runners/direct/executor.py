@@ -56,10 +56,6 @@ class _ExecutorService(object):
 
   class _ExecutorServiceWorker(threading.Thread):
     """Worker thread for executing a single task at a time."""
-
-    # Amount to block waiting for getting an item from the queue in seconds.
-    TIMEOUT = 5
-
     def __init__(
         self, queue: 'queue.Queue[_ExecutorService.CallableTask]', index):
       super().__init__()
@@ -82,13 +78,8 @@ class _ExecutorService(object):
           self._index, name, 'executing' if task else 'idle')
 
     def _get_task_or_none(self) -> Optional['_ExecutorService.CallableTask']:
-      try:
-        # Do not block indefinitely, otherwise we may not act for a requested
-        # shutdown.
-        return self.queue.get(
-            timeout=_ExecutorService._ExecutorServiceWorker.TIMEOUT)
-      except queue.Empty:
-        return None
+      # A requested shutdown wakes up the blocked workers with a None task.
+      return self.queue.get()
 
     def run(self):
       state_sampler = statesampler.StateSampler('', counters.CounterFactory())
@@ -137,8 +128,10 @@ class _ExecutorService(object):
         self.queue.task_done()
       except queue.Empty:
         continue
-    # All existing threads will eventually terminate (after they complete their
-    # last task).
+    # Wake up the idle workers. All existing threads will eventually terminate
+    # (after they complete their last task).
+    for _ in self.workers:
+      self.queue.put(None)
 
 
 class _TransformEvaluationState(object):
@@ -291,13 +284,11 @@ class TransformExecutor(_ExecutorService.CallableTask):
     self._evaluation_context = evaluation_context
     self._input_bundle = input_bundle
     # For non-empty bundles, store the window of the max EOW.
-    # TODO(mariagh): Move to class _Bundle's inner _StackedWindowedValues
     self._latest_main_input_window = None
-    if input_bundle.has_elements():
-      self._latest_main_input_window = input_bundle._elements[0].windows[0]
-      for elem in input_bundle.get_elements_iterable():
-        if elem.windows[0].end > self._latest_main_input_window.end:
-          self._latest_main_input_window = elem.windows[0]
+    for windows in input_bundle.get_windows_iterable():
+      if (self._latest_main_input_window is None or
+          windows[0].end > self._latest_main_input_window.end):
+        self._latest_main_input_window = windows[0]
     self._fired_timers = fired_timers
     self._applied_ptransform = applied_ptransform
     self._completion_callback = completion_callback
@@ -392,8 +383,7 @@ class TransformExecutor(_ExecutorService.CallableTask):
           evaluator.process_timer_wrapper(timer_firing)
 
       if self._input_bundle:
-        for value in self._input_bundle.get_elements_iterable():
-          evaluator.process_element(value)
+        evaluator.process_bundle(self._input_bundle)
 
     with finish_state:
       result = evaluator.finish_bundle()
@@ -513,6 +503,7 @@ class _ExecutorServiceParallelExecutor(object):
     def __init__(self, item_type):
       self._item_type = item_type
       self._queue = queue.Queue()
+      self._offered = threading.Event()
 
     def poll(self):
       try:
@@ -538,6 +529,13 @@ class _ExecutorServiceParallelExecutor(object):
     def offer(self, item):
       assert isinstance(item, self._item_type)
       self._queue.put_nowait(item)
+      self._offered.set()
+
+    def wait(self, timeout):
+      """Blocks until an item is offered, or for at most timeout seconds."""
+      if self._queue.empty():
+        self._offered.wait(timeout)
+      self._offered.clear()
 
   class _ExecutorUpdate(object):
     """An internal status update on the state of the executor."""
@@ -568,6 +566,11 @@ class _ExecutorServiceParallelExecutor(object):
 
   class _MonitorTask(_ExecutorService.CallableTask):
     """MonitorTask continuously runs to ensure that pipeline makes progress."""
+
+    # The longest time to wait for a processing time timer without checking
+    # for other progress, in seconds.
+    MAX_IDLE_WAIT_SECS = 1
+
     def __init__(self, executor: '_ExecutorServiceParallelExecutor') -> None:
       self._executor = executor
 
@@ -602,8 +605,23 @@ class _ExecutorServiceParallelExecutor(object):
             _ExecutorServiceParallelExecutor._VisibleExecutorUpdate(e))
       finally:
         if not self._should_shutdown():
+          self._wait_if_idle()
           self._executor.executor_service.submit(self)
 
+    def _wait_if_idle(self):
+      """Waits for the next processing time timer if there is no other work.
+
+      Rather than polling the timers until one of them fires, the monitor blocks
+      until the earliest one is due, or until an update arrives.
+      """
+      if (self._is_executing() or
+          not self._executor.executor_service.queue.empty()):
+        return
+      watermark_manager = self._executor.evaluation_context._watermark_manager
+      delay = watermark_manager.time_to_next_realtime_timer()
+      if delay is not None and delay > 0:
+        self._executor.all_updates.wait(min(delay, self.MAX_IDLE_WAIT_SECS))
+
     def _should_shutdown(self) -> bool:
       """Checks whether the pipeline is completed and should be shut down.
 
@@ -625,8 +643,7 @@ class _ExecutorServiceParallelExecutor(object):
         return False
 
       watermark_manager = self._executor.evaluation_context._watermark_manager
-      _, any_unfired_realtime_timers = watermark_manager.extract_all_timers()
-      if any_unfired_realtime_timers:
+      if watermark_manager.has_realtime_timer():
         return False
 
       else:
@@ -316,6 +316,15 @@ class _TransformEvaluator(object):
     """Processes a new element as part of the current bundle."""
     raise NotImplementedError('%s do not process elements.' % type(self))
 
+  def process_bundle(self, bundle):
+    """Processes all the elements of a committed input bundle.
+
+    Evaluators that do not need the windowing metadata of every element can
+    override it to read the columns of the bundle directly.
+    """
+    for element in bundle.get_elements_iterable():
+      self.process_element(element)
+
   def finish_bundle(self) -> TransformResult:
     """Finishes the bundle and produces output."""
     pass
@@ -806,6 +815,9 @@ class _FlattenEvaluator(_TransformEvaluator):
   def process_element(self, element):
     self.bundle.output(element)
 
+  def process_bundle(self, bundle):
+    self.bundle.add_all(bundle)
+
   def finish_bundle(self):
     bundles = [self.bundle]
     return TransformResult(self, bundles, [], None, None)
@@ -988,16 +1000,31 @@ class _GroupByKeyOnlyEvaluator(_TransformEvaluator):
   def process_element(self, element):
     assert not self.global_state.get_state(
         None, _GroupByKeyOnlyEvaluator.COMPLETION_TAG)
-    if (isinstance(element, WindowedValue) and
-        isinstance(element.value, abc.Iterable) and len(element.value) == 2):
-      k, v = element.value
+    if not isinstance(element, WindowedValue):
+      raise TypeCheckError(
+          'Input to _GroupByKeyOnly must be a PCollection of '
+          'windowed key-value pairs. Instead received: %r.' % element)
+    self._process_value(element.value)
+
+  def process_bundle(self, bundle):
+    # The input values are already reified, so their windows are not needed.
+    values = bundle.get_values_iterable()
+    if values:
+      assert not self.global_state.get_state(
+          None, _GroupByKeyOnlyEvaluator.COMPLETION_TAG)
+    for value in values:
+      self._process_value(value)
+
+  def _process_value(self, value):
+    if isinstance(value, abc.Iterable) and len(value) == 2:
+      k, v = value
       encoded_k = self.key_coder.encode(k)
       state = self._step_context.get_keyed_state(encoded_k)
       state.add_state(None, _GroupByKeyOnlyEvaluator.ELEMENTS_TAG, v)
     else:
       raise TypeCheckError(
           'Input to _GroupByKeyOnly must be a PCollection of '
-          'windowed key-value pairs. Instead received: %r.' % element)
+          'windowed key-value pairs. Instead received: %r.' % value)
 
   def finish_bundle(self):
     if self._is_final_bundle():
@@ -1076,15 +1103,24 @@ class _StreamingGroupByKeyOnlyEvaluator(_TransformEvaluator):
     self.key_coder = coders.registry.get_coder(key_type_hint)
 
   def process_element(self, element):
-    if (isinstance(element, WindowedValue) and
-        isinstance(element.value, collections.abc.Iterable) and
-        len(element.value) == 2):
-      k, v = element.value
+    if not isinstance(element, WindowedValue):
+      raise TypeCheckError(
+          'Input to _GroupByKeyOnly must be a PCollection of '
+          'windowed key-value pairs. Instead received: %r.' % element)
+    self._process_value(element.value)
+
+  def process_bundle(self, bundle):
+    for value in bundle.get_values_iterable():
+      self._process_value(value)
+
+  def _process_value(self, value):
+    if isinstance(value, collections.abc.Iterable) and len(value) == 2:
+      k, v = value
       self.gbk_items[self.key_coder.encode(k)].append(v)
     else:
       raise TypeCheckError(
           'Input to _GroupByKeyOnly must be a PCollection of '
-          'windowed key-value pairs. Instead received: %r.' % element)
+          'windowed key-value pairs. Instead received: %r.' % value)
 
   def finish_bundle(self):
     bundles = []
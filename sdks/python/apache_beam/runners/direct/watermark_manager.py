@@ -19,14 +19,18 @@
 
 # pytype: skip-file
 
+import heapq
+import itertools
 import threading
 from typing import TYPE_CHECKING
 from typing import Iterable
+from typing import Optional
 
 from apache_beam import pipeline
 from apache_beam import pvalue
 from apache_beam.pipeline import AppliedPTransform
 from apache_beam.runners.direct.util import TimerFiring
+from apache_beam.transforms.timeutil import TimeDomain
 from apache_beam.utils.timestamp import MAX_TIMESTAMP
 from apache_beam.utils.timestamp import MIN_TIMESTAMP
 from apache_beam.utils.timestamp import TIME_GRANULARITY
@@ -39,7 +43,12 @@ if TYPE_CHECKING:
 class WatermarkManager(object):
   """For internal use only; no backwards-compatibility guarantees.
 
-  Tracks and updates watermarks for all AppliedPTransforms."""
+  Tracks and updates watermarks for all AppliedPTransforms.
+
+  Watermark changes are pushed from the transform whose bundle was committed
+  to its consumers only, and each transform keeps its pending timers in
+  priority queues, so that extracting the fired timers does not scan the
+  keyed states of every transform."""
 
   WATERMARK_POS_INF = MAX_TIMESTAMP
   WATERMARK_NEG_INF = MIN_TIMESTAMP
@@ -122,6 +131,17 @@ class WatermarkManager(object):
     tw.hold(keyed_earliest_holds)
     return self._refresh_watermarks(applied_ptransform, side_inputs_container)
 
+  def update_keyed_timers(
+      self, applied_ptransform: AppliedPTransform, encoded_keys) -> None:
+    """Re-indexes the timers of the given keys of an AppliedPTransform.
+
+    This must be called whenever the keyed states of the given keys have been
+    replaced, as the timers of a transform are only read from its keyed states
+    when they are indexed.
+    """
+    self._transform_to_watermarks[applied_ptransform].update_keyed_timers(
+        encoded_keys)
+
   def _update_pending(
       self,
       input_committed_bundle,
@@ -191,6 +211,79 @@ class WatermarkManager(object):
         has_realtime_timer = True
     return all_timers, has_realtime_timer
 
+  def has_realtime_timer(self) -> bool:
+    """Reports if any unfinished transform has a processing time timer set."""
+    return any(
+        tw.earliest_realtime_timer is not None and
+        tw.output_watermark < WatermarkManager.WATERMARK_POS_INF
+        for tw in self._transform_to_watermarks.values())
+
+  def time_to_next_realtime_timer(self) -> Optional[float]:
+    """Returns the seconds until the earliest processing time timer is due.
+
+    Returns None if no transform has a processing time timer set.
+    """
+    earliest = None
+    for tw in self._transform_to_watermarks.values():
+      timestamp = tw.earliest_realtime_timer
+      if timestamp is not None and (earliest is None or timestamp < earliest):
+        earliest = timestamp
+    if earliest is None:
+      return None
+    return float(earliest) - self._clock.time()
+
+
+# Marks the entries of a _TimerQueue that have been replaced.
+_REMOVED = object()
+
+
+class _TimerQueue(object):
+  """A priority queue of the earliest timer of each key in a time domain.
+
+  Entries are invalidated in place when the earliest timer of a key changes,
+  and the queue is rebuilt once most of its entries are invalid.
+  """
+  def __init__(self):
+    self._heap = []
+    # Encoded key -> its valid [timestamp, sequence number, key] heap entry.
+    self._entries = {}
+    self._sequence = itertools.count()
+
+  def __len__(self):
+    return len(self._entries)
+
+  def set(self, encoded_key, timestamp: Optional[Timestamp]) -> None:
+    entry = self._entries.get(encoded_key)
+    if entry is not None:
+      if entry[0] == timestamp:
+        return
+      entry[2] = _REMOVED
+      del self._entries[encoded_key]
+    if timestamp is not None:
+      entry = [timestamp, next(self._sequence), encoded_key]
+      self._entries[encoded_key] = entry
+      heapq.heappush(self._heap, entry)
+      if len(self._heap) > 2 * len(self._entries) + 64:
+        self._heap = list(self._entries.values())
+        heapq.heapify(self._heap)
+
+  def peek(self) -> Optional[Timestamp]:
+    heap = self._heap
+    while heap and heap[0][2] is _REMOVED:
+      heapq.heappop(heap)
+    return heap[0][0] if heap else None
+
+  def pop_until(self, time_marker):
+    """Removes and returns the keys with a timer at or before time_marker."""
+    keys = []
+    heap = self._heap
+    while heap and heap[0][0] <= time_marker:
+      entry = heapq.heappop(heap)
+      if entry[2] is not _REMOVED:
+        keys.append(entry[2])
+        del self._entries[entry[2]]
+    return keys
+
 
 class _TransformWatermarks(object):
   """Tracks input and output watermarks for an AppliedPTransform."""
@@ -204,6 +297,8 @@ class _TransformWatermarks(object):
     # Scheduled bundles targeted for this transform.
     self._pending: set['_Bundle'] = set()
     self._fired_timers = set()
+    self._watermark_timers = _TimerQueue()
+    self._realtime_timers = _TimerQueue()
     self._lock = threading.Lock()
 
     self._label = str(transform)
@@ -218,6 +313,32 @@ class _TransformWatermarks(object):
       for timer_firing in completed_timers:
         self._fired_timers.remove(timer_firing)
 
+  def update_keyed_timers(self, encoded_keys) -> None:
+    with self._lock:
+      for encoded_key in encoded_keys:
+        self._index_timers(encoded_key)
+
+  def _index_timers(self, encoded_key) -> None:
+    earliest_watermark_timer = None
+    earliest_realtime_timer = None
+    state = self._keyed_states.get(encoded_key)
+    for timers in getattr(state, 'timers', {}).values():
+      for (_, time_domain, _), timestamp in timers.items():
+        if time_domain == TimeDomain.REAL_TIME:
+          if (earliest_realtime_timer is None or
+              timestamp < earliest_realtime_timer):
+            earliest_realtime_timer = timestamp
+        elif (earliest_watermark_timer is None or
+              timestamp < earliest_watermark_timer):
+          earliest_watermark_timer = timestamp
+    self._watermark_timers.set(encoded_key, earliest_watermark_timer)
+    self._realtime_timers.set(encoded_key, earliest_realtime_timer)
+
+  @property
+  def earliest_realtime_timer(self) -> Optional[Timestamp]:
+    with self._lock:
+      return self._realtime_timers.peek()
+
   @property
   def input_watermark(self) -> Timestamp:
     with self._lock:
@@ -260,12 +381,11 @@ class _TransformWatermarks(object):
       min_pending_timestamp = WatermarkManager.WATERMARK_POS_INF
       has_pending_elements = False
       for input_bundle in self._pending:
-        # TODO(ccy): we can have the Bundle class keep track of the minimum
-        # timestamp so we don't have to do an iteration here.
-        for wv in input_bundle.get_elements_iterable():
+        bundle_min_timestamp = input_bundle.min_timestamp
+        if bundle_min_timestamp is not None:
           has_pending_elements = True
-          if wv.timestamp < min_pending_timestamp:
-            min_pending_timestamp = wv.timestamp
+          if bundle_min_timestamp < min_pending_timestamp:
+            min_pending_timestamp = bundle_min_timestamp
 
       # If there is a pending element with a certain timestamp, we can at most
       # advance our watermark to the maximum timestamp less than that
@@ -300,13 +420,17 @@ class _TransformWatermarks(object):
     """Extracts fired timers and reports of any timers set per transform."""
     with self._lock:
       fired_timers = []
-      has_realtime_timer = False
-      for encoded_key, state in self._keyed_states.items():
-        timers, had_realtime_timer = state.get_timers(
+      processing_time = self._clock.time()
+      expired_keys = set(
+          self._watermark_timers.pop_until(self._input_watermark))
+      expired_keys.update(self._realtime_timers.pop_until(processing_time))
+      for encoded_key in expired_keys:
+        timers, _ = self._keyed_states[encoded_key].get_timers(
             watermark=self._input_watermark,
-            processing_time=self._clock.time())
-        if had_realtime_timer:
-          has_realtime_timer = True
+            processing_time=processing_time)
+        # The timers stay set until the bundle that processes them is
+        # committed, so they are extracted again until then.
+        self._index_timers(encoded_key)
         for expired in timers:
           window, (name, time_domain, timestamp, dynamic_timer_tag) = expired
           fired_timers.append(
@@ -318,4 +442,4 @@ class _TransformWatermarks(object):
                   timestamp,
                   dynamic_timer_tag=dynamic_timer_tag))
       self._fired_timers.update(fired_timers)
-      return fired_timers, has_realtime_timer
+      return fired_timers, len(self._realtime_timers) > 0
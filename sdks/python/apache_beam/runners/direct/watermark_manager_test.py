@@ -0,0 +1,97 @@
+#
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""Unit tests for the watermark manager of the DirectRunner."""
+
+# pytype: skip-file
+
+import unittest
+
+from apache_beam.runners.direct.clock import TestClock
+from apache_beam.runners.direct.evaluation_context import DirectUnmergedState
+from apache_beam.runners.direct.watermark_manager import _TimerQueue
+from apache_beam.runners.direct.watermark_manager import _TransformWatermarks
+from apache_beam.transforms.timeutil import TimeDomain
+from apache_beam.utils.timestamp import Timestamp
+
+
+class TimerQueueTest(unittest.TestCase):
+  def test_pop_until(self):
+    timers = _TimerQueue()
+    timers.set('a', Timestamp(5))
+    timers.set('b', Timestamp(3))
+    timers.set('c', Timestamp(8))
+    # Replaced and removed timers are not returned.
+    timers.set('a', Timestamp(9))
+    timers.set('b', None)
+    self.assertEqual(len(timers), 2)
+    self.assertEqual(timers.peek(), Timestamp(8))
+    self.assertEqual(timers.pop_until(Timestamp(7)), [])
+    self.assertEqual(timers.pop_until(Timestamp(9)), ['c', 'a'])
+    self.assertEqual(len(timers), 0)
+    self.assertIsNone(timers.peek())
+
+  def test_compaction(self):
+    timers = _TimerQueue()
+    for i in range(1000):
+      timers.set('a', Timestamp(i))
+    self.assertLess(len(timers._heap), 100)
+    self.assertEqual(timers.pop_until(Timestamp(1000)), ['a'])
+
+
+class TransformWatermarksTest(unittest.TestCase):
+  def _keyed_state(self, *timers):
+    state = DirectUnmergedState()
+    for name, time_domain, timestamp in timers:
+      state.set_timer(None, name, time_domain, timestamp)
+    return state
+
+  def test_extract_transform_timers(self):
+    clock = TestClock(Timestamp(100))
+    keyed_states = {
+        b'a': self._keyed_state(('t', TimeDomain.WATERMARK, Timestamp(5))),
+        b'b': self._keyed_state(('t', TimeDomain.WATERMARK, Timestamp(20))),
+        b'c': self._keyed_state(('t', TimeDomain.REAL_TIME, Timestamp(150))),
+    }
+    tw = _TransformWatermarks(clock, keyed_states, 'transform')
+    tw.update_keyed_timers(keyed_states)
+    tw._input_watermark = Timestamp(10)
+
+    fired, has_realtime_timer = tw.extract_transform_timers()
+    self.assertEqual([(t.encoded_key, t.timestamp) for t in fired],
+                     [(b'a', Timestamp(5))])
+    self.assertTrue(has_realtime_timer)
+    # Timers are extracted again until the state that clears them is
+    # committed.
+    fired, _ = tw.extract_transform_timers()
+    self.assertEqual([t.encoded_key for t in fired], [b'a'])
+    keyed_states[b'a'] = self._keyed_state()
+    tw.update_keyed_timers([b'a'])
+    fired, _ = tw.extract_transform_timers()
+    self.assertEqual(fired, [])
+
+    clock.advance_time(60)
+    tw._input_watermark = Timestamp(30)
+    fired, _ = tw.extract_transform_timers()
+    self.assertEqual(
+        sorted((t.encoded_key, t.time_domain) for t in fired),
+        [(b'b', TimeDomain.WATERMARK), (b'c', TimeDomain.REAL_TIME)])
+    self.assertEqual(tw.earliest_realtime_timer, Timestamp(150))
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -19,15 +19,20 @@
 
 # mypy: disallow-untyped-defs
 
+import array
 import collections
 import copy
 import itertools
 import logging
+import os
+import shutil
 import struct
+import tempfile
 import uuid
 import weakref
 from typing import TYPE_CHECKING
 from typing import Any
+from typing import BinaryIO
 from typing import Callable
 from typing import Generic
 from typing import Iterable
@@ -41,11 +46,17 @@ from typing import Union
 from typing_extensions import Protocol
 
 from apache_beam import coders
+from apache_beam.coders.coder_impl import BytesCoderImpl
 from apache_beam.coders.coder_impl import CoderImpl
+from apache_beam.coders.coder_impl import PaneInfoCoderImpl
+from apache_beam.coders.coder_impl import TupleSequenceCoderImpl
 from apache_beam.coders.coder_impl import WindowedValueCoderImpl
 from apache_beam.coders.coder_impl import create_InputStream
 from apache_beam.coders.coder_impl import create_OutputStream
+from apache_beam.coders.coders import LengthPrefixCoder
 from apache_beam.coders.coders import WindowedValueCoder
+from apache_beam.metrics.execution import MetricsContainer
+from apache_beam.metrics.metricbase import MetricName
 from apache_beam.portability import common_urns
 from apache_beam.portability import python_urns
 from apache_beam.portability.api import beam_fn_api_pb2
@@ -86,6 +97,61 @@ _LOGGER = logging.getLogger(__name__)
 SAFE_WINDOW_FNS = set(
     window.WindowFn._known_urns.keys()) - {python_urns.PICKLED_WINDOWFN}
 
+GROUPING_BUFFER_SPILLED_BYTES_COUNTER = '__grouping_buffer_spilled_bytes'
+GROUPING_BUFFER_SPILL_RUNS_COUNTER = '__grouping_buffer_spill_runs'
+
+# The pane emitted by GroupingBuffer for every key under default windowing.
+_ON_TIME_ONLY_PANE = windowed_value.PaneInfo(
+    is_first=True,
+    is_last=True,
+    timing=windowed_value.PaneInfoTiming.ON_TIME,
+    index=0,
+    nonspeculative_index=0)
+
+
+def _skip_length_prefixed(in_stream: Any) -> None:
+  in_stream.read(in_stream.read_var_int64())
+
+
+def _skip_var_int(in_stream: Any) -> None:
+  in_stream.read_var_int64()
+
+
+def _skip_fixed_size(size: int) -> Callable[[Any], None]:
+  def skip(in_stream: Any) -> None:
+    in_stream.read(size)
+
+  return skip
+
+
+def _nested_encoding_skipper(
+    coder: coders.Coder) -> Optional[Callable[[Any], None]]:
+  """Returns a function advancing an input stream past one nested encoding
+  of the given coder without decoding it, or None if the extent of such an
+  encoding can not be determined cheaply."""
+  coder_type = type(coder)
+  if coder_type in (LengthPrefixCoder, coders.BytesCoder, coders.StrUtf8Coder):
+    return _skip_length_prefixed
+  elif coder_type is coders.VarIntCoder:
+    return _skip_var_int
+  elif coder_type is coders.BooleanCoder:
+    return _skip_fixed_size(1)
+  elif coder_type is coders.FloatCoder:
+    return _skip_fixed_size(8)
+  elif coder_type is coders.TupleCoder:
+    component_skippers = [
+        _nested_encoding_skipper(c) for c in coder.coders()  # type: ignore[attr-defined]
+    ]
+    if any(skipper is None for skipper in component_skippers):
+      return None
+
+    def skip_components(in_stream: Any) -> None:
+      for skipper in component_skippers:
+        skipper(in_stream)  # type: ignore[misc]
+
+    return skip_components
+  return None
+
 
 class Buffer(Protocol):
   def __iter__(self) -> Iterator[bytes]:
@@ -117,16 +183,34 @@ class PartitionableBuffer(Buffer, Protocol):
 
 
 class ListBuffer:
-  """Used to support parititioning of a list."""
+  """Used to support parititioning of a list.
+
+  Appended chunks of encoded elements are kept as they are, and the offset
+  just past each one is recorded as it is appended, since chunks always end
+  at an element boundary. When the buffer must be split into more partitions
+  than it has known boundaries, the boundaries of the elements within the
+  chunks are recorded once, and each partition is a memoryview slice of the
+  encoded data, so elements are never re-encoded.
+  """
   def __init__(self, coder_impl: Optional[CoderImpl]) -> None:
     self._coder_impl = coder_impl or CoderImpl()
     self._inputs: list[bytes] = []
-    self._grouped_output: Optional[list[list[bytes]]] = None
+    # The offset just past each known element boundary, within the
+    # concatenation of self._inputs.
+    self._end_offsets = array.array('Q')
+    self._size = 0
+    # The size of the prefix of the data in which every element boundary is
+    # known.
+    self._indexed_size = 0
+    self._grouped_output: Optional[list[list[Union[bytes, memoryview]]]] = None
     self.cleared = False
 
   def copy(self) -> 'ListBuffer':
     new = ListBuffer(self._coder_impl)
-    new._inputs = [v for v in self._inputs]
+    new._inputs = list(self._inputs)
+    new._end_offsets = array.array('Q', self._end_offsets)
+    new._size = self._size
+    new._indexed_size = self._indexed_size
     return new
 
   def extend(self, extra: 'Buffer') -> None:
@@ -136,6 +220,11 @@ class ListBuffer:
       raise RuntimeError('ListBuffer append after read.')
     assert isinstance(extra, ListBuffer)
     self._inputs.extend(extra._inputs)
+    if self._indexed_size == self._size:
+      self._indexed_size += extra._indexed_size
+    self._end_offsets.extend(
+        self._size + offset for offset in extra._end_offsets)
+    self._size += extra._size
 
   def append(self, element: bytes) -> None:
     if self.cleared:
@@ -143,26 +232,47 @@ class ListBuffer:
     if self._grouped_output:
       raise RuntimeError('ListBuffer append after read.')
     self._inputs.append(element)
+    self._size += len(element)
+    self._end_offsets.append(self._size)
+
+  def _index_elements(self, data: bytes) -> None:
+    """Records the boundary of every element of data not yet indexed."""
+    end_offsets = array.array('Q')
+    for offset in self._end_offsets:
+      if offset > self._indexed_size:
+        break
+      end_offsets.append(offset)
+    input_stream = create_InputStream(memoryview(data)[self._indexed_size:])
+    while input_stream.size() > 0:
+      self._coder_impl.decode_from_stream(input_stream, True)
+      end_offsets.append(self._size - input_stream.size())
+    self._end_offsets = end_offsets
+    self._indexed_size = self._size
 
-  def partition(self, n: int) -> list[list[bytes]]:
+  def partition(self, n: int) -> list[list[Union[bytes, memoryview]]]:
     if self.cleared:
       raise RuntimeError('Trying to partition a cleared ListBuffer.')
     if len(self._inputs) >= n or len(self._inputs) == 0:
       return [self._inputs[k::n] for k in range(n)]
     else:
       if not self._grouped_output:
-        output_stream_list = [create_OutputStream() for _ in range(n)]
-        idx = 0
-        for input in self._inputs:
-          input_stream = create_InputStream(input)
-          while input_stream.size() > 0:
-            decoded_value = self._coder_impl.decode_from_stream(
-                input_stream, True)
-            self._coder_impl.encode_to_stream(
-                decoded_value, output_stream_list[idx], True)
-            idx = (idx + 1) % n
-        self._grouped_output = [[output_stream.get()]
-                                for output_stream in output_stream_list]
+        data = b''.join(self._inputs)
+        # The joined chunk replaces the appended ones, so the data is held
+        # only once.
+        self._inputs = [data]
+        if len(self._end_offsets) < n and self._indexed_size < self._size:
+          self._index_elements(data)
+        end_offsets = self._end_offsets
+        num_elements = len(end_offsets)
+        view = memoryview(data)
+        self._grouped_output = []
+        start = 0
+        for k in range(n):
+          # Each partition gets a contiguous run of (about) len / n elements.
+          last_element = num_elements * (k + 1) // n
+          end = end_offsets[last_element - 1] if last_element else 0
+          self._grouped_output.append([view[start:end]])
+          start = end
       return self._grouped_output
 
   def __iter__(self) -> Iterator[bytes]:
@@ -173,6 +283,9 @@ class ListBuffer:
   def clear(self) -> None:
     self.cleared = True
     self._inputs = []
+    self._end_offsets = array.array('Q')
+    self._size = 0
+    self._indexed_size = 0
     self._grouped_output = None
 
   def reset(self) -> None:
@@ -183,12 +296,28 @@ class ListBuffer:
 
 
 class GroupingBuffer(object):
-  """Used to accumulate groupded (shuffled) results."""
+  """Used to accumulate groupded (shuffled) results.
+
+  If a ``max_memory_bytes`` budget is given, the buffered data is spilled to
+  local temporary files, hash-partitioned by encoded key, whenever the encoded
+  size of the in-memory table exceeds that budget. Spilled runs are merged one
+  hash partition at a time when the buffer is partitioned.
+
+  Under default windowing, and when the extent of the encoded keys and values
+  can be determined without decoding them, elements are grouped on their raw
+  encoded bytes and the grouped output is produced by concatenating bytes.
+  """
+  # The number of hash partitions spilled data is written to. At merge time
+  # only a single partition's worth of data is held in memory.
+  _NUM_SPILL_PARTITIONS = 16
+
   def __init__(
       self,
       pre_grouped_coder: coders.Coder,
       post_grouped_coder: coders.Coder,
-      windowing: core.Windowing) -> None:
+      windowing: core.Windowing,
+      max_memory_bytes: Optional[int] = None,
+      metrics_container: Optional[MetricsContainer] = None) -> None:
     self._key_coder = pre_grouped_coder.key_coder()
     self._pre_grouped_coder = pre_grouped_coder
     self._post_grouped_coder = post_grouped_coder
@@ -197,6 +326,48 @@ class GroupingBuffer(object):
                                              list)
     self._windowing = windowing
     self._grouped_output: Optional[list[list[bytes]]] = None
+    self._max_memory_bytes = max_memory_bytes
+    self._metrics_container = metrics_container
+    # Encoded size of the elements currently held in self._table.
+    self._table_size = 0
+    self._spill_files: Optional[list[BinaryIO]] = None
+    self._spilled_bytes = 0
+    self._spill_runs = 0
+    self._encoded_skippers = self._make_encoded_skippers()
+
+  def _make_encoded_skippers(
+      self) -> Optional[tuple[Callable[[Any], None], ...]]:
+    """Returns functions skipping over the windowed value header, the key and
+    the value of an input element, if encoded grouping can be used."""
+    pre_grouped_coder = self._pre_grouped_coder
+    post_grouped_coder = self._post_grouped_coder
+    if (not self._windowing.is_default() or
+        type(pre_grouped_coder) is not WindowedValueCoder or
+        type(post_grouped_coder) is not WindowedValueCoder or
+        type(pre_grouped_coder.wrapped_value_coder) is not coders.TupleCoder or
+        not pre_grouped_coder.is_kv_coder()):
+      return None
+    key_coder = pre_grouped_coder.key_coder()
+    value_coder = pre_grouped_coder.value_coder()
+    # The output must be a plain iterable of the input values, e.g. not one
+    # that spills large iterables to state.
+    if post_grouped_coder.wrapped_value_coder != coders.TupleCoder(
+        [key_coder, coders.IterableCoder(value_coder)]):
+      return None
+    skip_key = _nested_encoding_skipper(key_coder)
+    skip_value = _nested_encoding_skipper(value_coder)
+    if skip_key is None or skip_value is None:
+      return None
+    windows_coder_impl = TupleSequenceCoderImpl(
+        pre_grouped_coder.window_coder.get_impl())
+    pane_info_coder_impl = PaneInfoCoderImpl()
+
+    def skip_header(in_stream: Any) -> None:
+      in_stream.read_bigendian_uint64()
+      windows_coder_impl.decode_from_stream(in_stream, True)
+      pane_info_coder_impl.decode_from_stream(in_stream, True)
+
+    return skip_header, skip_key, skip_value
 
   def copy(self) -> 'GroupingBuffer':
     # This is a silly temporary optimization. This class must be removed once
@@ -207,14 +378,38 @@ class GroupingBuffer(object):
   def append(self, elements_data: bytes) -> None:
     if self._grouped_output:
       raise RuntimeError('Grouping table append after read.')
+    if self._encoded_skippers is not None:
+      self._append_encoded(elements_data)
+    else:
+      self._append_decoded(elements_data)
+    self._table_size += len(elements_data)
+    if (self._max_memory_bytes is not None and
+        self._table_size > self._max_memory_bytes):
+      self._spill()
+
+  def _append_encoded(self, elements_data: bytes) -> None:
+    assert self._encoded_skippers is not None
+    skip_header, skip_key, skip_value = self._encoded_skippers
+    input_stream = create_InputStream(elements_data)
+    total_size = len(elements_data)
+    while input_stream.size() > 0:
+      skip_header(input_stream)
+      key_start = total_size - input_stream.size()
+      skip_key(input_stream)
+      value_start = total_size - input_stream.size()
+      skip_value(input_stream)
+      value_end = total_size - input_stream.size()
+      self._table[elements_data[key_start:value_start]].append(
+          elements_data[value_start:value_end])
+
+  def _append_decoded(self, elements_data: bytes) -> None:
     input_stream = create_InputStream(elements_data)
     coder_impl = self._pre_grouped_coder.get_impl()
     key_coder_impl = self._key_coder.get_impl()
     # TODO(robertwb): We could optimize this even more by using a
     # window-dropping coder for the data plane.
     is_trivial_windowing = self._windowing.is_default()
-    while input_stream.size() > 0:
-      windowed_key_value = coder_impl.decode_from_stream(input_stream, True)
+    for windowed_key_value in coder_impl.decode_all_from_stream(input_stream):
       key, value = windowed_key_value.value
       self._table[key_coder_impl.encode(key)].append(
           value if is_trivial_windowing else windowed_key_value.
@@ -229,6 +424,98 @@ class GroupingBuffer(object):
       'Input was not GroupingBuffer: %s' % input_buffer
     for key, values in input_buffer._table.items():
       self._table[key].extend(values)
+    self._table_size += input_buffer._table_size
+    if input_buffer._spill_files:
+      spill_files = self._get_spill_files()
+      for source, target in zip(input_buffer._spill_files, spill_files):
+        source.seek(0)
+        shutil.copyfileobj(source, target)
+        source.seek(0, os.SEEK_END)
+      self._spilled_bytes += input_buffer._spilled_bytes
+    if (self._max_memory_bytes is not None and
+        self._table_size > self._max_memory_bytes):
+      self._spill()
+
+  def _spill_value_coder_impl(self) -> CoderImpl:
+    if self._encoded_skippers is not None:
+      # Values are already nested encodings, so they are stored as raw bytes.
+      return BytesCoderImpl()
+    value_coder = self._pre_grouped_coder.value_coder()
+    if self._windowing.is_default():
+      return value_coder.get_impl()
+    assert isinstance(self._pre_grouped_coder, WindowedValueCoder)
+    return WindowedValueCoder(
+        value_coder, self._pre_grouped_coder.window_coder).get_impl()
+
+  def _get_spill_files(self) -> list[BinaryIO]:
+    if self._spill_files is None:
+      self._spill_files = [
+          tempfile.TemporaryFile(prefix='beam-gbk-spill-')
+          for _ in range(self._NUM_SPILL_PARTITIONS)
+      ]
+    return self._spill_files
+
+  def _spill(self) -> None:
+    """Writes the in-memory table out as one run of hash-partitioned files."""
+    if not self._table:
+      return
+    spill_files = self._get_spill_files()
+    value_coder_impl = self._spill_value_coder_impl()
+    output_stream_list = [
+        create_OutputStream() for _ in range(self._NUM_SPILL_PARTITIONS)
+    ]
+    for encoded_key, values in self._table.items():
+      output_stream = output_stream_list[hash(encoded_key) %
+                                         self._NUM_SPILL_PARTITIONS]
+      for value in values:
+        output_stream.write(encoded_key, True)
+        value_coder_impl.encode_to_stream(value, output_stream, True)
+    spilled_bytes = 0
+    for spill_file, output_stream in zip(spill_files, output_stream_list):
+      spill_file.write(output_stream.get())
+      spilled_bytes += output_stream.size()
+    self._table.clear()
+    self._table_size = 0
+    self._spilled_bytes += spilled_bytes
+    self._spill_runs += 1
+    if self._metrics_container is not None:
+      self._metrics_container.get_counter(
+          MetricName(
+              GroupingBuffer.__name__,
+              GROUPING_BUFFER_SPILLED_BYTES_COUNTER,
+              urn='internal:' +
+              GROUPING_BUFFER_SPILLED_BYTES_COUNTER)).inc(spilled_bytes)
+      self._metrics_container.get_counter(
+          MetricName(
+              GroupingBuffer.__name__,
+              GROUPING_BUFFER_SPILL_RUNS_COUNTER,
+              urn='internal:' + GROUPING_BUFFER_SPILL_RUNS_COUNTER)).inc()
+    _LOGGER.debug(
+        'GroupingBuffer spilled %d bytes (run %d).',
+        spilled_bytes,
+        self._spill_runs)
+
+  def _grouped_items(self) -> Iterator[tuple[bytes, list[Any]]]:
+    """Yields (encoded key, values) pairs, merging any spilled runs."""
+    if self._spill_files is None:
+      yield from self._table.items()
+      self._table.clear()
+      return
+    # Flush what is left so that every key lives in exactly one partition.
+    self._spill()
+    value_coder_impl = self._spill_value_coder_impl()
+    spill_files, self._spill_files = self._spill_files, None
+    for spill_file in spill_files:
+      with spill_file:
+        spill_file.seek(0)
+        input_stream = create_InputStream(spill_file.read())
+      table: collections.defaultdict[bytes,
+                                     list[Any]] = collections.defaultdict(list)
+      while input_stream.size() > 0:
+        encoded_key = input_stream.read_all(True)
+        table[encoded_key].append(
+            value_coder_impl.decode_from_stream(input_stream, True))
+      yield from table.items()
 
   def partition(self, n: int) -> list[list[bytes]]:
     """ It is used to partition _GroupingBuffer to N parts. Once it is
@@ -236,16 +523,15 @@ class GroupingBuffer(object):
     is not supported now.
     """
     if not self._grouped_output:
+      if self._encoded_skippers is not None:
+        self._grouped_output = self._partition_encoded(n)
+        self._table_size = 0
+        return self._grouped_output
       if self._windowing.is_default():
         globally_window = GlobalWindows.windowed_value(
             None,
             timestamp=GlobalWindow().max_timestamp(),
-            pane_info=windowed_value.PaneInfo(
-                is_first=True,
-                is_last=True,
-                timing=windowed_value.PaneInfoTiming.ON_TIME,
-                index=0,
-                nonspeculative_index=0)).with_value
+            pane_info=_ON_TIME_ONLY_PANE).with_value
         windowed_key_values = lambda key, values: [
             globally_window((key, values))
         ]
@@ -260,15 +546,35 @@ class GroupingBuffer(object):
       key_coder_impl = self._key_coder.get_impl()
       self._grouped_output = [[] for _ in range(n)]
       output_stream_list = [create_OutputStream() for _ in range(n)]
-      for idx, (encoded_key, windowed_values) in enumerate(self._table.items()):
+      for idx, (encoded_key,
+                windowed_values) in enumerate(self._grouped_items()):
         key = key_coder_impl.decode(encoded_key)
         for wkvs in windowed_key_values(key, windowed_values):
           coder_impl.encode_to_stream(wkvs, output_stream_list[idx % n], True)
       for ix, output_stream in enumerate(output_stream_list):
         self._grouped_output[ix] = [output_stream.get()]
-      self._table.clear()
+      self._table_size = 0
     return self._grouped_output
 
+  def _partition_encoded(self, n: int) -> list[list[bytes]]:
+    assert isinstance(self._post_grouped_coder, WindowedValueCoder)
+    # Encodes just the windowed value header, as the value encodes to nothing.
+    header = WindowedValueCoder(
+        coders.BytesCoder(), self._post_grouped_coder.window_coder).encode(
+            GlobalWindows.windowed_value(
+                b'',
+                timestamp=GlobalWindow().max_timestamp(),
+                pane_info=_ON_TIME_ONLY_PANE))
+    output_stream_list = [create_OutputStream() for _ in range(n)]
+    for idx, (encoded_key, encoded_values) in enumerate(self._grouped_items()):
+      output_stream = output_stream_list[idx % n]
+      output_stream.write(header)
+      output_stream.write(encoded_key)
+      # The nested encoding of an iterable of known length.
+      output_stream.write_bigendian_int32(len(encoded_values))
+      output_stream.write(b''.join(encoded_values))
+    return [[output_stream.get()] for output_stream in output_stream_list]
+
   def __iter__(self) -> Iterator[bytes]:
     """ Since partition() returns a list of lists, add this __iter__ to return
     a list to simplify code when we need to iterate through ALL elements of
@@ -667,8 +973,9 @@ class FnApiRunnerExecutionContext(object):
       num_workers: int,
       uses_teststream: bool = False,
       split_managers: Sequence[tuple[str, Callable[[int],
-                                                   Iterable[float]]]] = ()
-  ) -> None:
+                                                   Iterable[float]]]] = (),
+      grouping_buffer_max_memory_bytes: Optional[int] = None,
+      pipeline_metrics: Optional[MetricsContainer] = None) -> None:
     """
     :param worker_handler_manager: This class manages the set of worker
         handlers, and the communication with state / control APIs.
@@ -676,6 +983,9 @@ class FnApiRunnerExecutionContext(object):
     :param safe_coders: A map from Coder ID to Safe Coder ID.
     :param data_channel_coders: A map from PCollection ID to the ID of the Coder
         for that PCollection.
+    :param grouping_buffer_max_memory_bytes: The in-memory budget of each
+        ``GroupingBuffer`` before it spills to disk, or None to never spill.
+    :param pipeline_metrics: A container for runner-level metrics.
     """
     self.stages = {s.name: s for s in stages}
     self.side_input_descriptors_by_stage = (
@@ -688,6 +998,8 @@ class FnApiRunnerExecutionContext(object):
     self.data_channel_coders = data_channel_coders
     self.num_workers = num_workers
     self.split_managers = split_managers
+    self.grouping_buffer_max_memory_bytes = grouping_buffer_max_memory_bytes
+    self.pipeline_metrics = pipeline_metrics
     # TODO(pabloem): Move Clock classes out of DirectRunner and into FnApiRnr
     self.clock: Union[TestClock, RealClock] = (
         TestClock() if uses_teststream else RealClock())
@@ -1148,7 +1460,12 @@ class BundleContextManager(object):
                     self.execution_context.pipeline_components.
                     pcollections[input_pcoll].windowing_strategy_id]])
         self.execution_context.pcoll_buffers[buffer_id] = GroupingBuffer(
-            pre_gbk_coder, post_gbk_coder, windowing_strategy)
+            pre_gbk_coder,
+            post_gbk_coder,
+            windowing_strategy,
+            max_memory_bytes=(
+                self.execution_context.grouping_buffer_max_memory_bytes),
+            metrics_container=self.execution_context.pipeline_metrics)
     else:
       # These should be the only two identifiers we produce for now,
       # but special side input writes may go here.
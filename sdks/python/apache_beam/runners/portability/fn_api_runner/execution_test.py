@@ -0,0 +1,233 @@
+#
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# pytype: skip-file
+
+import logging
+import unittest
+from unittest import mock
+
+from apache_beam import coders
+from apache_beam.coders.coder_impl import create_InputStream
+from apache_beam.coders.coder_impl import create_OutputStream
+from apache_beam.metrics.execution import MetricsContainer
+from apache_beam.metrics.metricbase import MetricName
+from apache_beam.runners.portability.fn_api_runner import execution
+from apache_beam.transforms import core
+from apache_beam.transforms import window
+from apache_beam.utils import windowed_value
+
+
+class ListBufferTest(unittest.TestCase):
+  def encode(self, values):
+    output_stream = create_OutputStream()
+    for value in values:
+      coders.VarIntCoder().get_impl().encode_to_stream(
+          value, output_stream, True)
+    return output_stream.get()
+
+  def decode(self, data):
+    input_stream = create_InputStream(data)
+    values = []
+    while input_stream.size() > 0:
+      values.append(
+          coders.VarIntCoder().get_impl().decode_from_stream(
+              input_stream, True))
+    return values
+
+  def test_partition_chunks(self):
+    buffer = execution.ListBuffer(coders.VarIntCoder().get_impl())
+    for i in range(4):
+      buffer.append(self.encode([i]))
+    self.assertEqual([[self.decode(data) for data in part]
+                      for part in buffer.partition(2)],
+                     [[[0], [2]], [[1], [3]]])
+
+  def test_partition_elements(self):
+    buffer = execution.ListBuffer(coders.VarIntCoder().get_impl())
+    buffer.append(self.encode(range(0, 1000, 7)))
+    buffer.append(self.encode(range(1000, 1010)))
+    partitions = buffer.partition(3)
+    self.assertEqual(len(partitions), 3)
+    decoded = [self.decode(b''.join(part)) for part in partitions]
+    self.assertEqual([len(part) for part in decoded], [51, 51, 51])
+    self.assertEqual(
+        sum(decoded, []), list(range(0, 1000, 7)) + list(range(1000, 1010)))
+    # The partitioning is computed only once.
+    self.assertIs(buffer.partition(3), partitions)
+
+  def test_partition_is_sliced(self):
+    buffer = execution.ListBuffer(coders.VarIntCoder().get_impl())
+    buffer.append(self.encode(range(10)))
+    partitions = buffer.partition(2)
+    self.assertIsInstance(partitions[0][0], memoryview)
+    self.assertEqual([self.decode(part[0]) for part in partitions],
+                     [list(range(5)), list(range(5, 10))])
+
+  def test_copy_keeps_element_boundaries(self):
+    buffer = execution.ListBuffer(coders.VarIntCoder().get_impl())
+    buffer.append(self.encode(range(10)))
+    buffer.partition(2)
+    copy = buffer.copy()
+    copy.append(self.encode([10]))
+    self.assertEqual(copy._indexed_size, buffer._size)
+    self.assertEqual(len(copy._end_offsets), 11)
+    # Appended chunks end at element boundaries, so they need no decoding.
+    with mock.patch.object(execution.ListBuffer,
+                           '_index_elements',
+                           side_effect=AssertionError('decoded')):
+      self.assertEqual(
+          [self.decode(b''.join(part)) for part in copy.partition(4)],
+          [[0, 1], [2, 3, 4], [5, 6, 7], [8, 9, 10]])
+
+  def test_partition_fewer_elements_than_partitions(self):
+    buffer = execution.ListBuffer(coders.VarIntCoder().get_impl())
+    buffer.append(self.encode([1, 2]))
+    self.assertEqual(
+        [self.decode(b''.join(part)) for part in buffer.partition(4)],
+        [[], [1], [], [2]])
+
+
+class GroupingBufferTest(unittest.TestCase):
+  def make_buffer(self, windowing=None, value_coder=None, **kwargs):
+    value_coder = value_coder or coders.VarIntCoder()
+    kv_coder = coders.TupleCoder([coders.StrUtf8Coder(), value_coder])
+    pre_grouped_coder = coders.WindowedValueCoder(kv_coder)
+    post_grouped_coder = coders.WindowedValueCoder(
+        coders.TupleCoder(
+            [coders.StrUtf8Coder(), coders.IterableCoder(value_coder)]))
+    return execution.GroupingBuffer(
+        pre_grouped_coder,
+        post_grouped_coder,
+        windowing or core.Windowing(window.GlobalWindows()),
+        **kwargs), pre_grouped_coder, post_grouped_coder
+
+  def encode(self, coder, windowed_values):
+    output_stream = create_OutputStream()
+    for wv in windowed_values:
+      coder.get_impl().encode_to_stream(wv, output_stream, True)
+    return output_stream.get()
+
+  def decode(self, coder, partitions):
+    result = []
+    for part in partitions:
+      for data in part:
+        input_stream = create_InputStream(data)
+        while input_stream.size() > 0:
+          result.append(coder.get_impl().decode_from_stream(input_stream, True))
+    return result
+
+  def append_all(self, buffer, coder, kvs, chunk_size=10):
+    for start in range(0, len(kvs), chunk_size):
+      buffer.append(
+          self.encode(
+              coder,
+              [
+                  window.GlobalWindows.windowed_value(kv)
+                  for kv in kvs[start:start + chunk_size]
+              ]))
+
+  def grouped(self, coder, partitions):
+    return sorted((wv.value[0], sorted(wv.value[1]))
+                  for wv in self.decode(coder, partitions))
+
+  def test_grouping_without_spill(self):
+    buffer, pre, post = self.make_buffer()
+    kvs = [('k%d' % (i % 7), i) for i in range(100)]
+    self.append_all(buffer, pre, kvs)
+    self.assertIsNone(buffer._spill_files)
+    self.assertEqual(
+        self.grouped(post, buffer.partition(3)),
+        sorted(('k%d' % k, list(range(k, 100, 7))) for k in range(7)))
+
+  def test_encoded_grouping_matches_decoded_grouping(self):
+    encoded, pre, post = self.make_buffer()
+    decoded, _, _ = self.make_buffer()
+    self.assertIsNotNone(encoded._encoded_skippers)
+    decoded._encoded_skippers = None
+    kvs = [('k%d' % (i % 7), i * 1000) for i in range(100)]
+    self.append_all(encoded, pre, kvs)
+    self.append_all(decoded, pre, kvs)
+    self.assertEqual(encoded.partition(2), decoded.partition(2))
+
+  def test_grouping_non_length_delimited_values(self):
+    buffer, pre, post = self.make_buffer(value_coder=coders.PickleCoder())
+    self.assertIsNone(buffer._encoded_skippers)
+    self.append_all(buffer, pre, [('a', 1), ('b', 2), ('a', 3)])
+    self.assertEqual(
+        self.grouped(post, buffer.partition(1)), [('a', [1, 3]), ('b', [2])])
+
+  def test_grouping_with_spill(self):
+    metrics_container = MetricsContainer('')
+    buffer, pre, post = self.make_buffer(
+        max_memory_bytes=50, metrics_container=metrics_container)
+    kvs = [('k%d' % (i % 7), i) for i in range(100)]
+    self.append_all(buffer, pre, kvs)
+    self.assertGreater(buffer._spill_runs, 1)
+    self.assertEqual(
+        self.grouped(post, buffer.partition(3)),
+        sorted(('k%d' % k, list(range(k, 100, 7))) for k in range(7)))
+
+    spilled_bytes = metrics_container.get_counter(
+        MetricName(
+            'GroupingBuffer',
+            execution.GROUPING_BUFFER_SPILLED_BYTES_COUNTER,
+            urn='internal:' +
+            execution.GROUPING_BUFFER_SPILLED_BYTES_COUNTER)).get_cumulative()
+    spill_runs = metrics_container.get_counter(
+        MetricName(
+            'GroupingBuffer',
+            execution.GROUPING_BUFFER_SPILL_RUNS_COUNTER,
+            urn='internal:' +
+            execution.GROUPING_BUFFER_SPILL_RUNS_COUNTER)).get_cumulative()
+    self.assertEqual(spilled_bytes, buffer._spilled_bytes)
+    self.assertEqual(spill_runs, buffer._spill_runs)
+
+  def test_extend_with_spilled_buffer(self):
+    buffer, pre, post = self.make_buffer(max_memory_bytes=50)
+    other, _, _ = self.make_buffer(max_memory_bytes=50)
+    self.append_all(buffer, pre, [('a', i) for i in range(30)])
+    self.append_all(other, pre, [('a', i) for i in range(30, 60)])
+    self.append_all(other, pre, [('b', 1)])
+    buffer.extend(other)
+    self.assertEqual(
+        self.grouped(post, buffer.partition(2)), [('a', list(range(60))),
+                                                  ('b', [1])])
+
+  def test_grouping_with_spill_non_default_windowing(self):
+    windowing = core.Windowing(window.FixedWindows(10))
+    buffer, pre, post = self.make_buffer(windowing, max_memory_bytes=20)
+    pane_info = windowed_value.PANE_INFO_UNKNOWN
+    buffer.append(
+        self.encode(
+            pre,
+            [
+                windowed_value.WindowedValue(
+                    ('k', i),
+                    i, [window.IntervalWindow(i - i % 10, i - i % 10 + 10)],
+                    pane_info) for i in range(25)
+            ]))
+    self.assertEqual(buffer._spill_runs, 1)
+    self.assertEqual(
+        sorted((wv.windows[0].start, wv.value[0], sorted(wv.value[1]))
+               for wv in self.decode(post, buffer.partition(1))),
+        [(0, 'k', list(range(10))), (10, 'k', list(range(10, 20))),
+         (20, 'k', list(range(20, 25)))])
+
+
+if __name__ == '__main__':
+  logging.getLogger().setLevel(logging.INFO)
+  unittest.main()
@@ -27,6 +27,7 @@ import json
 import logging
 import multiprocessing
 import os
+import platform
 import subprocess
 import sys
 import threading
@@ -75,6 +76,7 @@ from apache_beam.runners.portability.fn_api_runner.translations import only_elem
 from apache_beam.runners.portability.fn_api_runner.worker_handlers import WorkerHandler
 from apache_beam.runners.portability.fn_api_runner.worker_handlers import WorkerHandlerManager
 from apache_beam.runners.worker import bundle_processor
+from apache_beam.runners.worker import data_plane
 from apache_beam.transforms import environments
 from apache_beam.utils import proto_utils
 from apache_beam.utils import thread_pool_executor
@@ -119,6 +121,8 @@ class FnApiRunner(runner.PipelineRunner):
         default_environment or environments.EmbeddedPythonEnvironment.default())
     self._bundle_repeat = bundle_repeat
     self._num_workers = 1
+    self._grouping_buffer_max_memory_bytes: Optional[int] = None
+    self._shared_memory_data_plane = False
     self._progress_frequency = progress_request_frequency
     self._profiler_factory: Optional[Callable[..., Profile]] = None
     self._use_state_iterables = use_state_iterables
@@ -209,6 +213,18 @@ class FnApiRunner(runner.PipelineRunner):
         (stage, create_test_split_manager(**data))
         for (stage, data) in test_splits.items()
     ]
+    if direct_options.direct_runner_grouping_buffer_memory_mb is not None:
+      self._grouping_buffer_max_memory_bytes = (
+          direct_options.direct_runner_grouping_buffer_memory_mb << 20)
+    self._shared_memory_data_plane = (
+        direct_options.direct_runner_shared_memory_data_plane)
+    if (self._shared_memory_data_plane and
+        not data_plane.SharedMemoryDataChannel.is_supported()):
+      _LOGGER.warning(
+          'The shared memory data plane is not supported on %s, using the '
+          'gRPC data plane instead.',
+          platform.machine())
+      self._shared_memory_data_plane = False
     if direct_options.direct_embed_docker_python:
       pipeline_proto = self.embed_default_docker_image(pipeline_proto)
     pipeline_proto = merge_common_environments(
@@ -412,7 +428,9 @@ class FnApiRunner(runner.PipelineRunner):
       stages (list[fn_api_runner.translations.Stage])
     """
     worker_handler_manager = WorkerHandlerManager(
-        stage_context.components.environments, self._provision_info)
+        stage_context.components.environments,
+        self._provision_info,
+        shared_memory_data_plane=self._shared_memory_data_plane)
     pipeline_metrics = MetricsContainer('')
     pipeline_metrics.get_counter(
         MetricName(
@@ -430,7 +448,9 @@ class FnApiRunner(runner.PipelineRunner):
         stage_context.safe_coders,
         stage_context.data_channel_coders,
         self._num_workers,
-        split_managers=self._split_managers)
+        split_managers=self._split_managers,
+        grouping_buffer_max_memory_bytes=self._grouping_buffer_max_memory_bytes,
+        pipeline_metrics=pipeline_metrics)
 
     try:
       with self.maybe_profile():
@@ -478,16 +498,10 @@ class FnApiRunner(runner.PipelineRunner):
               bundle_results.process_bundle.monitoring_infos
 
           # Within monitoring_infos_by_stage we also keep monitoring information
-          # for the whole pipeline, which we key under ''.
-          if '' not in monitoring_infos_by_stage:
-            monitoring_infos_by_stage[''] = list(
-                pipeline_metrics.to_runner_api_monitoring_infos('').values())
-          else:
-            monitoring_infos_by_stage[''] = consolidate_monitoring_infos(
-                itertools.chain(
-                    pipeline_metrics.to_runner_api_monitoring_infos(
-                        '').values(),
-                    monitoring_infos_by_stage['']))
+          # for the whole pipeline, which we key under ''. The pipeline metrics
+          # container is cumulative, so it replaces any previous report.
+          monitoring_infos_by_stage[''] = list(
+              pipeline_metrics.to_runner_api_monitoring_infos('').values())
 
           # We only compute new ready bundles whenever we run out of current
           # ready bundles, but we could do it after every new bundle and
@@ -1218,7 +1232,8 @@ class BundleManager(object):
     data_out = self._worker_handler.data_conn.output_stream(
         process_bundle_id, read_transform_id)
     for byte_stream in (byte_streams or []):
-      data_out.write(byte_stream)
+      # Partitions of a ListBuffer may be memoryviews of its data.
+      data_out.write(bytes(byte_stream))
     data_out.close()
 
   def _send_timers_to_worker(
@@ -33,6 +33,7 @@ import uuid
 from typing import Any
 from typing import Iterator
 from typing import no_type_check
+from unittest import mock
 
 import hamcrest  # pylint: disable=ungrouped-imports
 import numpy as np
@@ -58,6 +59,7 @@ from apache_beam.options.pipeline_options import StandardOptions
 from apache_beam.options.value_provider import RuntimeValueProvider
 from apache_beam.portability import python_urns
 from apache_beam.runners.portability import fn_api_runner
+from apache_beam.runners.portability.fn_api_runner import execution
 from apache_beam.runners.portability.fn_api_runner import fn_runner
 from apache_beam.runners.sdf_utils import RestrictionTrackerView
 from apache_beam.runners.worker import data_plane
@@ -673,6 +675,33 @@ class FnApiRunnerTest(unittest.TestCase):
       assert_that(
           p | beam.Create(inputs) | beam.ParDo(AddIndex()), equal_to(expected))
 
+  def test_pardo_state_prefetch(self):
+    values_state_spec = userstate.BagStateSpec(
+        'values', StrUtf8Coder(), prefetch=True)
+    count_state_spec = userstate.CombiningValueStateSpec(
+        'count', sum, prefetch=True)
+
+    class CollectValues(beam.DoFn):
+      def process(
+          self,
+          kv,
+          values=beam.DoFn.StateParam(values_state_spec),
+          count=beam.DoFn.StateParam(count_state_spec)):
+        k, v = kv
+        # Explicit prefetches may be issued in addition to the spec hints.
+        values.prefetch()
+        values.add(v)
+        count.add(1)
+        yield k, count.read(), len(list(values.read()))
+
+    inputs = [('A', 'a'), ('B', 'b'), ('A', 'c'), ('B', 'd'), ('A', 'e')]
+    expected = [('A', 1, 1), ('A', 2, 2), ('A', 3, 3), ('B', 1, 1), ('B', 2, 2)]
+
+    with self.create_pipeline() as p:
+      assert_that(
+          p | beam.Create(inputs) | beam.ParDo(CollectValues()),
+          equal_to(expected))
+
   @unittest.skip('TestStream not yet supported')
   def test_teststream_pardo_timers(self):
     timer_spec = userstate.TimerSpec('timer', userstate.TimeDomain.WATERMARK)
@@ -834,6 +863,7 @@ class FnApiRunnerTest(unittest.TestCase):
                                'FnApiRunnerTestWithMultiWorkers',
                                'FnApiRunnerTestWithBundleRepeat',
                                'FnApiRunnerTestWithBundleRepeatAndMultiWorkers',
+                               'FnApiRunnerTestWithGroupingBufferSpill',
                                'SparkRunnerTest'}:
       raise unittest.SkipTest("https://github.com/apache/beam/issues/35168")
 
@@ -850,6 +880,7 @@ class FnApiRunnerTest(unittest.TestCase):
                                'FnApiRunnerTestWithMultiWorkers',
                                'FnApiRunnerTestWithBundleRepeat',
                                'FnApiRunnerTestWithBundleRepeatAndMultiWorkers',
+                               'FnApiRunnerTestWithGroupingBufferSpill',
                                'SparkRunnerTest'}:
       raise unittest.SkipTest("https://github.com/apache/beam/issues/35168")
 
@@ -865,6 +896,7 @@ class FnApiRunnerTest(unittest.TestCase):
                                'FnApiRunnerTestWithMultiWorkers',
                                'FnApiRunnerTestWithBundleRepeat',
                                'FnApiRunnerTestWithBundleRepeatAndMultiWorkers',
+                               'FnApiRunnerTestWithGroupingBufferSpill',
                                'SparkRunnerTest'}:
       raise unittest.SkipTest("https://github.com/apache/beam/issues/35168")
     # The timer will fire at T + 10. After the timer is set, it is never
@@ -2151,6 +2183,59 @@ class FnApiRunnerTestWithBundleRepeatAndMultiWorkers(FnApiRunnerTest):
     raise unittest.SkipTest("This test is for a single worker only.")
 
 
+class FnApiRunnerTestWithGroupingBufferSpill(FnApiRunnerTest):
+  def create_pipeline(self, is_drain=False):
+    # A zero budget spills every GroupByKey input to disk.
+    return beam.Pipeline(
+        runner=fn_api_runner.FnApiRunner(is_drain=is_drain),
+        options=PipelineOptions(direct_runner_grouping_buffer_memory_mb=0))
+
+  def test_spill_metrics(self):
+    p = self.create_pipeline()
+    res = (
+        p
+        | beam.Create([(i % 10, i) for i in range(100)])
+        | beam.GroupByKey()
+        | beam.MapTuple(lambda k, vs: (k, sorted(vs))))
+    assert_that(
+        res, equal_to([(k, list(range(k, 100, 10))) for k in range(10)]))
+    result = p.run()
+    result.wait_until_finish()
+    counters = result.monitoring_metrics().query(
+        beam.metrics.MetricsFilter())['counters']
+    counter_values = {c.key.metric.name: c.committed for c in counters}
+    self.assertGreater(
+        counter_values[execution.GROUPING_BUFFER_SPILLED_BYTES_COUNTER], 0)
+    self.assertGreater(
+        counter_values[execution.GROUPING_BUFFER_SPILL_RUNS_COUNTER], 0)
+
+
+class FnApiRunnerSharedMemoryDataPlaneTest(unittest.TestCase):
+  def test_multi_processing_group_by_key(self):
+    self._run_group_by_key()
+
+  def test_falls_back_to_grpc_if_unsupported(self):
+    channel = data_plane.SharedMemoryDataChannel
+    with mock.patch.object(channel, 'is_supported', return_value=False), \
+        mock.patch.object(channel, 'create') as create:
+      self._run_group_by_key()
+    create.assert_not_called()
+
+  def _run_group_by_key(self):
+    with beam.Pipeline(runner=fn_api_runner.FnApiRunner(),
+                       options=PipelineOptions(
+                           direct_running_mode='multi_processing',
+                           direct_num_workers=2,
+                           direct_runner_shared_memory_data_plane=True)) as p:
+      res = (
+          p
+          | beam.Create([(i % 10, i) for i in range(1000)])
+          | beam.GroupByKey()
+          | beam.MapTuple(lambda k, vs: (k, sorted(vs))))
+      assert_that(
+          res, equal_to([(k, list(range(k, 1000, 10))) for k in range(10)]))
+
+
 class FnApiRunnerSplitTest(unittest.TestCase):
   def create_pipeline(self, is_drain=False):
     # Must be GRPC so we can send data and split requests concurrent
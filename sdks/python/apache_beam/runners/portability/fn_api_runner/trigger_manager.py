@@ -214,7 +214,8 @@ class GeneralTriggerManagerDoFn(DoFn):
       for value_w_timestamp in windows_to_elements[w]:
         _LOGGER.debug(value_w_timestamp)
         all_elements.add((w, value_w_timestamp))
-        self.windowing.triggerfn.on_element(windowed_values, w, window_context)
+      self.windowing.triggerfn.on_elements(
+          [e.value for e in windows_to_elements[w]], w, window_context)
 
     return self._fire_eligible_windows(
         key, TimeDomain.WATERMARK, watermark, None, context, seen_windows)
@@ -436,10 +437,11 @@ class PerWindowTriggerContext(TriggerContext):
     #   2) number of triggers matched individually ('index')
     #   3) whether the watermark has passed end of window ('is_late')
     all_triplets = self.parent.window_tag_values.read()
-    relevant_triplets = [(window, state_tag, state)
-                         for (window, state_tag, state) in all_triplets
-                         if window == self.window and state_tag == tag.tag]
-    return tag.combine_fn.apply(relevant_triplets)
+    relevant_values = [
+        state for (window, state_tag, state) in all_triplets
+        if window == self.window and state_tag == tag.tag
+    ]
+    return tag.combine_fn.apply(relevant_values)
 
   def clear_state(self, tag: _StateTag):
     if tag is None:
@@ -29,6 +29,7 @@ import subprocess
 import sys
 import threading
 import time
+import uuid
 from typing import TYPE_CHECKING
 from typing import Any
 from typing import BinaryIO  # pylint: disable=unused-import
@@ -454,6 +455,7 @@ class GrpcServer(object):
       state,  # type: StateServicer
       provision_info,  # type: Optional[ExtendedProvisionInfo]
       worker_manager,  # type: WorkerHandlerManager
+      shared_memory_data_plane=False,  # type: bool
   ):
     # type: (...) -> None
 
@@ -473,6 +475,10 @@ class GrpcServer(object):
 
     self.state = state
     self.provision_info = provision_info
+    # Prefix of the shared memory data channels of this server's workers.
+    self.shared_memory_prefix = None  # type: Optional[str]
+    if shared_memory_data_plane:
+      self.shared_memory_prefix = 'beam_%s' % uuid.uuid4().hex[:8]
     self.control_server = grpc.server(
         thread_pool_executor.shared_unbounded_instance(), options=options)
     self.control_port = self.control_server.add_insecure_port('[::]:0')
@@ -710,6 +716,22 @@ class SubprocessSdkWorkerHandler(GrpcWorkerHandler):
     # type: (...) -> None
     super().__init__(state, provision_info, grpc_server)
     self._worker_command_line = worker_command_line
+    if grpc_server.shared_memory_prefix:
+      # Subprocess workers run on this host, so elements can be exchanged
+      # through shared memory rather than the gRPC data server.
+      self.data_conn.close()
+      self.data_conn = data_plane.SharedMemoryDataChannel.create(
+          data_plane.SharedMemoryDataChannel.channel_name(
+              grpc_server.shared_memory_prefix, self.worker_id),
+          data_buffer_time_limit_ms=DATA_BUFFER_TIME_LIMIT_MS)
+
+  def data_api_service_descriptor(self):
+    # type: () -> endpoints_pb2.ApiServiceDescriptor
+    if self._grpc_server.shared_memory_prefix:
+      return endpoints_pb2.ApiServiceDescriptor(
+          url=data_plane.SharedMemoryDataChannel.url(
+              self._grpc_server.shared_memory_prefix))
+    return super().data_api_service_descriptor()
 
   def start_worker(self):
     # type: () -> None
@@ -868,11 +890,13 @@ class WorkerHandlerManager(object):
   def __init__(
       self,
       environments,  # type: Mapping[str, beam_runner_api_pb2.Environment]
-      job_provision_info  # type: ExtendedProvisionInfo
+      job_provision_info,  # type: ExtendedProvisionInfo
+      shared_memory_data_plane=False  # type: bool
   ):
     # type: (...) -> None
     self._environments = environments
     self._job_provision_info = job_provision_info
+    self._shared_memory_data_plane = shared_memory_data_plane
     self._cached_handlers = collections.defaultdict(
         list)  # type: DefaultDict[str, List[WorkerHandler]]
     self._workers_by_id = {}  # type: Dict[str, WorkerHandler]
@@ -922,7 +946,10 @@ class WorkerHandlerManager(object):
       grpc_server = cast(GrpcServer, self)
     elif self._grpc_server is None:
       self._grpc_server = GrpcServer(
-          self.state_servicer, self._job_provision_info, self)
+          self.state_servicer,
+          self._job_provision_info,
+          self,
+          shared_memory_data_plane=self._shared_memory_data_plane)
       grpc_server = self._grpc_server
     else:
       grpc_server = self._grpc_server
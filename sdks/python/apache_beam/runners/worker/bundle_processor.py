@@ -32,6 +32,7 @@ import json
 import logging
 import random
 import threading
+import time
 from dataclasses import dataclass
 from dataclasses import field
 from itertools import chain
@@ -57,15 +58,18 @@ import apache_beam as beam
 from apache_beam import coders
 from apache_beam.coders import WindowedValueCoder
 from apache_beam.coders import coder_impl
+from apache_beam.coders.batch_coders import BatchCoder
 from apache_beam.internal import pickler
 from apache_beam.io import iobase
 from apache_beam.metrics import monitoring_infos
+from apache_beam.metrics.cells import GaugeData
 from apache_beam.portability import common_urns
 from apache_beam.portability import python_urns
 from apache_beam.portability.api import beam_fn_api_pb2
 from apache_beam.portability.api import beam_runner_api_pb2
 from apache_beam.runners import common
 from apache_beam.runners import pipeline_context
+from apache_beam.runners.worker import data_plane
 from apache_beam.runners.worker import data_sampler
 from apache_beam.runners.worker import operation_specs
 from apache_beam.runners.worker import operations
@@ -80,6 +84,8 @@ from apache_beam.transforms import window
 from apache_beam.utils import counters
 from apache_beam.utils import proto_utils
 from apache_beam.utils import timestamp
+from apache_beam.utils.windowed_value import HomogeneousWindowedBatch
+from apache_beam.utils.windowed_value import WindowedBatch
 from apache_beam.utils.windowed_value import WindowedValue
 
 if TYPE_CHECKING:
@@ -89,7 +95,6 @@ if TYPE_CHECKING:
   from apache_beam.portability.api import metrics_pb2
   from apache_beam.runners.sdf_utils import SplitResultPrimary
   from apache_beam.runners.sdf_utils import SplitResultResidual
-  from apache_beam.runners.worker import data_plane
   from apache_beam.runners.worker import sdk_worker
   from apache_beam.transforms.core import Windowing
   from apache_beam.transforms.window import BoundedWindow
@@ -118,12 +123,19 @@ IDENTITY_DOFN_URN = 'beam:dofn:identity:0.1'
 # TODO(vikasrk): Fix this once runner sends appropriate common_urns.
 OLD_DATAFLOW_RUNNER_HARNESS_PARDO_URN = 'beam:dofn:javasdk:0.1'
 OLD_DATAFLOW_RUNNER_HARNESS_READ_URN = 'beam:source:java:0.1'
+DATA_PLANE_METRICS_NAMESPACE = 'beam.data_plane'
 URNS_NEEDING_PCOLLECTIONS = set([
     monitoring_infos.ELEMENT_COUNT_URN, monitoring_infos.SAMPLED_BYTE_SIZE_URN
 ])
 
 _LOGGER = logging.getLogger(__name__)
 
+# The number of elements whose user state is prefetched at a time.
+_STATE_PREFETCH_BATCH_SIZE = 1000
+# The maximum number of input elements decoded at a time, which bounds the
+# elements decoded past a split.
+_DECODE_BATCH_SIZE = 1000
+
 
 class RunnerIOOperation(operations.Operation):
   """Common baseclass for runner harness IO operations."""
@@ -144,6 +156,10 @@ class RunnerIOOperation(operations.Operation):
     # DataInputOperation or a producer of these bytes for a DataOutputOperation.
     self.transform_id = transform_id
     self.data_channel = data_channel
+    # Set if each encoded value is a whole batch of a Batched DoFn.
+    batch_coder = BatchCoder.from_coder(windowed_coder)
+    self.batch_converter = (
+        batch_coder.batch_converter if batch_coder is not None else None)
     for _, consumer_ops in consumers.items():
       for consumer in consumer_ops:
         self.add_receiver(consumer, 0)
@@ -161,10 +177,63 @@ class DataOutputOperation(RunnerIOOperation):
         windowed_value, self.output_stream, True)
     self.output_stream.maybe_flush()
 
+  def process_batch(self, windowed_batch: WindowedBatch) -> None:
+    self.windowed_coder_impl.encode_to_stream(
+        WindowedValue(
+            windowed_batch.values,
+            windowed_batch.timestamp,
+            windowed_batch.windows,
+            windowed_batch.pane_info),
+        self.output_stream,
+        True)
+    self.output_stream.maybe_flush()
+
+  def get_batching_preference(self):
+    if self.batch_converter is not None:
+      return common.BatchingPreference.BATCH_REQUIRED
+    return super().get_batching_preference()
+
+  def get_input_batch_converter(self):
+    return self.batch_converter
+
   def finish(self) -> None:
     super().finish()
     self.output_stream.close()
 
+  def monitoring_infos(
+      self, transform_id: str, tag_to_pcollection_id: dict[str, str]
+  ) -> dict[frozenset, metrics_pb2.MonitoringInfo]:
+    all_monitoring_infos = super().monitoring_infos(
+        transform_id, tag_to_pcollection_id)
+    output_stream = getattr(self, 'output_stream', None)
+    if isinstance(output_stream,
+                  data_plane.AdaptiveBufferingClosableOutputStream):
+      # Flushes are reported as user metrics of the transform so that runners
+      # aggregate them without knowing about the data plane.
+      infos = [
+          monitoring_infos.int64_user_counter(
+              DATA_PLANE_METRICS_NAMESPACE,
+              'flushes_by_%s' % reason,
+              count,
+              ptransform=transform_id)
+          for reason, count in output_stream.flush_counts.items()
+      ]
+      infos.append(
+          monitoring_infos.int64_user_distribution(
+              DATA_PLANE_METRICS_NAMESPACE,
+              'flush_bytes',
+              output_stream.flushed_bytes,
+              ptransform=transform_id))
+      infos.append(
+          monitoring_infos.int64_user_gauge(
+              DATA_PLANE_METRICS_NAMESPACE,
+              'flush_size_threshold_bytes',
+              GaugeData(output_stream.size_flush_threshold, time.time()),
+              ptransform=transform_id))
+      for info in infos:
+        all_monitoring_infos[monitoring_infos.to_key(info)] = info
+    return all_monitoring_infos
+
 
 class DataInputOperation(RunnerIOOperation):
   """A source-like operation that gathers input from the runner."""
@@ -193,6 +262,11 @@ class DataInputOperation(RunnerIOOperation):
     self.index = -1
     self.stop = float('inf')
     self.started = False
+    # The consumer whose user state should be prefetched for each batch of
+    # decoded elements, if any.
+    self._state_prefetching_consumer: Optional[operations.DoOperation] = None
+    if self.batch_converter is not None:
+      self.output = self._output_batch  # type: ignore[method-assign]
 
   def setup(self, data_sampler=None):
     super().setup(data_sampler)
@@ -208,8 +282,20 @@ class DataInputOperation(RunnerIOOperation):
             producer_batch_converter=self.get_output_batch_converter())
     ]
 
+  def get_output_batch_converter(self):
+    return self.batch_converter
+
+  def _output_batch(
+      self, windowed_value: windowed_value.WindowedValue, output_index=0):
+    self.receivers[output_index].receive_batch(
+        HomogeneousWindowedBatch(windowed_value))
+
   def start(self) -> None:
     super().start()
+    if (self.batch_converter is None and len(self.consumer) == 1 and
+        isinstance(self.consumer[0], operations.DoOperation) and
+        self.consumer[0].prefetch_state_specs):
+      self._state_prefetching_consumer = self.consumer[0]
     with self.splitting_lock:
       self.started = True
 
@@ -218,21 +304,54 @@ class DataInputOperation(RunnerIOOperation):
 
   def process_encoded(self, encoded_windowed_values: bytes) -> None:
     input_stream = coder_impl.create_InputStream(encoded_windowed_values)
+    if self._state_prefetching_consumer is not None:
+      self._process_encoded_with_prefetch(input_stream)
+      return
     while input_stream.size() > 0:
       with self.splitting_lock:
-        if self.index == self.stop - 1:
-          return
-        self.index += 1
-      try:
-        decoded_value = self.windowed_coder_impl.decode_from_stream(
-            input_stream, True)
-      except Exception as exn:
-        coder = str(self.windowed_coder)
-        step = self.name_context.step_name
-        raise ValueError(
-            f"Error decoding input stream with coder {coder} in step {step}"
-        ) from exn
-      self.output(decoded_value)
+        batch_size = min(self.stop - 1 - self.index, _DECODE_BATCH_SIZE)
+      if batch_size <= 0:
+        return
+      for decoded_value in self._decode_some(input_stream, batch_size):
+        with self.splitting_lock:
+          if self.index == self.stop - 1:
+            return
+          self.index += 1
+        self.output(decoded_value)
+
+  def _process_encoded_with_prefetch(
+      self, input_stream: coder_impl.create_InputStream) -> None:
+    assert self._state_prefetching_consumer is not None
+    while input_stream.size() > 0:
+      # Decode a batch of elements up front so that the consumer can issue
+      # all of their state reads before the first element is processed.
+      with self.splitting_lock:
+        batch_size = min(self.stop - 1 - self.index, _STATE_PREFETCH_BATCH_SIZE)
+      if batch_size <= 0:
+        return
+      decoded_values = self._decode_some(input_stream, batch_size)
+      self._state_prefetching_consumer.prefetch_state(decoded_values)
+      for decoded_value in decoded_values:
+        with self.splitting_lock:
+          if self.index == self.stop - 1:
+            return
+          self.index += 1
+        self.output(decoded_value)
+
+  def _decode_some(
+      self, input_stream: coder_impl.create_InputStream,
+      limit: int) -> list[windowed_value.WindowedValue]:
+    try:
+      return self.windowed_coder_impl.decode_some_from_stream(
+          input_stream, limit)
+    except Exception as exn:
+      raise self._decode_error() from exn
+
+  def _decode_error(self) -> ValueError:
+    coder = str(self.windowed_coder)
+    step = self.name_context.step_name
+    return ValueError(
+        f"Error decoding input stream with coder {coder} in step {step}")
 
   def monitoring_infos(
       self, transform_id: str, tag_to_pcollection_id: dict[str, str]
@@ -524,6 +643,9 @@ class ReadModifyWriteRuntimeState(userstate.ReadModifyWriteRuntimeState):
   def clear(self) -> None:
     self._underlying_bag_state.clear()
 
+  def prefetch(self) -> None:
+    self._underlying_bag_state.prefetch()
+
   def commit(self) -> None:
     self._underlying_bag_state.commit()
 
@@ -564,6 +686,9 @@ class CombiningValueRuntimeState(userstate.CombiningValueRuntimeState):
   def clear(self) -> None:
     self._underlying_bag_state.clear()
 
+  def prefetch(self) -> None:
+    self._underlying_bag_state.prefetch()
+
   def commit(self):
     self._underlying_bag_state.commit()
 
@@ -618,6 +743,11 @@ class SynchronousBagRuntimeState(userstate.BagRuntimeState):
     self._cleared = True
     self._added_elements = []
 
+  def prefetch(self) -> None:
+    if not self._cleared:
+      self._state_handler.prefetch(
+          self._state_key, self._value_coder.get_impl())
+
   def commit(self) -> None:
     to_await = None
     if self._cleared:
@@ -681,6 +811,11 @@ class SynchronousSetRuntimeState(userstate.SetRuntimeState):
     self._cleared = True
     self._added_elements = set()
 
+  def prefetch(self) -> None:
+    if not self._cleared:
+      self._state_handler.prefetch(
+          self._state_key, self._value_coder.get_impl())
+
   def commit(self) -> None:
     if self._cleared:
       self._futures.append(self._state_handler.clear(self._state_key))
@@ -1834,15 +1969,21 @@ def _create_sdf_operation(
     parameter,
     consumers,
     operation_cls=operations.DoOperation):
-
-  dofn_data = pickler.loads(parameter.do_fn.payload)
-  dofn = dofn_data[0]
-  restriction_provider = common.DoFnSignature(dofn).get_restriction_provider()
-  watermark_estimator_provider = (
-      common.DoFnSignature(dofn).get_watermark_estimator_provider())
-  serialized_fn = pickler.dumps(
-      (proxy_dofn(dofn, restriction_provider, watermark_estimator_provider), ) +
-      dofn_data[1:])
+  def create_serialized_fn():
+    dofn_data = operations.payload_cache.loads(
+        parameter.do_fn.payload, copy_prototype=False)
+    dofn = dofn_data[0]
+    restriction_provider = common.DoFnSignature(dofn).get_restriction_provider()
+    watermark_estimator_provider = (
+        common.DoFnSignature(dofn).get_watermark_estimator_provider())
+    return pickler.dumps((
+        proxy_dofn(dofn, restriction_provider, watermark_estimator_provider),
+    ) + dofn_data[1:])
+
+  # Proxy DoFn classes are recreated for every operation, so they are keyed by
+  # their name.
+  serialized_fn = operations.payload_cache.derive(
+      (proxy_dofn.__name__, parameter.do_fn.payload), create_serialized_fn)
   return _create_pardo_operation(
       factory,
       transform_id,
@@ -1905,7 +2046,8 @@ def _create_pardo_operation(
 
   output_tags = list(transform_proto.outputs.keys())
 
-  dofn_data = pickler.loads(serialized_fn)
+  dofn_data = operations.payload_cache.loads(
+      serialized_fn, copy_prototype=False)
   if not dofn_data[-1]:
     # Windowing not set.
     if pardo_proto:
@@ -1915,9 +2057,22 @@ def _create_pardo_operation(
       other_input_tags = ()
     pcoll_id, = [pcoll for tag, pcoll in transform_proto.inputs.items()
                  if tag not in other_input_tags]
-    windowing = factory.context.windowing_strategies.get_by_id(
+    windowing_strategy_id = (
         factory.descriptor.pcollections[pcoll_id].windowing_strategy_id)
-    serialized_fn = pickler.dumps(dofn_data[:-1] + (windowing, ))
+    windowing = factory.context.windowing_strategies.get_by_id(
+        windowing_strategy_id)
+    # Windowing strategy and coder ids are only unique within a descriptor,
+    # so the derived payload is keyed by the protos themselves.
+    windowing_proto = factory.descriptor.windowing_strategies[
+        windowing_strategy_id]
+    window_coder_proto = factory.descriptor.coders[
+        windowing_proto.window_coder_id]
+    serialized_fn = operations.payload_cache.derive(
+        (
+            serialized_fn,
+            windowing_proto.SerializeToString(deterministic=True),
+            window_coder_proto.SerializeToString(deterministic=True)),
+        lambda: pickler.dumps(dofn_data[:-1] + (windowing, )))
 
   if pardo_proto and (pardo_proto.timer_family_specs or pardo_proto.state_specs
                       or pardo_proto.restriction_coder_id):
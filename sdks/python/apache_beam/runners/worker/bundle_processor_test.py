@@ -20,19 +20,29 @@
 
 import random
 import unittest
+from unittest import mock
 
 import apache_beam as beam
+from apache_beam import coders
 from apache_beam.coders import StrUtf8Coder
 from apache_beam.coders.coders import FastPrimitivesCoder
+from apache_beam.internal import pickler
+from apache_beam.metrics import monitoring_infos
+from apache_beam.metrics.cells import DistributionData
+from apache_beam.metrics.cells import DistributionResult
 from apache_beam.portability import common_urns
 from apache_beam.portability.api import beam_fn_api_pb2
 from apache_beam.runners import common
 from apache_beam.runners.portability.fn_api_runner.worker_handlers import StateServicer
 from apache_beam.runners.worker import bundle_processor
+from apache_beam.runners.worker import data_plane
+from apache_beam.runners.worker import operation_specs
 from apache_beam.runners.worker import operations
+from apache_beam.runners.worker import statesampler
 from apache_beam.runners.worker.bundle_processor import BeamTransformFactory
 from apache_beam.runners.worker.bundle_processor import BundleProcessor
 from apache_beam.runners.worker.bundle_processor import DataInputOperation
+from apache_beam.runners.worker.bundle_processor import DataOutputOperation
 from apache_beam.runners.worker.bundle_processor import FnApiUserStateContext
 from apache_beam.runners.worker.bundle_processor import SynchronousOrderedListRuntimeState
 from apache_beam.runners.worker.bundle_processor import TimerInfo
@@ -41,8 +51,11 @@ from apache_beam.runners.worker.data_sampler import DataSampler
 from apache_beam.runners.worker.sdk_worker import GlobalCachingStateHandler
 from apache_beam.runners.worker.statecache import StateCache
 from apache_beam.transforms import userstate
+from apache_beam.transforms.core import Windowing
 from apache_beam.transforms.window import GlobalWindow
+from apache_beam.transforms.window import GlobalWindows
 from apache_beam.utils import timestamp
+from apache_beam.utils.counters import CounterFactory
 from apache_beam.utils.windowed_value import WindowedValue
 
 
@@ -265,6 +278,133 @@ def create_exception_dofn(
       RaiseException(payload))
 
 
+class DataOutputOperationTest(unittest.TestCase):
+  def test_adaptive_flush_monitoring_infos(self):
+    counter_factory = CounterFactory()
+    op = DataOutputOperation(
+        common.NameContext('write', 'write'),
+        None, {},
+        counter_factory,
+        statesampler.StateSampler('', counter_factory),
+        coders.WindowedValueCoder(coders.BytesCoder()),
+        'write',
+        None)
+    flushed = []
+    op.set_output_stream(
+        data_plane.AdaptiveBufferingClosableOutputStream(
+            flushed.append,
+            flushed.append,
+            data_plane.AdaptiveFlushPolicy(
+                60000, min_flush_size=10, max_flush_size=100)))
+    op.start()
+    for _ in range(12):
+      op.process(GlobalWindows.windowed_value(b'abcdefgh'))
+    op.finish()
+
+    metrics = {
+        monitoring_infos.parse_namespace_and_name(mi)[1]: monitoring_infos.
+        extract_metric_result_map_value(mi)
+        for mi in op.monitoring_infos('write', {}).values()
+        if monitoring_infos.parse_namespace_and_name(
+            mi)[0] == bundle_processor.DATA_PLANE_METRICS_NAMESPACE
+    }
+    # Buffers are flushed once they exceed 100 bytes, and on close.
+    size = len(b''.join(flushed)) // 12
+    self.assertEqual([len(data) for data in flushed],
+                     [5 * size, 5 * size, 2 * size])
+    self.assertEqual(metrics['flushes_by_size'], 2)
+    self.assertEqual(metrics['flushes_by_deadline'], 0)
+    self.assertEqual(metrics['flushes_by_close'], 1)
+    self.assertEqual(
+        metrics['flush_bytes'],
+        DistributionResult(DistributionData(12 * size, 3, 2 * size, 5 * size)))
+    self.assertEqual(metrics['flush_size_threshold_bytes'].value, 100)
+
+
+class DataInputOperationTest(unittest.TestCase):
+  def create_operations(self, state_spec):
+    class ReadStateDoFn(beam.DoFn):
+      def process(self, kv, state=beam.DoFn.StateParam(state_spec)):
+        state.read()
+
+    counter_factory = CounterFactory()
+    sampler = statesampler.StateSampler('', counter_factory)
+    user_state_context = mock.MagicMock()
+    do_op = operations.DoOperation(
+        common.NameContext('stateful'),
+        operation_specs.WorkerDoFn(
+            serialized_fn=pickler.dumps(
+                (ReadStateDoFn(), [], {}, [], Windowing(GlobalWindows()))),
+            output_tags=[],
+            input=None,
+            side_inputs=[],
+            output_coders=[]),
+        counter_factory,
+        sampler,
+        user_state_context=user_state_context)
+    windowed_coder = coders.WindowedValueCoder(
+        coders.TupleCoder([coders.StrUtf8Coder(), coders.VarIntCoder()]))
+    input_op = DataInputOperation(
+        common.NameContext('read', 'read'),
+        None, {'out': [do_op]},
+        counter_factory,
+        sampler,
+        windowed_coder,
+        'read',
+        None)
+    do_op.setup()
+    input_op.setup()
+    do_op.start()
+    input_op.start()
+
+    events = []
+    state = user_state_context.get_state.return_value
+    state.prefetch.side_effect = lambda: events.append('prefetch')
+    state.read.side_effect = lambda: events.append('read')
+    encoded = b''.join(
+        windowed_coder.get_impl().encode_nested(
+            GlobalWindows.windowed_value(('k%d' % i, i))) for i in range(5))
+    return input_op, user_state_context, events, encoded
+
+  def test_prefetch_state(self):
+    input_op, user_state_context, events, encoded = self.create_operations(
+        userstate.BagStateSpec('state', StrUtf8Coder(), prefetch=True))
+    input_op.process_encoded(encoded)
+    # The state of all elements is prefetched before any of them is processed.
+    self.assertEqual(events, ['prefetch'] * 5 + ['read'] * 5)
+    self.assertEqual(
+        sorted(
+            call.args[1]
+            for call in user_state_context.get_state.call_args_list),
+        sorted(['k%d' % i for i in range(5)] * 2))
+
+  def test_prefetch_state_respects_split(self):
+    input_op, _, events, encoded = self.create_operations(
+        userstate.BagStateSpec('state', StrUtf8Coder(), prefetch=True))
+    input_op.stop = 3
+    input_op.process_encoded(encoded)
+    self.assertEqual(events, ['prefetch'] * 3 + ['read'] * 3)
+    self.assertEqual(input_op.index, 2)
+
+  def test_no_prefetch_state_without_hint(self):
+    input_op, _, events, encoded = self.create_operations(
+        userstate.BagStateSpec('state', StrUtf8Coder()))
+    input_op.process_encoded(encoded)
+    self.assertEqual(events, ['read'] * 5)
+
+  def test_decoding_stops_at_split(self):
+    input_op, _, events, encoded = self.create_operations(
+        userstate.BagStateSpec('state', StrUtf8Coder()))
+    input_op.stop = 3
+    with mock.patch.object(
+        input_op.windowed_coder_impl,
+        'decode_from_stream',
+        wraps=input_op.windowed_coder_impl.decode_from_stream) as decode:
+      input_op.process_encoded(encoded)
+    self.assertEqual(events, ['read'] * 3)
+    self.assertEqual(decode.call_count, 3)
+
+
 class DataSamplingTest(unittest.TestCase):
   def test_disabled_by_default(self):
     """Test that not providing the sampler does not enable Data Sampling.
@@ -409,6 +549,97 @@ class DataSamplingTest(unittest.TestCase):
       data_sampler.stop()
 
 
+class PayloadCacheTest(unittest.TestCase):
+  def test_disabled_by_default(self):
+    cache = operations.PayloadCache()
+    payload = pickler.dumps({'key': ['value']})
+    with mock.patch.object(pickler, 'loads', wraps=pickler.loads) as mock_loads:
+      cache.loads(payload)
+      cache.loads(payload, copy_prototype=False)
+    self.assertEqual(mock_loads.call_count, 2)
+    create_fn = mock.MagicMock(return_value=b'derived')
+    cache.derive('a', create_fn)
+    cache.derive('a', create_fn)
+    self.assertEqual(create_fn.call_count, 2)
+
+  def test_loads_unpickles_each_payload_once(self):
+    cache = operations.PayloadCache(max_weight=1 << 20)
+    payload = pickler.dumps({'key': ['value']})
+    with mock.patch.object(pickler, 'loads', wraps=pickler.loads) as mock_loads:
+      first = cache.loads(payload)
+      second = cache.loads(payload)
+    self.assertEqual(mock_loads.call_count, 1)
+    self.assertEqual(first, {'key': ['value']})
+    self.assertEqual(first, second)
+    # Each lookup returns a private copy of the prototype.
+    first['key'].append('other')
+    self.assertEqual(second, {'key': ['value']})
+    self.assertIs(
+        cache.loads(payload, copy_prototype=False),
+        cache.loads(payload, copy_prototype=False))
+
+  def test_loads_unpickles_payloads_that_cannot_be_copied(self):
+    class NotCopyable(object):
+      def __deepcopy__(self, memo):
+        raise TypeError('not copyable')
+
+    cache = operations.PayloadCache(max_weight=1 << 20)
+    payload = pickler.dumps(NotCopyable())
+    self.assertIsInstance(cache.loads(payload), NotCopyable)
+    with mock.patch.object(pickler, 'loads', wraps=pickler.loads) as mock_loads:
+      self.assertIsInstance(cache.loads(payload), NotCopyable)
+    self.assertEqual(mock_loads.call_count, 1)
+
+  def test_least_recently_used_entries_are_evicted(self):
+    cache = operations.PayloadCache(max_weight=20)
+    create_fn = mock.MagicMock(side_effect=lambda: bytearray(10))
+    a = cache.derive('a', create_fn)
+    cache.derive('b', create_fn)
+    self.assertIs(cache.derive('a', create_fn), a)
+    cache.derive('c', create_fn)
+    self.assertIs(cache.derive('a', create_fn), a)
+    cache.derive('b', create_fn)
+    self.assertEqual(create_fn.call_count, 4)
+
+  def test_entries_are_evicted_by_weight(self):
+    cache = operations.PayloadCache(max_weight=20)
+    small = cache.derive('small', lambda: bytearray(5))
+    self.assertIs(cache.derive('small', lambda: bytearray(5)), small)
+    cache.derive('large', lambda: bytearray(18))
+    self.assertIsNot(cache.derive('small', lambda: bytearray(5)), small)
+    # Entries heavier than the cache are not kept.
+    large = cache.derive('too_large', lambda: bytearray(21))
+    self.assertIsNot(cache.derive('too_large', lambda: bytearray(21)), large)
+
+  def test_derived_sdf_payloads_are_reused(self):
+    class SdfDoFn(beam.DoFn, beam.RestrictionProvider):
+      def process(
+          self, element, restriction_tracker=beam.DoFn.RestrictionParam()):
+        yield element
+
+      def initial_restriction(self, element):
+        return None
+
+      def create_tracker(self, restriction):
+        return None
+
+      def restriction_size(self, element, restriction):
+        return 0
+
+    dofn_payload = pickler.dumps((SdfDoFn(), (), {}, [], None))
+    parameter = mock.MagicMock()
+    parameter.do_fn.payload = dofn_payload
+    with mock.patch.object(
+        bundle_processor, '_create_pardo_operation') as create_pardo, \
+        mock.patch.object(
+            operations, 'payload_cache', operations.PayloadCache(1 << 20)):
+      for _ in range(2):
+        bundle_processor.create_pair_with_restriction(
+            None, 'transform_id', None, parameter, {})
+    first, second = [c[0][4] for c in create_pardo.call_args_list]
+    self.assertIs(first, second)
+
+
 class EnvironmentCompatibilityTest(unittest.TestCase):
   def test_rc_environments_are_compatible_with_released_images(self):
     # TODO(https://github.com/apache/beam/issues/28084): remove when
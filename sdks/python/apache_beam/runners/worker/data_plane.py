@@ -24,7 +24,13 @@ import abc
 import collections
 import json
 import logging
+import os
+import platform
 import queue
+import select
+import struct
+import sys
+import tempfile
 import threading
 import time
 from typing import TYPE_CHECKING
@@ -45,6 +51,7 @@ from typing import Union
 import grpc
 
 from apache_beam.coders import coder_impl
+from apache_beam.metrics.cells import DistributionData
 from apache_beam.portability.api import beam_fn_api_pb2
 from apache_beam.portability.api import beam_fn_api_pb2_grpc
 from apache_beam.runners.worker.channel_factory import GRPCChannelFactory
@@ -64,6 +71,7 @@ _LOGGER = logging.getLogger(__name__)
 
 _DEFAULT_SIZE_FLUSH_THRESHOLD = 10 << 20  # 10MB
 _DEFAULT_TIME_FLUSH_THRESHOLD_MS = 0  # disable time-based flush by default
+_ADAPTIVE_MIN_FLUSH_SIZE = 64 << 10  # 64KB
 _FLUSH_MAX_SIZE = (2 << 30) - 100  # 2GB less some overhead, protobuf/grpc limit
 # Keep a set of completed instructions to discard late received data. The set
 # can have up to _MAX_CLEANED_INSTRUCTIONS items. See _GrpcDataChannel.
@@ -71,6 +79,8 @@ _MAX_CLEANED_INSTRUCTIONS = 10000
 _DEFAULT_SEND_QUEUE_MAX_ELEMENTS = 10000
 _DEFAULT_SEND_QUEUE_MAX_BYTES = 100 << 20  # 100MB
 _DEFAULT_RECEIVE_QUEUE_MAX_ELEMENTS = 5
+_SHARED_MEMORY_RING_SIZE = 16 << 20  # 16MB in each direction
+_SHARED_MEMORY_URL_PREFIX = 'shm://'
 
 # retry on transient UNAVAILABLE grpc error from data channels.
 _GRPC_SERVICE_CONFIG = json.dumps({
@@ -116,10 +126,14 @@ class ClosableOutputStream(OutputStream):
   def create(
       close_callback,  # type: Optional[Callable[[bytes], None]]
       flush_callback,  # type: Optional[Callable[[bytes], None]]
-      data_buffer_time_limit_ms  # type: int
+      data_buffer_time_limit_ms,  # type: int
+      flush_policy=None  # type: Optional[AdaptiveFlushPolicy]
   ):
     # type: (...) -> ClosableOutputStream
-    if data_buffer_time_limit_ms > 0:
+    if flush_policy is not None:
+      return AdaptiveBufferingClosableOutputStream(
+          close_callback, flush_callback=flush_callback, policy=flush_policy)
+    elif data_buffer_time_limit_ms > 0:
       return TimeBasedBufferingClosableOutputStream(
           close_callback,
           flush_callback=flush_callback,
@@ -235,6 +249,154 @@ class TimeBasedBufferingClosableOutputStream(
     self._periodic_flusher.start()
 
 
+class AdaptiveFlushPolicy(object):
+  """Chooses flush sizes for the output streams of a transform.
+
+  The size is what the transform outputs within the target latency at its
+  recently observed rate, so that slow outputs are not held back waiting for a
+  full buffer and fast outputs are not sent as many small messages. The rate is
+  kept across bundles, as streams only live for a single bundle.
+  """
+
+  # Weight of the latest observation in the moving average of the rate.
+  _SMOOTHING = 0.2
+
+  def __init__(
+      self,
+      target_latency_ms,  # type: int
+      min_flush_size=_ADAPTIVE_MIN_FLUSH_SIZE,  # type: int
+      max_flush_size=_DEFAULT_SIZE_FLUSH_THRESHOLD  # type: int
+  ):
+    # type: (...) -> None
+    assert target_latency_ms > 0
+    self.target_latency_secs = target_latency_ms / 1000.0
+    self._min_flush_size = min_flush_size
+    self._max_flush_size = max_flush_size
+    self._bytes_per_sec = None  # type: Optional[float]
+    # Flushes are left to the deadline until the rate is known.
+    self.size_flush_threshold = max_flush_size
+
+  def observe(self, size, elapsed_secs):
+    # type: (int, float) -> None
+
+    """Records that size bytes were output over elapsed_secs."""
+    if elapsed_secs <= 0:
+      return
+    rate = size / elapsed_secs
+    if self._bytes_per_sec is None:
+      self._bytes_per_sec = rate
+    else:
+      self._bytes_per_sec += self._SMOOTHING * (rate - self._bytes_per_sec)
+    self.size_flush_threshold = int(
+        min(
+            self._max_flush_size,
+            max(
+                self._min_flush_size,
+                self._bytes_per_sec * self.target_latency_secs)))
+
+
+class AdaptiveBufferingClosableOutputStream(
+    SizeBasedBufferingClosableOutputStream):
+  """A buffering OutputStream whose flush size and deadline adapt to its rate.
+
+  Buffered data is flushed once it reaches the size chosen by an
+  AdaptiveFlushPolicy, or once the oldest buffered data is older than the
+  target latency of the policy. The number of flushes for each reason and their
+  sizes are recorded for monitoring.
+  """
+  SIZE = 'size'
+  DEADLINE = 'deadline'
+  CLOSE = 'close'
+
+  # Number of deadline checks per target latency.
+  _CHECKS_PER_DEADLINE = 4
+
+  def __init__(
+      self,
+      close_callback=None,  # type: Optional[Callable[[bytes], None]]
+      flush_callback=None,  # type: Optional[Callable[[bytes], None]]
+      policy=None  # type: Optional[AdaptiveFlushPolicy]
+  ):
+    # type: (...) -> None
+    assert policy is not None
+    super().__init__(
+        close_callback,
+        flush_callback,
+        size_flush_threshold=policy.size_flush_threshold)
+    self._policy = policy
+    self._buffered_since = None  # type: Optional[float]
+    self.flush_counts = {
+        self.SIZE: 0, self.DEADLINE: 0, self.CLOSE: 0
+    }  # type: Dict[str, int]
+    self.flushed_bytes = DistributionData.identity_element()
+    self._flush_lock = threading.Lock()
+    self._schedule_lock = threading.Lock()
+    self._closed = False
+    self._deadline_checker = PeriodicThread(
+        policy.target_latency_secs / self._CHECKS_PER_DEADLINE,
+        self._check_deadline)
+    self._deadline_checker.daemon = True
+    self._deadline_checker.start()
+
+  @property
+  def size_flush_threshold(self):
+    # type: () -> int
+    return self._size_flush_threshold
+
+  def maybe_flush(self):
+    # type: () -> None
+    size = self.size()
+    if size > self._size_flush_threshold:
+      self._flush(self.SIZE)
+    elif size and self._buffered_since is None:
+      self._buffered_since = time.time()
+
+  def flush(self):
+    # type: () -> None
+    self._flush(self.SIZE)
+
+  def close(self):
+    # type: () -> None
+    with self._schedule_lock:
+      self._closed = True
+      self._deadline_checker.cancel()
+    with self._flush_lock:
+      self._record_flush(self.CLOSE)
+      super().close()
+
+  def _check_deadline(self):
+    # type: () -> None
+    with self._schedule_lock:
+      if self._closed or not self.size():
+        return
+      now = time.time()
+      if self._buffered_since is None:
+        self._buffered_since = now
+      elif now - self._buffered_since >= self._policy.target_latency_secs:
+        self._flush(self.DEADLINE)
+
+  def _flush(self, reason):
+    # type: (str) -> None
+    with self._flush_lock:
+      if self._record_flush(reason):
+        super().flush()
+      self._size_flush_threshold = self._policy.size_flush_threshold
+
+  def _record_flush(self, reason):
+    # type: (str) -> bool
+    size = self.size()
+    if not size:
+      return False
+    now = time.time()
+    if self._buffered_since is not None:
+      self._policy.observe(size, now - self._buffered_since)
+      self._buffered_since = None
+    self.flush_counts[reason] += 1
+    self.flushed_bytes = self.flushed_bytes.combine(
+        DistributionData.singleton(size))
+    return True
+
+
 class PeriodicThread(threading.Thread):
   """Call a function periodically with the specified number of seconds"""
   def __init__(
@@ -457,10 +619,15 @@ class _GrpcDataChannel(DataChannel):
 
   _WRITES_FINISHED = beam_fn_api_pb2.Elements.Data()
 
-  def __init__(self, data_buffer_time_limit_ms=0):
-    # type: (int) -> None
+  def __init__(
+      self, data_buffer_time_limit_ms=0, data_buffer_target_latency_ms=0):
+    # type: (int, int) -> None
 
     self._data_buffer_time_limit_ms = data_buffer_time_limit_ms
+    self._data_buffer_target_latency_ms = data_buffer_target_latency_ms
+    # Flush policies of the output streams, by transform and timer family id.
+    self._flush_policies = {
+    }  # type: Dict[Tuple[str, str], AdaptiveFlushPolicy]
     self._to_send = ByteLimitedQueue(
         maxsize=_DEFAULT_SEND_QUEUE_MAX_ELEMENTS,
         maxbytes=_DEFAULT_SEND_QUEUE_MAX_BYTES
@@ -648,7 +815,10 @@ class _GrpcDataChannel(DataChannel):
       self._enqueue_to_send(elem)
 
     return ClosableOutputStream.create(
-        close_callback, add_to_send_queue, self._data_buffer_time_limit_ms)
+        close_callback,
+        add_to_send_queue,
+        self._data_buffer_time_limit_ms,
+        self._flush_policy(transform_id))
 
   def output_timer_stream(
       self,
@@ -679,7 +849,21 @@ class _GrpcDataChannel(DataChannel):
       self._enqueue_to_send(elem)
 
     return ClosableOutputStream.create(
-        close_callback, add_to_send_queue, self._data_buffer_time_limit_ms)
+        close_callback,
+        add_to_send_queue,
+        self._data_buffer_time_limit_ms,
+        self._flush_policy(transform_id, timer_family_id))
+
+  def _flush_policy(self, transform_id, timer_family_id=''):
+    # type: (str, str) -> Optional[AdaptiveFlushPolicy]
+    if self._data_buffer_target_latency_ms <= 0:
+      return None
+    key = (transform_id, timer_family_id)
+    policy = self._flush_policies.get(key)
+    if policy is None:
+      policy = self._flush_policies.setdefault(
+          key, AdaptiveFlushPolicy(self._data_buffer_target_latency_ms))
+    return policy
 
   def _write_outputs(self):
     # type: () -> Iterator[beam_fn_api_pb2.Elements]
@@ -722,6 +906,18 @@ class _GrpcDataChannel(DataChannel):
 
   def _read_inputs(self, elements_iterator):
     # type: (Iterable[beam_fn_api_pb2.Elements]) -> None
+    def entries():
+      # type: () -> Iterator[DataOrTimers]
+      for elements in elements_iterator:
+        for timer in elements.timers:
+          yield timer
+        for data in elements.data:
+          yield data
+
+    self._read_entries(entries())
+
+  def _read_entries(self, entries):
+    # type: (Iterable[DataOrTimers]) -> None
 
     next_discard_log_time = 0  # type: float
 
@@ -760,11 +956,8 @@ class _GrpcDataChannel(DataChannel):
             next_waiting_log_time = current_time + 300
 
     try:
-      for elements in elements_iterator:
-        for timer in elements.timers:
-          _put_queue(timer.instruction_id, timer)
-        for data in elements.data:
-          _put_queue(data.instruction_id, data)
+      for entry in entries:
+        _put_queue(entry.instruction_id, entry)
     except Exception as e:
       if not self._closed:
         _LOGGER.exception('Failed to read inputs in the data plane.')
@@ -788,13 +981,489 @@ class GrpcClientDataChannel(_GrpcDataChannel):
   def __init__(
       self,
       data_stub,  # type: beam_fn_api_pb2_grpc.BeamFnDataStub
-      data_buffer_time_limit_ms=0  # type: int
+      data_buffer_time_limit_ms=0,  # type: int
+      data_buffer_target_latency_ms=0  # type: int
   ):
     # type: (...) -> None
-    super().__init__(data_buffer_time_limit_ms)
+    super().__init__(data_buffer_time_limit_ms, data_buffer_target_latency_ms)
     self.set_inputs(data_stub.Data(self._write_outputs()))
 
 
+class _SharedMemoryRing(object):
+  """A single-producer, single-consumer byte ring in shared memory.
+
+  The segment starts with six 64-bit counters: the capacity of the ring, the
+  total number of bytes written and read, whether the writer is done, and
+  whether the reader or the writer is waiting. A side that can't make progress
+  spins briefly, then blocks on a named pipe that the other side writes to
+  once it has published its counter, so the ring is only meant for processes
+  on one host.
+
+  A counter is only updated after the data it covers was copied, and read
+  before that data is, which relies on stores and on loads not being
+  reordered with each other. This holds on x86, so the ring is only used
+  there, see SharedMemoryDataChannel.is_supported.
+  """
+  _HEADER_SIZE = 48
+  _CAPACITY, _WRITTEN, _READ, _DONE, _READER_WAITING, _WRITER_WAITING = (
+      range(6))
+  _MAX_SPINS = 100
+  # Bounds the time to notice that the channel was stopped.
+  _MAX_WAIT_SECS = 0.1
+
+  def __init__(self, shm, owner):
+    # type: (Any, bool) -> None
+    self._shm = shm
+    self._owner = owner
+    self._buf = shm.buf
+    # Counters are accessed as whole words so that the other process never
+    # observes a partially updated value.
+    self._counters = self._buf[:self._HEADER_SIZE].cast('Q')
+    self._capacity = self._counters[self._CAPACITY]
+    # Named pipes through which the writer signals written data, and the
+    # reader signals freed space.
+    self._data_fd = os.open(
+        self._pipe_path(shm.name, 'data'), os.O_RDWR | os.O_NONBLOCK)
+    self._space_fd = os.open(
+        self._pipe_path(shm.name, 'space'), os.O_RDWR | os.O_NONBLOCK)
+    self._fence_lock = threading.Lock()
+
+  @property
+  def name(self):
+    # type: () -> str
+    return self._shm.name
+
+  @staticmethod
+  def _pipe_path(name, kind):
+    # type: (str, str) -> str
+    return os.path.join(
+        tempfile.gettempdir(), '%s_%s' % (name.lstrip('/'), kind))
+
+  @classmethod
+  def create(cls, name, size):
+    # type: (str, int) -> _SharedMemoryRing
+    from multiprocessing import shared_memory
+    shm = shared_memory.SharedMemory(
+        name=name, create=True, size=cls._HEADER_SIZE + size)
+    struct.pack_into('=QQQQQQ', shm.buf, 0, size, 0, 0, 0, 0, 0)
+    os.mkfifo(cls._pipe_path(shm.name, 'data'))
+    os.mkfifo(cls._pipe_path(shm.name, 'space'))
+    return cls(shm, owner=True)
+
+  @classmethod
+  def attach(cls, name):
+    # type: (str) -> _SharedMemoryRing
+    from multiprocessing import shared_memory
+
+    # Only the creator may unlink the segment when it exits, so the segment
+    # must not be tracked by the resource tracker of this process.
+    if sys.version_info >= (3, 13):
+      shm = shared_memory.SharedMemory(name=name, track=False)
+    else:
+      from multiprocessing import resource_tracker
+      shm = shared_memory.SharedMemory(name=name)
+      resource_tracker.unregister(shm._name, 'shared_memory')  # type: ignore
+    return cls(shm, owner=False)
+
+  def _fence(self):
+    # type: () -> None
+    # An uncontended lock round trip executes an atomic read-modify-write,
+    # which is a full memory barrier on x86. It keeps the store of a waiting
+    # flag or counter from being reordered with the load of the other side's
+    # counter or flag that follows, so that no wakeup is lost.
+    with self._fence_lock:
+      pass
+
+  def _wait(self, fd, waiting_flag, is_ready, attempt):
+    # type: (int, int, Callable[[], bool], int) -> None
+
+    """Waits until is_ready, the other side signals fd, or a timeout."""
+    if attempt < self._MAX_SPINS:
+      time.sleep(0)
+      return
+    counters = self._counters
+    counters[waiting_flag] = 1
+    try:
+      self._fence()
+      if not is_ready():
+        select.select([fd], [], [], self._MAX_WAIT_SECS)
+        self._drain(fd)
+    finally:
+      counters[waiting_flag] = 0
+
+  def _notify(self, fd, waiting_flag):
+    # type: (int, int) -> None
+    self._fence()
+    if self._counters[waiting_flag]:
+      self.wake(fd)
+
+  @staticmethod
+  def wake(fd):
+    # type: (int) -> None
+    try:
+      os.write(fd, b'\0')
+    except BlockingIOError:
+      # The pipe is full, so a wakeup is pending already.
+      pass
+
+  @staticmethod
+  def _drain(fd):
+    # type: (int) -> None
+    try:
+      while os.read(fd, 4096):
+        pass
+    except BlockingIOError:
+      pass
+
+  def wake_all(self):
+    # type: () -> None
+
+    """Wakes a reader or writer of this process blocked on the ring."""
+    self.wake(self._data_fd)
+    self.wake(self._space_fd)
+
+  def write(self, data, is_stopped):
+    # type: (bytes, Callable[[], bool]) -> None
+
+    """Writes data, waiting for the reader to make room as needed."""
+    view = memoryview(data)
+    counters = self._counters
+    written = counters[self._WRITTEN]
+    offset = 0
+    attempt = 0
+    while offset < len(view):
+      free = self._capacity - (written - counters[self._READ])
+      if not free:
+        if is_stopped():
+          raise RuntimeError('Shared memory channel closed prematurely.')
+        self._wait(
+            self._space_fd,
+            self._WRITER_WAITING,
+            lambda: written - counters[self._READ] < self._capacity,
+            attempt)
+        attempt += 1
+        continue
+      attempt = 0
+      size = min(free, len(view) - offset)
+      start = self._HEADER_SIZE + written % self._capacity
+      first = min(size, self._HEADER_SIZE + self._capacity - start)
+      self._buf[start:start + first] = view[offset:offset + first]
+      if first < size:
+        self._buf[self._HEADER_SIZE:self._HEADER_SIZE + size -
+                  first] = view[offset + first:offset + size]
+      offset += size
+      written += size
+      counters[self._WRITTEN] = written
+      self._notify(self._data_fd, self._READER_WAITING)
+
+  def read(self, size, is_stopped):
+    # type: (int, Callable[[], bool]) -> Optional[bytes]
+
+    """Reads size bytes, or returns None once the writer is done and all its
+    data was read."""
+    counters = self._counters
+    read = counters[self._READ]
+    chunks = []
+    remaining = size
+    attempt = 0
+    while remaining:
+      available = counters[self._WRITTEN] - read
+      if not available:
+        # The written counter must be checked again after seeing the writer
+        # done, as it may have written more data in between.
+        if ((counters[self._DONE] and counters[self._WRITTEN] == read) or
+            is_stopped()):
+          return None
+        self._wait(
+            self._data_fd,
+            self._READER_WAITING,
+            lambda: counters[self._WRITTEN] != read or counters[self._DONE],
+            attempt)
+        attempt += 1
+        continue
+      attempt = 0
+      start = self._HEADER_SIZE + read % self._capacity
+      chunk_size = min(
+          available, remaining, self._HEADER_SIZE + self._capacity - start)
+      chunks.append(self._buf[start:start + chunk_size].tobytes())
+      remaining -= chunk_size
+      read += chunk_size
+      counters[self._READ] = read
+      self._notify(self._space_fd, self._WRITER_WAITING)
+    return b''.join(chunks)
+
+  def close_writer(self):
+    # type: () -> None
+    self._counters[self._DONE] = 1
+    self._notify(self._data_fd, self._READER_WAITING)
+
+  def close(self):
+    # type: () -> None
+    self._counters.release()
+    self._buf = None
+    self._shm.close()
+    os.close(self._data_fd)
+    os.close(self._space_fd)
+    if self._owner:
+      self._shm.unlink()
+      os.unlink(self._pipe_path(self._shm.name, 'data'))
+      os.unlink(self._pipe_path(self._shm.name, 'space'))
+
+
+class SharedMemoryDataChannel(_GrpcDataChannel):
+  """A DataChannel between two processes on the same host.
+
+  Encoded elements are exchanged through a pair of shared memory rings
+  instead of a gRPC stream. Output streams send frames of their ids and
+  encoded payloads to the ring without building protobuf messages. Each input
+  frame is still read into an Elements.Data or Elements.Timers message, as
+  that is what input_elements yields.
+  The runner creates one channel per worker, naming it after a prefix shared by
+  all workers and the worker id. The prefix is advertised to the workers as
+  the data plane url, and each worker attaches to the channel for its id.
+  """
+  _FRAME_HEADER = struct.Struct('<BBHHHQ')
+  _DATA = 0
+  _TIMERS = 1
+
+  def __init__(
+      self,
+      inbound,  # type: _SharedMemoryRing
+      outbound,  # type: _SharedMemoryRing
+      data_buffer_time_limit_ms=0,  # type: int
+      data_buffer_target_latency_ms=0  # type: int
+  ):
+    # type: (...) -> None
+    super().__init__(data_buffer_time_limit_ms, data_buffer_target_latency_ms)
+    self._inbound = inbound
+    self._outbound = outbound
+    self._stopped = False
+    self._writer = threading.Thread(
+        target=self._write_to_ring, name='write_shared_memory_outputs')
+    self._writer.daemon = True
+    self._writer.start()
+    self._reader = threading.Thread(
+        target=lambda: self._read_entries(self._read_from_ring()),
+        name='read_shared_memory_inputs')
+    self._reader.daemon = True
+    self._reader.start()
+
+  @classmethod
+  def create(
+      cls,
+      name,  # type: str
+      data_buffer_time_limit_ms=0,  # type: int
+      size=_SHARED_MEMORY_RING_SIZE  # type: int
+  ):
+    # type: (...) -> SharedMemoryDataChannel
+    return cls(
+        _SharedMemoryRing.create(name + '_i', size),
+        _SharedMemoryRing.create(name + '_o', size),
+        data_buffer_time_limit_ms)
+
+  @classmethod
+  def attach(
+      cls,
+      name,  # type: str
+      data_buffer_time_limit_ms=0,  # type: int
+      data_buffer_target_latency_ms=0  # type: int
+  ):
+    # type: (...) -> SharedMemoryDataChannel
+    return cls(
+        _SharedMemoryRing.attach(name + '_o'),
+        _SharedMemoryRing.attach(name + '_i'),
+        data_buffer_time_limit_ms,
+        data_buffer_target_latency_ms)
+
+  @staticmethod
+  def is_supported():
+    # type: () -> bool
+
+    """Whether shared memory channels can be used on this host.
+
+    The rings rely on the memory ordering of x86, and on named pipes.
+    """
+    return hasattr(os, 'mkfifo') and platform.machine().lower() in (
+        'x86_64', 'amd64', 'i386', 'i686', 'x86')
+
+  @staticmethod
+  def channel_name(prefix, worker_id):
+    # type: (str, Optional[str]) -> str
+    return '%s_%s' % (prefix, worker_id)
+
+  @staticmethod
+  def url(prefix):
+    # type: (str) -> str
+    return _SHARED_MEMORY_URL_PREFIX + prefix
+
+  @staticmethod
+  def is_shared_memory_url(url):
+    # type: (str) -> bool
+    return url.startswith(_SHARED_MEMORY_URL_PREFIX)
+
+  @classmethod
+  def from_url(
+      cls,
+      url,  # type: str
+      worker_id,  # type: Optional[str]
+      data_buffer_time_limit_ms=0,  # type: int
+      data_buffer_target_latency_ms=0  # type: int
+  ):
+    # type: (...) -> SharedMemoryDataChannel
+    return cls.attach(
+        cls.channel_name(url[len(_SHARED_MEMORY_URL_PREFIX):], worker_id),
+        data_buffer_time_limit_ms,
+        data_buffer_target_latency_ms)
+
+  def close(self):
+    # type: () -> None
+    try:
+      super().close()
+      self._writer.join()
+    finally:
+      self._stopped = True
+      self._inbound.wake_all()
+      self._outbound.wake_all()
+      self._reader.join(timeout=5)
+      if self._reader.is_alive():
+        # Unmapping the rings under a running reader would crash the process.
+        _LOGGER.warning(
+            'Leaking shared memory data channel %s', self._inbound.name)
+      else:
+        self._inbound.close()
+        self._outbound.close()
+
+  def _is_stopped(self):
+    # type: () -> bool
+    return self._stopped
+
+  def output_stream(self, instruction_id, transform_id):
+    # type: (str, str) -> ClosableOutputStream
+    return self._frame_stream(
+        self._DATA,
+        instruction_id,
+        transform_id,
+        '',
+        self._flush_policy(transform_id))
+
+  def output_timer_stream(
+      self,
+      instruction_id,  # type: str
+      transform_id,  # type: str
+      timer_family_id  # type: str
+  ):
+    # type: (...) -> ClosableOutputStream
+    return self._frame_stream(
+        self._TIMERS,
+        instruction_id,
+        transform_id,
+        timer_family_id,
+        self._flush_policy(transform_id, timer_family_id))
+
+  def _frame_stream(
+      self,
+      kind,  # type: int
+      instruction_id,  # type: str
+      transform_id,  # type: str
+      timer_family_id,  # type: str
+      flush_policy  # type: Optional[AdaptiveFlushPolicy]
+  ):
+    # type: (...) -> ClosableOutputStream
+
+    """Returns a stream that sends its payloads as frames of the ring.
+
+    The frames are queued as (kind, id sizes, ids, payload, is_last) tuples,
+    the ids being encoded once per stream.
+    """
+    ids = [
+        instruction_id.encode('utf-8'),
+        transform_id.encode('utf-8'),
+        timer_family_id.encode('utf-8')
+    ]
+    id_sizes = tuple(len(part) for part in ids)
+    joined_ids = b''.join(ids)
+
+    def add_to_send_queue(payload):
+      # type: (bytes) -> None
+      if payload:
+        self._enqueue_to_send((kind, id_sizes, joined_ids, payload, False))
+
+    def close_callback(payload):
+      # type: (bytes) -> None
+      add_to_send_queue(payload)
+      self._enqueue_to_send((kind, id_sizes, joined_ids, b'', True))
+
+    return ClosableOutputStream.create(
+        close_callback,
+        add_to_send_queue,
+        self._data_buffer_time_limit_ms,
+        flush_policy)
+
+  def _get_element_size_bytes(self, element):
+    # type: (Any) -> int
+    if isinstance(element, tuple):
+      return len(element[3])
+    return super()._get_element_size_bytes(element)
+
+  def _write_to_ring(self):
+    # type: () -> None
+    try:
+      while True:
+        frame = self._to_send.get()
+        if frame is self._WRITES_FINISHED:
+          return
+        kind, id_sizes, ids, payload, is_last = frame
+        self._outbound.write(
+            self._FRAME_HEADER.pack(kind, is_last, *id_sizes, len(payload)) +
+            ids,
+            self._is_stopped)
+        if payload:
+          self._outbound.write(payload, self._is_stopped)
+    except Exception as e:
+      if not self._stopped:
+        _LOGGER.exception('Failed to write outputs in the data plane.')
+        self._exception = e
+    finally:
+      self._outbound.close_writer()
+
+  def _read_from_ring(self):
+    # type: () -> Iterator[DataOrTimers]
+    while True:
+      header = self._inbound.read(self._FRAME_HEADER.size, self._is_stopped)
+      if header is None:
+        return
+      (
+          kind,
+          is_last,
+          instruction_id_size,
+          transform_id_size,
+          timer_family_id_size,
+          payload_size) = self._FRAME_HEADER.unpack(header)
+      ids = self._inbound.read(
+          instruction_id_size + transform_id_size + timer_family_id_size,
+          self._is_stopped)
+      payload = self._inbound.read(payload_size, self._is_stopped)
+      if ids is None or payload is None:
+        return
+      instruction_id = ids[:instruction_id_size].decode('utf-8')
+      transform_id = ids[instruction_id_size:instruction_id_size +
+                         transform_id_size].decode('utf-8')
+      if kind == self._TIMERS:
+        yield beam_fn_api_pb2.Elements.Timers(
+            instruction_id=instruction_id,
+            transform_id=transform_id,
+            timer_family_id=ids[instruction_id_size +
+                                transform_id_size:].decode('utf-8'),
+            timers=payload,
+            is_last=bool(is_last))
+      else:
+        yield beam_fn_api_pb2.Elements.Data(
+            instruction_id=instruction_id,
+            transform_id=transform_id,
+            data=payload,
+            is_last=bool(is_last))
+
+
 class BeamFnDataServicer(beam_fn_api_pb2_grpc.BeamFnDataServicer):
   """Implementation of BeamFnDataServicer for any number of clients"""
   def __init__(
@@ -863,7 +1532,8 @@ class GrpcClientDataChannelFactory(DataChannelFactory):
       self,
       credentials=None,  # type: Any
       worker_id=None,  # type: Optional[str]
-      data_buffer_time_limit_ms=0  # type: int
+      data_buffer_time_limit_ms=0,  # type: int
+      data_buffer_target_latency_ms=0  # type: int
   ):
     # type: (...) -> None
     self._data_channel_cache = {}  # type: Dict[str, GrpcClientDataChannel]
@@ -871,6 +1541,7 @@ class GrpcClientDataChannelFactory(DataChannelFactory):
     self._credentials = None
     self._worker_id = worker_id
     self._data_buffer_time_limit_ms = data_buffer_time_limit_ms
+    self._data_buffer_target_latency_ms = data_buffer_target_latency_ms
     if credentials is not None:
       _LOGGER.info('Using secure channel creds.')
       self._credentials = credentials
@@ -881,7 +1552,16 @@ class GrpcClientDataChannelFactory(DataChannelFactory):
       return None
     if url not in self._data_channel_cache:
       with self._lock:
-        if url not in self._data_channel_cache:
+        if url in self._data_channel_cache:
+          pass
+        elif SharedMemoryDataChannel.is_shared_memory_url(url):
+          _LOGGER.info('Attaching shared memory data channel %s', url)
+          self._data_channel_cache[url] = SharedMemoryDataChannel.from_url(
+              url,
+              self._worker_id,
+              self._data_buffer_time_limit_ms,
+              self._data_buffer_target_latency_ms)
+        else:
           _LOGGER.info('Creating client data channel for %s', url)
           # Options to have no limits (-1) on the size of the messages
           # received or sent over the data plane. The actual buffer size
@@ -902,7 +1582,8 @@ class GrpcClientDataChannelFactory(DataChannelFactory):
               grpc_channel, WorkerIdInterceptor(self._worker_id))
           self._data_channel_cache[url] = GrpcClientDataChannel(
               beam_fn_api_pb2_grpc.BeamFnDataStub(grpc_channel),
-              self._data_buffer_time_limit_ms)
+              self._data_buffer_time_limit_ms,
+              self._data_buffer_target_latency_ms)
 
     return self._data_channel_cache[url]
 
@@ -21,11 +21,16 @@
 
 import itertools
 import logging
+import select
+import threading
 import time
 import unittest
+import uuid
+from unittest import mock
 
 import grpc
 
+from apache_beam.metrics.cells import DistributionData
 from apache_beam.portability.api import beam_fn_api_pb2
 from apache_beam.portability.api import beam_fn_api_pb2_grpc
 from apache_beam.runners.worker import data_plane
@@ -79,6 +84,75 @@ class DataChannelTest(unittest.TestCase):
     channel = data_plane.InMemoryDataChannel()
     self._data_channel_test(channel, channel.inverse())
 
+  @unittest.skipUnless(
+      data_plane.SharedMemoryDataChannel.is_supported(),
+      'Shared memory channels are not supported on this host.')
+  def test_shared_memory_data_channel(self):
+    self._shared_memory_data_channel_test()
+
+  @unittest.skipUnless(
+      data_plane.SharedMemoryDataChannel.is_supported(),
+      'Shared memory channels are not supported on this host.')
+  def test_shared_memory_data_channel_wraps_around(self):
+    self._shared_memory_data_channel_test(size=16)
+
+  @unittest.skipUnless(
+      data_plane.SharedMemoryDataChannel.is_supported(),
+      'Shared memory channels are not supported on this host.')
+  def test_shared_memory_ring_blocks_until_notified(self):
+    name = 'beam_test_%s' % uuid.uuid4().hex[:8]
+    owner = data_plane._SharedMemoryRing.create(name, 4)
+    ring = data_plane._SharedMemoryRing.attach(name)
+    try:
+      read = []
+      reader = threading.Thread(
+          target=lambda: read.append(ring.read(8, lambda: False)))
+      reader.start()
+      # Give the reader time to stop spinning and block on the pipe.
+      time.sleep(0.05)
+      with mock.patch.object(select, 'select', wraps=select.select) as waits:
+        owner.write(b'abcdefgh', lambda: False)
+        reader.join(timeout=5)
+      self.assertEqual(read, [b'abcdefgh'])
+      # The writer blocked once the ring was full until the reader freed it,
+      # rather than timing out.
+      self.assertLess(waits.call_count, 10)
+      owner.close_writer()
+      self.assertIsNone(ring.read(1, lambda: False))
+    finally:
+      ring.close()
+      owner.close()
+
+  def _shared_memory_data_channel_test(self, **kwargs):
+    prefix = 'beam_test_%s' % uuid.uuid4().hex[:8]
+    owner = data_plane.SharedMemoryDataChannel.create(
+        data_plane.SharedMemoryDataChannel.channel_name(prefix, 'worker_0'),
+        **kwargs)
+    factory = data_plane.GrpcClientDataChannelFactory(worker_id='worker_0')
+    client = factory.create_data_channel_from_url(
+        data_plane.SharedMemoryDataChannel.url(prefix))
+    self.assertIsInstance(client, data_plane.SharedMemoryDataChannel)
+    try:
+      self._data_channel_test(owner, client)
+
+      timer_stream = client.output_timer_stream('3', 'transform', 'timers')
+      timer_stream.write(b'timer' * 10)
+      timer_stream.close()
+      self.assertEqual(
+          list(owner.input_elements('3', [('transform', 'timers')])),
+          [
+              beam_fn_api_pb2.Elements.Timers(
+                  instruction_id='3',
+                  transform_id='transform',
+                  timer_family_id='timers',
+                  timers=b'timer' * 10)
+          ])
+    finally:
+      factory.close()
+      owner.close()
+      client.wait()
+      owner.wait()
+
   def _data_channel_test(self, server, client, time_based_flush=False):
     self._data_channel_test_one_direction(server, client, time_based_flush)
     self._data_channel_test_one_direction(client, server, time_based_flush)
@@ -139,6 +213,86 @@ class DataChannelTest(unittest.TestCase):
         ])
 
 
+class AdaptiveFlushTest(unittest.TestCase):
+  def test_policy_follows_rate(self):
+    policy = data_plane.AdaptiveFlushPolicy(
+        100, min_flush_size=10, max_flush_size=1000)
+    self.assertEqual(policy.size_flush_threshold, 1000)
+    # 2000 bytes per second for 100ms.
+    policy.observe(200, 0.1)
+    self.assertEqual(policy.size_flush_threshold, 200)
+    # The rate is smoothed over observations.
+    policy.observe(400, 0.1)
+    self.assertEqual(policy.size_flush_threshold, 240)
+    policy.observe(1, 10)
+    self.assertEqual(policy.size_flush_threshold, 192)
+    for _ in range(100):
+      policy.observe(1, 10)
+    self.assertEqual(policy.size_flush_threshold, 10)
+    for _ in range(100):
+      policy.observe(10000, 0.1)
+    self.assertEqual(policy.size_flush_threshold, 1000)
+
+  def test_size_and_close_flushes(self):
+    flushed = []
+    policy = data_plane.AdaptiveFlushPolicy(
+        60000, min_flush_size=10, max_flush_size=100)
+    stream = data_plane.ClosableOutputStream.create(
+        flushed.append, flushed.append, 0, policy)
+    self.assertIsInstance(
+        stream, data_plane.AdaptiveBufferingClosableOutputStream)
+    for _ in range(30):
+      stream.write(b'abcdefgh')
+      stream.maybe_flush()
+    stream.close()
+    self.assertEqual(b''.join(flushed), b'abcdefgh' * 30)
+    self.assertEqual([len(data) for data in flushed], [104, 104, 32])
+    self.assertEqual(
+        stream.flush_counts, {
+            'size': 2, 'deadline': 0, 'close': 1
+        })
+    self.assertEqual(stream.flushed_bytes, DistributionData(240, 3, 32, 104))
+    # Fast outputs are flushed in the largest allowed size.
+    self.assertEqual(stream.size_flush_threshold, 100)
+
+  def test_deadline_flushes(self):
+    flushed = []
+    policy = data_plane.AdaptiveFlushPolicy(20)
+    stream = data_plane.AdaptiveBufferingClosableOutputStream(
+        flushed.append, flushed.append, policy)
+    stream.write(b'abc')
+    stream.maybe_flush()
+    for _ in range(100):
+      if flushed:
+        break
+      time.sleep(0.01)
+    stream.close()
+    self.assertEqual(flushed, [b'abc', b''])
+    self.assertEqual(stream.flush_counts['deadline'], 1)
+    self.assertEqual(stream.flush_counts['close'], 0)
+
+  def test_channel_keeps_policy_across_streams(self):
+    channel = data_plane._GrpcDataChannel(data_buffer_target_latency_ms=10)
+    streams = [
+        channel.output_stream('1', 'transform'),
+        channel.output_stream('2', 'transform'),
+        channel.output_timer_stream('1', 'transform', 'timers'),
+    ]
+    try:
+      for stream in streams:
+        self.assertIsInstance(
+            stream, data_plane.AdaptiveBufferingClosableOutputStream)
+      self.assertIs(streams[0]._policy, streams[1]._policy)
+      self.assertIsNot(streams[0]._policy, streams[2]._policy)
+    finally:
+      for stream in streams:
+        stream.close()
+      channel.close()
+    self.assertNotIsInstance(
+        data_plane._GrpcDataChannel().output_stream('1', 'transform'),
+        data_plane.AdaptiveBufferingClosableOutputStream)
+
+
 if __name__ == '__main__':
   logging.getLogger().setLevel(logging.INFO)
   unittest.main()
@@ -115,6 +115,7 @@ cdef class DoOperation(Operation):
   cdef object user_state_context
   cdef public dict timer_inputs
   cdef dict timer_specs
+  cdef public list prefetch_state_specs
   cdef public object input_info
   cdef object fn
   cdef object scoped_timer_processing_state
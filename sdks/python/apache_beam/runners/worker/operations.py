@@ -22,11 +22,13 @@
 
 # ruff: noqa: UP006
 import collections
+import copy
 import logging
 import threading
 import warnings
 from typing import TYPE_CHECKING
 from typing import Any
+from typing import Callable
 from typing import DefaultDict
 from typing import Dict
 from typing import FrozenSet
@@ -90,6 +92,112 @@ SdfSplitResultsPrimary = Tuple['DoOperation', 'SplitResultPrimary']
 SdfSplitResultsResidual = Tuple['DoOperation', 'SplitResultResidual']
 
 
+class PayloadCache(object):
+  """A process-wide cache of unpickled operation payloads.
+
+  Payloads are keyed by their content, so every bundle processor created for
+  the same transform unpickles its payload only once. Lookups return a deep
+  copy of the cached prototype, so that bundle processors do not share
+  mutable attributes of their DoFns. Like other deep copies, the copies share
+  functions and classes, including the objects captured by their closures.
+  Payloads that cannot be deep-copied are unpickled on every lookup.
+
+  Entries are weighed by the size of their pickled form and evicted in least
+  recently used order once their total weight exceeds max_weight. The cache is
+  disabled while max_weight is 0, which is the default, see
+  --experiments=payload_cache_size_mb.
+  """
+  def __init__(self, max_weight=0):
+    # type: (int) -> None
+    self._max_weight = max_weight
+    self._current_weight = 0
+    self._lock = threading.Lock()
+    # Maps keys to [value, copyable, weight] lists, in least recently used
+    # order.
+    self._entries = collections.OrderedDict(
+    )  # type: collections.OrderedDict[Any, List[Any]]
+
+  def resize(self, max_weight):
+    # type: (int) -> None
+    with self._lock:
+      self._max_weight = max_weight
+      self._evict()
+
+  def loads(self, payload, copy_prototype=True):
+    # type: (bytes, bool) -> Any
+
+    """Returns the unpickled payload.
+
+    Args:
+      payload: The pickled payload.
+      copy_prototype: Whether to return a private copy of the unpickled
+        payload. Shared prototypes must not be modified by the caller.
+    """
+    if not self._max_weight:
+      return pickler.loads(payload)
+    entry = self._get_or_create(
+        payload, lambda: pickler.loads(payload), len(payload))
+    if not copy_prototype:
+      return entry[0]
+    if entry[1]:
+      try:
+        return copy.deepcopy(entry[0])
+      except Exception:  # pylint: disable=broad-except
+        _LOGGER.debug('Payload cannot be deep-copied', exc_info=True)
+        entry[1] = False
+    return pickler.loads(payload)
+
+  def derive(self, key, create_fn):
+    # type: (Any, Callable[[], bytes]) -> bytes
+
+    """Returns the pickled payload create_fn(), memoized by key.
+
+    Used for payloads derived from other payloads, such that re-pickling an
+    unchanged derived payload, whose bytes may differ between invocations,
+    does not defeat the cache.
+    """
+    if not self._max_weight:
+      return create_fn()
+    return self._get_or_create(('derived', key), create_fn, None)[0]
+
+  def clear(self):
+    # type: () -> None
+    with self._lock:
+      self._entries.clear()
+      self._current_weight = 0
+
+  def _get_or_create(self, key, create_fn, weight):
+    # type: (Any, Callable[[], Any], Optional[int]) -> List[Any]
+    with self._lock:
+      entry = self._entries.get(key)
+      if entry is not None:
+        self._entries.move_to_end(key)
+        return entry
+    # Create the value outside of the lock, as it may be expensive. Racing
+    # creations of the same value are benign.
+    value = create_fn()
+    if weight is None:
+      weight = len(value)
+    entry = [value, True, weight]
+    with self._lock:
+      previous = self._entries.pop(key, None)
+      if previous is not None:
+        self._current_weight -= previous[2]
+      self._entries[key] = entry
+      self._current_weight += weight
+      self._evict()
+    return entry
+
+  def _evict(self):
+    # type: () -> None
+    while self._current_weight > self._max_weight and self._entries:
+      _, (_, _, weight) = self._entries.popitem(last=False)
+      self._current_weight -= weight
+
+
+payload_cache = PayloadCache()
+
+
 # TODO(BEAM-9324) Remove these workarounds once upgraded to Cython 3
 def _cast_to_operation(value):
   if cython.compiled:
@@ -816,7 +924,9 @@ class DoOperation(Operation):
         metrics_container=self.metrics_container)
     # See fn_data in dataflow_runner.py
     # TODO: Store all the items from spec?
-    self.fn, _, _, _, _ = (pickler.loads(self.spec.serialized_fn))
+    self.fn, _, _, _, _ = (payload_cache.loads(self.spec.serialized_fn))
+    # User state specs whose state is read ahead of processing each element.
+    self.prefetch_state_specs = []  # type: List[userstate.StateSpec]
 
   def _read_side_inputs(self, tags_and_types):
     # type: (...) -> Iterator[apache_sideinputs.SideInputMap]
@@ -881,7 +991,7 @@ class DoOperation(Operation):
 
       # See fn_data in dataflow_runner.py
       fn, args, kwargs, tags_and_types, window_fn = (
-          pickler.loads(self.spec.serialized_fn))
+          payload_cache.loads(self.spec.serialized_fn))
 
       state = common.DoFnState(self.counter_factory)
       state.step_name = self.name_context.logging_name()
@@ -903,10 +1013,14 @@ class DoOperation(Operation):
             self.tagged_receivers[None] = self.receivers[index]
 
       if self.user_state_context:
+        state_specs, timer_specs = userstate.get_dofn_specs(fn)
         self.timer_specs = {
             spec.name: spec
-            for spec in userstate.get_dofn_specs(fn)[1]
+            for spec in timer_specs
         }  # type: Dict[str, TimerSpec]
+        self.prefetch_state_specs = [
+            spec for spec in state_specs if spec.prefetch
+        ]
 
       if self.side_input_maps is None:
         if tags_and_types:
@@ -963,6 +1077,24 @@ class DoOperation(Operation):
   def process_batch(self, windowed_batch: WindowedBatch) -> None:
     self.dofn_runner.process_batch(windowed_batch)
 
+  def prefetch_state(self, windowed_values):
+    # type: (Iterable[WindowedValue]) -> None
+
+    """Issues the reads of the prefetched user state of the given elements.
+
+    Called with a batch of keyed elements before any of them is processed,
+    so that their state reads are in flight concurrently.
+    """
+    assert self.user_state_context is not None
+    for wv in windowed_values:
+      if not isinstance(wv.value, tuple) or len(wv.value) != 2:
+        # Leave it to the DoFnRunner to report invalid input.
+        continue
+      key = wv.value[0]
+      for window in wv.windows:
+        for spec in self.prefetch_state_specs:
+          self.user_state_context.get_state(spec, key, window).prefetch()
+
   def finalize_bundle(self):
     # type: () -> None
     self.dofn_runner.finalize()
@@ -58,6 +58,7 @@ from apache_beam.runners.worker import statesampler
 from apache_beam.runners.worker.channel_factory import GRPCChannelFactory
 from apache_beam.runners.worker.data_plane import PeriodicThread
 from apache_beam.runners.worker.statecache import CacheAware
+from apache_beam.runners.worker.statecache import ShardedStateCache
 from apache_beam.runners.worker.statecache import StateCache
 from apache_beam.runners.worker.worker_id_interceptor import WorkerIdInterceptor
 from apache_beam.runners.worker.worker_status import FnApiWorkerStatusHandler
@@ -159,13 +160,19 @@ class SdkHarness(object):
       worker_id=None,  # type: Optional[str]
       # Caching is disabled by default
       state_cache_size=0,  # type: int
+      # A single LRU state cache is used by default
+      state_cache_num_shards=0,  # type: int
       # time-based data buffering is disabled by default
       data_buffer_time_limit_ms=0,  # type: int
+      # adaptive data buffering is disabled by default
+      data_buffer_target_latency_ms=0,  # type: int
       profiler_factory=None,  # type: Optional[Callable[..., Profile]]
       status_address=None,  # type: Optional[str]
       # Heap dump through status api is disabled by default
       enable_heap_dump=False,  # type: bool
       data_sampler=None,  # type: Optional[data_sampler.DataSampler]
+      # Bundle processors are created on demand by default
+      bundle_processor_prewarm_count=0,  # type: int
       # Unrecoverable SDK harness initialization error (if any)
       # that should be reported to the runner when proocessing the first bundle.
       deferred_exception=None,  # type: Optional[Exception]
@@ -176,7 +183,11 @@ class SdkHarness(object):
     self._alive = True
     self._worker_index = 0
     self._worker_id = worker_id
-    self._state_cache = StateCache(state_cache_size)
+    if state_cache_size > 0 and state_cache_num_shards > 0:
+      self._state_cache = ShardedStateCache(
+          state_cache_size, state_cache_num_shards)  # type: StateCache
+    else:
+      self._state_cache = StateCache(state_cache_size)
     self._deferred_exception = deferred_exception
     options = [('grpc.max_receive_message_length', -1),
                ('grpc.max_send_message_length', -1)]
@@ -194,7 +205,10 @@ class SdkHarness(object):
     self._control_channel = grpc.intercept_channel(
         self._control_channel, WorkerIdInterceptor(self._worker_id))
     self._data_channel_factory = data_plane.GrpcClientDataChannelFactory(
-        credentials, self._worker_id, data_buffer_time_limit_ms)
+        credentials,
+        self._worker_id,
+        data_buffer_time_limit_ms,
+        data_buffer_target_latency_ms)
     self._state_handler_factory = GrpcStateHandlerFactory(
         state_cache=self._state_cache,
         credentials=credentials,
@@ -219,6 +233,7 @@ class SdkHarness(object):
         data_channel_factory=self._data_channel_factory,
         fns=self._fns,
         data_sampler=self.data_sampler,
+        prewarm_count=bundle_processor_prewarm_count,
     )
     self._status_handler = None  # type: Optional[FnApiWorkerStatusHandler]
     if status_address:
@@ -426,6 +441,8 @@ class BundleProcessorCache(object):
     cached_bundle_processors (dict): A dictionary, indexed by bundle processor
       id, of cached ``bundle_processor.BundleProcessor`` that are not currently
       performing processing.
+    prewarm_count (int): The number of ``bundle_processor.BundleProcessor``s
+      created in the background for each registered bundle descriptor.
   """
   periodic_shutdown = None  # type: Optional[PeriodicThread]
 
@@ -436,9 +453,11 @@ class BundleProcessorCache(object):
       data_channel_factory,  # type: data_plane.DataChannelFactory
       fns,  # type: MutableMapping[str, beam_fn_api_pb2.ProcessBundleDescriptor]
       data_sampler=None,  # type: Optional[data_sampler.DataSampler]
+      prewarm_count=0,  # type: int
   ):
     # type: (...) -> None
     self.runner_capabilities = runner_capabilities
+    self.prewarm_count = prewarm_count
     self.fns = fns
     self.state_handler_factory = state_handler_factory
     self.data_channel_factory = data_channel_factory
@@ -461,8 +480,53 @@ class BundleProcessorCache(object):
   def register(self, bundle_descriptor):
     # type: (beam_fn_api_pb2.ProcessBundleDescriptor) -> None
 
-    """Register a ``beam_fn_api_pb2.ProcessBundleDescriptor`` by its id."""
+    """Register a ``beam_fn_api_pb2.ProcessBundleDescriptor`` by its id.
+
+    If ``prewarm_count`` is set, that many ``BundleProcessor``s are created
+    for the descriptor in the background, so that the first bundles do not
+    pay for their creation.
+    """
     self.fns[bundle_descriptor.id] = bundle_descriptor
+    if self.prewarm_count > 0:
+      prewarm_thread = threading.Thread(
+          target=self._prewarm,
+          args=(bundle_descriptor.id, self.prewarm_count),
+          name='prewarm-%s' % bundle_descriptor.id)
+      prewarm_thread.daemon = True
+      prewarm_thread.start()
+
+  def _prewarm(self, bundle_descriptor_id, count):
+    # type: (str, int) -> None
+    for _ in range(count):
+      try:
+        processor = self._create_bundle_processor(bundle_descriptor_id)
+      except Exception:  # pylint: disable=broad-except
+        # Creation errors are reported when processing the first bundle.
+        _LOGGER.warning(
+            'Failed to prewarm bundle processor for %s',
+            bundle_descriptor_id,
+            exc_info=True)
+        return
+      with self._lock:
+        self.last_access_times[bundle_descriptor_id] = time.time()
+        self.cached_bundle_processors[bundle_descriptor_id].append(processor)
+
+  def _create_bundle_processor(self, bundle_descriptor_id):
+    # type: (str) -> bundle_processor.BundleProcessor
+
+    # Reduce risks of concurrent modifications of the same protos
+    # captured in bundle descriptor when the same bundle descriptor is used
+    # in different instructions.
+    pbd = beam_fn_api_pb2.ProcessBundleDescriptor()
+    pbd.MergeFrom(self.fns[bundle_descriptor_id])
+
+    return bundle_processor.BundleProcessor(
+        self.runner_capabilities,
+        pbd,
+        self.state_handler_factory.create_state_handler(
+            pbd.state_api_service_descriptor),
+        self.data_channel_factory,
+        self.data_sampler)
 
   def activate(self, instruction_id):
     # type: (str) -> None
@@ -501,20 +565,7 @@ class BundleProcessorCache(object):
             bundle_descriptor_id, threading.current_thread(), time.time())
 
     # Make sure we instantiate the processor while not holding the lock.
-
-    # Reduce risks of concurrent modifications of the same protos
-    # captured in bundle descriptor when the same bundle descriptor is used
-    # in different instructions.
-    pbd = beam_fn_api_pb2.ProcessBundleDescriptor()
-    pbd.MergeFrom(self.fns[bundle_descriptor_id])
-
-    processor = bundle_processor.BundleProcessor(
-        self.runner_capabilities,
-        pbd,
-        self.state_handler_factory.create_state_handler(
-            pbd.state_api_service_descriptor),
-        self.data_channel_factory,
-        self.data_sampler)
+    processor = self._create_bundle_processor(bundle_descriptor_id)
     with self._lock:
       self.active_bundle_processors[
         instruction_id] = bundle_descriptor_id, processor
@@ -836,6 +887,20 @@ class StateHandler(metaclass=abc.ABCMeta):
     """
     raise NotImplementedError(type(self))
 
+  def get_raw_async(
+      self,
+      state_key,  # type: beam_fn_api_pb2.StateKey
+      continuation_token=None  # type: Optional[bytes]
+  ):
+    # type: (...) -> _Future[Tuple[bytes, Optional[bytes]]]
+
+    """Issues a get request for the given state key without waiting for it.
+
+    Returns a future of the tuple that get_raw would return. Handlers that
+    cannot issue requests asynchronously fetch the state eagerly.
+    """
+    return _Future().set(self.get_raw(state_key, continuation_token))
+
   @abc.abstractmethod
   def append_raw(
       self,
@@ -974,6 +1039,16 @@ class CachingStateHandler(metaclass=abc.ABCMeta):
     # type: (...) -> Iterable[Any]
     raise NotImplementedError(type(self))
 
+  def prefetch(
+      self,
+      state_key,  # type: beam_fn_api_pb2.StateKey
+      coder,  # type: coder_impl.CoderImpl
+  ):
+    # type: (...) -> None
+
+    """Hints that the given state is about to be read in this bundle."""
+    pass
+
   @abc.abstractmethod
   def extend(
       self,
@@ -1114,6 +1189,24 @@ class GrpcStateHandler(StateHandler):
                 continuation_token=continuation_token)))
     return response.get.data, response.get.continuation_token
 
+  def get_raw_async(
+      self,
+      state_key,  # type: beam_fn_api_pb2.StateKey
+      continuation_token=None  # type: Optional[bytes]
+  ):
+    # type: (...) -> _Future[Tuple[bytes, Optional[bytes]]]
+    req_future = self._request(
+        beam_fn_api_pb2.StateRequest(
+            state_key=state_key,
+            get=beam_fn_api_pb2.StateGetRequest(
+                continuation_token=continuation_token)))
+
+    def get_response_data():
+      response = self._wait_for_response(req_future)
+      return response.get.data, response.get.continuation_token
+
+    return _DeferredCall(get_response_data)
+
   def append_raw(
       self,
       state_key,  # type: Optional[beam_fn_api_pb2.StateKey]
@@ -1144,7 +1237,10 @@ class GrpcStateHandler(StateHandler):
 
   def _blocking_request(self, request):
     # type: (beam_fn_api_pb2.StateRequest) -> beam_fn_api_pb2.StateResponse
-    req_future = self._request(request)
+    return self._wait_for_response(self._request(request))
+
+  def _wait_for_response(self, req_future):
+    # type: (_Future[beam_fn_api_pb2.StateResponse]) -> beam_fn_api_pb2.StateResponse
     while not req_future.wait(timeout=1):
       if self._exception:
         raise self._exception
@@ -1211,11 +1307,15 @@ class GlobalCachingStateHandler(CachingStateHandler):
     # TODO: Consider a two-level cache to avoid extra logic and locking
     # for items cached at the bundle level.
     self._context.bundle_cache_token = bundle_id
+    # Outstanding prefetched reads, keyed by cache key. These never outlive
+    # the bundle that issued them.
+    self._context.prefetched = {}
     try:
       self._context.user_state_cache_token = user_state_cache_token
       with self._underlying.process_instruction_id(bundle_id):
         yield
     finally:
+      self._context.prefetched = {}
       self._context.side_input_cache_tokens = {}
       self._context.user_state_cache_token = None
       self._context.bundle_cache_token = None
@@ -1237,6 +1337,29 @@ class GlobalCachingStateHandler(CachingStateHandler):
         (cache_state_key, cache_token),
         lambda key: self._partially_cached_iterable(state_key, coder))
 
+  def prefetch(
+      self,
+      state_key,  # type: beam_fn_api_pb2.StateKey
+      coder,  # type: coder_impl.CoderImpl
+  ):
+    # type: (...) -> None
+
+    """Issues the first page read of the given state without blocking.
+
+    The response is consumed by the next blocking_get of the same state in
+    this bundle, which loads it into the cache. Without a cache there is
+    nowhere to keep the prefetched state, so this is a no-op.
+    """
+    cache_token = self._get_cache_token(state_key)
+    if not cache_token:
+      return
+    cache_key = self._convert_to_cache_key(state_key)
+    prefetched = self._context.prefetched
+    if (cache_key in prefetched or self._state_cache.peek(
+        (cache_key, cache_token)) is not None):
+      return
+    prefetched[cache_key] = self._underlying.get_raw_async(state_key)
+
   def extend(
       self,
       state_key,  # type: beam_fn_api_pb2.StateKey
@@ -1244,6 +1367,7 @@ class GlobalCachingStateHandler(CachingStateHandler):
       elements,  # type: Iterable[Any]
   ):
     # type: (...) -> _Future
+    self._discard_prefetched(state_key)
     cache_token = self._get_cache_token(state_key)
     if cache_token:
       # Update the cache if the value is already present and
@@ -1280,6 +1404,7 @@ class GlobalCachingStateHandler(CachingStateHandler):
 
   def clear(self, state_key):
     # type: (beam_fn_api_pb2.StateKey) -> _Future
+    self._discard_prefetched(state_key)
     cache_token = self._get_cache_token(state_key)
     if cache_token:
       cache_key = self._convert_to_cache_key(state_key)
@@ -1290,6 +1415,14 @@ class GlobalCachingStateHandler(CachingStateHandler):
     # type: () -> None
     self._underlying.done()
 
+  def _discard_prefetched(self, state_key):
+    # type: (beam_fn_api_pb2.StateKey) -> None
+    # A prefetched read does not observe later writes, so it must not be
+    # consumed once the state has been modified.
+    prefetched = getattr(self._context, 'prefetched', None)
+    if prefetched:
+      prefetched.pop(self._convert_to_cache_key(state_key), None)
+
   def _lazy_iterator(
       self,
       state_key,  # type: beam_fn_api_pb2.StateKey
@@ -1320,8 +1453,15 @@ class GlobalCachingStateHandler(CachingStateHandler):
     """Call underlying get_raw with performance statistics and detection."""
     start_time = time.time()
 
-    data, continuation_token = (
-        self._underlying.get_raw(state_key, continuation_token))
+    prefetched = getattr(self._context, 'prefetched', None)
+    future = None
+    if prefetched and not continuation_token:
+      future = prefetched.pop(self._convert_to_cache_key(state_key), None)
+    if future is not None:
+      data, continuation_token = future.get()
+    else:
+      data, continuation_token = (
+          self._underlying.get_raw(state_key, continuation_token))
 
     input_stream = coder_impl.create_InputStream(data)
 
@@ -1370,9 +1510,7 @@ class GlobalCachingStateHandler(CachingStateHandler):
     of the rest, if any.
     """
     input_stream, continuation_token = self._get_raw(state_key, None)
-    head = []
-    while input_stream.size() > 0:
-      head.append(coder.decode_from_stream(input_stream, True))
+    head = coder.decode_all_from_stream(input_stream)
 
     if not continuation_token:
       return head
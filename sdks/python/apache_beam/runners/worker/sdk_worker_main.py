@@ -42,6 +42,7 @@ from apache_beam.options.pipeline_options import WorkerOptions
 from apache_beam.options.value_provider import RuntimeValueProvider
 from apache_beam.portability.api import endpoints_pb2
 from apache_beam.runners.internal import names
+from apache_beam.runners.worker import operations
 from apache_beam.runners.worker.data_sampler import DataSampler
 from apache_beam.runners.worker.log_handler import FnApiLogRecordHandler
 from apache_beam.runners.worker.sdk_worker import SdkHarness
@@ -188,6 +189,7 @@ def create_harness(environment, dry_run=False):
     return
 
   data_sampler = DataSampler.create(sdk_pipeline_options)
+  operations.payload_cache.resize(_get_payload_cache_size_bytes(experiments))
 
   sdk_harness = SdkHarness(
       control_address=control_service_descriptor.url,
@@ -195,11 +197,17 @@ def create_harness(environment, dry_run=False):
       worker_id=_worker_id,
       state_cache_size=_get_state_cache_size_bytes(
           options=sdk_pipeline_options),
+      state_cache_num_shards=sdk_pipeline_options.view_as(
+          WorkerOptions).state_cache_num_shards,
       data_buffer_time_limit_ms=_get_data_buffer_time_limit_ms(experiments),
+      data_buffer_target_latency_ms=_get_data_buffer_target_latency_ms(
+          experiments),
       profiler_factory=profiler.Profile.factory_from_options(
           sdk_pipeline_options.view_as(ProfilingOptions)),
       enable_heap_dump=enable_heap_dump,
       data_sampler=data_sampler,
+      bundle_processor_prewarm_count=_get_bundle_processor_prewarm_count(
+          experiments),
       deferred_exception=deferred_exception,
       runner_capabilities=runner_capabilities,
       element_processing_timeout_minutes=sdk_pipeline_options.view_as(
@@ -339,6 +347,80 @@ def _get_data_buffer_time_limit_ms(experiments):
   return 0
 
 
+def _get_data_buffer_target_latency_ms(experiments):
+  """Defines the target latency of the adaptive outbound data buffering.
+
+  When set, outbound data is flushed in sizes chosen from the observed output
+  rate, and at the latest once it has been buffered for this long.
+
+  Note: data_buffer_target_latency_ms is an experimental flag and might
+  not be available in future releases.
+
+  Returns:
+    an int indicating the target latency in milliseconds of the outbound
+      data buffering. Default is 0 (disabled)
+  """
+
+  for experiment in experiments:
+    # There should only be 1 match so returning from the loop
+    if re.match(r'data_buffer_target_latency_ms=', experiment):
+      return int(
+          re.match(
+              r'data_buffer_target_latency_ms='
+              r'(?P<data_buffer_target_latency_ms>.*)',
+              experiment).group('data_buffer_target_latency_ms'))
+  return 0
+
+
+def _get_bundle_processor_prewarm_count(experiments):
+  """Defines the number of bundle processors created at registration time.
+
+  When set, this many bundle processors are created in the background for
+  each registered bundle descriptor.
+
+  Note: bundle_processor_prewarm_count is an experimental flag and might
+  not be available in future releases.
+
+  Returns:
+    an int indicating the number of bundle processors created for each
+      bundle descriptor at registration time. Default is 0 (disabled)
+  """
+
+  for experiment in experiments:
+    # There should only be 1 match so returning from the loop
+    if re.match(r'bundle_processor_prewarm_count=', experiment):
+      return int(
+          re.match(
+              r'bundle_processor_prewarm_count='
+              r'(?P<bundle_processor_prewarm_count>.*)',
+              experiment).group('bundle_processor_prewarm_count'))
+  return 0
+
+
+def _get_payload_cache_size_bytes(experiments):
+  """Defines the maximum size of the cache of unpickled DoFn payloads.
+
+  When set, the payloads of the DoFns of a bundle descriptor are unpickled
+  once per process instead of once per bundle processor.
+
+  Note: payload_cache_size_mb is an experimental flag and might
+  not be available in future releases.
+
+  Returns:
+    an int indicating the maximum size in bytes of the pickled payloads
+      kept by the cache. Default is 0 (disabled)
+  """
+
+  for experiment in experiments:
+    # There should only be 1 match so returning from the loop
+    if re.match(r'payload_cache_size_mb=', experiment):
+      return int(
+          re.match(
+              r'payload_cache_size_mb=(?P<payload_cache_size_mb>.*)',
+              experiment).group('payload_cache_size_mb')) << 20
+  return 0
+
+
 def _get_log_level_from_options_dict(options_dict: dict) -> int:
   """Get log level from options dict's entry `default_sdk_harness_log_level`.
   If not specified, default log level is logging.INFO.
@@ -294,6 +294,13 @@ class SdkWorkerMainTest(unittest.TestCase):
     cache_size = sdk_worker_main._get_state_cache_size_bytes(options)
     self.assertEqual(cache_size, 50 << 20)
 
+  def test_payload_cache_size_mb_experiment(self):
+    self.assertEqual(sdk_worker_main._get_payload_cache_size_bytes([]), 0)
+    self.assertEqual(
+        sdk_worker_main._get_payload_cache_size_bytes(
+            ['payload_cache_size_mb=16']),
+        16 << 20)
+
 
 if __name__ == '__main__':
   logging.getLogger().setLevel(logging.INFO)
@@ -334,6 +334,39 @@ class SdkWorkerTest(unittest.TestCase):
     self.assertLessEqual(len(tb_str), 13000)
     self.assertIn('[traceback truncated]', tb_str)
 
+  def test_register_prewarms_bundle_processors(self):
+    state_handler_factory = mock.create_autospec(
+        sdk_worker.GrpcStateHandlerFactory)
+    data_channel_factory = mock.create_autospec(
+        data_plane.GrpcClientDataChannelFactory)
+    bundle_processor_cache = BundleProcessorCache(
+        frozenset(),
+        state_handler_factory,
+        data_channel_factory, {},
+        prewarm_count=2)
+    if bundle_processor_cache.periodic_shutdown:
+      bundle_processor_cache.periodic_shutdown.cancel()
+
+    descriptor = beam_fn_api_pb2.ProcessBundleDescriptor(id='descriptor_id')
+    with mock.patch.object(
+        sdk_worker.bundle_processor, 'BundleProcessor') as processor_cls, \
+        mock.patch.object(sdk_worker.threading, 'Thread') as thread_cls:
+      processor_cls.side_effect = lambda *args: mock.MagicMock()
+      bundle_processor_cache.register(descriptor)
+      # Run the prewarming synchronously.
+      _, kwargs = thread_cls.call_args
+      kwargs['target'](*kwargs['args'])
+      self.assertEqual(processor_cls.call_count, 2)
+      self.assertEqual(
+          len(bundle_processor_cache.cached_bundle_processors['descriptor_id']),
+          2)
+
+      bundle_processor_cache.get('instruction_id', 'descriptor_id')
+      self.assertEqual(processor_cls.call_count, 2)
+      self.assertEqual(
+          len(bundle_processor_cache.cached_bundle_processors['descriptor_id']),
+          1)
+
   def test_data_sampling_response(self):
     # Create a data sampler with some fake sampled data. This data will be seen
     # in the sample response.
@@ -649,6 +682,83 @@ class CachingStateHandlerTest(unittest.TestCase):
       self.assertEqual(get_type(), list)
       self.assertEqual(get(), [i for i in range(1000)])
 
+  def test_prefetch(self):
+    coder = VarIntCoder()
+
+    class PrefetchingStateHandler(self.UnderlyingStateHandler):
+      def __init__(self):
+        super().__init__()
+        self.requests = []
+
+      def get_raw(self, state_key, continuation_token=None):
+        self.requests.append(('get', state_key.bag_user_state.user_state_id))
+        return super().get_raw(state_key, continuation_token)
+
+      def get_raw_async(self, state_key, continuation_token=None):
+        self.requests.append(
+            ('prefetch', state_key.bag_user_state.user_state_id))
+        return sdk_worker._Future().set(
+            super().get_raw(state_key, continuation_token))
+
+    def state_key(name):
+      return beam_fn_api_pb2.StateKey(
+          bag_user_state=beam_fn_api_pb2.StateKey.BagUserState(
+              user_state_id=name))
+
+    cache_token = beam_fn_api_pb2.ProcessBundleRequest.CacheToken(
+        token=b'state_token1',
+        user_state=beam_fn_api_pb2.ProcessBundleRequest.CacheToken.UserState())
+
+    underlying_state_handler = PrefetchingStateHandler()
+    underlying_state_handler.set_value(42, coder)
+    handler = GlobalCachingStateHandler(
+        statecache.StateCache(100 << 20), underlying_state_handler)
+
+    with handler.process_instruction_id('bundle', [cache_token]):
+      handler.prefetch(state_key('state1'), coder.get_impl())
+      handler.prefetch(state_key('state2'), coder.get_impl())
+      # Pending prefetches are not issued twice.
+      handler.prefetch(state_key('state1'), coder.get_impl())
+      self.assertEqual(
+          underlying_state_handler.requests, [('prefetch', 'state1'),
+                                              ('prefetch', 'state2')])
+      self.assertEqual(
+          list(handler.blocking_get(state_key('state1'), coder.get_impl())),
+          [42])
+      # Neither are prefetches of cached state.
+      handler.prefetch(state_key('state1'), coder.get_impl())
+      # A write invalidates the pending prefetch.
+      handler.extend(state_key('state2'), coder.get_impl(), [43])
+      self.assertEqual(
+          list(handler.blocking_get(state_key('state2'), coder.get_impl())),
+          [42, 43])
+      self.assertEqual(
+          underlying_state_handler.requests,
+          [('prefetch', 'state1'), ('prefetch', 'state2'), ('get', 'state2')])
+
+    # Outstanding prefetches do not outlive their bundle.
+    with handler.process_instruction_id('bundle2', []):
+      handler.prefetch(state_key('state3'), coder.get_impl())
+    with handler.process_instruction_id('bundle3', []):
+      self.assertEqual(
+          list(handler.blocking_get(state_key('state3'), coder.get_impl())),
+          [42, 43])
+    self.assertEqual(
+        underlying_state_handler.requests[-2:], [('prefetch', 'state3'),
+                                                 ('get', 'state3')])
+
+  def test_prefetch_without_cache(self):
+    underlying_state_handler = mock.MagicMock()
+    handler = GlobalCachingStateHandler(
+        statecache.StateCache(0), underlying_state_handler)
+    with handler.process_instruction_id('bundle', []):
+      handler.prefetch(
+          beam_fn_api_pb2.StateKey(
+              bag_user_state=beam_fn_api_pb2.StateKey.BagUserState(
+                  user_state_id='state1')),
+          VarIntCoder().get_impl())
+    underlying_state_handler.get_raw_async.assert_not_called()
+
 
 class ShortIdCacheTest(unittest.TestCase):
   def testShortIdAssignment(self):
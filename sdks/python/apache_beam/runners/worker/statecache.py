@@ -302,10 +302,7 @@ class StateCache(object):
       self._current_weight -= loading_value.weight()
       self._cache[key] = value
       self._current_weight += value.weight()
-      while self._current_weight > self._max_weight:
-        (_, weighted_value) = self._cache.popitem(last=False)
-        self._current_weight -= weighted_value.weight()
-        self._evict_count += 1
+      self._evict(key)
 
     return value.value()
 
@@ -326,10 +323,17 @@ class StateCache(object):
         self._current_weight -= old_value.weight()
       self._cache[key] = value
       self._current_weight += value.weight()
-      while self._current_weight > self._max_weight:
-        (_, weighted_value) = self._cache.popitem(last=False)
-        self._current_weight -= weighted_value.weight()
-        self._evict_count += 1
+      self._evict(key)
+
+  def _evict(self, key: Any) -> None:
+    """Evicts entries until the cache fits its maximum weight.
+
+    Must be called while holding the lock, after key has been (re-)inserted.
+    """
+    while self._current_weight > self._max_weight:
+      (_, weighted_value) = self._cache.popitem(last=False)
+      self._current_weight -= weighted_value.weight()
+      self._evict_count += 1
 
   def invalidate(self, key: Any) -> None:
     assert self.is_cache_enabled()
@@ -368,3 +372,183 @@ class StateCache(object):
   def size(self) -> int:
     with self._lock:
       return len(self._cache)
+
+
+class _FrequencySketch(object):
+  """Estimates how often keys are accessed, for TinyLFU cache admission.
+
+  A count-min sketch with saturating 4-bit counters. Once the number of
+  recorded accesses reaches ten times the width of the sketch all counters are
+  halved, so that recent popularity outweighs historic popularity.
+
+  :arg width The number of counters per row, rounded up to a power of two.
+  """
+  _MAX_COUNT = 15
+  _SEEDS = (
+      0x9E3779B97F4A7C15,
+      0xC2B2AE3D27D4EB4F,
+      0x165667B19E3779F9,
+      0xD6E8FEB86659FD93)
+
+  def __init__(self, width: int) -> None:
+    self._shift = 64 - max(4, (width - 1).bit_length())
+    self._table = [bytearray(1 << (64 - self._shift)) for _ in self._SEEDS]
+    self._sample_size = 10 << (64 - self._shift)
+    self._additions = 0
+
+  def _indices(self, key: Any) -> list[int]:
+    # Spread the (possibly poorly distributed) hash over 64 bits, then take
+    # the top bits of a different multiplicative hash for each row.
+    h = hash(key) & 0xFFFFFFFFFFFFFFFF
+    h = ((h ^ (h >> 33)) * 0xFF51AFD7ED558CCD) & 0xFFFFFFFFFFFFFFFF
+    h ^= h >> 33
+    return [((h * seed) & 0xFFFFFFFFFFFFFFFF) >> self._shift
+            for seed in self._SEEDS]
+
+  def increment(self, key: Any) -> None:
+    for row, index in zip(self._table, self._indices(key)):
+      if row[index] < self._MAX_COUNT:
+        row[index] += 1
+    self._additions += 1
+    if self._additions >= self._sample_size:
+      self._table = [
+          bytearray(count >> 1 for count in row) for row in self._table
+      ]
+      self._additions >>= 1
+
+  def frequency(self, key: Any) -> int:
+    return min(
+        row[index] for row, index in zip(self._table, self._indices(key)))
+
+
+class _TinyLfuStateCacheShard(StateCache):
+  """LRU StateCache which only admits new entries that are accessed more
+  frequently than the entries they would evict."""
+  def __init__(self, max_weight: int, sketch_width: int) -> None:
+    super().__init__(max_weight)
+    self._sketch = _FrequencySketch(sketch_width)
+    self._reject_count = 0
+
+  def peek(self, key: Any) -> Any:
+    with self._lock:
+      self._sketch.increment(key)
+      return super().peek(key)
+
+  def get(self, key: Any, loading_fn: Callable[[Any], Any]) -> Any:
+    with self._lock:
+      self._sketch.increment(key)
+    return super().get(key, loading_fn)
+
+  def put(self, key: Any, value: Any) -> None:
+    with self._lock:
+      self._sketch.increment(key)
+    super().put(key, value)
+
+  def _evict(self, key: Any) -> None:
+    admitted = True
+    while self._current_weight > self._max_weight:
+      victim_key = next(iter(self._cache))
+      if admitted and victim_key != key and self._sketch.frequency(
+          key) <= self._sketch.frequency(victim_key):
+        # The candidate is no more popular than the least recently used entry,
+        # so drop the candidate instead of the hotter entry.
+        admitted = False
+        self._current_weight -= self._cache.pop(key).weight()
+        self._reject_count += 1
+        continue
+      self._current_weight -= self._cache.pop(victim_key).weight()
+      self._evict_count += 1
+
+  def describe_stats(self) -> str:
+    with self._lock:
+      return '%s, rejections %d' % (
+          super().describe_stats(), self._reject_count)
+
+
+class ShardedStateCache(StateCache):
+  """StateCache split into lock-striped shards with a TinyLFU admission policy.
+
+  Keys are distributed over num_shards independent LRU shards, each guarded by
+  its own lock and holding an equal part of max_weight, so that concurrent
+  bundles rarely contend on the same lock. When a shard is full, a new entry
+  is only admitted if it is estimated to be accessed more often than the entry
+  it would evict, which keeps large one-off reads from flushing hot entries.
+
+  :arg max_weight The maximum weight of entries to store in the cache in bytes.
+  :arg num_shards The number of shards to split the cache into.
+  """
+  # Expected weight of a cached entry, used to size the frequency sketches.
+  _EXPECTED_ENTRY_WEIGHT = 1 << 10
+
+  def __init__(self, max_weight: int, num_shards: int) -> None:
+    if num_shards <= 0:
+      raise ValueError('Expected num_shards to be > 0 but was %d' % num_shards)
+    # The entries are held by the shards, so the cache of the base class stays
+    # empty.
+    super().__init__(max_weight)
+    _LOGGER.info('Splitting state cache into %d shards', num_shards)
+    shard_weight = max_weight // num_shards
+    if max_weight > 0:
+      shard_weight = max(shard_weight, 1)
+    sketch_width = max(
+        shard_weight // self._EXPECTED_ENTRY_WEIGHT, 1) if max_weight else 1
+    self._shards = [
+        _TinyLfuStateCacheShard(shard_weight, sketch_width)
+        for _ in range(num_shards)
+    ]
+
+  def _shard(self, key: Any) -> _TinyLfuStateCacheShard:
+    return self._shards[hash(key) % len(self._shards)]
+
+  def peek(self, key: Any) -> Any:
+    assert self.is_cache_enabled()
+    return self._shard(key).peek(key)
+
+  def get(self, key: Any, loading_fn: Callable[[Any], Any]) -> Any:
+    assert self.is_cache_enabled()
+    return self._shard(key).get(key, loading_fn)
+
+  def put(self, key: Any, value: Any) -> None:
+    assert self.is_cache_enabled()
+    self._shard(key).put(key, value)
+
+  def _evict(self, key: Any) -> None:
+    shard = self._shard(key)
+    with shard._lock:
+      shard._evict(key)
+
+  def invalidate(self, key: Any) -> None:
+    assert self.is_cache_enabled()
+    self._shard(key).invalidate(key)
+
+  def invalidate_all(self) -> None:
+    for shard in self._shards:
+      shard.invalidate_all()
+
+  def describe_stats(self) -> str:
+    current_weight = hit_count = request_count = 0
+    shard_stats = []
+    for i, shard in enumerate(self._shards):
+      with shard._lock:
+        current_weight += shard._current_weight
+        hit_count += shard._hit_count
+        request_count += shard._hit_count + shard._miss_count
+        shard_stats.append('shard %d: %s' % (i, shard.describe_stats()))
+    if request_count > 0:
+      hit_ratio = 100.0 * hit_count / request_count
+    else:
+      hit_ratio = 100.0
+    return '\n'.join([
+        'used/max %d/%d MB, hit %.2f%%, lookups %d, shards %d' % (
+            current_weight >> 20,
+            self._max_weight >> 20,
+            hit_ratio,
+            request_count,
+            len(self._shards))
+    ] + shard_stats)
+
+  def is_cache_enabled(self) -> bool:
+    return self._max_weight > 0
+
+  def size(self) -> int:
+    return sum(shard.size() for shard in self._shards)
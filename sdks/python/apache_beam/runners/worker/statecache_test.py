@@ -31,6 +31,7 @@ from hamcrest import assert_that
 from hamcrest import contains_string
 
 from apache_beam.runners.worker.statecache import CacheAware
+from apache_beam.runners.worker.statecache import ShardedStateCache
 from apache_beam.runners.worker.statecache import StateCache
 from apache_beam.runners.worker.statecache import WeightedValue
 from apache_beam.runners.worker.statecache import _LoadingValue
@@ -413,6 +414,95 @@ class StateCacheTest(unittest.TestCase):
     self.assertEqual(get_cache._current_weight, put_cache._current_weight)
 
 
+class ShardedStateCacheTest(unittest.TestCase):
+  def test_put_peek_invalidate(self):
+    cache = ShardedStateCache(16 << 20, 4)
+    self.assertTrue(cache.is_cache_enabled())
+    for i in range(8):
+      cache.put("key%d" % i, WeightedValue("value%d" % i, 1 << 10))
+    self.assertEqual(cache.size(), 8)
+    self.assertEqual([cache.peek("key%d" % i) for i in range(8)],
+                     ["value%d" % i for i in range(8)])
+    cache.invalidate("key0")
+    self.assertEqual(cache.peek("key0"), None)
+    self.assertEqual(cache.size(), 7)
+    cache.invalidate_all()
+    self.assertEqual(cache.size(), 0)
+
+  def test_get(self):
+    cache = ShardedStateCache(16 << 20, 4)
+    self.assertEqual(cache.get("key", lambda key: key + "_value"), "key_value")
+    self.assertEqual(cache.get("key", lambda key: "reloaded"), "key_value")
+    assert_that(
+        cache.describe_stats(),
+        contains_string('hit 50.00%, lookups 2, shards 4'))
+
+  def test_base_class_state(self):
+    cache = ShardedStateCache(16 << 20, 4)
+    self.assertIsInstance(cache, StateCache)
+    cache.put("key", WeightedValue("value", 1 << 10))
+    # Methods of the base class find its attributes, while the entries are
+    # held by the shards.
+    with cache._lock:
+      self.assertEqual(len(cache._cache), 0)
+    cache._evict("key")
+    self.assertEqual(cache.peek("key"), "value")
+    self.assertEqual(cache.size(), 1)
+
+  def test_disabled(self):
+    self.assertFalse(ShardedStateCache(0, 4).is_cache_enabled())
+    with self.assertRaises(ValueError):
+      ShardedStateCache(1 << 20, 0)
+
+  def test_frequent_entries_are_not_flushed_by_scan(self):
+    cache = ShardedStateCache(4 << 20, 1)
+    for _ in range(3):
+      for i in range(4):
+        cache.put("hot%d" % i, WeightedValue("hot", 1 << 20))
+    # A scan over many entries that are each accessed once.
+    for i in range(100):
+      cache.put("scan%d" % i, WeightedValue("scan", 1 << 20))
+    self.assertEqual([cache.peek("hot%d" % i) for i in range(4)], ["hot"] * 4)
+    self.assertEqual(cache.size(), 4)
+    assert_that(cache.describe_stats(), contains_string('rejections 100'))
+
+  def test_frequent_entries_are_admitted(self):
+    cache = ShardedStateCache(2 << 20, 1)
+    cache.put("old1", WeightedValue("old", 1 << 20))
+    cache.put("old2", WeightedValue("old", 1 << 20))
+    for _ in range(3):
+      cache.put("new", WeightedValue("new", 1 << 20))
+    self.assertEqual(cache.peek("new"), "new")
+    self.assertEqual(cache.size(), 2)
+    assert_that(cache.describe_stats(), contains_string('evictions 1'))
+
+  def test_per_shard_stats(self):
+    cache = ShardedStateCache(4 << 20, 2)
+    cache.peek("key")
+    stats = cache.describe_stats().split('\n')
+    self.assertEqual(len(stats), 3)
+    self.assertTrue(stats[1].startswith('shard 0: used/max 0/2 MB'))
+    self.assertTrue(stats[2].startswith('shard 1: used/max 0/2 MB'))
+    assert_that(cache.describe_stats(), contains_string('lookups 1, shards 2'))
+
+  def test_concurrent_access(self):
+    cache = ShardedStateCache(1 << 20, 8)
+
+    def access(thread_index):
+      for i in range(200):
+        key = "key%d" % ((thread_index * 7 + i) % 50)
+        cache.put(key, WeightedValue(key, 1 << 10))
+        value = cache.peek(key)
+        self.assertIn(value, (key, None))
+
+    threads = [threading.Thread(target=access, args=(i, )) for i in range(8)]
+    for thread in threads:
+      thread.start()
+    for thread in threads:
+      thread.join()
+    self.assertLessEqual(cache.size(), 50)
+
+
 if __name__ == '__main__':
   logging.getLogger().setLevel(logging.INFO)
   unittest.main()
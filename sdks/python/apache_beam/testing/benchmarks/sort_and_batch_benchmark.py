@@ -24,6 +24,9 @@ running the actual Beam transforms under DirectRunner:
   ``min_batch_size == max_batch_size``.
 - Stateless (SortAndBatchElements): sorts elements by size within each runner
   bundle, then splits batches using ``max_batch_weight``.
+- Spilling (SortAndBatchElements with ``max_buffer_weight``): as Stateless,
+  but holds at most ``max_buffer_weight`` of each bundle in memory and spills
+  the rest to local disk as sorted runs.
 
 The benchmark materializes per-batch summaries through a temporary Beam sink and
 analyzes them after the pipeline completes. This keeps the benchmark on the
@@ -53,6 +56,13 @@ Methodology:
 - Inference model: latency = batch_size * (max_seq_len / 50)^1.5 ms
   (simulates downstream transformer-like scaling).
 
+Memory benchmark:
+
+- Each strategy runs once on a larger corpus in a freshly spawned process,
+  so that its peak resident set size (RSS) is not inflated by earlier runs.
+- Reports the peak RSS of that process, its growth over the RSS before the
+  pipeline ran, and the throughput of the pipeline in input tokens per second.
+
 Run::
 
   python3 -m apache_beam.testing.benchmarks.sort_and_batch_benchmark
@@ -61,8 +71,10 @@ Run::
 import glob
 import json
 import math
+import multiprocessing
 import os
 import random
+import resource
 import statistics
 import tempfile
 import time
@@ -187,8 +199,11 @@ def _read_batch_summaries(output_prefix: str) -> list[dict[str, int]]:
 
 
 def _run_batching_pipeline(
-    strategy: str, data: list[str], max_batch_size: int,
-    max_batch_weight: int) -> tuple[list[dict[str, int]], float]:
+    strategy: str,
+    data: list[str],
+    max_batch_size: int,
+    max_batch_weight: int,
+    max_buffer_weight: int = 100000) -> tuple[list[dict[str, int]], float]:
   """Runs one Beam pipeline and returns batch summaries plus runtime."""
   with tempfile.TemporaryDirectory(prefix='beam_batch_benchmark_') as temp_dir:
     output_prefix = os.path.join(temp_dir, strategy)
@@ -203,6 +218,12 @@ def _run_batching_pipeline(
           min_batch_size=1,
           max_batch_size=max_batch_size,
           max_batch_weight=max_batch_weight)
+    elif strategy == 'spilling':
+      batched = batched | 'SortAndBatchElements' >> util.SortAndBatchElements(
+          min_batch_size=1,
+          max_batch_size=max_batch_size,
+          max_batch_weight=max_batch_weight,
+          max_buffer_weight=max_buffer_weight)
     else:
       raise ValueError(f'Unknown strategy: {strategy}')
 
@@ -403,6 +424,83 @@ def run_performance_benchmark(
   )
 
 
+# ---------------------------------------------------------------------------
+# Memory benchmark
+# ---------------------------------------------------------------------------
+
+
+def _peak_rss_mb() -> float:
+  # ru_maxrss is in kilobytes on Linux.
+  return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _measure_pipeline(
+    strategy: str,
+    num_elements: int,
+    max_batch_size: int,
+    max_batch_weight: int,
+    max_buffer_weight: int,
+    seed: int) -> dict[str, Any]:
+  """Runs one pipeline and measures the peak RSS of the current process."""
+  data = generate_lognormal_data(num_elements, seed=seed)
+  rss_before_mb = _peak_rss_mb()
+  summaries, runtime_ms = _run_batching_pipeline(
+      strategy, data, max_batch_size, max_batch_weight, max_buffer_weight)
+  peak_rss_mb = _peak_rss_mb()
+  return {
+      'peak_rss_mb': peak_rss_mb,
+      'rss_growth_mb': peak_rss_mb - rss_before_mb,
+      'runtime_ms': runtime_ms,
+      'tput_tokens_per_sec': sum(len(s) for s in data) / (runtime_ms / 1000),
+      'num_batches': len(summaries),
+      'padding_ratio': compute_padding_stats(summaries)['padding_ratio'],
+  }
+
+
+def run_memory_benchmark(
+    num_elements: int = 200000,
+    max_batch_size: int = 32,
+    max_batch_weight: int = 2000,
+    max_buffer_weight: int = 100000,
+    seed: int = 42) -> dict[str, dict[str, Any]]:
+  """Measures each strategy in its own spawned process."""
+  context = multiprocessing.get_context('spawn')
+  results = {}
+  for strategy in ('baseline', 'stateless', 'spilling'):
+    with context.Pool(1) as pool:
+      results[strategy] = pool.apply(
+          _measure_pipeline,
+          (
+              strategy,
+              num_elements,
+              max_batch_size,
+              max_batch_weight,
+              max_buffer_weight,
+              seed))
+  return results
+
+
+def print_memory_results(
+    results: dict[str, dict[str, Any]],
+    num_elements: int,
+    max_buffer_weight: int) -> None:
+  print("=" * 80)
+  print(
+      f"Memory: lognormal  |  N={num_elements}  |  "
+      f"max_buffer_weight={max_buffer_weight}")
+  print("-" * 80)
+  print(
+      f"  {'Strategy':<12}{'Peak RSS':>12}{'RSS growth':>14}"
+      f"{'Ktok/s':>10}{'Batches':>10}{'Padding':>10}")
+  for strategy, r in results.items():
+    print(
+        f"  {strategy:<12}{r['peak_rss_mb']:>9.1f} MB"
+        f"{r['rss_growth_mb']:>11.1f} MB"
+        f"{r['tput_tokens_per_sec'] / 1000:>10.1f}"
+        f"{r['num_batches']:>10}{r['padding_ratio']:>9.2f}x")
+  print("=" * 80)
+
+
 # ---------------------------------------------------------------------------
 # Single benchmark run
 # ---------------------------------------------------------------------------
@@ -650,6 +748,15 @@ def main():
       seed=42)
   print_results(r)
 
+  print("\nRunning: memory...")
+  num_elements = 200000
+  max_buffer_weight = 100000
+  print_memory_results(
+      run_memory_benchmark(
+          num_elements=num_elements, max_buffer_weight=max_buffer_weight),
+      num_elements,
+      max_buffer_weight)
+
 
 if __name__ == '__main__':
   main()
@@ -202,6 +202,10 @@ def globally_windowed_value():
       value=small_int(), timestamp=12345678, windows=(window.GlobalWindow(), ))
 
 
+def batch_windowed_value():
+  return window.GlobalWindows.windowed_value(small_int())
+
+
 def random_windowed_value(num_windows):
   return windowed_value.WindowedValue(
       value=small_int(),
@@ -301,6 +305,10 @@ def run_coder_benchmarks(
           coders.WindowedValueCoder(
               coders.FastPrimitivesCoder(), coders.GlobalWindowCoder()),
           globally_windowed_value),
+      coder_benchmark_factory(
+          coders.WindowedValueCoder(
+              coders.FastPrimitivesCoder(), coders.GlobalWindowCoder()),
+          batch_windowed_value),
       coder_benchmark_factory(
           coders.LengthPrefixCoder(coders.FastPrimitivesCoder()), small_int),
       row_coder_benchmark_factory(tiny_row),
@@ -24,6 +24,7 @@ from importlib.metadata import PackageNotFoundError
 from importlib.metadata import distribution
 
 from apache_beam.tools import coders_microbenchmark
+from apache_beam.tools import trigger_microbenchmark
 from apache_beam.tools import utils
 
 
@@ -34,6 +35,10 @@ class MicrobenchmarksTest(unittest.TestCase):
     coders_microbenchmark.run_coder_benchmarks(
         num_runs=1, input_size=10, seed=1, verbose=False)
 
+  def test_trigger_microbenchmark(self):
+    trigger_microbenchmark.run_trigger_benchmarks(
+        num_runs=1, input_size=1000, verbose=False)
+
   def is_cython_installed(self):
     try:
       distribution('cython')
@@ -28,6 +28,10 @@ stage does the following:
 3) When the watermark passes, change the key and output all the elements
 4) Go back to #1 until all elements in the stream have been consumed.
 
+A second benchmark keeps the number of elements fixed and scales the number of
+transforms instead, each of which holds an event time timer for every key. This
+measures the overhead of the watermark and timer bookkeeping of the runner.
+
 This executes the same codepaths that are run on the Fn API (and Dataflow)
 workers, but is generally easier to run (locally) and more stable.
 
@@ -49,6 +53,10 @@ from apache_beam import WindowInto
 from apache_beam.runners import DirectRunner
 from apache_beam.testing.test_stream import TestStream
 from apache_beam.tools import utils
+from apache_beam.transforms.timeutil import TimeDomain
+from apache_beam.transforms.userstate import BagStateSpec
+from apache_beam.transforms.userstate import TimerSpec
+from apache_beam.transforms.userstate import on_timer
 from apache_beam.transforms.window import FixedWindows
 from apache_beam.typehints import typehints
 
@@ -56,6 +64,10 @@ NUM_PARALLEL_STAGES = 7
 
 NUM_SERIAL_STAGES = 6
 
+NUM_ELEMENTS_PER_STAGE = 1000
+
+NUM_KEYS = 1000
+
 
 class RekeyElements(beam.DoFn):
   def process(self, element):
@@ -98,11 +110,58 @@ def run_single_pipeline(size):
   return _pipeline_runner
 
 
+class BufferUntilWatermark(beam.DoFn):
+  """Buffers the values of each key until the watermark passes them."""
+  BUFFER = BagStateSpec('buffer', beam.coders.VarIntCoder())
+  FLUSH = TimerSpec('flush', TimeDomain.WATERMARK)
+
+  def process(
+      self,
+      element,
+      timestamp=beam.DoFn.TimestampParam,
+      buffer=beam.DoFn.StateParam(BUFFER),
+      flush=beam.DoFn.TimerParam(FLUSH)):
+    _, value = element
+    buffer.add(value)
+    flush.set(timestamp + 500)
+
+  @on_timer(FLUSH)
+  def flush(self, key=beam.DoFn.KeyParam, buffer=beam.DoFn.StateParam(BUFFER)):
+    values = list(buffer.read())
+    buffer.clear()
+    yield key, sum(values)
+
+
+def run_many_stages_pipeline(num_stages):
+  def _pipeline_runner():
+    with beam.Pipeline(runner=DirectRunner()) as p:
+      ts = TestStream().advance_watermark_to(0)
+      for watermark in range(0, NUM_ELEMENTS_PER_STAGE, 100):
+        ts = ts.add_elements([
+            beam.window.TimestampedValue((i % NUM_KEYS, i), watermark)
+            for i in range(watermark, watermark + 100)
+        ])
+        ts = ts.advance_watermark_to(watermark + 100)
+      ts = ts.advance_watermark_to_infinity()
+
+      input_pc = p | ts
+      for i in range(num_stages):
+        _ = input_pc | ('stage%s' % i) >> beam.ParDo(BufferUntilWatermark())
+
+  return _pipeline_runner
+
+
 def run_benchmark(
-    starting_point=1, num_runs=10, num_elements_step=300, verbose=True):
+    starting_point=1,
+    num_runs=10,
+    num_elements_step=300,
+    num_stages_step=10,
+    verbose=True):
   suite = [
       utils.LinearRegressionBenchmarkConfig(
-          run_single_pipeline, starting_point, num_elements_step, num_runs)
+          run_single_pipeline, starting_point, num_elements_step, num_runs),
+      utils.LinearRegressionBenchmarkConfig(
+          run_many_stages_pipeline, starting_point, num_stages_step, num_runs),
   ]
   return utils.run_benchmarks(suite, verbose=verbose)
 
@@ -115,6 +174,7 @@ if __name__ == '__main__':
   parser.add_argument('--num_runs', default=10, type=int)
   parser.add_argument('--starting_point', default=1, type=int)
   parser.add_argument('--increment', default=300, type=int)
+  parser.add_argument('--stages_increment', default=10, type=int)
   parser.add_argument('--verbose', default=True, type=bool)
   options = parser.parse_args()
 
@@ -122,4 +182,5 @@ if __name__ == '__main__':
       options.starting_point,
       options.num_runs,
       options.increment,
+      options.stages_increment,
       options.verbose)
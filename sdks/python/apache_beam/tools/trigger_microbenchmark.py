@@ -0,0 +1,148 @@
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""A microbenchmark for measuring performance of trigger evaluation.
+
+This feeds bundles of elements of many keys to the GeneralTriggerDriver, as
+the DirectRunner does, and then fires the timers set by the trigger. It is run
+for each trigger type.
+
+Run as:
+  python -m apache_beam.tools.trigger_microbenchmark
+"""
+
+# pytype: skip-file
+
+import argparse
+import logging
+import re
+
+from apache_beam.runners.direct.clock import TestClock
+from apache_beam.tools import utils
+from apache_beam.transforms import trigger
+from apache_beam.transforms import window
+from apache_beam.transforms.core import Windowing
+from apache_beam.transforms.timeutil import TimeDomain
+from apache_beam.utils.timestamp import MAX_TIMESTAMP
+from apache_beam.utils.timestamp import MIN_TIMESTAMP
+from apache_beam.utils.windowed_value import WindowedValue
+
+NUM_KEYS = 100
+ELEMENTS_PER_BUNDLE = 50
+WINDOW_SIZE = 10
+
+TRIGGERS = [
+    trigger.DefaultTrigger(),
+    trigger.AfterWatermark(
+        early=trigger.AfterCount(100), late=trigger.AfterCount(1)),
+    trigger.AfterCount(1000),
+    trigger.Repeatedly(trigger.AfterCount(100)),
+    trigger.Repeatedly(
+        trigger.AfterAny(
+            trigger.AfterCount(100), trigger.AfterProcessingTime(60))),
+    trigger.Repeatedly(
+        trigger.AfterAll(trigger.AfterCount(50), trigger.AfterCount(100))),
+    trigger.AfterEach(trigger.AfterCount(100), trigger.AfterCount(200)),
+    trigger.AfterProcessingTime(10),
+    trigger.Always(),
+]
+
+
+def trigger_benchmark_factory(trigger_fn):
+  """Creates a benchmark that triggers the windows of many keys.
+
+  Args:
+    trigger_fn: the TriggerFn to evaluate.
+  """
+  class TriggerBenchmark(object):
+    def __init__(self, num_elements_per_benchmark):
+      windowing = Windowing(
+          window.FixedWindows(WINDOW_SIZE),
+          trigger_fn,
+          trigger.AccumulationMode.DISCARDING)
+      self._driver = trigger.GeneralTriggerDriver(windowing, TestClock())
+      # Each bundle holds elements of a single key, spread over two windows.
+      self._bundles = []
+      for i in range(0, num_elements_per_benchmark, ELEMENTS_PER_BUNDLE):
+        key = (i // ELEMENTS_PER_BUNDLE) % NUM_KEYS
+        self._bundles.append((
+            key,
+            [
+                WindowedValue(
+                    j,
+                    j % (2 * WINDOW_SIZE),
+                    (
+                        window.IntervalWindow(
+                            j % 2 * WINDOW_SIZE, (j % 2 + 1) * WINDOW_SIZE), ))
+                for j in range(ELEMENTS_PER_BUNDLE)
+            ]))
+
+    def __call__(self):
+      driver = self._driver
+      states = {}
+      for key, windowed_values in self._bundles:
+        state = states.get(key)
+        if state is None:
+          state = states[key] = trigger.InMemoryUnmergedState()
+        for _ in driver.process_elements(state,
+                                         windowed_values,
+                                         MIN_TIMESTAMP,
+                                         MIN_TIMESTAMP):
+          pass
+      for state in states.values():
+        fired, _ = state.get_timers(
+            clear=True, watermark=MAX_TIMESTAMP, processing_time=MAX_TIMESTAMP)
+        for timer_window, (name, time_domain, timestamp, _) in fired:
+          for _ in driver.process_timer(
+              timer_window,
+              name,
+              time_domain,
+              timestamp
+              if time_domain == TimeDomain.WATERMARK else MAX_TIMESTAMP,
+              state):
+            pass
+
+  TriggerBenchmark.__name__ = str(trigger_fn)
+
+  return TriggerBenchmark
+
+
+def run_trigger_benchmarks(num_runs, input_size, verbose, filter_regex='.*'):
+  suite = [
+      utils.BenchmarkConfig(
+          trigger_benchmark_factory(trigger_fn), input_size, num_runs)
+      for trigger_fn in TRIGGERS
+      if re.search(filter_regex, str(trigger_fn), flags=re.I)
+  ]
+  return utils.run_benchmarks(suite, verbose=verbose)
+
+
+if __name__ == '__main__':
+  logging.basicConfig()
+
+  parser = argparse.ArgumentParser()
+  parser.add_argument('--filter', default='.*')
+  parser.add_argument('--num_runs', default=10, type=int)
+  parser.add_argument('--num_elements_per_benchmark', default=100000, type=int)
+  options = parser.parse_args()
+
+  utils.check_compiled('apache_beam.utils.windowed_value')
+
+  run_trigger_benchmarks(
+      options.num_runs,
+      options.num_elements_per_benchmark,
+      verbose=True,
+      filter_regex=options.filter)
@@ -19,10 +19,16 @@
 
 """a collection of ptransforms for deduplicating elements."""
 
+import hashlib
+import math
+import struct
 import typing
 
+from apache_beam import coders
 from apache_beam import typehints
 from apache_beam.coders.coders import BooleanCoder
+from apache_beam.coders.coders import TupleCoder
+from apache_beam.coders.coders import VarIntCoder
 from apache_beam.transforms import core
 from apache_beam.transforms import ptransform
 from apache_beam.transforms import userstate
@@ -30,12 +36,14 @@ from apache_beam.transforms.timeutil import TimeDomain
 from apache_beam.utils import timestamp
 
 __all__ = [
+    'ApproximateDeduplicate',
     'Deduplicate',
     'DeduplicatePerKey',
 ]
 
 K = typing.TypeVar('K')
 V = typing.TypeVar('V')
+T = typing.TypeVar('T')
 
 
 @typehints.with_input_types(tuple[K, V])
@@ -129,3 +137,275 @@ class Deduplicate(ptransform.PTransform):
             processing_time_duration=self.processing_time_duration,
             event_time_duration=self.event_time_duration)
         | 'Output Value' >> core.Map(lambda kv: kv[0]))
+
+
+_MASK_64 = (1 << 64) - 1
+
+
+class _BloomFilter(object):
+  """A Bloom filter of 128-bit fingerprints.
+
+  The bits are only allocated once the filter holds enough fingerprints to
+  make them smaller than a set of the fingerprints. Until then the
+  fingerprints are kept, and answer membership exactly.
+  """
+  def __init__(self, num_bits, num_hashes):
+    self._num_bits = num_bits
+    self._num_hashes = num_hashes
+    self._bits = None
+    self._fingerprints = set()
+
+  def _positions(self, fingerprint):
+    # Double hashing with the two halves of the fingerprint.
+    h1 = fingerprint >> 64
+    h2 = (fingerprint & _MASK_64) | 1
+    num_bits = self._num_bits
+    return [(h1 + i * h2) % num_bits for i in range(self._num_hashes)]
+
+  def _allocate(self):
+    self._bits = bytearray((self._num_bits + 7) // 8)
+    fingerprints, self._fingerprints = self._fingerprints, set()
+    for fingerprint in fingerprints:
+      self.add(fingerprint)
+
+  def add(self, fingerprint):
+    if self._bits is None:
+      self._fingerprints.add(fingerprint)
+      # A fingerprint in a set takes about 512 bits.
+      if len(self._fingerprints) * 512 > self._num_bits:
+        self._allocate()
+    else:
+      bits = self._bits
+      for position in self._positions(fingerprint):
+        bits[position >> 3] |= 1 << (position & 7)
+
+  def update(self, other):
+    """Adds all the fingerprints of another filter of the same size."""
+    if other._bits is not None:
+      if self._bits is None:
+        self._allocate()
+      self._bits[:] = (
+          int.from_bytes(self._bits, 'little')
+          | int.from_bytes(other._bits, 'little')).to_bytes(
+              len(self._bits), 'little')
+    for fingerprint in other._fingerprints:
+      self.add(fingerprint)
+
+  def __contains__(self, fingerprint):
+    if self._bits is None:
+      return fingerprint in self._fingerprints
+    bits = self._bits
+    return all(
+        bits[position >> 3] & (1 << (position & 7))
+        for position in self._positions(fingerprint))
+
+
+class _BloomFilterCombineFn(core.CombineFn):
+  """Combines fingerprints into a _BloomFilter."""
+  def __init__(self, num_bits, num_hashes):
+    self._num_bits = num_bits
+    self._num_hashes = num_hashes
+
+  def create_accumulator(self):
+    return _BloomFilter(self._num_bits, self._num_hashes)
+
+  def add_input(self, accumulator, fingerprint):
+    accumulator.add(fingerprint)
+    return accumulator
+
+  def merge_accumulators(self, accumulators):
+    accumulators = list(accumulators)
+    if not accumulators:
+      return self.create_accumulator()
+    # Merge into a filter whose bits are allocated, if any, to avoid copying
+    # them.
+    accumulators.sort(key=lambda a: a._bits is None)
+    result = accumulators[0]
+    for accumulator in accumulators[1:]:
+      result.update(accumulator)
+    return result
+
+  def extract_output(self, accumulator):
+    return accumulator
+
+
+class _BloomFilterCoder(coders.Coder):
+  """Encodes a _BloomFilter as a header followed by its bits, or by its
+  fingerprints if its bits are not allocated."""
+  # The number of bits and hashes, and whether the bits are allocated.
+  _HEADER = struct.Struct('<QIB')
+
+  def encode(self, value):
+    header = self._HEADER.pack(
+        value._num_bits, value._num_hashes, value._bits is not None)
+    if value._bits is not None:
+      return header + value._bits
+    return header + b''.join(
+        fingerprint.to_bytes(16, 'little')
+        for fingerprint in value._fingerprints)
+
+  def decode(self, encoded):
+    num_bits, num_hashes, allocated = self._HEADER.unpack_from(encoded)
+    value = _BloomFilter(num_bits, num_hashes)
+    if allocated:
+      value._bits = bytearray(encoded[self._HEADER.size:])
+    else:
+      value._fingerprints = set(
+          int.from_bytes(encoded[i:i + 16], 'little')
+          for i in range(self._HEADER.size, len(encoded), 16))
+    return value
+
+  def is_deterministic(self):
+    return False
+
+
+def _fingerprint(encoded):
+  """Returns a 32-bit bucket hash and a 128-bit fingerprint of encoded."""
+  digest = hashlib.blake2b(encoded, digest_size=20).digest()
+  return (
+      int.from_bytes(digest[:4], 'little'),
+      int.from_bytes(digest[4:], 'little'))
+
+
+@typehints.with_input_types(T)
+@typehints.with_output_types(T)
+class ApproximateDeduplicate(ptransform.PTransform):
+  """Like Deduplicate, but with state and timers bounded by a number of buckets.
+
+  Deduplicate keeps state and sets timers for every distinct value, which
+  dominates the cost of deduplicating billions of IDs. ApproximateDeduplicate
+  instead hashes each value into one of num_buckets buckets. Every bucket keeps
+  two generations of Bloom filters of the values it has seen, in combining
+  state. Time is split into generations of the given duration, and the oldest
+  filter of a bucket is dropped when a value of a new generation reaches it,
+  so a value is deduplicated against the values of the same and the previous
+  generation. No timers are set.
+
+  Unlike Deduplicate, a value may be dropped although it is not a duplicate,
+  with a probability of about false_positive_rate for as long as a bucket sees
+  at most max_elements_per_bucket distinct values per generation. As a value is
+  checked against two filters, each of them is sized for half of that rate.
+  Values are encoded with a deterministic coder of the input type to be hashed.
+
+  Values in different windows will NOT be considered duplicates of each other.
+  Does not preserve any order the input PCollection might have had.
+  """
+  def __init__(
+      self,
+      processing_time_duration=None,
+      event_time_duration=None,
+      num_buckets=1024,
+      max_elements_per_bucket=100000,
+      false_positive_rate=0.001):
+    if processing_time_duration is None and event_time_duration is None:
+      raise ValueError(
+          'ApproximateDeduplicate requires at least providing either '
+          'processing_time_duration or event_time_duration.')
+    if num_buckets < 1:
+      raise ValueError('num_buckets must be positive: %s' % num_buckets)
+    if max_elements_per_bucket < 1:
+      raise ValueError(
+          'max_elements_per_bucket must be positive: %s' %
+          max_elements_per_bucket)
+    if not 0 < false_positive_rate < 1:
+      raise ValueError(
+          'false_positive_rate must be between 0 and 1: %s' %
+          false_positive_rate)
+    self.processing_time_duration = processing_time_duration
+    self.event_time_duration = event_time_duration
+    self.num_buckets = num_buckets
+    self.max_elements_per_bucket = max_elements_per_bucket
+    self.false_positive_rate = false_positive_rate
+
+  def _create_combine_fn(self):
+    num_bits = math.ceil(
+        -self.max_elements_per_bucket * math.log(self.false_positive_rate / 2) /
+        math.log(2)**2)
+    num_hashes = max(
+        1, round(num_bits / self.max_elements_per_bucket * math.log(2)))
+    return _BloomFilterCombineFn(num_bits, num_hashes)
+
+  def _create_deduplicate_fn(self, coder):
+    generation_spec = userstate.ReadModifyWriteStateSpec(
+        'generation', TupleCoder([VarIntCoder()] * 3))
+    combine_fn = self._create_combine_fn()
+    filter_specs = [
+        userstate.CombiningValueStateSpec(
+            'filter_%d' % ix, _BloomFilterCoder(), combine_fn)
+        for ix in range(2)
+    ]
+    processing_time_micros = (
+        timestamp.Duration.of(self.processing_time_duration).micros
+        if self.processing_time_duration is not None else None)
+    event_time_micros = (
+        timestamp.Duration.of(self.event_time_duration).micros
+        if self.event_time_duration is not None else None)
+
+    class ApproximateDeduplicationFn(core.DoFn):
+      def process(
+          self,
+          element,
+          ts=core.DoFn.TimestampParam,
+          generation_state=core.DoFn.StateParam(generation_spec),
+          filter_0=core.DoFn.StateParam(filter_specs[0]),
+          filter_1=core.DoFn.StateParam(filter_specs[1])):
+        _, value = element
+        # The fingerprint is computed again rather than shuffled with the
+        # value, as it is cheaper than encoding it.
+        _, fingerprint = _fingerprint(coder.encode(value))
+        processing_generation = (
+            timestamp.Timestamp.now().micros //
+            processing_time_micros if processing_time_micros else 0)
+        event_generation = (
+            ts.micros // event_time_micros if event_time_micros else 0)
+
+        generation = generation_state.read()
+        if generation is None:
+          rotations = 0
+          generation_state.write(
+              (rotations, processing_generation, event_generation))
+        else:
+          rotations, last_processing, last_event = generation
+          # Late values belong to the latest generation.
+          processing_generation = max(processing_generation, last_processing)
+          event_generation = max(event_generation, last_event)
+          steps = max(
+              processing_generation - last_processing,
+              event_generation - last_event)
+          if steps:
+            # The filter of the previous generation is dropped, and is reused
+            # for the new one.
+            rotations += 1
+            if steps > 1:
+              filter_0.clear()
+              filter_1.clear()
+            else:
+              (filter_1 if rotations % 2 else filter_0).clear()
+            generation_state.write(
+                (rotations, processing_generation, event_generation))
+
+        current, previous = (
+            (filter_1, filter_0) if rotations % 2 else (filter_0, filter_1))
+        if fingerprint in current.read() or fingerprint in previous.read():
+          return
+        current.add(fingerprint)
+        yield value
+
+    return ApproximateDeduplicationFn()
+
+  def expand(self, pcoll):
+    element_type = pcoll.element_type or typing.Any
+    coder = coders.registry.get_coder(element_type).as_deterministic_coder(
+        self.label)
+    num_buckets = self.num_buckets
+
+    def key_by_bucket(value):
+      bucket_hash, _ = _fingerprint(coder.encode(value))
+      return bucket_hash % num_buckets, value
+
+    return (
+        pcoll
+        | 'KeyByBucket' >> core.Map(key_by_bucket).with_output_types(
+            tuple[int, element_type])
+        | 'ApproximateDeduplicateFn' >> core.ParDo(
+            self._create_deduplicate_fn(coder)).with_output_types(element_type))
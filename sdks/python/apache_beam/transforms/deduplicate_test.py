@@ -19,6 +19,7 @@
 
 """Unit tests for deduplicate transform by using TestStream."""
 
+import pickle
 import unittest
 
 import pytest
@@ -163,5 +164,100 @@ class DeduplicateTest(unittest.TestCase):
                     ('k3', Timestamp(30)), ('k1', Timestamp(70))]))
 
 
+class ApproximateDeduplicateTest(unittest.TestCase):
+  def test_approximate_deduplication(self):
+    with TestPipeline() as p:
+      res = (
+          p
+          | beam.Create(list(range(1000)) * 3)
+          | deduplicate.ApproximateDeduplicate(
+              processing_time_duration=10 * 60,
+              num_buckets=16,
+              max_elements_per_bucket=1000,
+              false_positive_rate=1e-6))
+      assert_that(res, equal_to(list(range(1000))))
+
+  def test_approximate_deduplication_with_event_time(self):
+    with TestPipeline() as p:
+      test_stream = (
+          TestStream(coder=coders.StrUtf8Coder()).with_output_types(
+              str).advance_watermark_to(0).add_elements([
+                  window.TimestampedValue('k1', 0),
+                  window.TimestampedValue('k1', 5),
+              ]).advance_watermark_to(10).add_elements([
+                  window.TimestampedValue('k2', 12),
+              ]).advance_watermark_to(20).add_elements([
+                  window.TimestampedValue('k1', 25),
+              ]).add_elements([
+                  window.TimestampedValue('k2', 26),
+              ]).advance_watermark_to_infinity())
+      res = (
+          p
+          | test_stream
+          | deduplicate.ApproximateDeduplicate(
+              event_time_duration=Duration(10), num_buckets=1)
+          | beam.Map(lambda e, ts=beam.DoFn.TimestampParam: (e, ts)))
+      # The values of a generation are forgotten two generations later.
+      assert_that(
+          res,
+          equal_to([('k1', Timestamp(0)), ('k2', Timestamp(12)),
+                    ('k1', Timestamp(25))]))
+
+  def test_bloom_filter(self):
+    combine_fn = deduplicate.ApproximateDeduplicate(
+        processing_time_duration=60,
+        max_elements_per_bucket=1000,
+        false_positive_rate=0.01)._create_combine_fn()
+    fingerprints = [deduplicate._fingerprint(b'%d' % i)[1] for i in range(2000)]
+    small = combine_fn.add_input(
+        combine_fn.create_accumulator(), fingerprints[0])
+    large = combine_fn.create_accumulator()
+    for fingerprint in fingerprints[1:1000]:
+      large = combine_fn.add_input(large, fingerprint)
+    self.assertIsNone(small._bits)
+    self.assertIsNotNone(large._bits)
+    merged = pickle.loads(
+        pickle.dumps(
+            combine_fn.extract_output(
+                combine_fn.merge_accumulators([small, large]))))
+    for fingerprint in fingerprints[:1000]:
+      self.assertIn(fingerprint, merged)
+    false_positives = sum(
+        fingerprint in merged for fingerprint in fingerprints[1000:])
+    self.assertLess(false_positives, 30)
+
+  def test_bloom_filter_coder(self):
+    combine_fn = deduplicate.ApproximateDeduplicate(
+        processing_time_duration=60,
+        max_elements_per_bucket=1000,
+        false_positive_rate=0.01)._create_combine_fn()
+    coder = deduplicate._BloomFilterCoder()
+    fingerprints = [deduplicate._fingerprint(b'%d' % i)[1] for i in range(1000)]
+    bloom_filter = combine_fn.create_accumulator()
+    for count, fingerprint in enumerate(fingerprints, 1):
+      bloom_filter = combine_fn.add_input(bloom_filter, fingerprint)
+      if count in (1, 1000):
+        encoded = coder.encode(bloom_filter)
+        decoded = coder.decode(encoded)
+        self.assertEqual(decoded._bits, bloom_filter._bits)
+        self.assertEqual(decoded._fingerprints, bloom_filter._fingerprints)
+        self.assertEqual(decoded._num_hashes, bloom_filter._num_hashes)
+        for fingerprint in fingerprints[:count]:
+          self.assertIn(fingerprint, decoded)
+    # The header, and one byte for every 8 bits.
+    self.assertEqual(
+        len(coder.encode(bloom_filter)), 13 + (bloom_filter._num_bits + 7) // 8)
+
+  def test_invalid_arguments(self):
+    with self.assertRaises(ValueError):
+      deduplicate.ApproximateDeduplicate()
+    with self.assertRaises(ValueError):
+      deduplicate.ApproximateDeduplicate(
+          processing_time_duration=60, num_buckets=0)
+    with self.assertRaises(ValueError):
+      deduplicate.ApproximateDeduplicate(
+          processing_time_duration=60, false_positive_rate=1)
+
+
 if __name__ == '__main__':
   unittest.main()
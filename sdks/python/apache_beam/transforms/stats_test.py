@@ -19,6 +19,7 @@
 # pytype: skip-file
 
 import math
+import pickle
 import random
 import sys
 import unittest
@@ -38,7 +39,9 @@ from apache_beam.transforms.core import Create
 from apache_beam.transforms.display import DisplayData
 from apache_beam.transforms.display_test import DisplayDataItemMatcher
 from apache_beam.transforms.stats import ApproximateQuantilesCombineFn
+from apache_beam.transforms.stats import ApproximateQuantilesKllCombineFn
 from apache_beam.transforms.stats import ApproximateUniqueCombineFn
+from apache_beam.transforms.stats import ApproximateUniqueHllCombineFn
 
 try:
   import mmh3
@@ -229,6 +232,86 @@ class ApproximateUniqueTest(unittest.TestCase):
     assert beam.ApproximateUnique._get_sample_size_from_est_error(0.01) == 40000
 
 
+class ApproximateUniqueHllTest(unittest.TestCase):
+  """Unit tests for ApproximateUnique with the HLL algorithm."""
+  @parameterized.expand([
+      ('small_population_by_size', list(range(30)), 32, None),
+      ('with_duplicates_by_size', [10] * 50 + [20] * 50, 30, None),
+      ('large_population_by_error', list(range(20000)) * 2, None, 0.05),
+  ])
+  def test_approximate_unique_global(
+      self, name, test_input, sample_size, est_error):
+    if sample_size:
+      error = 2 / math.sqrt(sample_size)
+    else:
+      error = est_error
+    actual_count = len(set(test_input))
+
+    with TestPipeline() as pipeline:
+      result = (
+          pipeline
+          | 'create' >> beam.Create(test_input)
+          | 'get_estimate' >> beam.ApproximateUnique.Globally(
+              size=sample_size,
+              error=est_error,
+              algorithm=beam.ApproximateUnique.HLL)
+          | 'compare' >> beam.FlatMap(
+              lambda x: [abs(x - actual_count) * 1.0 / actual_count <= error]))
+
+      assert_that(result, equal_to([True]))
+
+  def test_approximate_unique_perkey(self):
+    test_input = [(k, v) for k in range(1, 4) for v in range(1000 * k)]
+
+    with TestPipeline() as pipeline:
+      result = (
+          pipeline
+          | 'create' >> beam.Create(test_input)
+          | 'get_estimate' >> beam.ApproximateUnique.PerKey(
+              error=0.1, algorithm=beam.ApproximateUnique.HLL)
+          | 'compare' >>
+          beam.FlatMap(lambda x: [abs(x[1] - 1000 * x[0]) <= 100 * x[0]]))
+
+      assert_that(result, equal_to([True] * 3))
+
+  def test_invalid_algorithm(self):
+    with self.assertRaises(ValueError):
+      beam.ApproximateUnique.Globally(size=100, algorithm='exact')
+
+  def test_hll_precision_from_sample_size(self):
+    get_precision = beam.ApproximateUnique._get_hll_precision_from_sample_size
+    self.assertEqual(get_precision(16), 5)
+    self.assertEqual(get_precision(400), 9)
+    self.assertEqual(get_precision(40000), 16)
+    self.assertEqual(get_precision(10**9), 18)
+
+  @parameterized.expand([(100, ), (3000, ), (50000, )])
+  def test_merge_accumulators(self, num_values):
+    # Sketches of 2**10 registers are dense above 256 unique values.
+    combine_fn = ApproximateUniqueHllCombineFn(10, coders.VarIntCoder())
+    values = [random.getrandbits(62) for _ in range(num_values)]
+    accumulators = []
+    for i in range(4):
+      accumulator = combine_fn.create_accumulator()
+      if i % 2:
+        accumulator = combine_fn.add_inputs(accumulator, values[i::4])
+      else:
+        for value in values[i::4]:
+          accumulator = combine_fn.add_input(accumulator, value)
+      accumulators.append(pickle.loads(pickle.dumps(accumulator)))
+    merged = combine_fn.merge_accumulators(accumulators)
+    single = combine_fn.add_inputs(combine_fn.create_accumulator(), values)
+
+    estimate = combine_fn.extract_output(merged)
+    self.assertEqual(estimate, combine_fn.extract_output(single))
+    self.assertLessEqual(abs(estimate - num_values), 0.1 * num_values)
+    self.assertLessEqual(len(pickle.dumps(merged)), 1200)
+
+  def test_invalid_precision(self):
+    with self.assertRaises(ValueError):
+      ApproximateUniqueHllCombineFn(3, coders.VarIntCoder())
+
+
 class ApproximateQuantilesTest(unittest.TestCase):
   _kv_data = [("a", 1), ("a", 2), ("a", 3), ("b", 1), ("b", 10), ("b", 10),
               ("b", 100)]
@@ -620,6 +703,93 @@ class ApproximateQuantilesTest(unittest.TestCase):
     hc.assert_that(data.items, hc.contains_inanyorder(*expected_items))
 
 
+class ApproximateQuantilesKllTest(unittest.TestCase):
+  """Unit tests for ApproximateQuantiles with the KLL algorithm."""
+  def test_quantiles_globally(self):
+    with TestPipeline() as p:
+      pc = p | Create(list(range(101)))
+
+      quantiles = pc | 'Quantiles globally' >> \
+                  beam.ApproximateQuantiles.Globally(
+                      5, algorithm=beam.ApproximateQuantiles.KLL)
+      quantiles_reversed = pc | 'Quantiles globally reversed' >> \
+                           beam.ApproximateQuantiles.Globally(
+                               5,
+                               reverse=True,
+                               algorithm=beam.ApproximateQuantiles.KLL)
+
+      assert_that(
+          quantiles,
+          equal_to([[0, 25, 50, 75, 100]]),
+          label='checkQuantilesGlobally')
+      assert_that(
+          quantiles_reversed,
+          equal_to([[100, 75, 50, 25, 0]]),
+          label='checkReversedQuantiles')
+
+  def test_quantiles_per_key_batched(self):
+    with TestPipeline() as p:
+      data = [('a', [1.0, 2.0, 3.0]), ('b', [1.0, 10.0]), ('b', [10.0, 100.0])]
+      pc = p | Create(data)
+      quantiles = pc | beam.ApproximateQuantiles.PerKey(
+          2, input_batched=True, algorithm=beam.ApproximateQuantiles.KLL)
+      assert_that(quantiles, equal_to([('a', [1.0, 3.0]), ('b', [1.0, 100.0])]))
+
+  def test_singleton(self):
+    with TestPipeline() as p:
+      pc = p | Create([389])
+      quantiles = pc | beam.ApproximateQuantiles.Globally(
+          5, algorithm=beam.ApproximateQuantiles.KLL)
+      assert_that(quantiles, equal_to([[389, 389, 389, 389, 389]]))
+
+  def test_merge_accumulators(self):
+    num_values = 100000
+    num_quantiles = 11
+    combine_fn = ApproximateQuantilesKllCombineFn.create(num_quantiles)
+    values = list(range(num_values))
+    random.shuffle(values)
+    accumulators = []
+    for i in range(10):
+      accumulator = combine_fn.create_accumulator()
+      if i % 2:
+        accumulator = combine_fn.add_inputs(accumulator, values[i::10])
+      else:
+        for value in values[i::10]:
+          accumulator = combine_fn.add_input(accumulator, value)
+      accumulators.append(pickle.loads(pickle.dumps(accumulator)))
+    quantiles = combine_fn.extract_output(
+        combine_fn.merge_accumulators(accumulators))
+
+    self.assertEqual(quantiles[0], 0)
+    self.assertEqual(quantiles[-1], num_values - 1)
+    for i, quantile in enumerate(quantiles):
+      expected = (num_values - 1) * i / (num_quantiles - 1)
+      self.assertLessEqual(abs(quantile - expected), 0.03 * num_values)
+    self.assertLessEqual(len(pickle.dumps(accumulators[0])), 10000)
+
+  def test_epsilon(self):
+    self.assertEqual(ApproximateQuantilesKllCombineFn.create(5)._k, 200)
+    self.assertEqual(
+        ApproximateQuantilesKllCombineFn.create(5, epsilon=0.1)._k, 30)
+    self.assertEqual(
+        ApproximateQuantilesKllCombineFn.create(5, epsilon=0.001)._k, 3910)
+
+  def test_unsupported_arguments(self):
+    with self.assertRaises(ValueError):
+      beam.ApproximateQuantiles.Globally(
+          5, key=len, algorithm=beam.ApproximateQuantiles.KLL)
+    with self.assertRaises(ValueError):
+      beam.ApproximateQuantiles.PerKey(
+          5, weighted=True, algorithm=beam.ApproximateQuantiles.KLL)
+    with self.assertRaises(ValueError):
+      beam.ApproximateQuantiles.Globally(5, algorithm='exact')
+
+  def test_non_numeric_values(self):
+    combine_fn = ApproximateQuantilesKllCombineFn.create(5)
+    with self.assertRaises(TypeError):
+      combine_fn.add_inputs(combine_fn.create_accumulator(), ['a', 'b'])
+
+
 def _build_quantilebuffer_test_data():
   """
   Test data taken from "Munro-Paterson Algorithm" reference values table of
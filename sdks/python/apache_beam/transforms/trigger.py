@@ -80,6 +80,14 @@ class _StateTag(metaclass=ABCMeta):
   The given tag must be unique for this step."""
   def __init__(self, tag):
     self.tag = tag
+    self._prefixed = {}
+
+  def prefixed(self, prefix):
+    """Returns with_prefix(prefix), reusing the tag of earlier calls."""
+    prefixed = self._prefixed.get(prefix)
+    if prefixed is None:
+      prefixed = self._prefixed[prefix] = self.with_prefix(prefix)
+    return prefixed
 
 
 class _ReadModifyWriteStateTag(_StateTag):
@@ -114,6 +122,7 @@ class _CombiningValueStateTag(_StateTag):
     if not isinstance(combine_fn, core.CombineFn):
       combine_fn = core.CombineFn.from_callable(combine_fn)
     self.combine_fn = combine_fn
+    self._without_extraction = None
 
   def __repr__(self):
     return 'CombiningValueStateTag(%s, %s)' % (self.tag, self.combine_fn)
@@ -122,6 +131,11 @@ class _CombiningValueStateTag(_StateTag):
     return _CombiningValueStateTag(prefix + self.tag, self.combine_fn)
 
   def without_extraction(self):
+    if self._without_extraction is None:
+      self._without_extraction = self._create_without_extraction()
+    return self._without_extraction
+
+  def _create_without_extraction(self):
     class NoExtractionCombineFn(core.CombineFn):
       setup = self.combine_fn.setup
       create_accumulator = self.combine_fn.create_accumulator
@@ -204,6 +218,22 @@ class TriggerFn(metaclass=ABCMeta):
     """
     pass
 
+  def on_elements(self, elements, window, context):
+    """Called when a batch of new elements arrives in a window.
+
+    The default implementation calls on_element() for each element. Triggers
+    whose state does not depend on the individual elements may override it to
+    advance their state once per batch.
+
+    Args:
+      elements: a non-empty list of the elements being added
+      window: the window to which the elements are being added
+      context: a context (e.g. a TriggerContext instance) for managing state
+          and setting timers
+    """
+    for element in elements:
+      self.on_element(element, window, context)
+
   @abstractmethod
   def on_merge(self, to_be_merged, merge_result, context):
     """Called when multiple windows are merged.
@@ -340,6 +370,9 @@ class DefaultTrigger(TriggerFn):
   def on_element(self, element, window, context):
     context.set_timer(str(window), TimeDomain.WATERMARK, window.end)
 
+  def on_elements(self, elements, window, context):
+    context.set_timer(str(window), TimeDomain.WATERMARK, window.end)
+
   def on_merge(self, to_be_merged, merge_result, context):
     for window in to_be_merged:
       context.clear_timer(str(window), TimeDomain.WATERMARK)
@@ -399,6 +432,10 @@ class AfterProcessingTime(TriggerFn):
           '', TimeDomain.REAL_TIME, context.get_current_time() + self.delay)
     context.add_state(self.STATE_TAG, True)
 
+  def on_elements(self, elements, window, context):
+    # Only the first element of a pane sets the timer.
+    self.on_element(elements[0], window, context)
+
   def on_merge(self, to_be_merged, merge_result, context):
     # timers will be kept through merging
     pass
@@ -458,6 +495,9 @@ class Always(TriggerFn):
   def on_element(self, element, window, context):
     pass
 
+  def on_elements(self, elements, window, context):
+    pass
+
   def on_merge(self, to_be_merged, merge_result, context):
     pass
 
@@ -589,6 +629,15 @@ class AfterWatermark(TriggerFn):
       if self.early:
         self.early.on_element(element, window, NestedContext(context, 'early'))
 
+  def on_elements(self, elements, window, context):
+    if self.is_late(context):
+      self.late.on_elements(elements, window, NestedContext(context, 'late'))
+    else:
+      context.set_timer('', TimeDomain.WATERMARK, window.end)
+      if self.early:
+        self.early.on_elements(
+            elements, window, NestedContext(context, 'early'))
+
   def on_merge(self, to_be_merged, merge_result, context):
     # TODO(robertwb): Figure out whether the 'rewind' semantics could be used
     # here.
@@ -679,7 +728,8 @@ class AfterWatermark(TriggerFn):
 class AfterCount(TriggerFn):
   """Fire when there are at least count elements in this window pane."""
 
-  COUNT_TAG = _CombiningValueStateTag('count', combiners.CountCombineFn())
+  # The count is a sum, so that a batch of elements is counted at once.
+  COUNT_TAG = _CombiningValueStateTag('count', sum)
 
   def __init__(self, count):
     if not isinstance(count, numbers.Integral) or count < 1:
@@ -698,6 +748,9 @@ class AfterCount(TriggerFn):
   def on_element(self, element, window, context):
     context.add_state(self.COUNT_TAG, 1)
 
+  def on_elements(self, elements, window, context):
+    context.add_state(self.COUNT_TAG, len(elements))
+
   def on_merge(self, to_be_merged, merge_result, context):
     # states automatically merged
     pass
@@ -748,6 +801,9 @@ class Repeatedly(TriggerFn):
   def on_element(self, element, window, context):
     self.underlying.on_element(element, window, context)
 
+  def on_elements(self, elements, window, context):
+    self.underlying.on_elements(elements, window, context)
+
   def on_merge(self, to_be_merged, merge_result, context):
     self.underlying.on_merge(to_be_merged, merge_result, context)
 
@@ -805,6 +861,10 @@ class _ParallelTriggerFn(TriggerFn, metaclass=ABCMeta):
     for ix, trigger in enumerate(self.triggers):
       trigger.on_element(element, window, self._sub_context(context, ix))
 
+  def on_elements(self, elements, window, context):
+    for ix, trigger in enumerate(self.triggers):
+      trigger.on_elements(elements, window, self._sub_context(context, ix))
+
   def on_merge(self, to_be_merged, merge_result, context):
     for ix, trigger in enumerate(self.triggers):
       trigger.on_merge(
@@ -919,6 +979,12 @@ class AfterEach(TriggerFn):
       self.triggers[ix].on_element(
           element, window, self._sub_context(context, ix))
 
+  def on_elements(self, elements, window, context):
+    ix = context.get_state(self.INDEX_TAG)
+    if ix < len(self.triggers):
+      self.triggers[ix].on_elements(
+          elements, window, self._sub_context(context, ix))
+
   def on_merge(self, to_be_merged, merge_result, context):
     # This takes the furthest window on merging.
     # TODO(robertwb): Revisit this when merging windows logic is settled for
@@ -1046,13 +1112,13 @@ class NestedContext(object):
     self._outer.clear_timer(self._prefix + name, time_domain)
 
   def add_state(self, tag, value):
-    self._outer.add_state(tag.with_prefix(self._prefix), value)
+    self._outer.add_state(tag.prefixed(self._prefix), value)
 
   def get_state(self, tag):
-    return self._outer.get_state(tag.with_prefix(self._prefix))
+    return self._outer.get_state(tag.prefixed(self._prefix))
 
   def clear_state(self, tag):
-    self._outer.clear_state(tag.with_prefix(self._prefix))
+    self._outer.clear_state(tag.prefixed(self._prefix))
 
 
 # pylint: disable=unused-argument
@@ -1078,6 +1144,10 @@ class SimpleState(metaclass=ABCMeta):
   def add_state(self, window, tag, value):
     pass
 
+  def extend_state(self, window, tag, values):
+    for value in values:
+      self.add_state(window, tag, value)
+
   @abstractmethod
   def get_state(self, window, tag):
     pass
@@ -1141,6 +1211,14 @@ class MergeableStateAdapter(SimpleState):
       tag = tag.without_extraction()
     self.raw_state.add_state(self._get_id(window), tag, value)
 
+  def extend_state(self, window, tag, values):
+    if isinstance(tag, _ReadModifyWriteStateTag):
+      raise ValueError(
+          'Merging requested for non-mergeable state tag: %r.' % tag)
+    elif isinstance(tag, _CombiningValueStateTag):
+      tag = tag.without_extraction()
+    self.raw_state.extend_state(self._get_id(window), tag, values)
+
   def get_state(self, window, tag):
     if isinstance(tag, _CombiningValueStateTag):
       original_tag, tag = tag, tag.without_extraction()
@@ -1479,9 +1557,9 @@ class GeneralTriggerDriver(TriggerDriver):
         state.add_state(window, self.WATERMARK_HOLD, output_time)
 
       context = state.at(window, self.clock)
-      for value, unused_timestamp in elements:
-        state.add_state(window, self.ELEMENTS, value)
-        self.trigger_fn.on_element(value, window, context)
+      values = [value for value, unused_timestamp in elements]
+      state.extend_state(window, self.ELEMENTS, values)
+      self.trigger_fn.on_elements(values, window, context)
 
       # Maybe fire this window.
       if self.trigger_fn.should_fire(TimeDomain.WATERMARK,
@@ -1615,8 +1693,10 @@ class InMemoryUnmergedState(UnmergedState):
     if isinstance(tag, _ReadModifyWriteStateTag):
       self.state[window][tag.tag] = value
     elif isinstance(tag, _CombiningValueStateTag):
-      # TODO(robertwb): Store merged accumulators.
-      self.state[window][tag.tag].append(value)
+      # Only the accumulator of the added values is stored.
+      tagged_states = self.state[window]
+      tagged_states[tag.tag] = tag.combine_fn.add_input(
+          self._get_accumulator(tagged_states, tag), value)
     elif isinstance(tag, _ListStateTag):
       self.state[window][tag.tag].append(value)
     elif isinstance(tag, _SetStateTag):
@@ -1626,12 +1706,31 @@ class InMemoryUnmergedState(UnmergedState):
     else:
       raise ValueError('Invalid tag.', tag)
 
+  def extend_state(self, window, tag, values):
+    if self.defensive_copy:
+      values = copy.deepcopy(values)
+    if isinstance(tag, _CombiningValueStateTag):
+      tagged_states = self.state[window]
+      tagged_states[tag.tag] = tag.combine_fn.add_inputs(
+          self._get_accumulator(tagged_states, tag), values)
+    elif isinstance(tag, (_ListStateTag, _SetStateTag, _WatermarkHoldStateTag)):
+      self.state[window][tag.tag].extend(values)
+    else:
+      super().extend_state(window, tag, values)
+
+  @staticmethod
+  def _get_accumulator(tagged_states, tag):
+    if tag.tag in tagged_states:
+      return tagged_states[tag.tag]
+    return tag.combine_fn.create_accumulator()
+
   def get_state(self, window, tag):
+    if isinstance(tag, _CombiningValueStateTag):
+      return tag.combine_fn.extract_output(
+          self._get_accumulator(self.state[window], tag))
     values = self.state[window][tag.tag]
     if isinstance(tag, _ReadModifyWriteStateTag):
       return values
-    elif isinstance(tag, _CombiningValueStateTag):
-      return tag.combine_fn.apply(values)
     elif isinstance(tag, _ListStateTag):
       return values
     elif isinstance(tag, _SetStateTag):
@@ -43,7 +43,9 @@ from apache_beam.testing.util import equal_to
 from apache_beam.transforms import WindowInto
 from apache_beam.transforms import ptransform
 from apache_beam.transforms import trigger
+from apache_beam.transforms.combiners import CountCombineFn
 from apache_beam.transforms.core import Windowing
+from apache_beam.transforms.timeutil import TimeDomain
 from apache_beam.transforms.trigger import AccumulationMode
 from apache_beam.transforms.trigger import AfterAll
 from apache_beam.transforms.trigger import AfterAny
@@ -451,6 +453,38 @@ class TriggerTest(unittest.TestCase):
       self.assertEqual(
           pickle.loads(pickle.dumps(unwindowed)).value, list(range(10)))
 
+  def test_after_count_on_elements(self):
+    window = IntervalWindow(0, 10)
+    state = InMemoryUnmergedState()
+    context = state.at(window, TestClock())
+    trigger_fn = Repeatedly(AfterAny(AfterCount(3), AfterCount(5)))
+    trigger_fn.on_elements(['a', 'b'], window, context)
+    self.assertFalse(
+        trigger_fn.should_fire(
+            TimeDomain.WATERMARK, MIN_TIMESTAMP, window, context))
+    trigger_fn.on_element('c', window, context)
+    self.assertTrue(
+        trigger_fn.should_fire(
+            TimeDomain.WATERMARK, MIN_TIMESTAMP, window, context))
+    trigger_fn.on_fire(MIN_TIMESTAMP, window, context)
+    trigger_fn.on_elements(['d', 'e', 'f'], window, context)
+    self.assertTrue(
+        trigger_fn.should_fire(
+            TimeDomain.WATERMARK, MIN_TIMESTAMP, window, context))
+
+  def test_combining_state_is_accumulated(self):
+    window = IntervalWindow(0, 10)
+    tag = trigger._CombiningValueStateTag('count', CountCombineFn())
+    state = InMemoryUnmergedState()
+    for _ in range(1000):
+      state.add_state(window, tag, 1)
+    state.extend_state(window, tag, [1] * 1000)
+    self.assertEqual(state.state[window]['count'], 2000)
+    copied = state.copy()
+    copied.add_state(window, tag, 1)
+    self.assertEqual(state.get_state(window, tag), 2000)
+    self.assertEqual(copied.get_state(window, tag), 2001)
+
 
 class MayLoseDataTest(unittest.TestCase):
   def _test(self, trigger, lateness, expected):
@@ -46,14 +46,23 @@ CallableT = TypeVar('CallableT', bound=Callable)
 
 
 class StateSpec(object):
-  """Specification for a user DoFn state cell."""
-  def __init__(self, name: str, coder: Coder) -> None:
+  """Specification for a user DoFn state cell.
+
+  Args:
+    name: The name by which the state is identified.
+    coder: Coder for the values held in the state.
+    prefetch: Whether runners may read this state for a batch of elements
+      ahead of processing them. Useful when most elements read the state, as
+      the reads are then issued concurrently rather than one at a time.
+  """
+  def __init__(self, name: str, coder: Coder, prefetch: bool = False) -> None:
     if not isinstance(name, str):
       raise TypeError("name is not a string")
     if not isinstance(coder, Coder):
       raise TypeError("coder is not of type Coder")
     self.name = name
     self.coder = coder
+    self.prefetch = prefetch
 
   def __repr__(self) -> str:
     return '%s(%s)' % (self.__class__.__name__, self.name)
@@ -114,7 +123,8 @@ class CombiningValueStateSpec(StateSpec):
       self,
       name: str,
       coder: Optional[Coder] = None,
-      combine_fn: Any = None) -> None:
+      combine_fn: Any = None,
+      prefetch: bool = False) -> None:
     """Initialize the specification for CombiningValue state.
 
     CombiningValueStateSpec(name, combine_fn) -> Coder-inferred combining value
@@ -128,6 +138,8 @@ class CombiningValueStateSpec(StateSpec):
         May be inferred.
       combine_fn (``CombineFn`` or ``callable``): Function specifying how to
         combine the values passed to state.
+      prefetch (bool): Whether runners may read this state for a batch of
+        elements ahead of processing them.
     """
     # Avoid circular import.
     from apache_beam.transforms.core import CombineFn
@@ -148,7 +160,7 @@ class CombiningValueStateSpec(StateSpec):
     if coder is None:
       coder = self.combine_fn.get_accumulator_coder()
 
-    super().__init__(name, coder)
+    super().__init__(name, coder, prefetch)
 
   def to_runner_api(
       self, context: 'PipelineContext') -> beam_runner_api_pb2.StateSpec:
@@ -23,11 +23,15 @@
 import bisect
 import collections
 import contextlib
+import copy
 import hashlib
+import heapq
 import hmac
 import logging
 import random
 import re
+import struct
+import tempfile
 import threading
 import time
 import uuid
@@ -52,6 +56,8 @@ from apache_beam.pvalue import AsSideInput
 from apache_beam.pvalue import PCollection
 from apache_beam.transforms import window
 from apache_beam.transforms.combiners import CountCombineFn
+from apache_beam.transforms.core import CombineFn
+from apache_beam.transforms.core import CombineGlobally
 from apache_beam.transforms.core import CombinePerKey
 from apache_beam.transforms.core import Create
 from apache_beam.transforms.core import DoFn
@@ -96,6 +102,7 @@ _LOGGER = logging.getLogger(__name__)
 __all__ = [
     'BatchElements',
     'CoGroupByKey',
+    'SkewAwareCoGroupByKey',
     'Distinct',
     'GcpHsmGeneratedSecret',
     'GcpSecret',
@@ -231,8 +238,7 @@ class CoGroupByKey(PTransform):
         str, typehints.Union[iterable_input_value_types or [typehints.Any]]]
     result = (
         pcolls_dict
-        | 'CoGroupByKeyImpl' >>
-        _CoGBKImpl(pipeline=self.pipeline).with_output_types(
+        | 'CoGroupByKeyImpl' >> self._impl().with_output_types(
             typehints.Tuple[output_key_type, output_value_type]))
 
     if restore_tags:
@@ -249,6 +255,9 @@ class CoGroupByKey(PTransform):
 
     return result
 
+  def _impl(self):
+    return _CoGBKImpl(pipeline=self.pipeline)
+
 
 class _CoGBKImpl(PTransform):
   def __init__(self, *, pipeline=None):
@@ -286,6 +295,272 @@ class _CoGBKImpl(PTransform):
                     tuple[K, dict[U, list[V]]]))
 
 
+class SkewAwareCoGroupByKey(CoGroupByKey):
+  """A CoGroupByKey for joins whose inputs may have hot keys.
+
+  The keys of each input are sampled first. A key that makes up more than
+  ``hot_key_fraction`` of the sample of some input is a hot key, and its values
+  in the input where it is most frequent are spread round robin over
+  ``hot_key_fanout`` sub-keys, while its values in all the other inputs are
+  replicated to every sub-key. This bounds the values a single worker groups
+  for a hot key, at the cost of replicating the smaller side of the join.
+
+  The output has the same shape as that of :class:`CoGroupByKey`, except that
+  a hot key may be output up to ``hot_key_fanout`` times. Each output holds a
+  disjoint part of the values of the input the key was split on, and all the
+  values of the other inputs, so a join over the outputs (inner or outer)
+  gives the same result as a join over the output of CoGroupByKey. An
+  aggregation over the values of a key must use CoGroupByKey instead.
+
+  The values of each tag are lazy iterables over the grouped values, rather
+  than lists, so a tag may be iterated more than once but is never
+  materialized. The number of hot keys, split values and replicated values are
+  reported as counters in the ``SkewAwareCoGroupByKey`` metrics namespace.
+
+  Keys must be hashable. The sample of each window is used as a side input, so
+  the grouping of a window starts once all of its input has been sampled; for
+  merging windows, such as sessions, keys are not sampled and nothing is
+  split. Unbounded inputs in the global window are never fully sampled, so
+  they are grouped by :class:`CoGroupByKey` instead.
+
+  Args:
+    hot_key_fanout: the number of sub-keys a hot key is split into. Keys with
+      an estimated frequency below it are not split.
+    hot_key_fraction: the fraction of the sampled keys of an input above which
+      a key is hot.
+    sample_size: the number of keys sampled from each input.
+    pipeline: as for :class:`CoGroupByKey`.
+  """
+  def __init__(
+      self,
+      *,
+      hot_key_fanout=16,
+      hot_key_fraction=0.01,
+      sample_size=10000,
+      pipeline=None):
+    if hot_key_fanout < 2:
+      raise ValueError('hot_key_fanout must be at least 2')
+    if not 0 < hot_key_fraction <= 1:
+      raise ValueError('hot_key_fraction must be in (0, 1]')
+    if sample_size < 1:
+      raise ValueError('sample_size must be at least 1')
+    super().__init__(pipeline=pipeline)
+    self._hot_key_fanout = hot_key_fanout
+    self._hot_key_fraction = hot_key_fraction
+    self._sample_size = sample_size
+
+  def _impl(self):
+    return _SkewAwareCoGBKImpl(
+        self._hot_key_fanout,
+        self._hot_key_fraction,
+        self._sample_size,
+        pipeline=self.pipeline)
+
+
+class _TaggedValues(object):
+  """The values of one tag of a grouped key, filtered lazily."""
+  def __init__(self, tagged_values, tag):
+    self._tagged_values = tagged_values
+    self._tag = tag
+
+  def __iter__(self):
+    tag = self._tag
+    for value_tag, value in self._tagged_values:
+      if value_tag == tag:
+        yield value
+
+  def __bool__(self):
+    return any(value_tag == self._tag for value_tag, _ in self._tagged_values)
+
+  def __repr__(self):
+    return repr(list(self))
+
+  def __reduce__(self):
+    return list, (list(self), )
+
+
+class _HotKeysCombineFn(CombineFn):
+  """Samples the keys of tagged keys, and extracts the hot ones.
+
+  The accumulator maps each tag to its number of keys and a uniform sample of
+  them, kept as the (priority, key) pairs with the largest random priorities.
+  The output maps each hot key to the tag it is most frequent in.
+  """
+  def __init__(self, hot_key_fanout, hot_key_fraction, sample_size):
+    self._hot_key_fanout = hot_key_fanout
+    self._hot_key_fraction = hot_key_fraction
+    self._sample_size = sample_size
+
+  def _compact(self, sample):
+    if len(sample) > self._sample_size:
+      sample[:] = heapq.nlargest(
+          self._sample_size, sample, key=lambda entry: entry[0])
+    return sample
+
+  def create_accumulator(self):
+    return {}
+
+  def add_input(self, accumulator, tagged_key):
+    tag, key = tagged_key
+    count_and_sample = accumulator.get(tag)
+    if count_and_sample is None:
+      count_and_sample = accumulator[tag] = [0, []]
+    count_and_sample[0] += 1
+    sample = count_and_sample[1]
+    sample.append((random.random(), key))
+    # Compacting at twice the sample size keeps adding amortized constant.
+    if len(sample) >= 2 * self._sample_size:
+      self._compact(sample)
+    return accumulator
+
+  def merge_accumulators(self, accumulators):
+    merged = {}
+    for accumulator in accumulators:
+      for tag, (count, sample) in accumulator.items():
+        if tag in merged:
+          merged[tag][0] += count
+          merged[tag][1].extend(sample)
+        else:
+          merged[tag] = [count, list(sample)]
+    for _, sample in merged.values():
+      self._compact(sample)
+    return merged
+
+  def compact(self, accumulator):
+    for _, sample in accumulator.values():
+      self._compact(sample)
+    return accumulator
+
+  def extract_output(self, accumulator):
+    # Maps each hot key to its largest estimated count and that input's tag.
+    estimates = {}
+    for tag, (count, sample) in accumulator.items():
+      sample = self._compact(sample)
+      key_counts = collections.Counter(key for _, key in sample)
+      for key, sampled in key_counts.items():
+        fraction = sampled / len(sample)
+        estimate = fraction * count
+        if (fraction >= self._hot_key_fraction and
+            estimate >= self._hot_key_fanout and
+            estimate > estimates.get(key, (0, None))[0]):
+          estimates[key] = estimate, tag
+    return {key: tag for key, (_, tag) in estimates.items()}
+
+
+class _SkewAwareTagDoFn(DoFn):
+  """Tags values, splitting or replicating the values of hot keys."""
+  def __init__(self, tag, hot_key_fanout):
+    self._tag = tag
+    self._hot_key_fanout = hot_key_fanout
+    self._split_values = Metrics.counter(
+        'SkewAwareCoGroupByKey', 'split_values')
+    self._replicated_values = Metrics.counter(
+        'SkewAwareCoGroupByKey', 'replicated_values')
+
+  def setup(self):
+    # The next sub-key of each hot key, which is not reset between bundles or
+    # windows, so any sub-key may get no values of the tag it was split on.
+    self._next_shards = {}
+
+  def process(self, element, hot_keys=None):
+    key, value = element
+    hot_tag = hot_keys.get(key) if hot_keys else None
+    if hot_tag is None:
+      yield (key, -1), (self._tag, value)
+    elif hot_tag == self._tag:
+      shard = self._next_shards.get(key, 0)
+      self._next_shards[key] = (shard + 1) % self._hot_key_fanout
+      self._split_values.inc()
+      yield (key, shard), (self._tag, value)
+    else:
+      self._replicated_values.inc(self._hot_key_fanout - 1)
+      for shard in range(self._hot_key_fanout):
+        yield (key, shard), (self._tag, value)
+
+
+class _SkewAwareCollectValuesDoFn(DoFn):
+  """Outputs the lazy per-tag values of each grouped sub-key."""
+  def __init__(self, tags):
+    self._tags = tags
+
+  def process(self, element, hot_keys=None):
+    (key, shard), tagged_values = element
+    if shard >= 0:
+      # The sub-keys of a hot key are only output if they have some values of
+      # the tag the key was split on, so that the values replicated to them
+      # are not output on their own.
+      hot_tag = hot_keys[key]
+      if not any(tag == hot_tag for tag, _ in tagged_values):
+        return
+    yield key, {tag: _TaggedValues(tagged_values, tag) for tag in self._tags}
+
+
+class _SkewAwareCoGBKImpl(_CoGBKImpl):
+  def __init__(
+      self, hot_key_fanout, hot_key_fraction, sample_size, *, pipeline=None):
+    super().__init__(pipeline=pipeline)
+    self._hot_key_fanout = hot_key_fanout
+    self._hot_key_fraction = hot_key_fraction
+    self._sample_size = sample_size
+
+  def _sample_hot_keys(self, pcolls):
+    def count_hot_keys(hot_keys):
+      Metrics.counter('SkewAwareCoGroupByKey', 'hot_keys').inc(len(hot_keys))
+      return hot_keys
+
+    hot_keys = ([
+        pcoll
+        | 'SampleKeys[%s]' % tag >> MapTuple(lambda k, _, tag=tag: (tag, k))
+        for (tag, pcoll) in pcolls.items()
+    ]
+                | 'FlattenSampledKeys' >> Flatten(pipeline=self.pipeline)
+                | 'HotKeys' >> CombineGlobally(
+                    _HotKeysCombineFn(
+                        self._hot_key_fanout,
+                        self._hot_key_fraction,
+                        self._sample_size)).without_defaults()
+                | 'CountHotKeys' >> Map(count_hot_keys))
+    return (pvalue.AsSingleton(hot_keys, default_value={}), )
+
+  def expand(self, pcolls):
+    for pcoll in pcolls.values():
+      self._check_pcollection(pcoll)
+      if self.pipeline:
+        assert pcoll.pipeline == self.pipeline, (
+            'All input PCollections must belong to the same pipeline.')
+
+    if any(not pcoll.is_bounded and
+           isinstance(pcoll.windowing.windowfn, window.GlobalWindows)
+           for pcoll in pcolls.values()):
+      # The sample of the global window would never be ready.
+      return super().expand(pcolls)
+
+    tags = list(pcolls.keys())
+    if any(pcoll.windowing.windowfn.is_merging() for pcoll in pcolls.values()):
+      # Side inputs do not support merging windows.
+      side_inputs = ()
+    else:
+      side_inputs = self._sample_hot_keys(pcolls)
+
+    tagged = []
+    for tag, pcoll in pcolls.items():
+      key_type, value_type = trivial_inference.key_value_types(
+          pcoll.element_type)
+      tagged.append(
+          pcoll
+          | 'Tag[%s]' % tag >> ParDo(
+              _SkewAwareTagDoFn(tag, self._hot_key_fanout), *
+              side_inputs).with_output_types(
+                  typehints.Tuple[typehints.Tuple[key_type, int],
+                                  typehints.Tuple[type(tag), value_type]]))
+    return (
+        tagged
+        | Flatten(pipeline=self.pipeline)
+        | GroupByKey()
+        | 'CollectValues' >> ParDo(
+            _SkewAwareCollectValuesDoFn(tags), *side_inputs))
+
+
 @ptransform_fn
 @typehints.with_input_types(tuple[K, V])
 @typehints.with_output_types(K)
@@ -759,28 +1034,52 @@ class _BatchSizeEstimator(object):
         self._data)
 
 
+def _element_size_and_weight(element, element_size_fn, max_batch_weight):
+  """Returns the contributions of element to a batch's size and weight.
+
+  Without max_batch_weight, batch sizes are measured by element_size_fn.
+  Otherwise they count elements and element_size_fn measures their weight.
+  """
+  element_weight = element_size_fn(element)
+  return (1 if max_batch_weight else element_weight), element_weight
+
+
+def _exceeds_max_batch_weight(batch_weight, element_weight, max_batch_weight):
+  return bool(
+      max_batch_weight and batch_weight + element_weight > max_batch_weight)
+
+
 class _GlobalWindowsBatchingDoFn(DoFn):
-  def __init__(self, batch_size_estimator, element_size_fn):
+  def __init__(
+      self, batch_size_estimator, element_size_fn, max_batch_weight=None):
     self._batch_size_estimator = batch_size_estimator
     self._element_size_fn = element_size_fn
+    self._max_batch_weight = max_batch_weight
 
   def start_bundle(self):
     self._batch = []
     self._running_batch_size = 0
+    self._running_batch_weight = 0
     self._target_batch_size = self._batch_size_estimator.next_batch_size()
     # The first emit often involves non-trivial setup.
     self._batch_size_estimator.ignore_next_timing()
 
   def process(self, element):
-    element_size = self._element_size_fn(element)
-    if self._running_batch_size + element_size > self._target_batch_size:
+    element_size, element_weight = _element_size_and_weight(
+        element, self._element_size_fn, self._max_batch_weight)
+    if (self._running_batch_size + element_size > self._target_batch_size or
+        self._batch and _exceeds_max_batch_weight(self._running_batch_weight,
+                                                  element_weight,
+                                                  self._max_batch_weight)):
       with self._batch_size_estimator.record_time(self._running_batch_size):
         yield window.GlobalWindows.windowed_value_at_end_of_window(self._batch)
       self._batch = []
       self._running_batch_size = 0
+      self._running_batch_weight = 0
       self._target_batch_size = self._batch_size_estimator.next_batch_size()
     self._batch.append(element)
     self._running_batch_size += element_size
+    self._running_batch_weight += element_weight
 
   def finish_bundle(self):
     if self._batch:
@@ -788,6 +1087,7 @@ class _GlobalWindowsBatchingDoFn(DoFn):
         yield window.GlobalWindows.windowed_value_at_end_of_window(self._batch)
       self._batch = None
       self._running_batch_size = 0
+      self._running_batch_weight = 0
     self._target_batch_size = self._batch_size_estimator.next_batch_size()
     _LOGGER.info(
         "BatchElements statistics: " + self._batch_size_estimator.stats())
@@ -797,15 +1097,18 @@ class _SizedBatch():
   def __init__(self):
     self.elements = []
     self.size = 0
+    self.weight = 0
 
 
 class _WindowAwareBatchingDoFn(DoFn):
 
   _MAX_LIVE_WINDOWS = 10
 
-  def __init__(self, batch_size_estimator, element_size_fn):
+  def __init__(
+      self, batch_size_estimator, element_size_fn, max_batch_weight=None):
     self._batch_size_estimator = batch_size_estimator
     self._element_size_fn = element_size_fn
+    self._max_batch_weight = max_batch_weight
 
   def start_bundle(self):
     self._batches = collections.defaultdict(_SizedBatch)
@@ -815,8 +1118,11 @@ class _WindowAwareBatchingDoFn(DoFn):
 
   def process(self, element, window=DoFn.WindowParam):
     batch = self._batches[window]
-    element_size = self._element_size_fn(element)
-    if batch.size + element_size > self._target_batch_size:
+    element_size, element_weight = _element_size_and_weight(
+        element, self._element_size_fn, self._max_batch_weight)
+    if (batch.size + element_size > self._target_batch_size or
+        batch.elements and _exceeds_max_batch_weight(
+            batch.weight, element_weight, self._max_batch_weight)):
       with self._batch_size_estimator.record_time(batch.size):
         yield windowed_value.WindowedValue(
             batch.elements, window.max_timestamp(), (window, ))
@@ -825,6 +1131,7 @@ class _WindowAwareBatchingDoFn(DoFn):
 
     self._batches[window].elements.append(element)
     self._batches[window].size += element_size
+    self._batches[window].weight += element_weight
 
     if len(self._batches) > self._MAX_LIVE_WINDOWS:
       window, batch = max(
@@ -846,13 +1153,104 @@ class _WindowAwareBatchingDoFn(DoFn):
     self._target_batch_size = self._batch_size_estimator.next_batch_size()
 
 
+class _KeyedBatchingDoFn(DoFn):
+  """Batches the values of each key and window of a keyed PCollection.
+
+  Every key has its own batch size estimator, so that keys whose values are
+  processed at different costs converge to different batch sizes.
+  """
+
+  _MAX_LIVE_BATCHES = 100
+  _MAX_KEY_ESTIMATORS = 1000
+
+  def __init__(
+      self, batch_size_estimator, element_size_fn, max_batch_weight=None):
+    self._batch_size_estimator = batch_size_estimator
+    self._element_size_fn = element_size_fn
+    self._max_batch_weight = max_batch_weight
+
+  def setup(self):
+    # The estimators of the most recently batched keys, oldest first.
+    self._estimators = collections.OrderedDict()
+
+  def _estimator(self, key):
+    estimator = self._estimators.pop(key, None)
+    if estimator is None:
+      estimator = copy.deepcopy(self._batch_size_estimator)
+      # The first emit often involves non-trivial setup.
+      estimator.ignore_next_timing()
+      if len(self._estimators) >= self._MAX_KEY_ESTIMATORS:
+        self._estimators.popitem(last=False)
+    self._estimators[key] = estimator
+    return estimator
+
+  def start_bundle(self):
+    self._batches = {}
+    self._target_batch_sizes = {}
+
+  def _flush(self, window, key):
+    batch = self._batches.pop((window, key))
+    with self._estimator(key).record_time(batch.size):
+      yield windowed_value.WindowedValue((key, batch.elements),
+                                         window.max_timestamp(), (window, ))
+    self._target_batch_sizes[window,
+                             key] = self._estimator(key).next_batch_size()
+
+  def process(self, element, window=DoFn.WindowParam):
+    key, value = element
+    target_batch_size = self._target_batch_sizes.get((window, key))
+    if target_batch_size is None:
+      target_batch_size = self._estimator(key).next_batch_size()
+      self._target_batch_sizes[window, key] = target_batch_size
+    batch = self._batches.get((window, key))
+    element_size, element_weight = _element_size_and_weight(
+        value, self._element_size_fn, self._max_batch_weight)
+    if batch is not None and (
+        batch.size + element_size > target_batch_size or
+        _exceeds_max_batch_weight(
+            batch.weight, element_weight, self._max_batch_weight)):
+      yield from self._flush(window, key)
+      batch = None
+    if batch is None:
+      batch = self._batches[window, key] = _SizedBatch()
+    batch.elements.append(value)
+    batch.size += element_size
+    batch.weight += element_weight
+
+    if len(self._batches) > self._MAX_LIVE_BATCHES:
+      largest_window, largest_key = max(
+          self._batches, key=lambda window_key: self._batches[window_key].size)
+      yield from self._flush(largest_window, largest_key)
+
+  def finish_bundle(self):
+    for window, key in list(self._batches):
+      yield from self._flush(window, key)
+    self._batches = self._target_batch_sizes = None
+
+
+class _SumCombineFn(CountCombineFn):
+  """Sums integer inputs, with the accumulators of CountCombineFn."""
+  def add_input(self, accumulator, element):
+    return accumulator + element
+
+  def add_inputs(self, accumulator, elements):
+    return accumulator + sum(elements)
+
+
 def _pardo_stateful_batch_elements(
     input_coder: coders.Coder,
     batch_size_estimator: _BatchSizeEstimator,
     max_buffering_duration_secs: int,
-    clock=time.time):
+    clock=time.time,
+    element_size_fn=lambda x: 1,
+    max_batch_weight=None,
+    keyed=False):
   ELEMENT_STATE = BagStateSpec('values', input_coder)
-  COUNT_STATE = CombiningValueStateSpec('count', input_coder, CountCombineFn())
+  # The batch size, which is the number of elements unless they are sized by
+  # element_size_fn without a max_batch_weight.
+  COUNT_STATE = CombiningValueStateSpec('count', input_coder, _SumCombineFn())
+  WEIGHT_STATE = CombiningValueStateSpec(
+      'weight', coders.VarIntCoder(), _SumCombineFn())
   BATCH_SIZE_STATE = ReadModifyWriteStateSpec('batch_size', input_coder)
   WINDOW_TIMER = TimerSpec('window_end', TimeDomain.WATERMARK)
   BUFFERING_TIMER = TimerSpec('buffering_end', TimeDomain.REAL_TIME)
@@ -866,14 +1264,29 @@ def _pardo_stateful_batch_elements(
         window=DoFn.WindowParam,
         element_state=DoFn.StateParam(ELEMENT_STATE),
         count_state=DoFn.StateParam(COUNT_STATE),
+        weight_state=DoFn.StateParam(WEIGHT_STATE),
         batch_size_state=DoFn.StateParam(BATCH_SIZE_STATE),
         batch_estimator_state=DoFn.StateParam(BATCH_ESTIMATOR_STATE),
         window_timer=DoFn.TimerParam(WINDOW_TIMER),
         buffering_timer=DoFn.TimerParam(BUFFERING_TIMER)):
       window_timer.set(window.end)
-      # Drop the fixed key since we don't care about it
+      element_size, element_weight = _element_size_and_weight(
+          element[1], element_size_fn, max_batch_weight)
+      if max_batch_weight and _exceeds_max_batch_weight(
+          weight_state.read(), element_weight, max_batch_weight):
+        yield from self.flush_batch(
+            element[0],
+            element_state,
+            count_state,
+            weight_state,
+            batch_size_state,
+            batch_estimator_state,
+            buffering_timer)
+      # Unless keyed, drop the fixed key since we don't care about it
       element_state.add(element[1])
-      count_state.add(1)
+      count_state.add(element_size)
+      if max_batch_weight:
+        weight_state.add(element_weight)
       count = count_state.read()
       target_size = batch_size_state.read()
       # Should only happen on the first element
@@ -883,14 +1296,16 @@ def _pardo_stateful_batch_elements(
         batch_size_state.write(target_size)
         batch_estimator_state.write(batch_estimator)
 
-      if count == 1 and max_buffering_duration_secs > 0:
+      if count == element_size and max_buffering_duration_secs > 0:
         # First element in batch, start buffering timer
         buffering_timer.set(clock() + max_buffering_duration_secs)
 
       if count >= target_size:
-        return self.flush_batch(
+        yield from self.flush_batch(
+            element[0],
             element_state,
             count_state,
+            weight_state,
             batch_size_state,
             batch_estimator_state,
             buffering_timer)
@@ -898,14 +1313,18 @@ def _pardo_stateful_batch_elements(
     @on_timer(WINDOW_TIMER)
     def on_window_timer(
         self,
+        key=DoFn.KeyParam,
         element_state=DoFn.StateParam(ELEMENT_STATE),
         count_state=DoFn.StateParam(COUNT_STATE),
+        weight_state=DoFn.StateParam(WEIGHT_STATE),
         batch_size_state=DoFn.StateParam(BATCH_SIZE_STATE),
         batch_estimator_state=DoFn.StateParam(BATCH_ESTIMATOR_STATE),
         buffering_timer=DoFn.TimerParam(BUFFERING_TIMER)):
       return self.flush_batch(
+          key,
           element_state,
           count_state,
+          weight_state,
           batch_size_state,
           batch_estimator_state,
           buffering_timer)
@@ -913,33 +1332,41 @@ def _pardo_stateful_batch_elements(
     @on_timer(BUFFERING_TIMER)
     def on_buffering_timer(
         self,
+        key=DoFn.KeyParam,
         element_state=DoFn.StateParam(ELEMENT_STATE),
         count_state=DoFn.StateParam(COUNT_STATE),
+        weight_state=DoFn.StateParam(WEIGHT_STATE),
         batch_size_state=DoFn.StateParam(BATCH_SIZE_STATE),
         batch_estimator_state=DoFn.StateParam(BATCH_ESTIMATOR_STATE),
         buffering_timer=DoFn.TimerParam(BUFFERING_TIMER)):
       return self.flush_batch(
+          key,
           element_state,
           count_state,
+          weight_state,
           batch_size_state,
           batch_estimator_state,
           buffering_timer)
 
     def flush_batch(
         self,
+        key,
         element_state,
         count_state,
+        weight_state,
         batch_size_state,
         batch_estimator_state,
         buffering_timer):
       batch = [element for element in element_state.read()]
       if not batch:
         return
+      batch_size = count_state.read()
       element_state.clear()
       count_state.clear()
+      weight_state.clear()
       batch_estimator = batch_estimator_state.read()
-      with batch_estimator.record_time(len(batch)):
-        yield batch
+      with batch_estimator.record_time(batch_size):
+        yield (key, batch) if keyed else batch
       batch_size_state.write(batch_estimator.next_batch_size())
       batch_estimator_state.write(batch_estimator)
       buffering_timer.clear()
@@ -1030,6 +1457,16 @@ class BatchElements(PTransform):
   increase as needed to get the desired tradeoff between target batch size
   and latency or throughput.
 
+  When max_batch_weight is provided, batch sizes count elements while
+  element_size_fn measures their weight, e.g. their size in bytes. Batches are
+  then emitted before their total weight would exceed max_batch_weight, in
+  addition to the batch size targets, so that costs scaling with payload size
+  and with per batch latency can be bounded together.
+
+  With keyed=True, the input is a PCollection of (key, value) pairs and the
+  values of each key are batched separately, producing a PCollection of
+  (key, list of values) pairs. Each key has its own batch size estimator.
+
   For more information on tuning parameters to this transform, see
   https://beam.apache.org/documentation/patterns/batch-elements
 
@@ -1048,7 +1485,14 @@ class BatchElements(PTransform):
     element_size_fn: (optional) A mapping of an element to its contribution to
         batch size, defaulting to every element having size 1.  When provided,
         attempts to provide batches of optimal total size which may consist of
-        a varying number of elements.
+        a varying number of elements. With keyed=True, it is applied to the
+        values.
+    max_batch_weight: (optional) the maximum total weight of the elements of
+        a batch, as measured by element_size_fn. Batches larger than this only
+        hold a single element. When provided, min_batch_size and
+        max_batch_size count elements rather than their weight.
+    keyed: (optional) whether to batch the values of each key of a
+        PCollection of (key, value) pairs separately. Defaults to False.
     variance: (optional) the permitted (relative) amount of deviation from the
         (estimated) ideal batch size used to produce a wider base for
         linear interpolation
@@ -1064,7 +1508,7 @@ class BatchElements(PTransform):
         for length bucketing. Boundaries are lower-inclusive (bisect_right
         semantics): e.g., for boundaries [10, 50], buckets are (-inf, 10),
         [10, 50), [50, inf). Defaults to [16, 32, 64, 128, 256, 512] when
-        length_fn is set. Requires length_fn.
+        length_fn is set. Requires length_fn. Cannot be used with keyed=True.
   """
   _DEFAULT_BUCKET_BOUNDARIES = [16, 32, 64, 128, 256, 512]
 
@@ -1082,7 +1526,9 @@ class BatchElements(PTransform):
       clock=time.time,
       record_metrics=True,
       length_fn=None,
-      bucket_boundaries=None):
+      bucket_boundaries=None,
+      max_batch_weight=None,
+      keyed=False):
     if bucket_boundaries is not None and length_fn is None:
       raise ValueError('bucket_boundaries requires length_fn to be set.')
     if bucket_boundaries is not None:
@@ -1091,6 +1537,11 @@ class BatchElements(PTransform):
         raise ValueError(
             'bucket_boundaries must be a non-empty sorted list of '
             'positive values.')
+    if max_batch_weight is not None and max_batch_weight < 1:
+      raise ValueError(
+          'max_batch_weight (%s) must be positive' % max_batch_weight)
+    if keyed and length_fn is not None:
+      raise ValueError('length_fn cannot be used with keyed=True.')
     self._batch_size_estimator = _BatchSizeEstimator(
         min_batch_size=min_batch_size,
         max_batch_size=max_batch_size,
@@ -1109,33 +1560,138 @@ class BatchElements(PTransform):
       self._bucket_boundaries = self._DEFAULT_BUCKET_BOUNDARIES
     else:
       self._bucket_boundaries = bucket_boundaries
+    self._max_batch_weight = max_batch_weight
+    self._keyed = keyed
+    if keyed:
+      self.with_input_types(tuple[K, V]).with_output_types(tuple[K, list[V]])
 
   def expand(self, pcoll):
     if getattr(pcoll.pipeline.runner, 'is_streaming', False):
       raise NotImplementedError("Requires stateful processing (BEAM-2687)")
     elif self._max_batch_dur is not None:
-      coder = coders.registry.get_coder(pcoll)
-      if self._length_fn is not None:
-        keying_dofn = WithLengthBucketKey(
-            self._length_fn, self._bucket_boundaries)
+      if self._keyed:
+        _, value_type = trivial_inference.key_value_types(pcoll.element_type)
+        coder = coders.registry.get_coder(value_type)
+        keyed_pcoll = pcoll
       else:
-        keying_dofn = WithSharedKey()
-      return pcoll | ParDo(keying_dofn) | ParDo(
+        coder = coders.registry.get_coder(pcoll)
+        if self._length_fn is not None:
+          keying_dofn = WithLengthBucketKey(
+              self._length_fn, self._bucket_boundaries)
+        else:
+          keying_dofn = WithSharedKey()
+        keyed_pcoll = pcoll | ParDo(keying_dofn)
+      return keyed_pcoll | ParDo(
           _pardo_stateful_batch_elements(
               coder,
               self._batch_size_estimator,
               self._max_batch_dur,
-              self._clock))
+              self._clock,
+              element_size_fn=self._element_size_fn,
+              max_batch_weight=self._max_batch_weight,
+              keyed=self._keyed))
+    elif self._keyed:
+      return pcoll | ParDo(
+          _KeyedBatchingDoFn(
+              self._batch_size_estimator,
+              self._element_size_fn,
+              self._max_batch_weight))
     elif pcoll.windowing.is_default():
       # This is the same logic as _GlobalWindowsBatchingDoFn, but optimized
       # for that simpler case.
       return pcoll | ParDo(
           _GlobalWindowsBatchingDoFn(
-              self._batch_size_estimator, self._element_size_fn))
+              self._batch_size_estimator,
+              self._element_size_fn,
+              self._max_batch_weight))
     else:
       return pcoll | ParDo(
           _WindowAwareBatchingDoFn(
-              self._batch_size_estimator, self._element_size_fn))
+              self._batch_size_estimator,
+              self._element_size_fn,
+              self._max_batch_weight))
+
+
+class _SpillingSortBuffer(object):
+  """A buffer of elements to sort by size that can spill to local disk.
+
+  Elements are held in memory until spill() is called, which sorts them and
+  writes them to a temporary file as a sorted run, encoded with coder_impl.
+  sorted_elements() then merges the runs with the elements still in memory
+  lazily, in the same order as sorting all of them would.
+
+  Once there are _MAX_RUNS runs, they are merged into a single one, so that no
+  more than _MAX_RUNS files are open at a time.
+  """
+  _MAX_RUNS = 64
+
+  def __init__(self, coder_impl, element_size_fn):
+    self._coder_impl = coder_impl
+    self._element_size_fn = element_size_fn
+    self._elements = []
+    self._runs = []
+    self._count = 0
+    # The total size of the elements held in memory.
+    self.weight = 0
+
+  def __len__(self):
+    return self._count
+
+  def append(self, element):
+    self._elements.append(element)
+    self._count += 1
+    self.weight += self._element_size_fn(element)
+
+  def spill(self):
+    self._runs.append(
+        self._write_run(sorted(self._elements, key=self._element_size_fn)))
+    self._elements = []
+    self.weight = 0
+    if len(self._runs) >= self._MAX_RUNS:
+      self._runs = [self._write_run(self._merge_runs([]))]
+
+  def _write_run(self, sorted_elements):
+    run = tempfile.TemporaryFile()
+    for element in sorted_elements:
+      encoded = self._coder_impl.encode(element)
+      run.write(struct.pack('>I', len(encoded)))
+      run.write(encoded)
+    run.seek(0)
+    return run
+
+  def _read_run(self, run):
+    with run:
+      while True:
+        header = run.read(4)
+        if not header:
+          return
+        length, = struct.unpack('>I', header)
+        yield self._coder_impl.decode(run.read(length))
+
+  def sorted_elements(self):
+    elements = sorted(self._elements, key=self._element_size_fn)
+    self._elements = None
+    if not self._runs:
+      return elements
+    return self._merge_runs(elements)
+
+  def _merge_runs(self, elements):
+    # The runs hold earlier elements, so that ties keep their input order.
+    return heapq.merge(
+        *[self._read_run(run) for run in self._runs],
+        elements,
+        key=self._element_size_fn)
+
+  def close(self):
+    for run in self._runs:
+      run.close()
+    self._runs = []
+
+
+def _sort_by_size(buffer, element_size_fn):
+  if isinstance(buffer, _SpillingSortBuffer):
+    return buffer.sorted_elements()
+  return sorted(buffer, key=element_size_fn)
 
 
 class _SortAndBatchElementsDoFn(DoFn):
@@ -1146,6 +1702,9 @@ class _SortAndBatchElementsDoFn(DoFn):
   elements in the current bundle, sorts them by size in ascending order,
   and emits optimally-sized batches on ``finish_bundle``.
 
+  With ``max_buffer_weight``, elements beyond it are spilled to local
+  temporary files as sorted runs, which are merged on ``finish_bundle``.
+
   Args:
     min_batch_size: The minimum number of elements per batch. Must be >= 1.
     max_batch_size: The maximum number of elements per batch.
@@ -1154,17 +1713,24 @@ class _SortAndBatchElementsDoFn(DoFn):
         where weight is computed by ``element_size_fn``. Must be >= 1.
     element_size_fn: An optional callable mapping an element to its integer
         size/weight.
+    max_buffer_weight: An optional maximum total weight of the elements held
+        in memory. Requires ``coder``.
+    coder: The coder of the elements, used to spill them.
   """
   def __init__(
       self,
       min_batch_size: int,
       max_batch_size: int,
       max_batch_weight: int,
-      element_size_fn: Optional[Callable[[Any], int]]):
+      element_size_fn: Optional[Callable[[Any], int]],
+      max_buffer_weight: Optional[int] = None,
+      coder: Optional[coders.Coder] = None):
     self._min_batch_size = min_batch_size
     self._max_batch_size = max_batch_size
     self._max_batch_weight = max_batch_weight
     self._element_size_fn = element_size_fn or self._default_element_size
+    self._max_buffer_weight = max_buffer_weight
+    self._coder = coder
     self._has_warned_type_error = False
     self._buffer = []
 
@@ -1182,10 +1748,17 @@ class _SortAndBatchElementsDoFn(DoFn):
       return 1
 
   def start_bundle(self):
-    self._buffer = []
+    if self._max_buffer_weight:
+      self._buffer = _SpillingSortBuffer(
+          self._coder.get_impl(), self._element_size_fn)
+    else:
+      self._buffer = []
 
   def process(self, element):
     self._buffer.append(element)
+    if self._max_buffer_weight and (self._buffer.weight
+                                    > self._max_buffer_weight):
+      self._buffer.spill()
 
   def finish_bundle(self):
     if not self._buffer:
@@ -1193,7 +1766,7 @@ class _SortAndBatchElementsDoFn(DoFn):
 
     # Sort elements by size (ascending) for optimal batching
     # Elements of similar sizes will be grouped together
-    sorted_elements = sorted(self._buffer, key=self._element_size_fn)
+    sorted_elements = _sort_by_size(self._buffer, self._element_size_fn)
 
     batch = []
     batch_weight = 0
@@ -1221,6 +1794,10 @@ class _SortAndBatchElementsDoFn(DoFn):
 
     self._buffer = None
 
+  def teardown(self):
+    if isinstance(self._buffer, _SpillingSortBuffer):
+      self._buffer.close()
+
 
 class _WindowAwareSortAndBatchElementsDoFn(DoFn):
   """DoFn that buffers, sorts by element size, and batches elements per window.
@@ -1234,6 +1811,11 @@ class _WindowAwareSortAndBatchElementsDoFn(DoFn):
   ``_WindowAwareBatchingDoFn._MAX_LIVE_WINDOWS`` so it follows the same
   existing window-aware batching behavior already used in this module.
 
+  With ``max_buffer_weight``, whenever the elements held in memory across all
+  windows exceed it, those of the largest window are spilled to a local
+  temporary file as a sorted run, and the runs of a window are merged when it
+  is flushed.
+
   Args:
     min_batch_size: The minimum number of elements per batch. Must be >= 1.
     max_batch_size: The maximum number of elements per batch.
@@ -1242,6 +1824,9 @@ class _WindowAwareSortAndBatchElementsDoFn(DoFn):
         where weight is computed by ``element_size_fn``. Must be >= 1.
     element_size_fn: An optional callable mapping an element to its integer
         size/weight.
+    max_buffer_weight: An optional maximum total weight of the elements held
+        in memory. Requires ``coder``.
+    coder: The coder of the elements, used to spill them.
   """
 
   _MAX_LIVE_WINDOWS = _WindowAwareBatchingDoFn._MAX_LIVE_WINDOWS
@@ -1251,11 +1836,15 @@ class _WindowAwareSortAndBatchElementsDoFn(DoFn):
       min_batch_size: int,
       max_batch_size: int,
       max_batch_weight: int,
-      element_size_fn: Optional[Callable[[Any], int]]):
+      element_size_fn: Optional[Callable[[Any], int]],
+      max_buffer_weight: Optional[int] = None,
+      coder: Optional[coders.Coder] = None):
     self._min_batch_size = min_batch_size
     self._max_batch_size = max_batch_size
     self._max_batch_weight = max_batch_weight
     self._element_size_fn = element_size_fn or self._default_element_size
+    self._max_buffer_weight = max_buffer_weight
+    self._coder = coder
     self._has_warned_type_error = False
     self._buffers = collections.defaultdict(list)
 
@@ -1272,12 +1861,24 @@ class _WindowAwareSortAndBatchElementsDoFn(DoFn):
         self._has_warned_type_error = True
       return 1
 
+  def _new_spilling_buffer(self):
+    return _SpillingSortBuffer(self._coder_impl, self._element_size_fn)
+
   def start_bundle(self):
-    self._buffers = collections.defaultdict(list)
+    if self._max_buffer_weight:
+      self._coder_impl = self._coder.get_impl()
+      self._buffers = collections.defaultdict(self._new_spilling_buffer)
+    else:
+      self._buffers = collections.defaultdict(list)
 
   def process(self, element, window=DoFn.WindowParam):
     self._buffers[window].append(element)
 
+    if self._max_buffer_weight and sum(
+        buffer.weight
+        for buffer in self._buffers.values()) > self._max_buffer_weight:
+      max(self._buffers.values(), key=lambda buffer: buffer.weight).spill()
+
     # If we have too many live windows, flush the largest one
     if len(self._buffers) > self._MAX_LIVE_WINDOWS:
       largest_window = max(
@@ -1291,7 +1892,7 @@ class _WindowAwareSortAndBatchElementsDoFn(DoFn):
       return
 
     # Sort elements by size (ascending)
-    sorted_elements = sorted(buffer, key=self._element_size_fn)
+    sorted_elements = _sort_by_size(buffer, self._element_size_fn)
 
     batch = []
     batch_weight = 0
@@ -1319,6 +1920,11 @@ class _WindowAwareSortAndBatchElementsDoFn(DoFn):
       yield from self._flush_window(win)
     self._buffers = None
 
+  def teardown(self):
+    for buffer in (self._buffers or {}).values():
+      if isinstance(buffer, _SpillingSortBuffer):
+        buffer.close()
+
 
 @typehints.with_input_types(T)
 @typehints.with_output_types(list[T])
@@ -1344,6 +1950,12 @@ class SortAndBatchElements(PTransform):
   and then creates optimally-sized batches. This trade-off of increased memory
   usage for better batch homogeneity can significantly reduce padding overhead.
 
+  To bound that memory for large bundles, set max_buffer_weight. Whenever the
+  elements held in memory exceed it, they are sorted and spilled to local
+  temporary files, encoded with the coder of the input PCollection. The sorted
+  runs are then merged lazily when the bundle finishes, so that batches are
+  the same as without spilling, and are emitted as they fill.
+
   Args:
     min_batch_size: The minimum number of elements in a batch. Must be >= 1.
     max_batch_size: The maximum number of elements in a batch.
@@ -1355,6 +1967,9 @@ class SortAndBatchElements(PTransform):
         If not provided, defaults to trying len(element) and falling back to 1
         if the element doesn't support len(). This default allows sorting to
         work for common types like strings, lists, and arrays.
+    max_buffer_weight: (optional) the maximum total weight of the elements
+        held in memory, as computed by element_size_fn, beyond which they are
+        spilled to local disk. Defaults to None, which never spills.
 
   Example usage::
 
@@ -1381,7 +1996,8 @@ class SortAndBatchElements(PTransform):
       min_batch_size: int,
       max_batch_size: int,
       max_batch_weight: int,
-      element_size_fn: Optional[Callable[[Any], int]] = None):
+      element_size_fn: Optional[Callable[[Any], int]] = None,
+      max_buffer_weight: Optional[int] = None):
     if min_batch_size < 1:
       raise ValueError(f'min_batch_size must be >= 1, got {min_batch_size}')
     if max_batch_size < min_batch_size:
@@ -1392,29 +2008,39 @@ class SortAndBatchElements(PTransform):
       raise ValueError(f'max_batch_weight must be >= 1, got {max_batch_weight}')
     if element_size_fn is not None and not callable(element_size_fn):
       raise TypeError('element_size_fn must be callable')
+    if max_buffer_weight is not None and max_buffer_weight < 1:
+      raise ValueError(
+          f'max_buffer_weight must be >= 1, got {max_buffer_weight}')
 
     self._min_batch_size = min_batch_size
     self._max_batch_size = max_batch_size
     self._max_batch_weight = max_batch_weight
+    self._max_buffer_weight = max_buffer_weight
 
     # None means the DoFn will use its own _default_element_size method,
     # which tries len() and warns once on TypeError before falling back to 1.
     self._element_size_fn = element_size_fn
 
   def expand(self, pcoll):
+    coder = (
+        coders.registry.get_coder(pcoll) if self._max_buffer_weight else None)
     if pcoll.windowing.is_default():
       return pcoll | ParDo(
           _SortAndBatchElementsDoFn(
               self._min_batch_size,
               self._max_batch_size,
               self._max_batch_weight,
-              self._element_size_fn))
+              self._element_size_fn,
+              self._max_buffer_weight,
+              coder))
     return pcoll | ParDo(
         _WindowAwareSortAndBatchElementsDoFn(
             self._min_batch_size,
             self._max_batch_size,
             self._max_batch_weight,
-            self._element_size_fn))
+            self._element_size_fn,
+            self._max_buffer_weight,
+            coder))
 
 
 class _IdentityWindowFn(NonMergingWindowFn):
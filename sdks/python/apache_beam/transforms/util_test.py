@@ -242,6 +242,162 @@ class CoGroupByKeyTest(unittest.TestCase):
       expected = [0, 0, 1, 2, 2, 4, 3, 6, 4, 8]
       assert_that(pcoll, equal_to(expected))
 
+  def test_skew_aware_co_group_by_key_joins_hot_keys(self):
+    orders = [('hot', i) for i in range(200)] + [('a', 1), ('b', 2)]
+    customers = [('hot', 'H'), ('a', 'A'), ('c', 'C')]
+    p = TestPipeline('FnApiRunner')
+    grouped = ({
+        'orders': p | 'Orders' >> beam.Create(orders),
+        'customers': p | 'Customers' >> beam.Create(customers)
+    }
+               | util.SkewAwareCoGroupByKey(
+                   hot_key_fanout=4, hot_key_fraction=0.1))
+    joined = grouped | beam.FlatMapTuple(
+        lambda k, vs: [(k, o, c) for o in vs['orders'] or [None]
+                       for c in vs['customers'] or [None]])
+    assert_that(
+        joined,
+        equal_to([('hot', i, 'H') for i in range(200)] +
+                 [('a', 1, 'A'), ('b', 2, None), ('c', None, 'C')]))
+    assert_that(
+        grouped
+        | beam.MapTuple(lambda k, _: k)
+        | beam.combiners.Count.PerElement(),
+        equal_to([('hot', 4), ('a', 1), ('b', 1), ('c', 1)]),
+        label='CheckKeys')
+    res = p.run()
+    res.wait_until_finish()
+
+    def counter(name):
+      results = res.metrics().query(MetricsFilter().with_name(name))['counters']
+      return sum(result.committed for result in results)
+
+    self.assertEqual(counter('hot_keys'), 1)
+    self.assertEqual(counter('split_values'), 200)
+    self.assertEqual(counter('replicated_values'), 3)
+
+  def test_skew_aware_co_group_by_key_matches_co_group_by_key(self):
+    with TestPipeline() as pipeline:
+      pcoll_1 = pipeline | 'Start 1' >> beam.Create([('a', 1), ('a', 2),
+                                                     ('b', 3), ('c', 4)])
+      pcoll_2 = pipeline | 'Start 2' >> beam.Create([('a', 5), ('a', 6),
+                                                     ('c', 7), ('c', 8)])
+      result = ((pcoll_1, pcoll_2)
+                | util.SkewAwareCoGroupByKey(hot_key_fanout=100)
+                | beam.MapTuple(lambda k, vs: (k, tuple(list(v) for v in vs)))
+                | SortLists)
+      assert_that(
+          result,
+          equal_to([('a', ([1, 2], [5, 6])), ('b', ([3], [])),
+                    ('c', ([4], [7, 8]))]))
+
+  def test_skew_aware_co_group_by_key_on_sessions(self):
+    with TestPipeline() as pipeline:
+      pcoll = (
+          pipeline
+          | beam.Create([('a', 1), ('a', 2), ('b', 30)])
+          | beam.Map(lambda kv: window.TimestampedValue(kv, kv[1]))
+          | beam.WindowInto(window.Sessions(5)))
+      result = ({
+          'x': pcoll
+      }
+                | util.SkewAwareCoGroupByKey()
+                | beam.MapTuple(lambda k, vs: (k, sorted(vs['x']))))
+      assert_that(result, equal_to([('a', [1, 2]), ('b', [30])]))
+
+  def test_skew_aware_co_group_by_key_on_unbounded_global_window(self):
+    pipeline = TestPipeline()
+    pcoll = (
+        pipeline
+        | beam.Create([('a', 1)])
+        | beam.WindowInto(
+            window.GlobalWindows(),
+            trigger=trigger.Repeatedly(trigger.AfterCount(1)),
+            accumulation_mode=trigger.AccumulationMode.DISCARDING))
+    pcoll.is_bounded = False
+    with mock.patch.object(util._SkewAwareCoGBKImpl,
+                           '_sample_hot_keys') as sample_hot_keys:
+      result = {'x': pcoll} | util.SkewAwareCoGroupByKey()
+    sample_hot_keys.assert_not_called()
+    self.assertEqual(
+        result.element_type,
+        typehints.Tuple[str, typehints.Dict[str, typehints.List[int]]])
+
+  def test_skew_aware_co_group_by_key_on_fixed_windows(self):
+    first, second = range(9), range(10, 15)
+    orders = [('hot', i) for i in list(first) + list(second)]
+    customers = [('hot', 'H', 0), ('hot', 'I', 10), ('cold', 'C', 10)]
+    with TestPipeline() as pipeline:
+      grouped = ({
+          'orders': pipeline
+          | 'Orders' >> beam.Create(orders)
+          | 'StampOrders' >>
+          beam.Map(lambda kv: window.TimestampedValue(kv, kv[1]))
+          | 'WindowOrders' >> beam.WindowInto(window.FixedWindows(10)),
+          'customers': pipeline
+          | 'Customers' >> beam.Create(customers)
+          | 'StampCustomers' >>
+          beam.Map(lambda kvt: window.TimestampedValue(kvt[:2], kvt[2]))
+          | 'WindowCustomers' >> beam.WindowInto(window.FixedWindows(10))
+      }
+                 | util.SkewAwareCoGroupByKey(
+                     hot_key_fanout=4, hot_key_fraction=0.5))
+      joined = grouped | beam.FlatMapTuple(
+          lambda k, vs: [(k, o, c) for o in vs['orders'] or [None]
+                         for c in vs['customers'] or [None]])
+      assert_that(
+          joined,
+          equal_to([('hot', i, 'H') for i in first] +
+                   [('hot', i, 'I') for i in second] + [('cold', None, 'C')]))
+
+  def test_skew_aware_collect_values_drops_replicated_only_sub_keys(self):
+    tag_fn = util._SkewAwareTagDoFn('orders', 4)
+    tag_fn.setup()
+    hot_keys = {'hot': 'orders'}
+    # The first bundle leaves the next sub-key of the hot key at 1.
+    for i in range(5):
+      list(tag_fn.process(('hot', i), hot_keys))
+    grouped = collections.defaultdict(list)
+    for i in range(2):
+      for sub_key, tagged_value in tag_fn.process(('hot', i), hot_keys):
+        grouped[sub_key].append(tagged_value)
+    for shard in range(4):
+      grouped['hot', shard].append(('customers', 'H'))
+
+    collect_fn = util._SkewAwareCollectValuesDoFn(['orders', 'customers'])
+    outputs = [
+        output for element in grouped.items()
+        for output in collect_fn.process(element, hot_keys)
+    ]
+    self.assertEqual(
+        sorted(list(values['orders']) for _, values in outputs), [[0], [1]])
+
+  def test_skew_aware_co_group_by_key_validation(self):
+    with self.assertRaises(ValueError):
+      util.SkewAwareCoGroupByKey(hot_key_fanout=1)
+    with self.assertRaises(ValueError):
+      util.SkewAwareCoGroupByKey(hot_key_fraction=0)
+    with self.assertRaises(ValueError):
+      util.SkewAwareCoGroupByKey(sample_size=0)
+
+  def test_hot_keys_combine_fn(self):
+    combine_fn = util._HotKeysCombineFn(
+        hot_key_fanout=2, hot_key_fraction=0.25, sample_size=10)
+    accumulators = []
+    for part in range(4):
+      accumulator = combine_fn.create_accumulator()
+      for i in range(50):
+        combine_fn.add_input(accumulator, ('x', 'hot' if i % 2 else i))
+        combine_fn.add_input(accumulator, ('y', 'hot' if i == 0 else i))
+      accumulators.append(accumulator)
+    accumulator = combine_fn.merge_accumulators(accumulators)
+    self.assertEqual(accumulator['x'][0], 200)
+    self.assertEqual(len(accumulator['x'][1]), 10)
+    self.assertEqual(
+        combine_fn.extract_output(accumulator).get('hot', 'x'), 'x')
+    self.assertEqual(
+        combine_fn.extract_output(combine_fn.create_accumulator()), {})
+
 
 class FakeSecret(beam.Secret):
   def __init__(self, version_name=None, should_throw=False):
@@ -879,6 +1035,82 @@ class BatchElementsTest(unittest.TestCase):
           | beam.Map(len))
       assert_that(res, equal_to([1, 1, 2, 4, 8, 16, 32, 50, 50]))
 
+  def test_max_batch_weight(self):
+    # Assumes a single bundle, in order, so we pin to the FnApiRunner
+    data = ['aaaa', 'bbbb', 'cc', 'd', 'e' * 12, 'f', 'g', 'h']
+    for max_batch_duration_secs in (None, 100):
+      with TestPipeline('FnApiRunner') as p:
+        res = (
+            p
+            | beam.Create(data, reshuffle=False)
+            | util.BatchElements(
+                min_batch_size=3,
+                max_batch_size=3,
+                max_batch_duration_secs=max_batch_duration_secs,
+                element_size_fn=len,
+                max_batch_weight=10)
+            | beam.Map(lambda batch: len(''.join(batch))))
+        assert_that(res, equal_to([10, 1, 12, 3]))
+
+  def test_stateful_sized_batches(self):
+    # Assumes a single bundle, in order, so we pin to the FnApiRunner
+    with TestPipeline('FnApiRunner') as p:
+      res = (
+          p
+          | beam.Create(['a', 'a', 'aaaaaaaaaa', 'aaaaa', 'aaaaa'],
+                        reshuffle=False)
+          | util.BatchElements(
+              min_batch_size=10,
+              max_batch_size=10,
+              max_batch_duration_secs=100,
+              element_size_fn=len)
+          | beam.Map(len))
+      assert_that(res, equal_to([3, 2]))
+
+  def test_keyed_batches(self):
+    data = [('a', i) for i in range(7)] + [('b', i) for i in range(4)]
+    for max_batch_duration_secs in (None, 100):
+      with TestPipeline() as p:
+        res = (
+            p
+            | beam.Create(data)
+            | util.BatchElements(
+                min_batch_size=3,
+                max_batch_size=3,
+                max_batch_duration_secs=max_batch_duration_secs,
+                keyed=True))
+        assert_that(
+            res | beam.MapTuple(lambda k, batch: (k, sorted(batch)[0] // 3)),
+            equal_to([('a', 0), ('a', 1), ('a', 2), ('b', 0), ('b', 1)]),
+            label='keys')
+        assert_that(
+            res | beam.MapTuple(lambda k, batch: (k, len(batch))),
+            equal_to([('a', 3), ('a', 3), ('a', 1), ('b', 3), ('b', 1)]),
+            label='sizes')
+
+  def test_keyed_batch_size_estimators(self):
+    # Assumes a single bundle, so we pin to the FnApiRunner
+    with TestPipeline('FnApiRunner') as p:
+      res = (
+          p
+          | beam.Create([(k, i) for i in range(15) for k in 'ab'],
+                        reshuffle=False)
+          | util.BatchElements(
+              min_batch_size=1,
+              max_batch_size=50,
+              clock=FakeClock(),
+              keyed=True)
+          | beam.MapTuple(lambda k, batch: (k, len(batch))))
+      # Each key grows its own batch size.
+      assert_that(
+          res, equal_to([(k, n) for k in 'ab' for n in (1, 1, 2, 4, 7)]))
+
+  def test_keyed_validation(self):
+    with self.assertRaises(ValueError):
+      util.BatchElements(keyed=True, length_fn=len)
+    with self.assertRaises(ValueError):
+      util.BatchElements(max_batch_weight=0)
+
   def test_length_bucket_assignment(self):
     """WithLengthBucketKey assigns correct bucket indices."""
     boundaries = [10, 50, 100]
@@ -1308,6 +1540,16 @@ class SortAndBatchElementsTest(unittest.TestCase):
           min_batch_size=1, max_batch_size=10, max_batch_weight=0)
     self.assertIn('max_batch_weight must be >= 1', str(cm.exception))
 
+  def test_validation_max_buffer_weight(self):
+    """Test that max_buffer_weight validation raises ValueError."""
+    with self.assertRaises(ValueError) as cm:
+      util.SortAndBatchElements(
+          min_batch_size=1,
+          max_batch_size=10,
+          max_batch_weight=10,
+          max_buffer_weight=0)
+    self.assertIn('max_buffer_weight must be >= 1', str(cm.exception))
+
   def test_validation_element_size_fn_callable(self):
     """Test that a non-callable element_size_fn raises TypeError."""
     with self.assertRaises(TypeError) as cm:
@@ -1475,6 +1717,85 @@ class SortAndBatchElementsDoFnDirectTest(unittest.TestCase):
     result = list(dofn._flush_window(IntervalWindow(0, 10)))
     self.assertEqual(result, [])
 
+  def test_global_dofn_spills_to_disk(self):
+    """Test that a bounded buffer produces the same batches as an unbounded
+    one."""
+    from apache_beam.transforms.util import _SortAndBatchElementsDoFn
+
+    random.seed(0)
+    data = ['x' * random.randint(1, 50) + str(i) for i in range(500)]
+
+    def batches(max_buffer_weight):
+      dofn = _SortAndBatchElementsDoFn(
+          min_batch_size=1,
+          max_batch_size=8,
+          max_batch_weight=200,
+          element_size_fn=len,
+          max_buffer_weight=max_buffer_weight,
+          coder=coders.StrUtf8Coder())
+      dofn.start_bundle()
+      for elem in data:
+        dofn.process(elem)
+      if max_buffer_weight:
+        # Only the elements since the last spill are held in memory.
+        self.assertLessEqual(dofn._buffer.weight, max_buffer_weight)
+        self.assertGreater(len(dofn._buffer._runs), 1)
+      return [wv.value for wv in dofn.finish_bundle()]
+
+    self.assertEqual(batches(None), batches(1000))
+
+  def test_spilled_runs_are_compacted(self):
+    from apache_beam.transforms.util import _SpillingSortBuffer
+
+    random.seed(0)
+    data = [random.randint(0, 100) for _ in range(300)]
+    buffer = _SpillingSortBuffer(
+        coders.VarIntCoder().get_impl(), lambda x: x // 10)
+    with mock.patch.object(_SpillingSortBuffer, '_MAX_RUNS', 4):
+      for i, elem in enumerate(data):
+        buffer.append(elem)
+        if i % 10 == 9:
+          buffer.spill()
+          self.assertLess(len(buffer._runs), 4)
+    self.assertEqual(
+        list(buffer.sorted_elements()), sorted(data, key=lambda x: x // 10))
+    buffer.close()
+
+  def test_windowed_dofn_spills_to_disk(self):
+    """Test spilling in the windowed DoFn."""
+    from apache_beam.transforms.util import _WindowAwareSortAndBatchElementsDoFn
+
+    dofn = _WindowAwareSortAndBatchElementsDoFn(
+        min_batch_size=1,
+        max_batch_size=2,
+        max_batch_weight=100,
+        element_size_fn=len,
+        max_buffer_weight=5,
+        coder=coders.StrUtf8Coder())
+    dofn.start_bundle()
+    win1 = IntervalWindow(0, 3)
+    win2 = IntervalWindow(3, 6)
+    for elem, win in [('cccc', win1), ('a', win2), ('bb', win1), ('ddd', win1),
+                      ('e', win1), ('ff', win2)]:
+      self.assertEqual(list(dofn.process(elem, win)), [])
+    self.assertEqual(
+        sorted((wv.windows[0].start, wv.value) for wv in dofn.finish_bundle()),
+        [(0, ['ddd', 'cccc']), (0, ['e', 'bb']), (3, ['a', 'ff'])])
+
+  def test_spilling_pipeline(self):
+    """Test SortAndBatchElements with a bounded buffer in a pipeline."""
+    with TestPipeline() as p:
+      data = ['aaaaa', 'bb', 'cccc', 'a', 'ddd']
+      res = (
+          p
+          | beam.Create(data, reshuffle=False)
+          | util.SortAndBatchElements(
+              min_batch_size=1,
+              max_batch_size=5,
+              max_batch_weight=100,
+              max_buffer_weight=4))
+      assert_that(res, equal_to([['a', 'bb', 'ddd', 'cccc', 'aaaaa']]))
+
   def test_windowed_dofn_weight_splitting(self):
     """Test weight-based splitting in the windowed DoFn."""
     from apache_beam.transforms.util import _WindowAwareSortAndBatchElementsDoFn
@@ -344,6 +344,10 @@ class PyarrowBatchConverter(BatchConverter):
   def estimate_byte_size(self, batch: pa.Table):
     return batch.nbytes
 
+  def get_batch_coder(self):
+    from apache_beam.coders.batch_coders import ArrowIpcBatchCoder
+    return ArrowIpcBatchCoder(self, self._arrow_schema)
+
   @staticmethod
   def _from_serialized_schema(serialized_schema):
     beam_schema = proto_utils.parse_Bytes(serialized_schema, schema_pb2.Schema)
@@ -382,11 +386,15 @@ class PyarrowArrayBatchConverter(BatchConverter):
     return pa.concat_arrays(batches)
 
   def get_length(self, batch: pa.Array):
-    return batch.num_rows
+    return len(batch)
 
   def estimate_byte_size(self, batch: pa.Array):
     return batch.nbytes
 
+  def get_batch_coder(self):
+    from apache_beam.coders.batch_coders import ArrowIpcArrayBatchCoder
+    return ArrowIpcArrayBatchCoder(self, self._arrow_type)
+
 
 @BatchConverter.register(name="pyarrow")
 def create_pyarrow_batch_converter(
@@ -72,6 +72,16 @@ class BatchConverter(Generic[B, E]):
   def estimate_byte_size(self, batch):
     raise NotImplementedError
 
+  def get_batch_coder(self) -> Optional['coders.Coder']:
+    """Returns a coder that encodes a whole instance of B at once, or None.
+
+    If provided, it must be an instance of
+    :class:`~apache_beam.coders.batch_coders.BatchCoder`. Batch coders are used
+    to pass batches across the data plane between a producer and consumers that
+    all process batches of this type.
+    """
+    return None
+
   @staticmethod
   def register(*, name: str):
     def do_registration(
@@ -207,6 +207,13 @@ class DataFrameBatchConverter(BatchConverter):
   def estimate_byte_size(self, batch: pd.DataFrame):
     return batch.memory_usage().sum()
 
+  def get_batch_coder(self):
+    from apache_beam.coders import batch_coders
+    if batch_coders.pa is None:
+      return None
+    return batch_coders.DataFrameArrowBatchCoder(
+        self, preserve_index=isinstance(self, DataFrameBatchConverterKeepIndex))
+
   def get_length(self, batch: pd.DataFrame):
     return len(batch)
 
@@ -298,5 +305,11 @@ class SeriesBatchConverter(BatchConverter):
   def estimate_byte_size(self, batch: pd.Series):
     return batch.memory_usage()
 
+  def get_batch_coder(self):
+    from apache_beam.coders import batch_coders
+    if batch_coders.pa is None:
+      return None
+    return batch_coders.SeriesArrowBatchCoder(self, self._dtype)
+
   def get_length(self, batch: pd.Series):
     return len(batch)